@@ -5,6 +5,7 @@ from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 
 from .config import config
+from .cache import cache
 
 # Extensions
 db = SQLAlchemy()
@@ -23,6 +24,7 @@ def create_app(config_name='default'):
     login_manager.init_app(app)
     jwt.init_app(app)
     bcrypt.init_app(app)
+    cache.init_app(app)
 
     # Login manager settings
     login_manager.login_view = 'auth.login'
@@ -55,12 +57,20 @@ def create_app(config_name='default'):
     app.register_blueprint(templates_bp, url_prefix='/templates')
     app.register_blueprint(body_bp, url_prefix='/body')
 
-    # User loader for Flask-Login
-    from .models.user import User
+    # User loaders for Flask-Login and JWT share one per-worker cache
+    from .models.user import User, user_cache
+
+    user_cache.ttl = app.config['USER_CACHE_TTL']
+    user_cache.max_entries = app.config['USER_CACHE_MAX_ENTRIES']
+    user_cache.clear()
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return User.get_cached(user_id)
+
+    @jwt.user_lookup_loader
+    def load_jwt_user(_jwt_header, jwt_data):
+        return User.get_cached(jwt_data['sub'])
 
     # Offline page route
     @app.route('/offline.html')
@@ -2,8 +2,17 @@ from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from datetime import date, timedelta
 from app import db
-from app.models import WorkoutSession, StrengthLog, RunningLog, PersonalRecord, Exercise
+from app.cache import cache, user_tag
+from app.models import (
+    WorkoutSession, StrengthLog, RunningLog, PersonalRecord, Exercise, ExerciseMuscleGroup
+)
 from sqlalchemy import func, text
+from app.services.hr_zones import zone_distribution
+from app.services.training_load import load_series
+from app.services.intervals import rep_pace_trends
+from app.services.muscle_sets import weekly_hard_sets, hard_sets_for_week
+from app.services.relative_strength import relative_strength_history, relative_pr
+from app.services.aggregation import aggregate
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -44,31 +53,45 @@ def running_analytics():
 @analytics_bp.route('/api/strength-volume')
 @login_required
 def strength_volume_data():
-    """Get weekly strength volume data for charts."""
-    weeks = request.args.get('weeks', 12, type=int)
-
-    result = db.session.execute(
-        text('''
-            SELECT week_start, muscle_group, total_volume
-            FROM weekly_strength_volume
-            WHERE user_id = :user_id
-            ORDER BY week_start DESC
-            LIMIT :limit
-        '''),
-        {'user_id': current_user.user_id, 'limit': weeks * 10}
-    )
+    """Get weekly strength volume per muscle group for charts."""
+    weeks = max(1, min(request.args.get('weeks', 12, type=int), 260))
+    today = date.today()
+    result = aggregate(current_user.user_id, ['strength_volume'], 'week',
+                       start=today - timedelta(weeks=weeks - 1), end=today, group_by='muscle_group')
 
     # Organize by week and muscle group
-    data = {}
-    for row in result:
-        week = str(row.week_start)
-        if week not in data:
-            data[week] = {}
-        data[week][row.muscle_group] = float(row.total_volume or 0)
-
+    series = result['metrics']['strength_volume']['series']
+    data = {week: {muscle_group: values[i] for muscle_group, values in series.items() if values[i]}
+            for i, week in enumerate(result['buckets'])}
     return jsonify(data)
 
 
+@analytics_bp.route('/api/aggregate')
+@login_required
+def aggregate_data():
+    """Get any metrics bucketed by day/week/month/quarter/year, optionally grouped.
+
+    ``metric`` may be repeated or comma-separated; ``start``/``end`` are ISO dates.
+    """
+    metrics = [name for value in request.args.getlist('metric') for name in value.split(',') if name]
+    try:
+        start, end = (date.fromisoformat(request.args[key]) if request.args.get(key) else None
+                      for key in ('start', 'end'))
+        result = aggregate(current_user.user_id, metrics, request.args.get('bucket', 'week'),
+                           start, end, request.args.get('group_by') or None)
+    except (ValueError, OverflowError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
+@analytics_bp.route('/api/muscle-sets')
+@login_required
+def muscle_sets_data():
+    """Get weekly hard sets per muscle group for charts."""
+    weeks = request.args.get('weeks', 12, type=int)
+    return jsonify(weekly_hard_sets(current_user.user_id, weeks))
+
+
 @analytics_bp.route('/api/exercise-progress/<int:exercise_id>')
 @login_required
 def exercise_progress(exercise_id):
@@ -86,6 +109,17 @@ def exercise_progress(exercise_id):
     return jsonify(data)
 
 
+@analytics_bp.route('/api/relative-strength/<int:exercise_id>')
+@login_required
+def relative_strength(exercise_id):
+    """Get e1RM per kg of bodyweight (and DOTS) over time, with the relative PR."""
+    user_id, sex = current_user.user_id, current_user.sex
+    return jsonify({
+        'history': relative_strength_history(user_id, exercise_id, sex),
+        'pr': relative_pr(user_id, exercise_id, sex)
+    })
+
+
 @analytics_bp.route('/api/running-progress')
 @login_required
 def running_progress():
@@ -118,66 +152,50 @@ def running_progress():
 @login_required
 def run_type_distribution():
     """Get distribution of run types."""
+    user_id = current_user.user_id
+    return jsonify(cache.get_or_set(
+        f'analytics:run-types:{user_id}',
+        lambda: _run_type_distribution(user_id),
+        tags=[user_tag(user_id)]
+    ))
+
+
+def _run_type_distribution(user_id):
+    """Count runs and distance per run type."""
     result = db.session.query(
         RunningLog.run_type,
         func.count(RunningLog.log_id).label('count'),
         func.sum(RunningLog.distance_km).label('total_distance')
     ).join(WorkoutSession).filter(
-        WorkoutSession.user_id == current_user.user_id
+        WorkoutSession.user_id == user_id
     ).group_by(RunningLog.run_type).all()
 
-    data = [{
+    return [{
         'type': row.run_type or 'other',
         'count': row.count,
         'distance': float(row.total_distance or 0)
     } for row in result]
 
-    return jsonify(data)
-
 
 @analytics_bp.route('/api/muscle-group-volume')
 @login_required
 def muscle_group_volume():
     """Get volume distribution by muscle group."""
-    result = db.session.query(
-        Exercise.muscle_group,
-        func.sum(StrengthLog.sets * StrengthLog.reps * StrengthLog.weight_kg).label('total_volume')
-    ).join(StrengthLog).join(WorkoutSession).filter(
-        WorkoutSession.user_id == current_user.user_id
-    ).group_by(Exercise.muscle_group).all()
+    user_id = current_user.user_id
+    return jsonify(cache.get_or_set(
+        f'analytics:muscle-volume:{user_id}',
+        lambda: _muscle_group_volume(user_id),
+        tags=[user_tag(user_id)]
+    ))
 
-    data = [{
-        'muscle_group': row.muscle_group or 'Other',
-        'volume': float(row.total_volume or 0)
-    } for row in result]
-
-    return jsonify(data)
-
-
-@analytics_bp.route('/api/recovery-trends')
-@login_required
-def recovery_trends():
-    """Get recovery trends data."""
-    result = db.session.execute(
-        text('''
-            SELECT week_start, avg_sleep, avg_energy, avg_soreness, avg_motivation
-            FROM recovery_trends
-            WHERE user_id = :user_id
-            ORDER BY week_start DESC
-            LIMIT 12
-        '''),
-        {'user_id': current_user.user_id}
-    )
-
-    data = [{
-        'week': str(row.week_start),
-        'sleep': float(row.avg_sleep or 0),
-        'energy': float(row.avg_energy or 0),
-        'soreness': float(row.avg_soreness or 0),
-        'motivation': float(row.avg_motivation or 0)
-    } for row in reversed(list(result))]
 
-    return jsonify(data)
+def _muscle_group_volume(user_id):
+    """Sum strength volume per muscle group, split across target muscles."""
+    volume = ExerciseMuscleGroup.volume_by_muscle_group(user_id)
+    return [{
+        'muscle_group': muscle_group,
+        'volume': total
+    } for muscle_group, total in volume.items()]
 
 
 @analytics_bp.route('/api/workout-frequency')
@@ -308,7 +326,7 @@ def week_comparison():
         # Strength stats
         strength_result = db.session.query(
             func.count(func.distinct(WorkoutSession.session_id)).label('sessions'),
-            func.sum(StrengthLog.sets * StrengthLog.reps * StrengthLog.weight_kg).label('volume'),
+            func.sum(StrengthLog.volume_kg).label('volume'),
             func.count(StrengthLog.log_id).label('sets_logged')
         ).select_from(WorkoutSession).outerjoin(StrengthLog).filter(
             WorkoutSession.user_id == current_user.user_id,
@@ -330,16 +348,12 @@ def week_comparison():
         ).first()
 
         # Volume by muscle group
-        muscle_volume = db.session.query(
-            Exercise.muscle_group,
-            func.sum(StrengthLog.sets * StrengthLog.reps * StrengthLog.weight_kg).label('volume')
-        ).join(StrengthLog).join(WorkoutSession).filter(
-            WorkoutSession.user_id == current_user.user_id,
-            WorkoutSession.session_date >= start_date,
-            WorkoutSession.session_date <= end_date
-        ).group_by(Exercise.muscle_group).all()
+        muscle_volume = ExerciseMuscleGroup.volume_by_muscle_group(
+            current_user.user_id, start_date, end_date
+        )
 
         return {
+            'muscle_sets': hard_sets_for_week(current_user.user_id, start_date),
             'strength': {
                 'sessions': strength_result.sessions or 0,
                 'volume': float(strength_result.volume or 0),
@@ -350,7 +364,7 @@ def week_comparison():
                 'distance': float(running_result.distance or 0),
                 'duration': running_result.duration or 0
             },
-            'muscle_volume': {row.muscle_group: float(row.volume or 0) for row in muscle_volume}
+            'muscle_volume': muscle_volume
         }
 
     this_week = get_week_stats(this_week_start, today)
@@ -390,7 +404,7 @@ def pr_history(exercise_id):
     logs = db.session.query(
         WorkoutSession.session_date,
         func.max(StrengthLog.weight_kg).label('max_weight'),
-        func.max(StrengthLog.weight_kg * (1 + StrengthLog.reps / 30.0)).label('max_1rm')
+        func.max(StrengthLog.e1rm).label('max_1rm')
     ).join(StrengthLog).filter(
         WorkoutSession.user_id == current_user.user_id,
         StrengthLog.exercise_id == exercise_id
@@ -420,55 +434,27 @@ def pr_history(exercise_id):
 @analytics_bp.route('/api/running-zones')
 @login_required
 def running_zones():
-    """Get heart rate zone distribution for running."""
-    # Get all runs with heart rate data
-    runs = db.session.query(
-        RunningLog.avg_heart_rate,
-        RunningLog.max_heart_rate,
-        RunningLog.duration_minutes,
-        RunningLog.run_type
-    ).join(WorkoutSession).filter(
-        WorkoutSession.user_id == current_user.user_id,
-        RunningLog.avg_heart_rate.isnot(None)
-    ).all()
+    """Get heart rate zone distribution for running (summed per-run zone times)."""
+    return jsonify(zone_distribution(current_user.user_id))
 
-    # Calculate zones based on max HR (use 220 - age estimate or user's recorded max)
-    max_hr_recorded = max([r.max_heart_rate for r in runs if r.max_heart_rate], default=190)
-    estimated_max_hr = max(max_hr_recorded, 190)
-
-    # Zone definitions (% of max HR)
-    zones = {
-        'zone1': {'name': 'Recovery', 'min': 0.50, 'max': 0.60, 'minutes': 0, 'color': '#94a3b8'},
-        'zone2': {'name': 'Aerobic', 'min': 0.60, 'max': 0.70, 'minutes': 0, 'color': '#22c55e'},
-        'zone3': {'name': 'Tempo', 'min': 0.70, 'max': 0.80, 'minutes': 0, 'color': '#eab308'},
-        'zone4': {'name': 'Threshold', 'min': 0.80, 'max': 0.90, 'minutes': 0, 'color': '#f97316'},
-        'zone5': {'name': 'VO2 Max', 'min': 0.90, 'max': 1.00, 'minutes': 0, 'color': '#ef4444'}
-    }
-
-    # Categorize each run into zones based on avg HR
-    for run in runs:
-        if run.avg_heart_rate and run.duration_minutes:
-            hr_pct = run.avg_heart_rate / estimated_max_hr
-            for zone_key, zone in zones.items():
-                if zone['min'] <= hr_pct < zone['max']:
-                    zone['minutes'] += run.duration_minutes
-                    break
-            else:
-                # If above all zones, add to zone5
-                if hr_pct >= 0.90:
-                    zones['zone5']['minutes'] += run.duration_minutes
-
-    total_minutes = sum(z['minutes'] for z in zones.values())
 
-    return jsonify({
-        'zones': [{
-            'zone': k,
-            'name': v['name'],
-            'minutes': v['minutes'],
-            'percentage': round(v['minutes'] / total_minutes * 100, 1) if total_minutes > 0 else 0,
-            'color': v['color'],
-            'hr_range': f"{int(estimated_max_hr * v['min'])}-{int(estimated_max_hr * v['max'])} bpm"
-        } for k, v in zones.items()],
-        'total_minutes': total_minutes,
-        'estimated_max_hr': estimated_max_hr
-    })
+@analytics_bp.route('/api/interval-trends')
+@login_required
+def interval_trends():
+    """Get rep paces per interval session, grouped by rep size."""
+    weeks = request.args.get('weeks', type=int)
+    start_date = date.today() - timedelta(weeks=weeks) if weeks else None
+    return jsonify(rep_pace_trends(current_user.user_id, start_date))
+
+
+@analytics_bp.route('/api/training-load')
+@login_required
+def training_load():
+    """Get the daily ATL/CTL/TSB/ACWR series (read from training_load_days)."""
+    days = min(max(request.args.get('days', 90, type=int), 1), 730)
+    user_id = current_user.user_id
+    return jsonify(cache.get_or_set(
+        f'analytics:training-load:{user_id}:{days}:{date.today()}',
+        lambda: load_series(user_id, days),
+        tags=[user_tag(user_id)]
+    ))
@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import (
     create_access_token, create_refresh_token,
-    jwt_required, get_jwt_identity
+    jwt_required, get_jwt_identity, get_current_user
 )
 from datetime import date
 from app import db
@@ -9,6 +9,11 @@ from app.models import (
     User, Exercise, WorkoutSession, StrengthLog,
     RunningLog, PersonalRecord, RecoveryLog
 )
+from app.services.hr_zones import update_run_zones
+from app.services.training_load import load_series
+from app.services.race_predictions import race_predictions
+from app.services.readiness import readiness_series
+from app.services.strength_sets import MAX_SETS, set_detail
 
 api_bp = Blueprint('api', __name__)
 
@@ -68,11 +73,7 @@ def api_refresh():
 @jwt_required()
 def api_me():
     """Get current user info."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    user = get_current_user()
 
     return jsonify({
         'id': user.user_id,
@@ -93,19 +94,7 @@ def api_exercises():
     """Get all exercises."""
     exercise_type = request.args.get('type')
 
-    query = Exercise.query
-    if exercise_type:
-        query = query.filter_by(exercise_type=exercise_type)
-
-    exercises = query.all()
-
-    return jsonify([{
-        'id': e.exercise_id,
-        'name': e.name,
-        'description': e.description,
-        'muscle_group': e.muscle_group,
-        'type': e.exercise_type
-    } for e in exercises])
+    return jsonify(Exercise.get_catalog(exercise_type))
 
 
 @api_bp.route('/exercises/<int:exercise_id>/substitutes')
@@ -138,6 +127,7 @@ def api_exercise_history(exercise_id):
         'reps': log.reps,
         'weight_kg': float(log.weight_kg) if log.weight_kg else None,
         'rpe': log.rpe,
+        'set_detail': set_detail(log),
         'estimated_1rm': log.estimated_1rm
     } for log in history])
 
@@ -208,7 +198,7 @@ def api_get_workout(session_id):
             'duration': log.duration_minutes,
             'pace': float(log.avg_pace_per_km) if log.avg_pace_per_km else None,
             'avg_hr': log.avg_heart_rate,
-            'trimp': log.trimp_score
+            'trimp': float(log.trimp_score) if log.trimp_score is not None else None
         } for log in session.running_logs]
     else:
         logs = [{
@@ -219,6 +209,8 @@ def api_get_workout(session_id):
             'reps': log.reps,
             'weight_kg': float(log.weight_kg) if log.weight_kg else None,
             'rpe': log.rpe,
+            'set_detail': set_detail(log),
+            'volume': log.volume,
             'estimated_1rm': log.estimated_1rm
         } for log in session.strength_logs]
 
@@ -267,22 +259,33 @@ def api_add_log(session_id):
             rpe=data.get('rpe'),
             rest_seconds=data.get('rest')
         )
-
-        # Check for PR
-        if data.get('weight_kg'):
-            is_pr = PersonalRecord.check_and_update_pr(
-                user_id=user_id,
-                exercise_id=data.get('exercise_id'),
-                record_type='1RM',
-                new_value=log.estimated_1rm,
-                date_achieved=session.session_date
-            )
+        if data.get('set_detail'):
+            sets = data['set_detail']
+            if not isinstance(sets, list) or len(sets) > MAX_SETS:
+                return jsonify({'error': f'set_detail must be a list of at most {MAX_SETS} sets'}), 400
+            try:
+                log.set_sets([(s['reps'], s.get('weight_kg'), s.get('rpe')) for s in sets])
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Each set needs reps of at least 1 (and optionally '
+                                         'weight_kg of 0 or more, rpe of 1-10)'}), 400
 
     db.session.add(log)
+    if session.session_type != 'running' and log.weight_kg:
+        # Flushing stores the e1RM with the user's formula
+        db.session.flush()
+        is_pr = PersonalRecord.check_and_update_pr(
+            user_id=user_id,
+            exercise_id=data.get('exercise_id'),
+            record_type='1RM',
+            new_value=log.estimated_1rm,
+            date_achieved=session.session_date
+        )
+    if session.session_type == 'running':
+        update_run_zones(log, session.user_id)
     db.session.commit()
 
     response = {'id': log.log_id}
-    if session.session_type != 'running' and data.get('weight_kg'):
+    if session.session_type != 'running' and log.weight_kg:
         response['estimated_1rm'] = log.estimated_1rm
         response['is_pr'] = is_pr if 'is_pr' in locals() else False
 
@@ -365,8 +368,8 @@ def api_add_recovery():
 @jwt_required()
 def api_stats_summary():
     """Get user stats summary."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_current_user()
+    user_id = user.user_id
 
     weekly_distance = RunningLog.get_weekly_mileage(user_id)
     recovery_avg = RecoveryLog.get_weekly_average(user_id)
@@ -379,6 +382,39 @@ def api_stats_summary():
     })
 
 
+@api_bp.route('/stats/training-load')
+@jwt_required()
+def api_training_load():
+    """Get the daily training-load series and today's values."""
+    user_id = get_jwt_identity()
+    days = min(max(request.args.get('days', 90, type=int), 1), 730)
+
+    series = load_series(user_id, days)
+    return jsonify({
+        'current': series[-1],
+        'series': series
+    })
+
+
+@api_bp.route('/stats/readiness')
+@jwt_required()
+def api_readiness():
+    """Get the stored daily readiness series."""
+    user_id = get_jwt_identity()
+    days = min(max(request.args.get('days', 90, type=int), 1), 730)
+    return jsonify(readiness_series(user_id, days))
+
+
+@api_bp.route('/stats/predictions')
+@jwt_required()
+def api_predictions():
+    """Get VDOT, race predictions and training paces."""
+    predictions = race_predictions(get_jwt_identity())
+    if predictions is None:
+        return jsonify({'error': 'No best efforts of 1500m or longer yet'}), 404
+    return jsonify(predictions)
+
+
 @api_bp.route('/stats/prs')
 @jwt_required()
 def api_prs():
@@ -2,10 +2,18 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
+from app.services.run_metrics import recompute_user_metrics, parse_pace
+from app.services.e1rm import FORMULAS, formula_choices
+from app.services.strength_sets import recompute_user_strength
+from app.services.relative_strength import DOTS_COEFFICIENTS
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _render_profile():
+    return render_template('auth/profile.html', e1rm_formulas=formula_choices())
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """User login."""
@@ -98,6 +106,8 @@ def profile():
     """User profile management."""
     if request.method == 'POST':
         action = request.form.get('action')
+        # current_user is a cached snapshot; edits go through the full model
+        user = User.query.get(current_user.user_id)
 
         if action == 'update_profile':
             username = request.form.get('username')
@@ -107,37 +117,79 @@ def profile():
             if username != current_user.username:
                 if User.query.filter_by(username=username).first():
                     flash('Username already taken.', 'error')
-                    return render_template('auth/profile.html')
+                    return _render_profile()
 
             if email != current_user.email:
                 if User.query.filter_by(email=email).first():
                     flash('Email already registered.', 'error')
-                    return render_template('auth/profile.html')
+                    return _render_profile()
 
-            current_user.username = username
-            current_user.email = email
+            user.username = username
+            user.email = email
             db.session.commit()
             flash('Profile updated successfully.', 'success')
 
+        elif action == 'update_heart_rate':
+            max_hr = request.form.get('max_heart_rate', type=int)
+            resting_hr = request.form.get('resting_heart_rate', type=int)
+            threshold_pace = parse_pace(request.form.get('threshold_pace'))
+
+            if max_hr is not None and not 120 <= max_hr <= 230:
+                flash('Max heart rate must be between 120 and 230 bpm.', 'error')
+                return redirect(url_for('auth.profile'))
+            if resting_hr is not None and not 30 <= resting_hr <= 100:
+                flash('Resting heart rate must be between 30 and 100 bpm.', 'error')
+                return redirect(url_for('auth.profile'))
+            if threshold_pace is not None and not 2.5 <= threshold_pace <= 12:
+                flash('Threshold pace must be between 2:30 and 12:00 min/km.', 'error')
+                return redirect(url_for('auth.profile'))
+
+            user.max_heart_rate = max_hr
+            user.resting_heart_rate = resting_hr
+            user.threshold_pace_per_km = threshold_pace
+            db.session.flush()
+            # Zones, TRIMP and intensity depend on the profile: reprocess every run
+            recompute_user_metrics(user.user_id)
+            db.session.commit()
+            flash('Training profile updated.', 'success')
+
+        elif action == 'update_e1rm_formula':
+            formula = request.form.get('e1rm_formula')
+            if formula not in FORMULAS:
+                flash('Unknown 1RM formula.', 'error')
+                return redirect(url_for('auth.profile'))
+
+            user.sex = request.form.get('sex') if request.form.get('sex') in DOTS_COEFFICIENTS else None
+            if formula != user.e1rm_formula:
+                user.e1rm_formula = formula
+                db.session.flush()
+                # Stored estimates follow the formula: rewrite the history
+                recompute_user_strength(user.user_id)
+            db.session.commit()
+            flash('Strength settings updated.', 'success')
+
         elif action == 'change_password':
             current_password = request.form.get('current_password')
             new_password = request.form.get('new_password')
             confirm_password = request.form.get('confirm_password')
 
-            if not current_user.check_password(current_password):
+            if not user.check_password(current_password):
                 flash('Current password is incorrect.', 'error')
-                return render_template('auth/profile.html')
+                return _render_profile()
 
             if new_password != confirm_password:
                 flash('New passwords do not match.', 'error')
-                return render_template('auth/profile.html')
+                return _render_profile()
 
             if len(new_password) < 8:
                 flash('Password must be at least 8 characters.', 'error')
-                return render_template('auth/profile.html')
+                return _render_profile()
 
-            current_user.set_password(new_password)
+            user.set_password(new_password)
             db.session.commit()
             flash('Password changed successfully.', 'success')
 
-    return render_template('auth/profile.html')
+        # Redirect so the page renders from the refreshed user record
+        return redirect(url_for('auth.profile'))
+
+    return _render_profile()
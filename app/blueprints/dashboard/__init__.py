@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
 from datetime import date, datetime, timedelta
-from app.models import WorkoutSession, StrengthLog, RunningLog, PersonalRecord, RecoveryLog
+from app.cache import cache, user_tag
+from app.models import WorkoutSession, StrengthLog, RunningLog, PersonalRecord, RecoveryLog, ReadinessDay
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -23,6 +24,7 @@ def index():
 
     # Today's recovery
     today_recovery = RecoveryLog.get_today_log(user_id)
+    today_readiness = ReadinessDay.for_day(user_id, date.today()) if today_recovery else None
 
     # Weekly recovery average
     recovery_avg = RecoveryLog.get_weekly_average(user_id)
@@ -36,6 +38,7 @@ def index():
         recent_workouts=recent_workouts,
         recent_prs=recent_prs,
         today_recovery=today_recovery,
+        today_readiness=today_readiness,
         recovery_avg=recovery_avg,
         volume_alerts=volume_alerts,
         now=datetime.now()
@@ -43,6 +46,15 @@ def index():
 
 
 def get_dashboard_stats(user_id):
+    """Get dashboard statistics, cached until the user's workouts change."""
+    return cache.get_or_set(
+        f'dashboard:stats:{user_id}:{date.today()}',
+        lambda: _compute_dashboard_stats(user_id),
+        tags=[user_tag(user_id)]
+    )
+
+
+def _compute_dashboard_stats(user_id):
     """Calculate dashboard statistics."""
     from app import db
     from sqlalchemy import func
@@ -79,7 +91,7 @@ def get_dashboard_stats(user_id):
 
     # Weekly volume (strength)
     weekly_volume = db.session.query(
-        func.sum(StrengthLog.sets * StrengthLog.reps * StrengthLog.weight_kg)
+        func.sum(StrengthLog.volume_kg)
     ).join(WorkoutSession).filter(
         WorkoutSession.user_id == user_id,
         WorkoutSession.session_date >= week_start
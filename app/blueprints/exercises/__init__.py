@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from app import db
 from app.models import Exercise, ExerciseSubstitution, StrengthLog, MUSCLE_GROUPS
+from app.services.search import search_exercises, autocomplete
 
 exercises_bp = Blueprint('exercises', __name__)
 
@@ -19,14 +20,20 @@ def index():
     query = Exercise.query
 
     if muscle_group:
-        # Filter by muscle group (searches within comma-separated list)
-        query = query.filter(Exercise.muscle_group.ilike(f'%{muscle_group}%'))
+        # Filter by muscle group (primary or secondary, via the mapping table)
+        query = query.filter(Exercise.targets_muscle_group(muscle_group))
     if exercise_type:
         query = query.filter(Exercise.exercise_type == exercise_type)
     if search:
-        query = query.filter(Exercise.name.ilike(f'%{search}%'))
-
-    exercises = query.order_by(Exercise.muscle_group, Exercise.name).all()
+        # Ranked search; keep the ranking instead of alphabetical order
+        ranked_ids = [r['id'] for r in search_exercises(
+            search, user_id=current_user.user_id, limit=None
+        )]
+        rank = {exercise_id: i for i, exercise_id in enumerate(ranked_ids)}
+        exercises = query.filter(Exercise.exercise_id.in_(ranked_ids)).all()
+        exercises.sort(key=lambda e: rank[e.exercise_id])
+    else:
+        exercises = query.order_by(Exercise.muscle_group, Exercise.name).all()
 
     return render_template(
         'exercises/index.html',
@@ -193,21 +200,41 @@ def manage_substitutes(exercise_id):
 @exercises_bp.route('/api/search')
 @login_required
 def api_search():
-    """Search exercises (for AJAX)."""
+    """Search exercises (for AJAX), ranked by relevance and the user's usage."""
     query = request.args.get('q', '')
     exercise_type = request.args.get('type', '')
 
-    exercises = Exercise.query
     if query:
-        exercises = exercises.filter(Exercise.name.ilike(f'%{query}%'))
-    if exercise_type:
-        exercises = exercises.filter(Exercise.exercise_type == exercise_type)
+        results = search_exercises(
+            query, user_id=current_user.user_id,
+            exercise_type=exercise_type or None, limit=20
+        )
+    else:
+        results = Exercise.get_catalog(exercise_type or None)[:20]
+
+    return jsonify([{
+        'id': e['id'],
+        'name': e['name'],
+        'muscle_group': e['muscle_group'],
+        'type': e['type']
+    } for e in results])
 
-    exercises = exercises.limit(20).all()
 
+@exercises_bp.route('/api/autocomplete')
+@login_required
+def api_autocomplete():
+    """Typo-tolerant name completions while the user types."""
+    prefix = request.args.get('q', '')
+    exercise_type = request.args.get('type', '')
+    limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+
+    results = autocomplete(
+        prefix, user_id=current_user.user_id,
+        exercise_type=exercise_type or None, limit=limit
+    )
     return jsonify([{
-        'id': e.exercise_id,
-        'name': e.name,
-        'muscle_group': e.muscle_group,
-        'type': e.exercise_type
-    } for e in exercises])
+        'id': e['id'],
+        'name': e['name'],
+        'muscle_group': e['muscle_group'],
+        'score': e['score']
+    } for e in results])
@@ -25,7 +25,7 @@ def export_strength():
     # Header row
     writer.writerow([
         'Date', 'Exercise', 'Muscle Group', 'Sets', 'Reps', 'Weight (kg)',
-        'RPE', 'Rest (sec)', 'Volume', 'Est. 1RM', 'Session Notes'
+        'RPE', 'Rest (sec)', 'Volume', 'Est. 1RM', 'Session Notes', 'Set Detail'
     ])
 
     # Get all strength logs for user
@@ -45,7 +45,8 @@ def export_strength():
             log.rest_seconds or '',
             round(log.volume, 1),
             log.estimated_1rm,
-            log.session.notes or ''
+            log.session.notes or '',
+            log.set_summary if log.set_data else ''
         ])
 
     output.seek(0)
@@ -195,7 +196,7 @@ def export_all():
     writer.writerow(['=== STRENGTH TRAINING DATA ==='])
     writer.writerow([
         'Date', 'Exercise', 'Muscle Group', 'Sets', 'Reps', 'Weight (kg)',
-        'RPE', 'Volume', 'Est. 1RM'
+        'RPE', 'Volume', 'Est. 1RM', 'Set Detail'
     ])
 
     strength_logs = StrengthLog.query.join(WorkoutSession).filter(
@@ -212,7 +213,8 @@ def export_all():
             float(log.weight_kg) if log.weight_kg else '',
             log.rpe or '',
             round(log.volume, 1),
-            log.estimated_1rm
+            log.estimated_1rm,
+            log.set_summary if log.set_data else ''
         ])
 
     writer.writerow([])
@@ -1,13 +1,27 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from datetime import date, timedelta
+from datetime import MAXYEAR, date, timedelta
 import calendar
 from app import db
-from app.models import PlannedWorkout, WorkoutSession, WorkoutTemplate
+from app.models import PlannedWorkout, PlanRule, WorkoutTemplate
+from app.services.plan_rules import (
+    MAX_WEEKS, create_weekly_rules, clear_range, end_rule, skip_occurrence, weekday_mask
+)
+from app.services.plan_calendar import (
+    YEARS, month_calendar, neighbour_months, completion_stats, template_choices
+)
 
 planning_bp = Blueprint('planning', __name__)
 
 
+def _parse_date(value):
+    """ISO date from user input, or None if it is missing or malformed."""
+    try:
+        return date.fromisoformat(value or '')
+    except ValueError:
+        return None
+
+
 @planning_bp.route('/')
 @login_required
 def index():
@@ -24,43 +38,11 @@ def index():
     elif month < 1:
         month = 12
         year -= 1
+    year = min(max(year, YEARS.start), YEARS.stop - 1)
 
-    # Get first and last day of month
-    first_day = date(year, month, 1)
-    _, last_day_num = calendar.monthrange(year, month)
-    last_day = date(year, month, last_day_num)
-
-    # Get start of calendar (may include days from previous month)
-    cal_start = first_day - timedelta(days=first_day.weekday())
-    # Get end of calendar (may include days from next month)
-    cal_end = last_day + timedelta(days=(6 - last_day.weekday()))
-
-    # Get all plans for the visible calendar range
-    plans = PlannedWorkout.query.filter(
-        PlannedWorkout.user_id == current_user.user_id,
-        PlannedWorkout.planned_date >= cal_start,
-        PlannedWorkout.planned_date <= cal_end
-    ).all()
-
-    # Get actual workouts for the visible range
-    actual_workouts = WorkoutSession.query.filter(
-        WorkoutSession.user_id == current_user.user_id,
-        WorkoutSession.session_date >= cal_start,
-        WorkoutSession.session_date <= cal_end
-    ).all()
-
-    # Create lookup dicts
-    plans_by_date = {}
-    for plan in plans:
-        if plan.planned_date not in plans_by_date:
-            plans_by_date[plan.planned_date] = []
-        plans_by_date[plan.planned_date].append(plan)
-
-    actual_by_date = {}
-    for workout in actual_workouts:
-        if workout.session_date not in actual_by_date:
-            actual_by_date[workout.session_date] = []
-        actual_by_date[workout.session_date].append(workout)
+    # Per-day summaries for the six-week grid (cached per month)
+    data = month_calendar(current_user.user_id, year, month)
+    cal_start, cal_end = date.fromisoformat(data['start']), date.fromisoformat(data['end'])
 
     # Build calendar weeks
     calendar_weeks = []
@@ -68,8 +50,7 @@ def index():
     while current_date <= cal_end:
         week = []
         for _ in range(7):
-            day_plans = plans_by_date.get(current_date, [])
-            day_actual = actual_by_date.get(current_date, [])
+            day_data = data['days'].get(current_date.isoformat(), {})
 
             week.append({
                 'date': current_date,
@@ -77,23 +58,14 @@ def index():
                 'is_today': current_date == today,
                 'is_current_month': current_date.month == month,
                 'is_past': current_date < today,
-                'plans': day_plans,
-                'actual': day_actual
+                'plans': day_data.get('plans', []),
+                'actual': day_data.get('actual', [])
             })
             current_date += timedelta(days=1)
         calendar_weeks.append(week)
 
-    # Get user's workout templates for the quick-add dropdown
-    templates = WorkoutTemplate.get_user_templates(current_user.user_id)
-
-    # Completion stats
-    stats = PlannedWorkout.get_completion_stats(current_user.user_id)
-
     # Month navigation
-    prev_month = month - 1 if month > 1 else 12
-    prev_year = year if month > 1 else year - 1
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
+    (prev_year, prev_month), (next_year, next_month) = neighbour_months(year, month)
 
     return render_template(
         'planning/index.html',
@@ -105,12 +77,26 @@ def index():
         prev_year=prev_year,
         next_month=next_month,
         next_year=next_year,
-        stats=stats,
+        stats=completion_stats(current_user.user_id),
         today=today,
-        templates=templates
+        templates=template_choices(current_user.user_id)
     )
 
 
+@planning_bp.route('/api/month')
+@login_required
+def month_data():
+    """Per-day plan and session summaries for a month (used to prefetch neighbours)."""
+    today = date.today()
+    year = request.args.get('year', today.year, type=int)
+    month = request.args.get('month', today.month, type=int)
+    if not 1 <= month <= 12:
+        return jsonify({'error': 'Month must be 1-12'}), 400
+    if year not in YEARS:
+        return jsonify({'error': f'Year must be {YEARS.start}-{YEARS.stop - 1}'}), 400
+    return jsonify(month_calendar(current_user.user_id, year, month))
+
+
 @planning_bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add_plan():
@@ -122,27 +108,35 @@ def add_plan():
         target_duration = request.form.get('target_duration', type=int)
         target_distance = request.form.get('target_distance', type=float)
         template_id = request.form.get('template_id', type=int)
+        repeat_weeks = request.form.get('repeat_weeks', 1, type=int)
 
         if not planned_date or not workout_type:
             flash('Date and workout type are required.', 'error')
             return redirect(url_for('planning.index'))
 
-        plan = PlannedWorkout(
+        plan_dt = _parse_date(planned_date)
+        if plan_dt is None:
+            flash('Invalid date.', 'error')
+            return redirect(url_for('planning.index'))
+        fields = dict(
             user_id=current_user.user_id,
-            planned_date=planned_date,
             workout_type=workout_type,
             description=description or None,
             target_duration=target_duration,
             target_distance=target_distance,
             template_id=template_id if template_id else None
         )
-        db.session.add(plan)
+        if repeat_weeks > 1:
+            # Stored once as a weekly rule, expanded when shown
+            db.session.add(PlanRule(start_date=plan_dt, weekdays=weekday_mask([plan_dt.weekday()]),
+                                    count=min(repeat_weeks, MAX_WEEKS), **fields))
+        else:
+            db.session.add(PlannedWorkout(planned_date=plan_dt, **fields))
         db.session.commit()
 
         flash('Workout planned!', 'success')
 
         # Redirect back to the same month view
-        plan_dt = date.fromisoformat(planned_date)
         return redirect(url_for('planning.index', year=plan_dt.year, month=plan_dt.month))
 
     # For GET, show quick add form
@@ -168,6 +162,48 @@ def complete_plan(plan_id):
     return redirect(url_for('planning.index'))
 
 
+@planning_bp.route('/rules/<int:rule_id>/skip', methods=['POST'])
+@login_required
+def skip_rule_occurrence(rule_id):
+    """Skip one occurrence of a recurring plan."""
+    rule = PlanRule.query.get_or_404(rule_id)
+
+    if rule.user_id != current_user.user_id:
+        flash('Access denied.', 'error')
+        return redirect(url_for('planning.index'))
+
+    day = _parse_date(request.form.get('date'))
+    if day is None:
+        flash('Invalid date.', 'error')
+        return redirect(url_for('planning.index'))
+    skip_occurrence(rule, day)
+    db.session.commit()
+
+    flash('Skipped.', 'success')
+    return redirect(url_for('planning.index', year=day.year, month=day.month))
+
+
+@planning_bp.route('/rules/<int:rule_id>/end', methods=['POST'])
+@login_required
+def end_rule_series(rule_id):
+    """Stop a recurring plan from the given date on."""
+    rule = PlanRule.query.get_or_404(rule_id)
+
+    if rule.user_id != current_user.user_id:
+        flash('Access denied.', 'error')
+        return redirect(url_for('planning.index'))
+
+    day = _parse_date(request.form.get('date'))
+    if day is None:
+        flash('Invalid date.', 'error')
+        return redirect(url_for('planning.index'))
+    end_rule(rule, day)
+    db.session.commit()
+
+    flash('Recurring plan ended.', 'success')
+    return redirect(url_for('planning.index', year=day.year, month=day.month))
+
+
 @planning_bp.route('/<int:plan_id>/delete', methods=['POST'])
 @login_required
 def delete_plan(plan_id):
@@ -211,9 +247,19 @@ def quick_plan():
 @planning_bp.route('/template/<template_name>')
 @login_required
 def apply_template(template_name):
-    """Apply a predefined weekly template."""
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
+    """Apply a predefined weekly template for one or more weeks.
+
+    ``start`` (any date in the first week, default this week) and ``weeks``
+    are optional query parameters. The block is stored as recurring rules.
+    """
+    start = request.args.get('start')
+    week_start = _parse_date(start) if start else date.today()
+    weeks = max(1, min(request.args.get('weeks', 1, type=int), MAX_WEEKS))
+    if week_start is None or week_start.year == MAXYEAR:  # a block must end by 9999-12-31
+        flash('Invalid start date.', 'error')
+        return redirect(url_for('planning.index'))
+    week_start -= timedelta(days=week_start.weekday())
+    week_end = week_start + timedelta(weeks=weeks, days=-1)
 
     templates = {
         'nippard_upper': [
@@ -249,25 +295,10 @@ def apply_template(template_name):
         flash('Template not found.', 'error')
         return redirect(url_for('planning.index'))
 
-    # Clear existing plans for the week
-    week_end = week_start + timedelta(days=6)
-    PlannedWorkout.query.filter(
-        PlannedWorkout.user_id == current_user.user_id,
-        PlannedWorkout.planned_date >= week_start,
-        PlannedWorkout.planned_date <= week_end
-    ).delete()
-
-    # Apply template
-    for item in templates[template_name]:
-        plan = PlannedWorkout(
-            user_id=current_user.user_id,
-            planned_date=week_start + timedelta(days=item['day']),
-            workout_type=item['type'],
-            description=item['desc']
-        )
-        db.session.add(plan)
-
+    # Clear existing plans for the block, then apply the template as rules
+    clear_range(current_user.user_id, week_start, week_end)
+    create_weekly_rules(current_user.user_id, templates[template_name], week_start, weeks)
     db.session.commit()
 
     flash(f'Applied {template_name.replace("_", " ").title()} template!', 'success')
-    return redirect(url_for('planning.index'))
+    return redirect(url_for('planning.index', year=week_start.year, month=week_start.month))
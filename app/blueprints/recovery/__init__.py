@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from app import db
 from app.models import RecoveryLog
+from app.services.recovery_trends import trends, MAX_POINTS
 
 recovery_bp = Blueprint('recovery', __name__)
 
@@ -104,3 +105,26 @@ def delete_log(recovery_id):
 
     flash('Recovery log deleted.', 'success')
     return redirect(url_for('recovery.index'))
+
+
+@recovery_bp.route('/api/trends')
+@login_required
+def trends_data():
+    """Rolling 7/28-day means, SDs and z-scores of the recovery metrics.
+
+    Takes ``start``/``end`` ISO dates or ``days`` back from today, and
+    ``points`` (the most points returned; longer ranges are downsampled).
+    """
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        if request.args.get('start'):
+            start = date.fromisoformat(request.args['start'])
+        elif request.args.get('days'):
+            days = min(max(request.args.get('days', type=int) or 1, 1), (end - date.min).days + 1)
+            start = end - timedelta(days=days - 1)
+        else:
+            start = None
+        points = min(max(request.args.get('points', MAX_POINTS, type=int), 10), 2000)
+        return jsonify(trends(current_user.user_id, start, end, points))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
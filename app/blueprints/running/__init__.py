@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from datetime import date
+from datetime import date, datetime
+from sqlalchemy import func
 from app import db
 from app.models import WorkoutSession, RunningLog
+from app.services.best_efforts import run_prs, current_prs, format_seconds, BEST_EFFORT_DISTANCES
+from app.services.hr_zones import update_run_zones
+from app.services.routes import route_efforts, user_routes
+from app.services.race_predictions import race_predictions
+from app.services.run_import import import_track, TrackParseError
 
 running_bp = Blueprint('running', __name__)
 
@@ -58,7 +64,8 @@ def index():
 def new_session():
     """Log a new running session."""
     if request.method == 'POST':
-        session_date = request.form.get('session_date', date.today())
+        session_date_str = request.form.get('session_date')
+        session_date = datetime.strptime(session_date_str, '%Y-%m-%d').date() if session_date_str else date.today()
         run_type = request.form.get('run_type')
         distance_km = parse_decimal(request.form.get('distance_km'))
         duration_minutes = request.form.get('duration_minutes', type=int)
@@ -70,11 +77,6 @@ def new_session():
         route_notes = request.form.get('route_notes')
         notes = request.form.get('notes')
 
-        # Calculate pace if distance and duration provided
-        avg_pace = None
-        if distance_km and duration_minutes and distance_km > 0:
-            avg_pace = round(duration_minutes / distance_km, 2)
-
         # Create session
         session = WorkoutSession(
             user_id=current_user.user_id,
@@ -96,7 +98,6 @@ def new_session():
             run_type=run_type,
             distance_km=distance_km,
             duration_minutes=duration_minutes,
-            avg_pace_per_km=avg_pace,
             elevation_gain_meters=elevation_gain,
             avg_heart_rate=avg_heart_rate,
             max_heart_rate=max_heart_rate,
@@ -106,13 +107,16 @@ def new_session():
             interval_details=interval_details
         )
         db.session.add(run_log)
-        db.session.commit()
+        update_run_zones(run_log, current_user.user_id)
+        db.session.commit()  # also stores the run's intervals and best efforts
 
         # Check for volume spike warning
         check_and_warn_volume_spike()
 
         flash('Run logged successfully!', 'success')
 
+        flash_new_prs(run_prs(run_log))
+
         # Show TRIMP if HR data provided
         if run_log.trimp_score:
             flash(f'Training load (TRIMP): {run_log.trimp_score}', 'info')
@@ -133,8 +137,58 @@ def view_session(session_id):
         return redirect(url_for('running.index'))
 
     run_log = session.running_logs.first()
+    efforts = []
+    if run_log is not None and run_log.track is not None and run_log.track.route_id:
+        efforts = route_efforts(current_user.user_id, run_log.track.route_id)
+
+    return render_template('running/view_session.html', session=session, run_log=run_log,
+                           route_efforts=efforts)
+
+
+@running_bp.route('/session/<int:session_id>/import', methods=['POST'])
+@login_required
+def import_file(session_id):
+    """Attach a GPX, TCX or FIT recording to a run."""
+    session = WorkoutSession.query.get_or_404(session_id)
+
+    if session.user_id != current_user.user_id:
+        flash('Access denied.', 'error')
+        return redirect(url_for('running.index'))
+
+    run_log = session.running_logs.first()
+    upload = request.files.get('track_file')
+    if run_log is None or upload is None or not upload.filename:
+        flash('Choose a GPX, TCX or FIT file to import.', 'error')
+        return redirect(url_for('running.view_session', session_id=session_id))
+
+    try:
+        track = import_track(run_log, upload.filename, upload.stream)
+    except TrackParseError as exc:
+        db.session.rollback()
+        flash(str(exc), 'error')
+        return redirect(url_for('running.view_session', session_id=session_id))
+
+    db.session.commit()
+    flash(f'Imported {len(track)} samples from {upload.filename}.', 'success')
+    flash_new_prs(run_prs(run_log))
+    return redirect(url_for('running.view_session', session_id=session_id))
+
+
+@running_bp.route('/session/<int:session_id>/samples')
+@login_required
+def session_samples(session_id):
+    """Recorded samples of an imported run (for charts)."""
+    session = WorkoutSession.query.get_or_404(session_id)
+
+    if session.user_id != current_user.user_id:
+        return jsonify({'error': 'Access denied'}), 403
+
+    run_log = session.running_logs.first()
+    if run_log is None or run_log.samples is None:
+        return jsonify({'error': 'No recorded samples'}), 404
 
-    return render_template('running/view_session.html', session=session, run_log=run_log)
+    step = max(request.args.get('step', 1, type=int), 1)
+    return jsonify(run_log.samples.to_dict(step=step))
 
 
 @running_bp.route('/session/<int:session_id>/edit', methods=['GET', 'POST'])
@@ -150,7 +204,9 @@ def edit_session(session_id):
     run_log = session.running_logs.first()
 
     if request.method == 'POST':
-        session.session_date = request.form.get('session_date', session.session_date)
+        session_date_str = request.form.get('session_date')
+        if session_date_str:
+            session.session_date = datetime.strptime(session_date_str, '%Y-%m-%d').date()
         session.notes = request.form.get('notes')
 
         run_log.run_type = request.form.get('run_type')
@@ -165,11 +221,8 @@ def edit_session(session_id):
         has_intervals = request.form.get('has_intervals') == 'on'
         run_log.interval_details = request.form.get('interval_details') if has_intervals else None
 
-        # Recalculate pace
-        if run_log.distance_km and run_log.duration_minutes and run_log.distance_km > 0:
-            run_log.avg_pace_per_km = round(run_log.duration_minutes / float(run_log.distance_km), 2)
-
         session.duration_minutes = run_log.duration_minutes
+        update_run_zones(run_log, current_user.user_id)
 
         db.session.commit()
         flash('Run updated successfully!', 'success')
@@ -194,7 +247,7 @@ def delete_session(session_id):
         return redirect(url_for('running.index'))
 
     db.session.delete(session)
-    db.session.commit()
+    db.session.commit()  # the commit hook replays the PR ledger without this run
 
     flash('Run deleted.', 'success')
     return redirect(url_for('running.index'))
@@ -204,27 +257,29 @@ def delete_session(session_id):
 @login_required
 def stats():
     """Running statistics and history."""
-    history = RunningLog.get_user_running_history(current_user.user_id, limit=50)
-
-    # Calculate stats
-    total_distance = sum(float(r.distance_km or 0) for r in history)
-    total_runs = len(history)
+    user_id = current_user.user_id
+    history = RunningLog.get_user_running_history(user_id, limit=50)
+
+    # All-time totals and bests come from the database, not the recent runs
+    total_distance, total_runs = db.session.query(
+        func.coalesce(func.sum(RunningLog.distance_km), 0),
+        func.count(RunningLog.log_id)
+    ).join(WorkoutSession).filter(WorkoutSession.user_id == user_id).one()
+    total_distance = float(total_distance)
     avg_distance = total_distance / total_runs if total_runs > 0 else 0
 
-    # Best performances
-    if history:
-        longest_run = max(history, key=lambda r: float(r.distance_km or 0))
-        fastest_pace = min(
-            (r for r in history if r.avg_pace_per_km),
-            key=lambda r: float(r.avg_pace_per_km),
-            default=None
-        )
-    else:
-        longest_run = None
-        fastest_pace = None
+    user_runs = RunningLog.query.join(WorkoutSession).filter(WorkoutSession.user_id == user_id)
+    longest_run = user_runs.filter(RunningLog.distance_km.isnot(None)).order_by(
+        RunningLog.distance_km.desc()
+    ).first()
+    fastest_pace = user_runs.filter(RunningLog.avg_pace_per_km.isnot(None)).order_by(
+        RunningLog.avg_pace_per_km
+    ).first()
 
     return render_template(
         'running/stats.html',
+        best_efforts=current_prs(user_id),
+        predictions=race_predictions(user_id),
         history=history,
         total_distance=round(total_distance, 2),
         total_runs=total_runs,
@@ -262,6 +317,41 @@ def weekly_mileage():
     return jsonify(data)
 
 
+@running_bp.route('/api/prs')
+@login_required
+def api_prs():
+    """Current best-effort PRs per standard distance."""
+    return jsonify(current_prs(current_user.user_id))
+
+
+@running_bp.route('/api/predictions')
+@login_required
+def api_predictions():
+    """VDOT, race predictions and training paces from the current PRs."""
+    return jsonify(race_predictions(current_user.user_id))
+
+
+@running_bp.route('/api/routes')
+@login_required
+def api_routes():
+    """Routes matched from imported GPS tracks."""
+    return jsonify(user_routes(current_user.user_id))
+
+
+@running_bp.route('/api/routes/<int:route_id>/efforts')
+@login_required
+def api_route_efforts(route_id):
+    """Every run on one route, oldest first."""
+    return jsonify(route_efforts(current_user.user_id, route_id))
+
+
+def flash_new_prs(new_prs):
+    """Announce PRs set by a just-saved run."""
+    for pr in new_prs:
+        label = BEST_EFFORT_DISTANCES[pr.distance_key][0]
+        flash(f'New {label} PR: {format_seconds(pr.elapsed_seconds)}!', 'success')
+
+
 def check_and_warn_volume_spike():
     """Check if current week has volume spike and show warning."""
     from app import db
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
+from app.cache import cache, templates_tag
 from app.models import WorkoutTemplate, TemplateExercise, Exercise
 
 templates_bp = Blueprint('templates', __name__)
@@ -108,12 +109,17 @@ def add_exercise(template_id):
     exercise_id = request.form.get('exercise_id', type=int)
     target_sets = request.form.get('target_sets', 3, type=int)
     target_reps = request.form.get('target_reps', 10, type=int)
+    target_reps_max = request.form.get('target_reps_max', type=int)
     notes = request.form.get('notes', '').strip()
 
     if not exercise_id:
         flash('Please select an exercise.', 'error')
         return redirect(url_for('templates.edit_template', template_id=template_id))
 
+    if target_reps_max is not None and target_reps_max < target_reps:
+        flash('The top of the rep range cannot be below the target reps.', 'error')
+        return redirect(url_for('templates.edit_template', template_id=template_id))
+
     # Check if exercise already in template
     existing = TemplateExercise.query.filter_by(
         template_id=template_id,
@@ -135,6 +141,7 @@ def add_exercise(template_id):
         order_index=max_order + 1,
         target_sets=target_sets,
         target_reps=target_reps,
+        target_reps_max=target_reps_max,
         notes=notes
     )
     db.session.add(te)
@@ -243,12 +250,19 @@ def get_exercises_data(template_id):
 def api_list_templates():
     """Get list of templates for dropdown (AJAX)."""
     workout_type = request.args.get('type', 'upper_body')
-    templates = WorkoutTemplate.get_by_type(current_user.user_id, workout_type)
+    user_id = current_user.user_id
 
-    return jsonify({
-        'templates': [{
+    def load():
+        templates = WorkoutTemplate.get_by_type(user_id, workout_type)
+        return [{
             'id': t.template_id,
             'name': t.name,
             'exercise_count': t.exercises.count()
         } for t in templates]
+
+    return jsonify({
+        'templates': cache.get_or_set(
+            f'templates:list:{user_id}:{workout_type}', load,
+            tags=[templates_tag(user_id)]
+        )
     })
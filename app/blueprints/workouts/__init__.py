@@ -3,7 +3,11 @@ from flask_login import login_required, current_user
 from datetime import date
 from sqlalchemy import text
 from app import db
-from app.models import WorkoutSession, StrengthLog, Exercise, PersonalRecord, WorkoutTemplate
+from app.models import (
+    WorkoutSession, StrengthLog, Exercise, PersonalRecord, WorkoutTemplate, ProgressionSuggestion
+)
+from app.services.progression import REASONS as PROGRESSION_REASONS
+from app.services.strength_sets import parse_set_detail
 
 
 def parse_decimal(value):
@@ -147,9 +151,16 @@ def log_exercise(session_id):
         weight_kg = parse_decimal(request.form.get('weight_kg'))
         rpe = request.form.get('rpe', type=int)
         rest_seconds = request.form.get('rest_seconds', type=int)
-
-        if not all([exercise_id, sets, reps]):
-            flash('Exercise, sets, and reps are required.', 'error')
+        set_detail, detail_error = [], None
+        try:
+            set_detail = parse_set_detail(request.form.get('set_detail'))
+        except ValueError as e:
+            detail_error = str(e)
+
+        if detail_error:
+            flash(detail_error, 'error')
+        elif not exercise_id or not (set_detail or (sets and reps)):
+            flash('Exercise and either sets and reps or per-set detail are required.', 'error')
         else:
             # Get previous PR before logging
             previous_pr = PersonalRecord.get_exercise_pr(
@@ -166,6 +177,8 @@ def log_exercise(session_id):
                 rpe=rpe,
                 rest_seconds=rest_seconds
             )
+            if set_detail:
+                log.set_sets(set_detail)
             db.session.add(log)
             db.session.commit()
 
@@ -173,7 +186,7 @@ def log_exercise(session_id):
 
             # Check for PR
             pr_data = None
-            if weight_kg:
+            if log.weight_kg:
                 estimated_1rm = log.estimated_1rm
                 is_pr = PersonalRecord.check_and_update_pr(
                     user_id=current_user.user_id,
@@ -279,16 +292,20 @@ def get_substitutes(exercise_id):
 @login_required
 def last_performance(exercise_id):
     """Get last performance for an exercise (for AJAX)."""
-    last = StrengthLog.get_last_performance(current_user.user_id, exercise_id)
+    last = StrengthLog.get_last_performances(current_user.user_id, [exercise_id]).get(exercise_id)
 
     if last:
+        suggestion = ProgressionSuggestion.for_exercises(current_user.user_id, [exercise_id]).get(exercise_id)
+        if suggestion is not None:
+            suggestion = dict(suggestion.to_dict(), reason_text=PROGRESSION_REASONS[suggestion.reason])
         return jsonify({
             'found': True,
             'sets': last.sets,
             'reps': last.reps,
             'weight_kg': float(last.weight_kg) if last.weight_kg else None,
             'rpe': last.rpe,
-            'date': str(last.session.session_date)
+            'date': str(last.session_date),
+            'suggestion': suggestion
         })
 
     return jsonify({'found': False})
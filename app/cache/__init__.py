@@ -0,0 +1,245 @@
+"""Application cache with pluggable backends and tag-based invalidation.
+
+Configure with ``CACHE_TYPE`` ('memory', 'filesystem', 'redis' or 'null')
+in ``app/config.py``. Values are pickled, so cache plain data (dicts, lists,
+numbers) rather than ORM instances.
+
+Tags are versioned: each tag has a token stored in the backend and every
+entry remembers the tokens it was written under. ``invalidate_tags`` swaps
+the token, which turns every entry written under the old one into a miss
+without having to enumerate keys.
+"""
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+
+from .backends import (
+    BaseBackend, NullBackend, MemoryBackend, FileSystemBackend, RedisBackend
+)
+from .ttl import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+STATS = ('hits', 'misses', 'sets', 'deletes', 'invalidations')
+STATS_FLUSH_SECONDS = 5
+
+
+def user_tag(user_id):
+    """Tag covering all cached data derived from a user's workouts."""
+    return f'user:{user_id}'
+
+
+def templates_tag(user_id):
+    """Tag covering a user's cached workout templates."""
+    return f'templates:{user_id}'
+
+
+EXERCISES_TAG = 'exercises'
+
+
+class Cache:
+    """Facade over a cache backend, created once and bound in create_app."""
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.default_timeout = 300
+        self.key_prefix = ''
+        self._pending = dict.fromkeys(STATS, 0)
+        self._flushed_at = time.monotonic()
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Build the backend described by the app config."""
+        self.default_timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        self.key_prefix = app.config.get('CACHE_KEY_PREFIX', '')
+        self.backend = self._create_backend(app.config)
+        with self._stats_lock:
+            self._pending = dict.fromkeys(STATS, 0)
+        app.extensions['cache'] = self
+
+    def _create_backend(self, config):
+        cache_type = config.get('CACHE_TYPE', 'memory')
+        if cache_type == 'memory':
+            if config.get('WEB_CONCURRENCY', 1) > 1:
+                raise ValueError(
+                    "CACHE_TYPE 'memory' is per process and cannot be invalidated across "
+                    f"{config['WEB_CONCURRENCY']} workers; use 'filesystem' or 'redis'"
+                )
+            return MemoryBackend(max_bytes=config.get('CACHE_MEMORY_MAX_BYTES', 32 * 1024 * 1024))
+        if cache_type == 'filesystem':
+            cache_dir = config.get('CACHE_DIR') or os.path.join(
+                tempfile.gettempdir(), 'workout-tracker-cache'
+            )
+            return FileSystemBackend(
+                cache_dir, max_entries=config.get('CACHE_FILESYSTEM_MAX_ENTRIES', 10000)
+            )
+        if cache_type == 'redis':
+            return RedisBackend(
+                url=config.get('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+                key_prefix=self.key_prefix
+            )
+        if cache_type == 'null':
+            return NullBackend()
+        raise ValueError(f'Unknown CACHE_TYPE: {cache_type}')
+
+    # -- internal helpers ---------------------------------------------------
+
+    def _key(self, key):
+        return f'{self.key_prefix}{key}'
+
+    def _tag_key(self, tag):
+        return f'{self.key_prefix}tag:{tag}'
+
+    def _stat_key(self, stat):
+        return f'{self.key_prefix}stats:{stat}'
+
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self._pending[stat] += amount
+            due = time.monotonic() - self._flushed_at >= STATS_FLUSH_SECONDS
+        if due:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        """Add this process's pending counts to the counters in the backend."""
+        with self._stats_lock:
+            pending, self._pending = self._pending, dict.fromkeys(STATS, 0)
+            self._flushed_at = time.monotonic()
+        for stat, amount in pending.items():
+            if amount:
+                self.backend.incr(self._stat_key(stat), amount)
+
+    def _tag_versions(self, tags, create=False):
+        """Current version token of each tag (None if unknown)."""
+        raw = self.backend.get_many([self._tag_key(t) for t in tags])
+        versions = {}
+        for tag, value in zip(tags, raw):
+            if value is None and create:
+                value = uuid.uuid4().hex.encode('ascii')
+                self.backend.set(self._tag_key(tag), value)
+            versions[tag] = value
+        return versions
+
+    # -- public API ------------------------------------------------------------
+
+    def get(self, key, default=None):
+        """Return the cached value, or ``default`` on a miss."""
+        value = self._get(key)
+        return default if value is _MISSING else value
+
+    def _get(self, key):
+        raw = self.backend.get(self._key(key))
+        if raw is None:
+            self._count('misses')
+            return _MISSING
+        try:
+            value, tag_versions = pickle.loads(raw)
+        except Exception:
+            logger.warning('Discarding unreadable cache entry %s', key)
+            self.backend.delete(self._key(key))
+            self._count('misses')
+            return _MISSING
+        if tag_versions:
+            current = self._tag_versions(list(tag_versions))
+            if any(current[tag] is None or current[tag] != version
+                   for tag, version in tag_versions.items()):
+                self._count('misses')
+                return _MISSING
+        self._count('hits')
+        return value
+
+    def set(self, key, value, timeout=None, tags=()):
+        """Store ``value`` for ``timeout`` seconds under optional tags."""
+        self._store(key, value, timeout, self._tag_versions(list(tags), create=True) if tags else {})
+
+    def _store(self, key, value, timeout, tag_versions):
+        raw = pickle.dumps((value, tag_versions), protocol=pickle.HIGHEST_PROTOCOL)
+        self.backend.set(
+            self._key(key), raw,
+            self.default_timeout if timeout is None else timeout
+        )
+        self._count('sets')
+
+    def delete(self, key):
+        """Remove a single key."""
+        self.backend.delete(self._key(key))
+        self._count('deletes')
+
+    def get_or_set(self, key, producer, timeout=None, tags=()):
+        """Return the cached value, computing and storing it on a miss.
+
+        The tag versions are taken before ``producer`` runs, so if a tag is
+        invalidated while it computes, the stored value is already stale
+        and the next read is a miss.
+        """
+        value = self._get(key)
+        if value is _MISSING:
+            tag_versions = self._tag_versions(list(tags), create=True) if tags else {}
+            value = producer()
+            self._store(key, value, timeout, tag_versions)
+        return value
+
+    def tag_version(self, tag):
+        """Current version token of a tag; changes whenever it is invalidated.
+
+        Lets callers keep derived in-process structures (e.g. search
+        indexes) and rebuild them only when the tag moves.
+        """
+        return self._tag_versions([tag], create=True)[tag]
+
+    def invalidate_tags(self, *tags):
+        """Expire every entry stored under any of ``tags``."""
+        for tag in tags:
+            self.backend.delete(self._tag_key(tag))
+        self._count('invalidations', len(tags))
+
+    def clear(self):
+        """Drop everything from the backend."""
+        self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters of every process sharing the backend, plus backend details.
+
+        Other processes add their counts every ``STATS_FLUSH_SECONDS``, so
+        the totals can lag by that much.
+        """
+        self._flush_stats()
+        stats = dict(zip(STATS, self.backend.get_counters([self._stat_key(s) for s in STATS])))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0
+        stats['backend'] = self.backend.name
+        stats.update(self.backend.info())
+        return stats
+
+    def reset_stats(self):
+        """Zero the shared counters."""
+        with self._stats_lock:
+            self._pending = dict.fromkeys(STATS, 0)
+        keys = [self._stat_key(stat) for stat in STATS]
+        for key, value in zip(keys, self.backend.get_counters(keys)):
+            if value:
+                self.backend.incr(key, -value)
+
+
+cache = Cache()
+
+__all__ = [
+    'Cache',
+    'cache',
+    'user_tag',
+    'templates_tag',
+    'EXERCISES_TAG',
+    'BaseBackend',
+    'NullBackend',
+    'MemoryBackend',
+    'FileSystemBackend',
+    'RedisBackend',
+    'TTLCache'
+]
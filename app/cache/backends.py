@@ -0,0 +1,421 @@
+"""Storage drivers for the application cache.
+
+Backends store opaque byte strings; serialization, tagging and statistics
+live in ``app.cache.Cache``. Every backend must treat failures as cache
+misses so that an unavailable cache never breaks a request.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBackend:
+    """Interface implemented by every cache driver."""
+
+    name = 'base'
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, timeout=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def incr(self, key, amount=1):
+        """Add ``amount`` to the integer counter ``key`` (created at 0, never expires)."""
+        value = self.get_counters([key])[0] + amount
+        self.set(key, str(value).encode('ascii'))
+        return value
+
+    def get_counters(self, keys):
+        """Current values of counters kept with ``incr`` (0 if unknown)."""
+        return [int(value or 0) for value in self.get_many(keys)]
+
+    def info(self):
+        """Backend-specific statistics (size, item count...)."""
+        return {}
+
+
+class NullBackend(BaseBackend):
+    """Backend that stores nothing (caching disabled)."""
+
+    name = 'null'
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def incr(self, key, amount=1):
+        return 0
+
+
+class MemoryBackend(BaseBackend):
+    """Process-local LRU cache bounded by the total size of stored values.
+
+    ``timeout`` of None or 0 means the entry never expires; it can still be
+    evicted when the byte budget is exceeded. Counters are kept apart and
+    are never evicted.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + timeout if timeout else 0
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (expires_at, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = self._counters.get(key, 0) + amount
+            self._counters[key] = value
+            return value
+
+    def get_counters(self, keys):
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def info(self):
+        return {
+            'items': len(self._data),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self._evictions
+        }
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+class FileSystemBackend(BaseBackend):
+    """One file per key in a directory shared by all workers on a host.
+
+    Files hold an 8-byte expiry timestamp followed by the value and are
+    written to a temp file then renamed, so readers never see partial data.
+    Once more than ``max_entries`` files are stored, a write removes the
+    oldest third (a culled tag token just turns its entries into misses).
+    Counters live in a ``counters`` subdirectory, updated under a file lock.
+    """
+
+    name = 'filesystem'
+    _header = struct.Struct('!d')
+    cull_fraction = 3
+
+    def __init__(self, cache_dir, max_entries=10000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.counter_dir = os.path.join(cache_dir, 'counters')
+        self._evictions = 0
+        os.makedirs(self.counter_dir, exist_ok=True)
+
+    def _path(self, key, directory=None):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(directory or self.cache_dir, digest)
+
+    def _entries(self):
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                return [entry for entry in entries if entry.is_file() and not entry.name.startswith('.')]
+        except OSError:
+            return []
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        if len(data) < self._header.size:
+            return None
+        (expires_at,) = self._header.unpack_from(data)
+        if expires_at and expires_at < time.time():
+            self._unlink(path)
+            return None
+        return data[self._header.size:]
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.time() + timeout if timeout else 0.0
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(self._header.pack(expires_at))
+                fh.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            logger.warning('Filesystem cache write failed for %s', key, exc_info=True)
+            return
+        self._cull()
+
+    def _cull(self):
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=self._mtime)
+        for entry in entries[:len(entries) // self.cull_fraction]:
+            self._unlink(entry.path)
+            self._evictions += 1
+
+    @staticmethod
+    def _mtime(entry):
+        try:
+            return entry.stat().st_mtime
+        except OSError:
+            return 0
+
+    def delete(self, key):
+        self._unlink(self._path(key))
+
+    def incr(self, key, amount=1):
+        path = self._path(key, self.counter_dir)
+        try:
+            with open(path, 'a+') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                fh.seek(0)
+                value = int(fh.read() or 0) + amount
+                fh.seek(0)
+                fh.truncate()
+                fh.write(str(value))
+            return value
+        except (OSError, ValueError):
+            logger.warning('Filesystem cache counter update failed for %s', key, exc_info=True)
+            return 0
+
+    def get_counters(self, keys):
+        values = []
+        for key in keys:
+            try:
+                with open(self._path(key, self.counter_dir)) as fh:
+                    fcntl.flock(fh, fcntl.LOCK_SH)
+                    values.append(int(fh.read() or 0))
+            except (OSError, ValueError):
+                values.append(0)
+        return values
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            self._unlink(os.path.join(self.cache_dir, name))
+
+    def info(self):
+        return {
+            'items': len(self._entries()),
+            'max_entries': self.max_entries,
+            'evictions': self._evictions,
+            'cache_dir': self.cache_dir
+        }
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class RedisError(Exception):
+    """Error reply or protocol failure from a Redis-protocol server."""
+
+
+class ConnectionClosed(RedisError):
+    """The server closed the connection mid-reply."""
+
+
+class RedisBackend(BaseBackend):
+    """Minimal RESP2 client for Redis or any server speaking its protocol.
+
+    Only GET/MGET/SET/DEL/INCRBY/SCAN are used, so Redis, KeyDB, Valkey or a
+    local stand-in server all work. Each thread keeps its own connection.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', key_prefix='', socket_timeout=0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.key_prefix = key_prefix
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+
+    # -- connection handling -------------------------------------------------
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        if self.password:
+            self._command('AUTH', self.password)
+        if self.db:
+            self._command('SELECT', self.db)
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                self._local.reader.close()
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _command(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._local.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionClosed('Connection closed')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload
+        if prefix == b'-':
+            raise RedisError(payload.decode('utf-8', 'replace'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            count = int(payload)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RedisError(f'Unexpected reply prefix {prefix!r}')
+
+    def execute(self, *args):
+        """Run a command, reconnecting once if the connection dropped."""
+        try:
+            if getattr(self._local, 'sock', None) is None:
+                self._connect()
+            return self._command(*args)
+        except (OSError, ConnectionClosed):
+            self._close()
+        try:
+            self._connect()
+            return self._command(*args)
+        except (OSError, ConnectionClosed):
+            self._close()
+            raise
+
+    def _safe(self, *args, default=None):
+        try:
+            return self.execute(*args)
+        except (OSError, RedisError):
+            logger.warning('Redis cache command %s failed', args[0], exc_info=True)
+            return default
+
+    # -- backend API -----------------------------------------------------------
+
+    def get(self, key):
+        return self._safe('GET', key)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        result = self._safe('MGET', *keys)
+        return result if result is not None else [None] * len(keys)
+
+    def set(self, key, value, timeout=None):
+        if timeout:
+            self._safe('SET', key, value, 'PX', int(timeout * 1000))
+        else:
+            self._safe('SET', key, value)
+
+    def delete(self, key):
+        self._safe('DEL', key)
+
+    def incr(self, key, amount=1):
+        return self._safe('INCRBY', key, amount, default=0)
+
+    def clear(self):
+        """Delete every key under this cache's prefix."""
+        cursor = b'0'
+        while True:
+            reply = self._safe('SCAN', cursor, 'MATCH', f'{self.key_prefix}*', 'COUNT', 500)
+            if not reply:
+                return
+            cursor, keys = reply
+            if keys:
+                self._safe('DEL', *keys)
+            if cursor in (b'0', 0):
+                return
+
+    def info(self):
+        return {'host': self.host, 'port': self.port, 'db': self.db}
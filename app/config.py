@@ -20,7 +20,29 @@ class Config:
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
 
+    # Application cache: 'memory' (per-process LRU), 'filesystem' (shared by
+    # the workers on one host), 'redis' (any Redis-protocol server) or 'null'.
+    # 'memory' is refused when WEB_CONCURRENCY (the gunicorn worker count)
+    # is above 1: invalidations would only reach the worker that wrote.
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'memory')
+    CACHE_DEFAULT_TIMEOUT = 300  # seconds
+    CACHE_KEY_PREFIX = 'wt:'
+    CACHE_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+    CACHE_DIR = os.environ.get('CACHE_DIR')
+    CACHE_FILESYSTEM_MAX_ENTRIES = int(os.environ.get('CACHE_FILESYSTEM_MAX_ENTRIES', 10000))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+    # Per-worker user record cache (Flask-Login and JWT identity lookups)
+    USER_CACHE_TTL = 60  # seconds
+    USER_CACHE_MAX_ENTRIES = 1024
+
+    # Exercise search: 'auto' uses pg_trgm on PostgreSQL and the in-memory
+    # prefix index elsewhere; 'postgres' or 'memory' force one backend
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
     # App settings
+    MAX_CONTENT_LENGTH = 32 * 1024 * 1024  # largest accepted upload (GPX/TCX/FIT files)
     WORKOUTS_PER_PAGE = 20
     RUNNING_VOLUME_SPIKE_THRESHOLD = 10  # percent
     STRENGTH_VOLUME_SPIKE_THRESHOLD = 20  # percent
@@ -37,6 +59,9 @@ class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_ECHO = False
 
+    # Shared by all gunicorn workers in the container
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'filesystem')
+
     # Override with strong secret in production
     SECRET_KEY = os.environ.get('SECRET_KEY')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
@@ -50,6 +75,8 @@ class TestingConfig(Config):
         'TEST_DATABASE_URL',
         'sqlite:///:memory:'  # Use in-memory SQLite for fast tests
     )
+    CACHE_TYPE = 'memory'
+    WEB_CONCURRENCY = 1
     SQLALCHEMY_ECHO = False
 
 
@@ -1,24 +1,46 @@
-from .user import User
-from .exercise import Exercise, ExerciseSubstitution, MUSCLE_GROUPS
+from .user import User, CachedUser
+from .exercise import Exercise, ExerciseSubstitution, ExerciseMuscleGroup, MUSCLE_GROUPS
 from .workout import WorkoutSession, StrengthLog, RunningLog
-from .records import PersonalRecord
+from .run_samples import RunSamples
+from .intervals import RunInterval
+from .routes import RunRoute, RunTrack
+from .records import PersonalRecord, RunBestEffort, RunningPR
+from .training_load import TrainingLoadDay
 from .recovery import RecoveryLog
-from .planning import PlannedWorkout
+from .planning import PlannedWorkout, PlanRule, PlanRuleException
 from .template import WorkoutTemplate, TemplateExercise
 from .body_measurements import BodyMeasurement
+from .progression import ProgressionSuggestion
+from .muscle_sets import WeeklyMuscleSets
+from .readiness import ReadinessDay
+from . import events  # noqa: F401  (registers session hooks)
 
 __all__ = [
     'User',
+    'CachedUser',
     'Exercise',
     'ExerciseSubstitution',
+    'ExerciseMuscleGroup',
     'MUSCLE_GROUPS',
     'WorkoutSession',
     'StrengthLog',
     'RunningLog',
+    'RunSamples',
+    'RunInterval',
+    'RunRoute',
+    'RunTrack',
     'PersonalRecord',
+    'RunBestEffort',
+    'RunningPR',
+    'TrainingLoadDay',
     'RecoveryLog',
     'PlannedWorkout',
+    'PlanRule',
+    'PlanRuleException',
     'WorkoutTemplate',
     'TemplateExercise',
-    'BodyMeasurement'
+    'BodyMeasurement',
+    'ProgressionSuggestion',
+    'WeeklyMuscleSets',
+    'ReadinessDay'
 ]
@@ -30,6 +30,11 @@ class BodyMeasurement(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # As-of bodyweight lookups (app/services/relative_strength.py)
+        db.Index('idx_body_measurements_user_date', 'user_id', 'measurement_date'),
+    )
+
     @property
     def waist_to_hip_ratio(self):
         """Calculate waist-to-hip ratio (health indicator)."""
@@ -0,0 +1,450 @@
+"""Session-level hooks that keep derived data coherent with writes."""
+from datetime import date, timedelta
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, attributes
+
+from app.cache import cache, user_tag, templates_tag, EXERCISES_TAG
+from .user import User
+from .exercise import Exercise, ExerciseSubstitution, ExerciseMuscleGroup
+from .workout import WorkoutSession, StrengthLog, RunningLog
+from .template import WorkoutTemplate, TemplateExercise
+from .recovery import RecoveryLog
+from .records import PersonalRecord, RunBestEffort, RunningPR
+from .intervals import RunInterval
+from .routes import RunRoute, RunTrack
+from .run_samples import RunSamples
+from .training_load import TrainingLoadDay
+from .body_measurements import BodyMeasurement
+from .planning import PlannedWorkout, PlanRule, PlanRuleException
+
+# Models whose rows carry a user_id and feed per-user cached data
+USER_OWNED = (RecoveryLog, PersonalRecord, RunBestEffort, RunningPR, RunInterval, RunRoute, RunTrack,
+              TrainingLoadDay, BodyMeasurement, PlannedWorkout, PlanRule)
+# RunningLog columns its interval rows and best efforts are derived from
+RUN_DERIVED_INPUTS = ('distance_km', 'duration_minutes', 'interval_details', 'session_id')
+
+
+def log_session(session, log):
+    """(user_id, session_date) of a strength/running log, without flushing."""
+    ws = log.__dict__.get('session')
+    if ws is None and log.session_id is not None:
+        ws = session.identity_map.get(session.identity_key(WorkoutSession, log.session_id))
+    if ws is not None:
+        return ws.user_id, ws.session_date
+    if log.session_id is None:
+        return None, None
+    with session.no_autoflush:
+        row = session.execute(
+            select(WorkoutSession.user_id, WorkoutSession.session_date).where(
+                WorkoutSession.session_id == log.session_id
+            )
+        ).first()
+    return tuple(row) if row is not None else (None, None)
+
+
+def log_owner(session, log):
+    """Resolve the user owning a strength/running log without flushing."""
+    return log_session(session, log)[0]
+
+
+def _template_owner(session, template_id):
+    template = session.identity_map.get(session.identity_key(WorkoutTemplate, template_id))
+    if template is not None:
+        return template.user_id
+    with session.no_autoflush:
+        return session.execute(
+            select(WorkoutTemplate.user_id).where(WorkoutTemplate.template_id == template_id)
+        ).scalar()
+
+
+def _rule_owner(session, rule_id):
+    rule = session.identity_map.get(session.identity_key(PlanRule, rule_id))
+    if rule is not None:
+        return rule.user_id
+    with session.no_autoflush:
+        return session.execute(select(PlanRule.user_id).where(PlanRule.rule_id == rule_id)).scalar()
+
+
+def collect_changed_tags(session):
+    """Cache tags affected by the objects pending in this flush."""
+    tags = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, WorkoutSession):
+            tags.add(user_tag(obj.user_id))
+        elif isinstance(obj, (StrengthLog, RunningLog)):
+            user_id = log_owner(session, obj)
+            if user_id is not None:
+                tags.add(user_tag(user_id))
+        elif isinstance(obj, (Exercise, ExerciseSubstitution, ExerciseMuscleGroup)):
+            tags.add(EXERCISES_TAG)
+        elif isinstance(obj, WorkoutTemplate):
+            tags.add(templates_tag(obj.user_id))
+        elif isinstance(obj, TemplateExercise):
+            user_id = _template_owner(session, obj.template_id)
+            if user_id is not None:
+                tags.add(templates_tag(user_id))
+        elif isinstance(obj, PlanRuleException):
+            user_id = _rule_owner(session, obj.rule_id)
+            if user_id is not None:
+                tags.add(user_tag(user_id))
+        elif isinstance(obj, USER_OWNED) and obj.user_id:
+            tags.add(user_tag(obj.user_id))
+    return tags
+
+
+def collect_load_changes(session):
+    """{user_id: earliest date} whose training load the pending objects change."""
+    changes = {}
+
+    def mark(user_id, day):
+        if user_id is not None and day is not None:
+            changes[user_id] = min(day, changes.get(user_id, day))
+
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, RunningLog):
+            mark(*log_session(session, obj))
+        elif isinstance(obj, WorkoutSession) and obj not in session.new:
+            if obj in session.deleted:
+                mark(obj.user_id, obj.session_date)
+            else:
+                history = attributes.get_history(obj, 'session_date')
+                for day in history.added + history.deleted:
+                    mark(obj.user_id, day)
+    return changes
+
+
+def collect_readiness_changes(session, load_changes):
+    """{user_id: earliest date} whose readiness the pending objects change.
+
+    Readiness reads the training-load series, so every load change counts too.
+    """
+    changes = dict(load_changes)
+
+    def mark(user_id, day):
+        if user_id is not None and day is not None:
+            changes[user_id] = min(day, changes.get(user_id, day))
+
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, RecoveryLog):
+            history = attributes.get_history(obj, 'log_date')
+            for day in [*history.added, *history.unchanged, *history.deleted]:
+                mark(obj.user_id, day)
+    return changes
+
+
+def collect_progression_changes(session):
+    """{user_id: exercise_ids} whose progression suggestions the pending objects change."""
+    changes = {}
+
+    def mark(user_id, exercise_ids):
+        if user_id is not None:
+            changes.setdefault(user_id, set()).update(e for e in exercise_ids if e is not None)
+
+    def changed(obj, column):
+        history = attributes.get_history(obj, column)
+        return [*history.added, *history.deleted]
+
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, StrengthLog):
+            mark(log_owner(session, obj), changed(obj, 'exercise_id') or [obj.exercise_id])
+        elif isinstance(obj, TemplateExercise):
+            mark(_template_owner(session, obj.template_id),
+                 changed(obj, 'exercise_id') or [obj.exercise_id])
+        elif obj in session.new:
+            continue
+        elif isinstance(obj, WorkoutSession) and changed(obj, 'session_date'):
+            # A moved session can change which log is the most recent
+            with session.no_autoflush:
+                mark(obj.user_id, session.scalars(
+                    select(StrengthLog.exercise_id).where(StrengthLog.session_id == obj.session_id)
+                ))
+        elif isinstance(obj, WorkoutTemplate) and changed(obj, 'is_active'):
+            with session.no_autoflush:
+                mark(obj.user_id, session.scalars(
+                    select(TemplateExercise.exercise_id).where(
+                        TemplateExercise.template_id == obj.template_id
+                    )
+                ))
+    return changes
+
+
+def collect_muscle_week_changes(session):
+    """{user_id: dates} whose week of muscle set counts the pending objects change."""
+    changes = {}
+    remapped = set()
+
+    def mark(user_id, day):
+        if user_id is not None and day is not None:
+            changes.setdefault(user_id, set()).add(day)
+
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, StrengthLog):
+            if obj in session.dirty and not any(
+                attributes.get_history(obj, column).has_changes()
+                for column in StrengthLog.SET_COUNT_INPUTS
+            ):
+                continue
+            mark(*log_session(session, obj))
+            for session_id in attributes.get_history(obj, 'session_id').deleted:
+                # Moved to another session: the old week changes too
+                with session.no_autoflush:
+                    old = session.get(WorkoutSession, session_id) if session_id else None
+                if old is not None:
+                    mark(old.user_id, old.session_date)
+        elif isinstance(obj, WorkoutSession) and obj not in session.new:
+            history = attributes.get_history(obj, 'session_date')
+            for day in [*history.added, *history.deleted]:
+                mark(obj.user_id, day)
+        elif isinstance(obj, ExerciseMuscleGroup):
+            remapped.add(obj.exercise_id)
+
+    if remapped:
+        with session.no_autoflush:
+            for user_id, day in session.execute(
+                select(WorkoutSession.user_id, WorkoutSession.session_date).join(
+                    StrengthLog, StrengthLog.session_id == WorkoutSession.session_id
+                ).where(StrengthLog.exercise_id.in_(remapped)).distinct()
+            ):
+                mark(user_id, day)
+    return changes
+
+
+def collect_plan_changes(session):
+    """{user_id: dates} around which plans and sessions need re-matching."""
+    changes = {}
+
+    def mark(user_id, days):
+        days = [day for day in days if day is not None]
+        if user_id is not None and days:
+            changes.setdefault(user_id, set()).update(days)
+
+    def touched(obj, date_column, type_column):
+        if obj in session.new or obj in session.deleted:
+            return [getattr(obj, date_column)]
+        dates = attributes.get_history(obj, date_column)
+        if dates.has_changes():
+            return [*dates.added, *dates.deleted]
+        if attributes.get_history(obj, type_column).has_changes():
+            return [getattr(obj, date_column)]
+        return []
+
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, WorkoutSession):
+            mark(obj.user_id, touched(obj, 'session_date', 'session_type'))
+        elif isinstance(obj, PlannedWorkout):
+            if obj in session.new and obj.match_source == 'auto':
+                continue  # an occurrence saved by the reconciler itself
+            mark(obj.user_id, touched(obj, 'planned_date', 'workout_type'))
+        elif isinstance(obj, PlanRule):
+            # Past occurrences may now (or no longer) match logged sessions
+            today = date.today()
+            spans = [obj.start_date, *attributes.get_history(obj, 'start_date').deleted]
+            ends = [obj.until or today, *attributes.get_history(obj, 'until').deleted]
+            mark(obj.user_id, [min(day or today, today) for day in spans + ends])
+    return changes
+
+
+def collect_run_changes(session):
+    """(runs whose intervals and best efforts to re-derive, users whose PR ledger to replay).
+
+    New runs, runs whose inputs or recording changed and the runs of a
+    session moved to another date are re-derived; deleting a run or a
+    session replays its owner's ledger.
+    """
+    runs, ledgers = set(), set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, RunningLog):
+            if obj in session.deleted:
+                ledgers.add(log_owner(session, obj))
+            elif obj in session.new or any(
+                attributes.get_history(obj, column).has_changes() for column in RUN_DERIVED_INPUTS
+            ):
+                runs.add(obj)
+        elif isinstance(obj, RunSamples) and obj not in session.deleted:
+            if obj.running_log is not None:
+                runs.add(obj.running_log)
+        elif isinstance(obj, WorkoutSession) and obj not in session.new:
+            if obj in session.deleted:
+                ledgers.add(obj.user_id)
+            elif attributes.get_history(obj, 'session_date').has_changes():
+                with session.no_autoflush:
+                    runs.update(obj.running_logs)
+    ledgers.discard(None)
+    return runs, ledgers
+
+
+def _pending_logs(session, model, inputs):
+    """New logs of ``model`` and dirty ones with a change in any of ``inputs``."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, model):
+            continue
+        if obj in session.new or any(
+            attributes.get_history(obj, column).has_changes() for column in inputs
+        ):
+            yield obj
+
+
+def _log_profile(session, log, profiles):
+    """The owning User of a log (memoized in ``profiles``), or None."""
+    user_id = log_owner(session, log)
+    if user_id not in profiles:
+        with session.no_autoflush:
+            profiles[user_id] = session.get(User, user_id) if user_id is not None else None
+    return profiles[user_id]
+
+
+def apply_pending_run_metrics(session, profiles=None):
+    """Store the derived metrics of new runs and of runs whose inputs changed."""
+    from app.services.run_metrics import apply_run_metrics, METRIC_INPUTS
+
+    profiles = {} if profiles is None else profiles
+    for obj in _pending_logs(session, RunningLog, METRIC_INPUTS):
+        pace_set = attributes.get_history(obj, 'avg_pace_per_km').has_changes()
+        apply_run_metrics(obj, _log_profile(session, obj, profiles),
+                          keep_pace=pace_set and obj.avg_pace_per_km is not None)
+
+
+def apply_pending_strength_aggregates(session, profiles=None):
+    """Store the e1RM and volume of new strength logs and of edited ones."""
+    from app.services.strength_sets import apply_strength_aggregates
+
+    profiles = {} if profiles is None else profiles
+    for obj in _pending_logs(session, StrengthLog, StrengthLog.AGGREGATE_INPUTS):
+        if (obj not in session.new and obj.set_data is not None
+                and not attributes.get_history(obj, 'set_data').has_changes()):
+            # Summary columns edited directly: the sets are uniform again
+            obj.set_data = None
+        apply_strength_aggregates(obj, _log_profile(session, obj, profiles))
+
+
+@event.listens_for(Session, 'before_flush')
+def _remember_changed_tags(session, flush_context, instances):
+    """Record affected tags while pending objects still know their owners."""
+    profiles = {}
+    apply_pending_run_metrics(session, profiles)
+    apply_pending_strength_aggregates(session, profiles)
+    session.info.setdefault('changed_cache_tags', set()).update(collect_changed_tags(session))
+    load_changes = collect_load_changes(session)
+    for key, changes in (('training_load_from', load_changes),
+                         ('readiness_from', collect_readiness_changes(session, load_changes))):
+        pending = session.info.setdefault(key, {})
+        for user_id, day in changes.items():
+            pending[user_id] = min(day, pending.get(user_id, day))
+    muscle_weeks = session.info.setdefault('muscle_weeks_pending', {})
+    for user_id, days in collect_muscle_week_changes(session).items():
+        muscle_weeks.setdefault(user_id, set()).update(days)
+    progressions = session.info.setdefault('progression_pending', {})
+    for user_id, exercise_ids in collect_progression_changes(session).items():
+        progressions.setdefault(user_id, set()).update(exercise_ids)
+    plan_days = session.info.setdefault('plan_matches_pending', {})
+    for user_id, days in collect_plan_changes(session).items():
+        plan_days.setdefault(user_id, set()).update(days)
+    runs, ledgers = collect_run_changes(session)
+    session.info.setdefault('runs_pending', set()).update(runs)
+    session.info.setdefault('ledgers_pending', set()).update(ledgers)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_tags(session):
+    """Expire the affected tags once the data they cover is committed."""
+    tags = session.info.pop('changed_cache_tags', None)
+    if tags:
+        cache.invalidate_tags(*tags)
+
+
+@event.listens_for(Session, 'before_commit')
+def _update_run_efforts(session):
+    """Re-derive interval rows and best efforts of the runs this commit touched."""
+    from app.services.best_efforts import record_best_efforts, rebuild_ledger
+    from app.services.intervals import sync_run_intervals
+
+    session.flush()
+    runs = session.info.pop('runs_pending', None) or set()
+    ledgers = session.info.pop('ledgers_pending', None) or set()
+    for run_log in runs:
+        if not inspect(run_log).persistent:
+            continue  # deleted later in the transaction
+        user_id, day = log_session(session, run_log)
+        if user_id is not None:
+            sync_run_intervals(run_log, user_id)
+            record_best_efforts(run_log, user_id, day)
+    for user_id in ledgers:
+        rebuild_ledger(user_id)
+    if runs or ledgers:
+        session.flush()
+
+
+@event.listens_for(Session, 'before_commit')
+def _update_training_load(session):
+    """Bring the training-load series up to date from each changed date."""
+    from app.services.training_load import update_training_load
+
+    session.flush()
+    pending = session.info.pop('training_load_from', None)
+    if pending:
+        for user_id, day in pending.items():
+            update_training_load(user_id, day)
+        session.flush()
+
+
+@event.listens_for(Session, 'before_commit')
+def _update_readiness(session):
+    """Rewrite readiness from each changed date (after the training load)."""
+    from app.services.readiness import update_readiness
+
+    session.flush()
+    pending = session.info.pop('readiness_from', None)
+    if pending:
+        for user_id, day in pending.items():
+            update_readiness(user_id, day)
+
+
+@event.listens_for(Session, 'before_commit')
+def _update_muscle_sets(session):
+    """Rewrite the weekly muscle set counts of the weeks this commit touched."""
+    from app.services.muscle_sets import update_weeks, week_start
+
+    session.flush()
+    pending = session.info.pop('muscle_weeks_pending', None)
+    if pending:
+        for user_id, days in pending.items():
+            update_weeks(user_id, {week_start(day) for day in days})
+
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_progressions(session):
+    """Recompute the suggestions of the exercises this commit touched."""
+    from app.services.progression import refresh_suggestions
+
+    session.flush()
+    pending = session.info.pop('progression_pending', None)
+    if pending:
+        for user_id, exercise_ids in pending.items():
+            if exercise_ids:
+                refresh_suggestions(user_id, exercise_ids)
+
+
+@event.listens_for(Session, 'before_commit')
+def _reconcile_plans(session):
+    """Re-match plans and sessions around the dates this commit touched."""
+    from app.services.plan_matching import reconcile, MATCH_WINDOW
+
+    session.flush()
+    pending = session.info.pop('plan_matches_pending', None)
+    if pending:
+        window = timedelta(days=MATCH_WINDOW)
+        for user_id, days in pending.items():
+            reconcile(user_id, min(days) - window, max(days) + window)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_load_changes(session, previous_transaction):
+    session.info.pop('changed_cache_tags', None)
+    session.info.pop('training_load_from', None)
+    session.info.pop('readiness_from', None)
+    session.info.pop('muscle_weeks_pending', None)
+    session.info.pop('progression_pending', None)
+    session.info.pop('plan_matches_pending', None)
+    session.info.pop('runs_pending', None)
+    session.info.pop('ledgers_pending', None)
@@ -1,4 +1,6 @@
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import validates
 from app import db
 
 
@@ -18,6 +20,29 @@ MUSCLE_GROUPS = [
     'Cardio'
 ]
 
+# Share of an exercise's volume credited to its first (primary) muscle group
+# relative to each of the others; shares are normalized to sum to 1
+PRIMARY_MUSCLE_WEIGHT = 1.0
+SECONDARY_MUSCLE_WEIGHT = 0.5
+
+
+def split_muscle_groups(value):
+    """Split a comma-separated muscle group string, dropping duplicates."""
+    groups = []
+    for group in (value or '').split(','):
+        group = group.strip()
+        if group and group not in groups:
+            groups.append(group)
+    return groups
+
+
+def muscle_group_shares(groups):
+    """Volume share per muscle group, e.g. Chest, Triceps -> 2/3, 1/3."""
+    raw = [PRIMARY_MUSCLE_WEIGHT if i == 0 else SECONDARY_MUSCLE_WEIGHT
+           for i in range(len(groups))]
+    total = sum(raw)
+    return [(group, round(weight / total, 4)) for group, weight in zip(groups, raw)]
+
 
 class Exercise(db.Model):
     """Exercise library model."""
@@ -34,6 +59,10 @@ class Exercise(db.Model):
     # Relationships
     strength_logs = db.relationship('StrengthLog', backref='exercise', lazy='dynamic')
     personal_records = db.relationship('PersonalRecord', backref='exercise', lazy='dynamic')
+    muscle_links = db.relationship(
+        'ExerciseMuscleGroup', backref='exercise',
+        cascade='all, delete-orphan', order_by='ExerciseMuscleGroup.position'
+    )
 
     # Substitutions (self-referential many-to-many)
     substitutes = db.relationship(
@@ -45,21 +74,53 @@ class Exercise(db.Model):
     )
 
     def get_substitutes_with_history(self, user_id):
-        """Get substitutes with user's last performance."""
-        from sqlalchemy import text
-        result = db.session.execute(
-            text('SELECT * FROM get_exercise_substitutes(:ex_id, :u_id)'),
-            {'ex_id': self.exercise_id, 'u_id': user_id}
+        """Get substitutes with user's last performance.
+
+        Substitutes come from the cached substitution graph; the user's last
+        performance for all of them is one batched, user-scoped query.
+        """
+        from app.models import StrengthLog
+
+        substitutes = ExerciseSubstitution.get_graph().get(self.exercise_id, [])
+        last_logs = StrengthLog.get_last_performances(
+            user_id, [sub['exercise_id'] for sub in substitutes]
         )
-        return [dict(row._mapping) for row in result]
 
-    def calculate_1rm(self, weight, reps):
-        """Calculate estimated 1RM using Epley formula."""
-        if reps == 1:
-            return weight
-        if reps <= 0 or weight <= 0:
-            return 0
-        return round(weight * (1 + reps / 30), 2)
+        result = []
+        for sub in substitutes:
+            last = last_logs.get(sub['exercise_id'])
+            result.append({
+                'substitute_exercise_id': sub['exercise_id'],
+                'exercise_name': sub['name'],
+                'muscle_group': sub['muscle_group'],
+                'last_sets': last.sets if last else None,
+                'last_reps': last.reps if last else None,
+                'last_weight_kg': float(last.weight_kg) if last and last.weight_kg is not None else None,
+                'last_performed': str(last.session_date) if last else None
+            })
+        return result
+
+    @validates('muscle_group')
+    def _sync_muscle_links(self, key, value):
+        """Keep the normalized muscle group rows in step with the string."""
+        self.set_muscle_links(split_muscle_groups(value))
+        return value
+
+    def set_muscle_links(self, groups):
+        """Replace the normalized mapping, reusing rows for unchanged groups."""
+        existing = {link.muscle_group: link for link in self.muscle_links}
+        links = []
+        for position, (group, share) in enumerate(muscle_group_shares(groups)):
+            link = existing.get(group) or ExerciseMuscleGroup(muscle_group=group)
+            link.share = share
+            link.position = position
+            links.append(link)
+        self.muscle_links = links
+
+    def calculate_1rm(self, weight, reps, rpe=None, formula=None):
+        """Estimated 1RM with a registered formula (app/services/e1rm.py)."""
+        from app.services.e1rm import estimate
+        return estimate(weight, reps, rpe, formula)
 
     @property
     def muscle_groups_list(self):
@@ -88,8 +149,39 @@ class Exercise(db.Model):
 
     @classmethod
     def get_by_muscle_group(cls, muscle_group):
-        """Get all exercises for a muscle group (searches within comma-separated list)."""
-        return cls.query.filter(cls.muscle_group.ilike(f'%{muscle_group}%')).all()
+        """Get all exercises targeting a muscle group (primary or secondary)."""
+        return cls.query.filter(cls.targets_muscle_group(muscle_group)).all()
+
+    @classmethod
+    def targets_muscle_group(cls, muscle_group):
+        """Filter clause matching exercises mapped to a muscle group (indexed)."""
+        return cls.exercise_id.in_(
+            db.session.query(ExerciseMuscleGroup.exercise_id).filter(
+                ExerciseMuscleGroup.muscle_group == muscle_group
+            )
+        )
+
+    @classmethod
+    def get_catalog(cls, exercise_type=None):
+        """Get the exercise catalog as plain dicts (cached until an exercise changes)."""
+        from app.cache import cache, EXERCISES_TAG
+
+        def load():
+            query = cls.query
+            if exercise_type:
+                query = query.filter_by(exercise_type=exercise_type)
+            return [{
+                'id': e.exercise_id,
+                'name': e.name,
+                'description': e.description,
+                'muscle_group': e.muscle_group,
+                'type': e.exercise_type
+            } for e in query.order_by(cls.name).all()]
+
+        return cache.get_or_set(
+            f'exercises:catalog:{exercise_type or "all"}', load,
+            timeout=3600, tags=[EXERCISES_TAG]
+        )
 
     @classmethod
     def get_strength_exercises(cls):
@@ -119,6 +211,36 @@ class ExerciseSubstitution(db.Model):
         db.CheckConstraint('exercise_id != substitute_id'),
     )
 
+    @classmethod
+    def get_graph(cls):
+        """Get the substitution graph as {exercise_id: [substitute dicts]}.
+
+        Cached until any exercise or substitution changes.
+        """
+        from app.cache import cache, EXERCISES_TAG
+
+        def load():
+            rows = db.session.query(
+                cls.exercise_id,
+                Exercise.exercise_id.label('substitute_id'),
+                Exercise.name,
+                Exercise.muscle_group
+            ).join(Exercise, Exercise.exercise_id == cls.substitute_id).order_by(
+                cls.exercise_id, Exercise.exercise_id
+            ).all()
+
+            graph = {}
+            for row in rows:
+                graph.setdefault(row.exercise_id, []).append({
+                    'exercise_id': row.substitute_id,
+                    'name': row.name,
+                    'muscle_group': row.muscle_group
+                })
+            return graph
+
+        return cache.get_or_set('exercises:substitution-graph', load,
+                                timeout=3600, tags=[EXERCISES_TAG])
+
     @classmethod
     def add_substitution(cls, exercise_id, substitute_id):
         """Add bidirectional substitution."""
@@ -138,8 +260,68 @@ class ExerciseSubstitution(db.Model):
     @classmethod
     def remove_substitution(cls, exercise_id, substitute_id):
         """Remove bidirectional substitution."""
+        from app.cache import cache, EXERCISES_TAG
         cls.query.filter(
             ((cls.exercise_id == exercise_id) & (cls.substitute_id == substitute_id)) |
             ((cls.exercise_id == substitute_id) & (cls.substitute_id == exercise_id))
         ).delete()
         db.session.commit()
+        # Bulk deletes bypass the session hooks, so invalidate explicitly
+        cache.invalidate_tags(EXERCISES_TAG)
+
+
+class ExerciseMuscleGroup(db.Model):
+    """Normalized exercise to muscle group mapping with volume shares.
+
+    Maintained from ``Exercise.muscle_group``; ``share`` values of one
+    exercise sum to 1 so volume split across muscles adds up to the total.
+    """
+    __tablename__ = 'exercise_muscle_groups'
+
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.exercise_id', ondelete='CASCADE'),
+                            primary_key=True)
+    muscle_group = db.Column(db.String(50), primary_key=True)
+    share = db.Column(db.Numeric(5, 4), nullable=False)
+    position = db.Column(db.SmallInteger, nullable=False, default=0)  # 0 = primary
+
+    __table_args__ = (
+        db.Index('idx_exercise_muscle_groups_muscle', 'muscle_group', 'exercise_id'),
+    )
+
+    @classmethod
+    def volume_by_muscle_group(cls, user_id, start_date=None, end_date=None):
+        """Strength volume per muscle group, split by share, in one aggregation.
+
+        Exercises without a muscle group are reported under 'Other'.
+        """
+        from app.models import StrengthLog, WorkoutSession
+
+        muscle_group = func.coalesce(cls.muscle_group, 'Other')
+        query = db.session.query(
+            muscle_group.label('muscle_group'),
+            func.sum(
+                StrengthLog.volume_kg * func.coalesce(cls.share, 1)
+            ).label('volume')
+        ).select_from(StrengthLog).join(WorkoutSession).outerjoin(
+            cls, cls.exercise_id == StrengthLog.exercise_id
+        ).filter(WorkoutSession.user_id == user_id)
+
+        if start_date:
+            query = query.filter(WorkoutSession.session_date >= start_date)
+        if end_date:
+            query = query.filter(WorkoutSession.session_date <= end_date)
+
+        rows = query.group_by(muscle_group).order_by(muscle_group).all()
+        return {row.muscle_group: round(float(row.volume or 0), 2) for row in rows}
+
+    @classmethod
+    def backfill(cls):
+        """Rebuild the mapping for every exercise; returns the number updated."""
+        exercises = Exercise.query.all()
+        for exercise in exercises:
+            exercise.set_muscle_links(split_muscle_groups(exercise.muscle_group))
+        db.session.commit()
+        return len(exercises)
+
+    def __repr__(self):
+        return f'<ExerciseMuscleGroup {self.exercise_id} {self.muscle_group} {self.share}>'
@@ -0,0 +1,54 @@
+from datetime import datetime
+from app import db
+
+
+class RunInterval(db.Model):
+    """One segment of an interval session parsed from ``interval_details``.
+
+    Reps get one row each (``kind`` 'rep'); warm-up, cool-down and steady
+    blocks get a single row. Either ``distance_m`` or ``duration_seconds``
+    is the prescribed size. ``actual_pace_per_km`` comes from paces listed
+    in the text or from the run's recorded samples (app/services/intervals.py).
+    """
+    __tablename__ = 'run_intervals'
+
+    interval_id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('running_logs.log_id', ondelete='CASCADE'),
+                       nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    position = db.Column(db.SmallInteger, nullable=False)  # order within the run
+    kind = db.Column(db.String(10), nullable=False)  # 'warmup', 'rep', 'steady', 'cooldown'
+    block = db.Column(db.SmallInteger, nullable=False)
+    rep = db.Column(db.SmallInteger)  # 1-based rep number within the block
+    distance_m = db.Column(db.Numeric(7, 1))
+    duration_seconds = db.Column(db.Integer)
+    target_pace_per_km = db.Column(db.Numeric(5, 2))
+    actual_pace_per_km = db.Column(db.Numeric(5, 2))
+    recovery_seconds = db.Column(db.Integer)
+    recovery_type = db.Column(db.String(10))  # 'jog', 'walk', 'rest', ...
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_run_intervals_user_kind', 'user_id', 'kind', 'distance_m', 'duration_seconds'),
+    )
+
+    running_log = db.relationship(
+        'RunningLog', backref=db.backref('intervals', cascade='all, delete-orphan',
+                                         order_by='RunInterval.position')
+    )
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'block': self.block,
+            'rep': self.rep,
+            'distance_m': float(self.distance_m) if self.distance_m is not None else None,
+            'duration_seconds': self.duration_seconds,
+            'target_pace': float(self.target_pace_per_km) if self.target_pace_per_km is not None else None,
+            'actual_pace': float(self.actual_pace_per_km) if self.actual_pace_per_km is not None else None,
+            'recovery_seconds': self.recovery_seconds,
+            'recovery_type': self.recovery_type
+        }
+
+    def __repr__(self):
+        return f'<RunInterval {self.kind} {self.block}.{self.rep}>'
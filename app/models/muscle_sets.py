@@ -0,0 +1,31 @@
+from app import db
+
+
+class WeeklyMuscleSets(db.Model):
+    """Sets per muscle group in one training week (app/services/muscle_sets.py).
+
+    ``hard_sets`` counts working sets at RPE 7 or above (sets logged
+    without an RPE count as working sets); ``sets`` counts every set. Both
+    are split across an exercise's muscle groups by ``ExerciseMuscleGroup.share``,
+    so they are fractional. Weeks start on Monday; the commit hook in
+    app/models/events.py rewrites the weeks a commit touched.
+    """
+    __tablename__ = 'weekly_muscle_sets'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'),
+                        primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    muscle_group = db.Column(db.String(50), primary_key=True)
+    hard_sets = db.Column(db.Numeric(6, 2), nullable=False, default=0)
+    sets = db.Column(db.Numeric(6, 2), nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'week_start': str(self.week_start),
+            'muscle_group': self.muscle_group,
+            'hard_sets': float(self.hard_sets),
+            'sets': float(self.sets)
+        }
+
+    def __repr__(self):
+        return f'<WeeklyMuscleSets {self.week_start} {self.muscle_group}: {self.hard_sets}>'
@@ -15,7 +15,14 @@ class PlannedWorkout(db.Model):
     target_distance = db.Column(db.Numeric(6, 2))  # km for running
     template_id = db.Column(db.Integer, db.ForeignKey('workout_templates.template_id'))  # Link to workout template
     completed = db.Column(db.Boolean, default=False)
-    completed_session_id = db.Column(db.Integer, db.ForeignKey('workout_sessions.session_id'))
+    completed_session_id = db.Column(db.Integer, db.ForeignKey('workout_sessions.session_id',
+                                                               ondelete='SET NULL'))
+    # 'manual' (marked by the user) or 'auto' (app/services/plan_matching.py);
+    # completed rows from before automatic matching have none and count as manual
+    match_source = db.Column(db.String(10))
+    # Set on rows that override one occurrence of a recurring rule
+    rule_id = db.Column(db.Integer, db.ForeignKey('plan_rules.rule_id', ondelete='CASCADE'))
+    occurrence_date = db.Column(db.Date)  # the occurrence's date in the rule
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationship to actual workout session
@@ -23,6 +30,13 @@ class PlannedWorkout(db.Model):
     # Relationship to workout template
     template = db.relationship('WorkoutTemplate', foreign_keys=[template_id])
 
+    __table_args__ = (
+        # Calendar ranges and reconciliation (app/services/plan_matching.py)
+        db.Index('idx_planned_workouts_user_date', 'user_id', 'planned_date'),
+        db.Index('idx_planned_workouts_session', 'completed_session_id'),
+        db.Index('idx_planned_workouts_rule', 'rule_id', 'occurrence_date'),
+    )
+
     @classmethod
     def get_week_plan(cls, user_id, week_start=None):
         """Get planned workouts for a week."""
@@ -78,27 +92,36 @@ class PlannedWorkout(db.Model):
         if plan:
             plan.completed = True
             plan.completed_session_id = session_id
+            plan.match_source = 'manual'
             db.session.commit()
             return True
         return False
 
     @classmethod
     def get_completion_stats(cls, user_id, weeks=4):
-        """Get completion statistics for the past N weeks."""
+        """Get completion statistics for the past N weeks.
+
+        Rest days are not counted: there is no session to complete them.
+        Unsaved occurrences of recurring rules count as not completed.
+        """
+        from app.services.plan_rules import occurrence_count
+
         start_date = date.today() - timedelta(weeks=weeks)
 
-        plans = cls.query.filter(
+        total, completed = db.session.query(
+            db.func.count(cls.plan_id),
+            db.func.count(cls.plan_id).filter(cls.completed.is_(True))
+        ).filter(
             cls.user_id == user_id,
             cls.planned_date >= start_date,
-            cls.planned_date <= date.today()
-        ).all()
+            cls.planned_date <= date.today(),
+            cls.workout_type != 'rest'
+        ).one()
+        total += occurrence_count(user_id, start_date, date.today())
 
-        if not plans:
+        if not total:
             return {'total': 0, 'completed': 0, 'rate': 0}
 
-        total = len(plans)
-        completed = sum(1 for p in plans if p.completed)
-
         return {
             'total': total,
             'completed': completed,
@@ -107,3 +130,65 @@ class PlannedWorkout(db.Model):
 
     def __repr__(self):
         return f'<PlannedWorkout {self.planned_date} - {self.workout_type}>'
+
+
+class PlanRule(db.Model):
+    """A recurring planned workout (weekly RRULE subset).
+
+    Occurs on the ``weekdays`` (bit 0 = Monday) of every ``interval_weeks``-th
+    week from ``start_date``, until ``until`` and/or for ``count``
+    occurrences. Occurrences are expanded on demand
+    (app/services/plan_rules.py); only exceptions (skipped dates) and
+    overrides (``PlannedWorkout`` rows with this ``rule_id``) are stored.
+    """
+    __tablename__ = 'plan_rules'
+
+    rule_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    workout_type = db.Column(db.String(20), nullable=False)
+    description = db.Column(db.String(255))
+    target_duration = db.Column(db.Integer)
+    target_distance = db.Column(db.Numeric(6, 2))
+    template_id = db.Column(db.Integer, db.ForeignKey('workout_templates.template_id'))
+    start_date = db.Column(db.Date, nullable=False)
+    weekdays = db.Column(db.SmallInteger, nullable=False)
+    interval_weeks = db.Column(db.SmallInteger, nullable=False, default=1)
+    count = db.Column(db.Integer)
+    until = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    template = db.relationship('WorkoutTemplate', foreign_keys=[template_id])
+    overrides = db.relationship('PlannedWorkout', backref='rule', cascade='all, delete-orphan')
+    exceptions = db.relationship('PlanRuleException', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('idx_plan_rules_user_start', 'user_id', 'start_date'),
+    )
+
+    # Columns an occurrence inherits from its rule
+    OCCURRENCE_FIELDS = ('user_id', 'workout_type', 'description', 'target_duration',
+                         'target_distance', 'template_id')
+
+    def occurrence(self, day):
+        """An unsaved PlannedWorkout for the occurrence on ``day``."""
+        plan = PlannedWorkout(planned_date=day, occurrence_date=day, rule_id=self.rule_id,
+                              completed=False, **{f: getattr(self, f) for f in self.OCCURRENCE_FIELDS})
+        plan.template = self.template
+        return plan
+
+    def copy(self, **changes):
+        """An unsaved rule with the same pattern and ``changes`` applied."""
+        fields = self.OCCURRENCE_FIELDS + ('start_date', 'weekdays', 'interval_weeks', 'count', 'until')
+        return PlanRule(**{**{f: getattr(self, f) for f in fields}, **changes})
+
+    def __repr__(self):
+        return f'<PlanRule {self.workout_type} from {self.start_date}>'
+
+
+class PlanRuleException(db.Model):
+    """An occurrence of a ``PlanRule`` that was skipped."""
+    __tablename__ = 'plan_rule_exceptions'
+
+    rule_id = db.Column(db.Integer, db.ForeignKey('plan_rules.rule_id', ondelete='CASCADE'),
+                        primary_key=True)
+    occurrence_date = db.Column(db.Date, primary_key=True)
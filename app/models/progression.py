@@ -0,0 +1,46 @@
+from datetime import datetime
+from app import db
+
+
+class ProgressionSuggestion(db.Model):
+    """Next prescription for one exercise of a user (app/services/progression.py).
+
+    Rebuilt for everyone by the nightly ``flask compute-progressions`` job
+    and refreshed for the affected exercises on every commit that changes
+    their strength logs or template targets, so views only read this row.
+    """
+    __tablename__ = 'progression_suggestions'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'),
+                        primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.exercise_id', ondelete='CASCADE'),
+                            primary_key=True)
+    sets = db.Column(db.SmallInteger, nullable=False)
+    reps = db.Column(db.SmallInteger, nullable=False)
+    weight_kg = db.Column(db.Numeric(6, 2))  # None for bodyweight exercises
+    reason = db.Column(db.String(20), nullable=False)  # see progression.REASONS
+    rep_low = db.Column(db.SmallInteger, nullable=False)
+    rep_high = db.Column(db.SmallInteger, nullable=False)
+    based_on_log_id = db.Column(db.Integer, db.ForeignKey('strength_logs.log_id', ondelete='SET NULL'))
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @classmethod
+    def for_exercises(cls, user_id, exercise_ids):
+        """{exercise_id: suggestion} in one query."""
+        exercise_ids = list(exercise_ids)
+        if not exercise_ids:
+            return {}
+        rows = cls.query.filter(cls.user_id == user_id, cls.exercise_id.in_(exercise_ids)).all()
+        return {row.exercise_id: row for row in rows}
+
+    def to_dict(self):
+        return {
+            'sets': self.sets,
+            'reps': self.reps,
+            'weight_kg': float(self.weight_kg) if self.weight_kg is not None else None,
+            'reason': self.reason,
+            'rep_range': [self.rep_low, self.rep_high]
+        }
+
+    def __repr__(self):
+        return f'<ProgressionSuggestion {self.exercise_id}: {self.sets}x{self.reps}@{self.weight_kg}>'
@@ -0,0 +1,53 @@
+from app import db
+
+
+class ReadinessDay(db.Model):
+    """Readiness on one day with a recovery log (app/services/readiness.py).
+
+    ``recovery_score`` is the day's 0-10 recovery score, ``baseline_mean``/
+    ``baseline_sd`` the user's scores over the previous 28 days and
+    ``recovery_z`` the day's deviation from them. ``acwr``/``tsb`` come from
+    the training-load series; ``readiness`` (0-100) blends all of them.
+    """
+    __tablename__ = 'readiness_days'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'),
+                        primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    recovery_score = db.Column(db.Numeric(3, 1), nullable=False)
+    baseline_mean = db.Column(db.Numeric(4, 2))  # None until enough history
+    baseline_sd = db.Column(db.Numeric(4, 2))
+    recovery_z = db.Column(db.Numeric(4, 2))
+    acwr = db.Column(db.Numeric(5, 2))
+    tsb = db.Column(db.Numeric(7, 2))
+    readiness = db.Column(db.Numeric(4, 1), nullable=False)
+    level = db.Column(db.String(10), nullable=False)
+
+    @classmethod
+    def for_day(cls, user_id, day):
+        return db.session.get(cls, (user_id, day))
+
+    @property
+    def readiness_level(self):
+        """Level description (label, color, advice) for the dashboard."""
+        from app.services.readiness import LEVELS
+        return dict(LEVELS[self.level], level=self.level)
+
+    def to_dict(self):
+        def number(value):
+            return float(value) if value is not None else None
+
+        return {
+            'date': str(self.day),
+            'readiness': float(self.readiness),
+            'level': self.level,
+            'recovery_score': float(self.recovery_score),
+            'baseline_mean': number(self.baseline_mean),
+            'baseline_sd': number(self.baseline_sd),
+            'recovery_z': number(self.recovery_z),
+            'acwr': number(self.acwr),
+            'tsb': number(self.tsb)
+        }
+
+    def __repr__(self):
+        return f'<ReadinessDay {self.day}: {self.readiness}>'
@@ -61,3 +61,64 @@ class PersonalRecord(db.Model):
 
     def __repr__(self):
         return f'<PersonalRecord {self.record_type}: {self.value}>'
+
+
+class RunBestEffort(db.Model):
+    """Fastest segment of a standard distance found inside one run."""
+    __tablename__ = 'run_best_efforts'
+
+    effort_id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('running_logs.log_id', ondelete='CASCADE'),
+                       nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    distance_key = db.Column(db.String(10), nullable=False)  # '400m', '1k', '5k', '10k', 'half'
+    elapsed_seconds = db.Column(db.Numeric(8, 1), nullable=False)
+    start_offset_seconds = db.Column(db.Numeric(8, 1))  # None when taken from run totals
+    achieved_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('log_id', 'distance_key'),
+        db.Index('idx_run_best_efforts_user_distance', 'user_id', 'distance_key', 'elapsed_seconds'),
+    )
+
+    running_log = db.relationship(
+        'RunningLog', backref=db.backref('best_efforts', cascade='all, delete-orphan')
+    )
+
+    def __repr__(self):
+        return f'<RunBestEffort {self.distance_key}: {self.elapsed_seconds}s>'
+
+
+class RunningPR(db.Model):
+    """Ledger of running PR progressions, one row per improvement.
+
+    The current record for a distance is its fastest (and latest) row.
+    """
+    __tablename__ = 'running_pr_ledger'
+
+    pr_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    distance_key = db.Column(db.String(10), nullable=False)
+    elapsed_seconds = db.Column(db.Numeric(8, 1), nullable=False)
+    previous_seconds = db.Column(db.Numeric(8, 1))
+    log_id = db.Column(db.Integer, db.ForeignKey('running_logs.log_id', ondelete='CASCADE'))
+    achieved_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_running_pr_ledger_user_distance', 'user_id', 'distance_key', 'elapsed_seconds'),
+    )
+
+    @classmethod
+    def get_current(cls, user_id):
+        """Current PR per distance as {distance_key: RunningPR}."""
+        current = {}
+        for pr in cls.query.filter_by(user_id=user_id).order_by(
+            cls.distance_key, cls.elapsed_seconds, cls.achieved_date
+        ).all():
+            current.setdefault(pr.distance_key, pr)
+        return current
+
+    def __repr__(self):
+        return f'<RunningPR {self.distance_key}: {self.elapsed_seconds}s>'
@@ -22,7 +22,7 @@ class RecoveryLog(db.Model):
         metrics = [
             self.sleep_quality,
             self.energy_level,
-            10 - (self.muscle_soreness or 0),  # Invert soreness (lower is better)
+            10 - self.muscle_soreness if self.muscle_soreness is not None else None,  # Lower is better
             self.motivation_score
         ]
         valid_metrics = [m for m in metrics if m is not None]
@@ -32,18 +32,14 @@ class RecoveryLog(db.Model):
 
     @property
     def readiness_level(self):
-        """Get readiness level description."""
+        """Readiness level of this entry alone (see ReadinessDay for the blended one)."""
+        from app.services.readiness import LEVELS, level_for
+
         score = self.overall_recovery_score
         if score is None:
             return None
-        if score >= 8:
-            return {'level': 'excellent', 'label': 'Ready to Push', 'color': 'success', 'advice': 'Great day for intense training!'}
-        elif score >= 6:
-            return {'level': 'good', 'label': 'Good to Go', 'color': 'primary', 'advice': 'Normal training recommended.'}
-        elif score >= 4:
-            return {'level': 'moderate', 'label': 'Take it Easy', 'color': 'warning', 'advice': 'Consider lighter intensity today.'}
-        else:
-            return {'level': 'low', 'label': 'Rest Day', 'color': 'danger', 'advice': 'Recovery day recommended.'}
+        level = level_for(score * 10)
+        return dict(LEVELS[level], level=level)
 
     @classmethod
     def get_today_log(cls, user_id):
@@ -62,24 +58,44 @@ class RecoveryLog(db.Model):
 
     @classmethod
     def get_weekly_average(cls, user_id):
-        """Get weekly average recovery metrics."""
+        """Average recovery metrics and readiness over the last 7 days.
+
+        One aggregate query; blank metrics are left out of their average
+        (None when a metric was never logged) instead of counting as 0.
+        """
         from datetime import timedelta
+        from app.models import ReadinessDay
         week_start = date.today() - timedelta(days=7)
 
-        logs = cls.query.filter(
+        readiness = db.session.query(db.func.avg(ReadinessDay.readiness)).filter(
+            ReadinessDay.user_id == user_id,
+            ReadinessDay.day >= week_start
+        ).scalar_subquery()
+        row = db.session.query(
+            db.func.avg(cls.sleep_quality).label('sleep'),
+            db.func.avg(cls.energy_level).label('energy'),
+            db.func.avg(cls.muscle_soreness).label('soreness'),
+            db.func.avg(cls.motivation_score).label('motivation'),
+            readiness.label('readiness'),
+            db.func.count(cls.recovery_id).label('logs_count')
+        ).filter(
             cls.user_id == user_id,
             cls.log_date >= week_start
-        ).all()
+        ).one()
 
-        if not logs:
+        if not row.logs_count:
             return None
 
+        def average(value):
+            return round(float(value), 1) if value is not None else None
+
         return {
-            'avg_sleep': round(sum(l.sleep_quality or 0 for l in logs) / len(logs), 1),
-            'avg_energy': round(sum(l.energy_level or 0 for l in logs) / len(logs), 1),
-            'avg_soreness': round(sum(l.muscle_soreness or 0 for l in logs) / len(logs), 1),
-            'avg_motivation': round(sum(l.motivation_score or 0 for l in logs) / len(logs), 1),
-            'logs_count': len(logs)
+            'avg_sleep': average(row.sleep),
+            'avg_energy': average(row.energy),
+            'avg_soreness': average(row.soreness),
+            'avg_motivation': average(row.motivation),
+            'avg_readiness': average(row.readiness),
+            'logs_count': row.logs_count
         }
 
     def __repr__(self):
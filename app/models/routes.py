@@ -0,0 +1,80 @@
+from datetime import datetime
+from app import db
+from .run_samples import encode_series, decode_series
+
+# Polylines are stored like sample channels: 1e-5 degree (~1 m) steps, delta encoded
+POLYLINE_SCALE = 100_000
+POLYLINE_ORDER = 1
+
+
+class PolylineMixin:
+    """``lat_data``/``lon_data`` blobs holding a downsampled track."""
+
+    lat_data = db.Column(db.LargeBinary, nullable=False)
+    lon_data = db.Column(db.LargeBinary, nullable=False)
+    point_count = db.Column(db.SmallInteger, nullable=False)
+
+    def set_points(self, lats, lons):
+        self.lat_data = encode_series(lats, POLYLINE_SCALE, POLYLINE_ORDER)
+        self.lon_data = encode_series(lons, POLYLINE_SCALE, POLYLINE_ORDER)
+        self.point_count = len(lats)
+
+    def points(self):
+        """(lats, lons) lists."""
+        return (decode_series(self.lat_data, POLYLINE_SCALE, POLYLINE_ORDER),
+                decode_series(self.lon_data, POLYLINE_SCALE, POLYLINE_ORDER))
+
+
+class RunRoute(db.Model, PolylineMixin):
+    """A cluster of runs over the same course (app/services/routes.py).
+
+    The polyline is the downsampled track of the run that founded the
+    route; new tracks are compared against it. Candidates are found by the
+    grid cell of the start point.
+    """
+    __tablename__ = 'run_routes'
+
+    route_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    name = db.Column(db.String(100))
+    start_cell = db.Column(db.String(24), nullable=False)
+    distance_m = db.Column(db.Numeric(8, 1), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_run_routes_user_cell', 'user_id', 'start_cell'),
+    )
+
+    tracks = db.relationship('RunTrack', backref='route', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<RunRoute {self.route_id} {self.distance_m}m>'
+
+
+class RunTrack(db.Model, PolylineMixin):
+    """Downsampled track of one imported run and the route it matched.
+
+    The stored ``route_id`` is the cached match, so all efforts on a route
+    are one indexed lookup.
+    """
+    __tablename__ = 'run_tracks'
+
+    log_id = db.Column(db.Integer, db.ForeignKey('running_logs.log_id', ondelete='CASCADE'),
+                       primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    route_id = db.Column(db.Integer, db.ForeignKey('run_routes.route_id', ondelete='SET NULL'))
+    start_cell = db.Column(db.String(24), nullable=False)
+    distance_m = db.Column(db.Numeric(8, 1), nullable=False)
+    match_distance_m = db.Column(db.Numeric(7, 1))  # Fréchet distance to the route polyline
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_run_tracks_route', 'route_id'),
+    )
+
+    running_log = db.relationship(
+        'RunningLog', backref=db.backref('track', uselist=False, cascade='all, delete-orphan')
+    )
+
+    def __repr__(self):
+        return f'<RunTrack log={self.log_id} route={self.route_id}>'
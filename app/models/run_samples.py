@@ -0,0 +1,127 @@
+import zlib
+from datetime import datetime
+from app import db
+
+
+# Channel -> (scale to integer units, delta order). Values are quantized,
+# delta encoded (twice for smooth signals such as time, distance and GPS
+# position), zigzag/varint packed and zlib compressed, so a steady 1 Hz
+# series costs well under a byte per sample.
+CHANNELS = {
+    'time': (1, 2),            # seconds since start
+    'distance': (10, 2),       # metres, 0.1 m resolution
+    'heart_rate': (1, 1),      # bpm
+    'elevation': (10, 1),      # metres, 0.1 m resolution
+    'lat': (1_000_000, 2),     # degrees, ~0.1 m resolution
+    'lon': (1_000_000, 2),
+}
+
+ENCODING_VERSION = 1
+
+
+def encode_series(values, scale, order):
+    """Pack a list of floats into a compressed blob."""
+    ints = [int(round(v * scale)) for v in values]
+    for _ in range(order):
+        ints = ints[:1] + [b - a for a, b in zip(ints, ints[1:])]
+
+    buf = bytearray()
+    for n in ints:
+        n = (n << 1) ^ (n >> 63)  # zigzag: small negatives stay small
+        while n >= 0x80:
+            buf.append((n & 0x7F) | 0x80)
+            n >>= 7
+        buf.append(n)
+    return zlib.compress(bytes(buf), 9)
+
+
+def decode_series(blob, scale, order):
+    """Inverse of encode_series."""
+    data = zlib.decompress(blob)
+    ints = []
+    n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        ints.append((n >> 1) ^ -(n & 1))
+        n = shift = 0
+
+    for _ in range(order):
+        total = 0
+        for i, delta in enumerate(ints):
+            total += delta
+            ints[i] = total
+    if scale == 1:
+        return ints
+    return [n / scale for n in ints]
+
+
+class RunSamples(db.Model):
+    """Recorded samples of an imported run, one row per run.
+
+    Each channel is a compressed array blob (see ``CHANNELS``); channels the
+    file did not record are NULL. Loading a run is a single-row read.
+    """
+    __tablename__ = 'run_samples'
+
+    log_id = db.Column(db.Integer, db.ForeignKey('running_logs.log_id', ondelete='CASCADE'),
+                       primary_key=True)
+    source_format = db.Column(db.String(10))  # 'gpx', 'tcx' or 'fit'
+    start_time = db.Column(db.DateTime)  # UTC
+    sample_count = db.Column(db.Integer, nullable=False)
+    encoding = db.Column(db.SmallInteger, nullable=False, default=ENCODING_VERSION)
+    time_data = db.Column(db.LargeBinary, nullable=False)
+    distance_data = db.Column(db.LargeBinary)
+    heart_rate_data = db.Column(db.LargeBinary)
+    elevation_data = db.Column(db.LargeBinary)
+    lat_data = db.Column(db.LargeBinary)
+    lon_data = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def from_series(cls, series, source_format=None, start_time=None):
+        """Build a row from {channel: list of floats or None}."""
+        samples = cls(
+            source_format=source_format,
+            start_time=start_time,
+            sample_count=len(series['time']),
+            encoding=ENCODING_VERSION
+        )
+        samples.set_series(series)
+        return samples
+
+    def set_series(self, series):
+        for channel, (scale, order) in CHANNELS.items():
+            values = series.get(channel)
+            blob = encode_series(values, scale, order) if values else None
+            setattr(self, f'{channel}_data', blob)
+        self.sample_count = len(series['time'])
+
+    def series(self, channel):
+        """Decoded values of one channel, or None if it was not recorded."""
+        blob = getattr(self, f'{channel}_data')
+        if blob is None:
+            return None
+        scale, order = CHANNELS[channel]
+        return decode_series(blob, scale, order)
+
+    def to_dict(self, step=1):
+        """All channels, keeping every ``step``-th sample (for charts)."""
+        data = {
+            'source_format': self.source_format,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'sample_count': self.sample_count
+        }
+        for channel in CHANNELS:
+            values = self.series(channel)
+            data[channel] = values[::step] if values is not None else None
+        return data
+
+    @property
+    def stored_bytes(self):
+        return sum(len(getattr(self, f'{channel}_data') or b'') for channel in CHANNELS)
+
+    def __repr__(self):
+        return f'<RunSamples log={self.log_id} n={self.sample_count}>'
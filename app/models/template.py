@@ -42,24 +42,35 @@ class WorkoutTemplate(db.Model):
         ).order_by(cls.name).all()
 
     def get_exercises_with_last_performance(self, user_id):
-        """Get template exercises with user's last performance for each."""
-        from app.models import StrengthLog, Exercise
+        """Get template exercises with user's last performance for each.
+
+        Two queries regardless of template size: template exercises with
+        their exercise rows and stored progression suggestions (which drive
+        the pre-fill), then one batched last-performance lookup.
+        """
+        from app.models import StrengthLog, ProgressionSuggestion
+
+        rows = self.exercises.options(
+            db.joinedload(TemplateExercise.exercise)
+        ).outerjoin(ProgressionSuggestion, db.and_(
+            ProgressionSuggestion.user_id == user_id,
+            ProgressionSuggestion.exercise_id == TemplateExercise.exercise_id
+        )).add_entity(ProgressionSuggestion).all()
+        template_exercises = [te for te, _ in rows]
+        suggestions = {te.exercise_id: suggestion for te, suggestion in rows if suggestion}
+        last_logs = StrengthLog.get_last_performances(
+            user_id, {te.exercise_id for te in template_exercises}
+        )
 
         result = []
-        for te in self.exercises.all():
-            exercise = Exercise.query.get(te.exercise_id)
+        for te in template_exercises:
+            exercise = te.exercise
             if not exercise:
                 continue
 
-            # Get last performance for this exercise (from ANY workout)
-            last_log = StrengthLog.query.join(
-                StrengthLog.session
-            ).filter(
-                StrengthLog.exercise_id == te.exercise_id,
-                StrengthLog.session.has(user_id=user_id)
-            ).order_by(
-                StrengthLog.log_id.desc()
-            ).first()
+            # Last performance for this exercise (from ANY workout)
+            last_log = last_logs.get(te.exercise_id)
+            suggestion = suggestions.get(te.exercise_id)
 
             result.append({
                 'template_exercise_id': te.template_exercise_id,
@@ -69,14 +80,20 @@ class WorkoutTemplate(db.Model):
                 'order_index': te.order_index,
                 'target_sets': te.target_sets,
                 'target_reps': te.target_reps,
+                'target_reps_max': te.target_reps_max,
+                'rep_range': te.rep_range,
                 'notes': te.notes,
                 # Last performance data (smart pre-fill)
                 'last_sets': last_log.sets if last_log else te.target_sets,
                 'last_reps': last_log.reps if last_log else te.target_reps,
                 'last_weight': float(last_log.weight_kg) if last_log and last_log.weight_kg else None,
                 'last_rpe': last_log.rpe if last_log else None,
-                'last_date': str(last_log.session.session_date) if last_log else None,
-                'has_history': last_log is not None
+                'last_date': str(last_log.session_date) if last_log else None,
+                'has_history': last_log is not None,
+                'suggested_sets': suggestion.sets if suggestion else None,
+                'suggested_reps': suggestion.reps if suggestion else None,
+                'suggested_weight': float(suggestion.weight_kg) if suggestion and suggestion.weight_kg else None,
+                'suggested_reason': suggestion.reason if suggestion else None
             })
 
         return result
@@ -99,6 +116,7 @@ class WorkoutTemplate(db.Model):
                 order_index=te.order_index,
                 target_sets=te.target_sets,
                 target_reps=te.target_reps,
+                target_reps_max=te.target_reps_max,
                 notes=te.notes
             )
             db.session.add(new_te)
@@ -116,6 +134,7 @@ class TemplateExercise(db.Model):
     order_index = db.Column(db.Integer, default=0)  # Order within template
     target_sets = db.Column(db.Integer, default=3)
     target_reps = db.Column(db.Integer, default=10)
+    target_reps_max = db.Column(db.Integer)  # top of a rep range (e.g. 8-12); None = fixed target
     notes = db.Column(db.String(200))  # e.g., "Warm up with lighter weight first"
 
     # Relationship to exercise
@@ -123,3 +142,10 @@ class TemplateExercise(db.Model):
 
     def __repr__(self):
         return f'<TemplateExercise {self.exercise_id} in template {self.template_id}>'
+
+    @property
+    def rep_range(self):
+        """'8-12' for a rep range, otherwise the fixed target."""
+        if self.target_reps_max and self.target_reps_max > (self.target_reps or 0):
+            return f'{self.target_reps}-{self.target_reps_max}'
+        return str(self.target_reps)
@@ -0,0 +1,33 @@
+from app import db
+
+
+class TrainingLoadDay(db.Model):
+    """One day of a user's training-load series (app/services/training_load.py).
+
+    ``load`` is the day's summed TRIMP; ``atl``/``ctl`` are the acute (7 day)
+    and chronic (42 day) exponentially weighted loads as of the end of the
+    day, ``tsb`` is their balance and ``acwr`` the acute:chronic ratio.
+    """
+    __tablename__ = 'training_load_days'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'),
+                        primary_key=True)
+    load_date = db.Column(db.Date, primary_key=True)
+    load = db.Column(db.Numeric(7, 2), nullable=False, default=0)
+    atl = db.Column(db.Numeric(7, 2), nullable=False)
+    ctl = db.Column(db.Numeric(7, 2), nullable=False)
+    tsb = db.Column(db.Numeric(7, 2), nullable=False)
+    acwr = db.Column(db.Numeric(5, 2))  # None while chronic load is zero
+
+    def to_dict(self):
+        return {
+            'date': str(self.load_date),
+            'load': float(self.load),
+            'atl': float(self.atl),
+            'ctl': float(self.ctl),
+            'tsb': float(self.tsb),
+            'acwr': float(self.acwr) if self.acwr is not None else None
+        }
+
+    def __repr__(self):
+        return f'<TrainingLoadDay {self.load_date}: ATL {self.atl} CTL {self.ctl}>'
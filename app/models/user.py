@@ -1,9 +1,36 @@
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from app import db, bcrypt
+from app.cache import TTLCache
 
 
-class User(UserMixin, db.Model):
+# Per-worker cache of lightweight user records, keyed by user_id.
+# Shared by the Flask-Login session loader and the JWT identity loader.
+user_cache = TTLCache(ttl=60, max_entries=1024)
+
+
+class WorkoutCountsMixin:
+    """Workout counters shared by ``User`` and its cached ``CachedUser`` snapshot."""
+
+    @property
+    def total_workouts(self):
+        """Get total workout count."""
+        return WorkoutSession.query.filter_by(user_id=self.user_id).count()
+
+    @property
+    def workouts_this_week(self):
+        """Get workouts in current week."""
+        from datetime import date, timedelta
+        week_start = date.today() - timedelta(days=date.today().weekday())
+        return WorkoutSession.query.filter(
+            WorkoutSession.user_id == self.user_id,
+            WorkoutSession.session_date >= week_start
+        ).count()
+
+
+class User(WorkoutCountsMixin, UserMixin, db.Model):
     """User model for authentication."""
     __tablename__ = 'users'
 
@@ -15,6 +42,15 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime)
     is_active = db.Column(db.Boolean, default=True)
 
+    # Physiology profile (heart-rate zones, TRIMP, intensity factor)
+    max_heart_rate = db.Column(db.SmallInteger)
+    resting_heart_rate = db.Column(db.SmallInteger)
+    threshold_pace_per_km = db.Column(db.Numeric(5, 2))  # min/km
+
+    # Estimated 1RM formula key (app/services/e1rm.py)
+    e1rm_formula = db.Column(db.String(20), default='epley')
+    sex = db.Column(db.String(1))  # 'M' or 'F': selects the DOTS coefficients
+
     # Relationships
     workout_sessions = db.relationship('WorkoutSession', backref='user', lazy='dynamic')
     personal_records = db.relationship('PersonalRecord', backref='user', lazy='dynamic')
@@ -37,23 +73,105 @@ class User(UserMixin, db.Model):
         self.last_login = datetime.utcnow()
         db.session.commit()
 
-    @property
-    def total_workouts(self):
-        """Get total workout count."""
-        return self.workout_sessions.count()
+    @classmethod
+    def get_cached(cls, user_id):
+        """Get a lightweight record for an active user, hitting the DB only on a cache miss."""
+        if user_id is None:
+            return None
+        user_id = int(user_id)
+        record = user_cache.get(user_id)
+        if record is None:
+            user = cls.query.get(user_id)
+            if user is None:
+                return None
+            record = CachedUser.from_user(user)
+            user_cache.set(user_id, record)
+        return record if record.is_active else None
 
-    @property
-    def workouts_this_week(self):
-        """Get workouts in current week."""
-        from datetime import date, timedelta
-        week_start = date.today() - timedelta(days=date.today().weekday())
-        return self.workout_sessions.filter(
-            WorkoutSession.session_date >= week_start
-        ).count()
+    @staticmethod
+    def invalidate_cache(user_id):
+        """Drop a user's cached record (profile, password or status change)."""
+        user_cache.delete(int(user_id))
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 
+class CachedUser(WorkoutCountsMixin, UserMixin):
+    """Read-only snapshot of a User row, safe to share across requests.
+
+    It is detached from any SQLAlchemy session, so views that need to modify
+    the account must load the full ``User`` model first.
+    """
+
+    __slots__ = ('user_id', 'username', 'email', 'created_at', 'last_login', '_active',
+                 'max_heart_rate', 'resting_heart_rate', 'threshold_pace_per_km', 'e1rm_formula',
+                 'sex')
+
+    def __init__(self, user_id, username, email, created_at=None, last_login=None, is_active=True,
+                 max_heart_rate=None, resting_heart_rate=None, threshold_pace_per_km=None,
+                 e1rm_formula=None, sex=None):
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+        self.last_login = last_login
+        self._active = bool(is_active)
+        self.max_heart_rate = max_heart_rate
+        self.resting_heart_rate = resting_heart_rate
+        self.threshold_pace_per_km = threshold_pace_per_km
+        self.e1rm_formula = e1rm_formula
+        self.sex = sex
+
+    @classmethod
+    def from_user(cls, user):
+        """Build a record from a User model instance."""
+        return cls(
+            user_id=user.user_id,
+            username=user.username,
+            email=user.email,
+            created_at=user.created_at,
+            last_login=user.last_login,
+            is_active=user.is_active is not False,
+            max_heart_rate=user.max_heart_rate,
+            resting_heart_rate=user.resting_heart_rate,
+            threshold_pace_per_km=user.threshold_pace_per_km,
+            e1rm_formula=user.e1rm_formula,
+            sex=user.sex
+        )
+
+    @property
+    def is_active(self):
+        return self._active
+
+    def get_id(self):
+        """Override for Flask-Login."""
+        return str(self.user_id)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _remember_changed_user(mapper, connection, target):
+    """Note written users; their records are dropped once the write commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_user_cache(session):
+    """Drop committed users only, so no reader can re-cache the old row meanwhile."""
+    for user_id in session.info.pop('changed_user_ids', ()):
+        User.invalidate_cache(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changed_users(session, previous_transaction):
+    session.info.pop('changed_user_ids', None)
+
+
 # Import here to avoid circular imports
 from .workout import WorkoutSession
@@ -1,5 +1,32 @@
 from datetime import datetime, date
 from app import db
+from .run_samples import encode_series, decode_series
+
+
+# Per-set detail of a strength log: the reps, weights (0.01 kg) and RPEs
+# of all sets packed channel after channel into one blob. 0 stands for a
+# missing weight or RPE.
+SET_CHANNEL_SCALES = (1, 100, 1)
+
+
+def pack_sets(sets):
+    """[(reps, weight_kg, rpe)] -> compressed blob."""
+    values = []
+    for index, scale in enumerate(SET_CHANNEL_SCALES):
+        values.extend(float(s[index] or 0) * scale for s in sets)
+    return encode_series(values, 1, 0)
+
+
+def unpack_sets(blob):
+    """Inverse of pack_sets."""
+    values = decode_series(blob, 1, 0)
+    count = len(values) // len(SET_CHANNEL_SCALES)
+    reps, weights, rpes = (
+        [value / scale for value in values[i * count:(i + 1) * count]] if scale != 1
+        else values[i * count:(i + 1) * count]
+        for i, scale in enumerate(SET_CHANNEL_SCALES)
+    )
+    return [(r, w or None, rpe or None) for r, w, rpe in zip(reps, weights, rpes)]
 
 
 class WorkoutSession(db.Model):
@@ -14,6 +41,10 @@ class WorkoutSession(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_workout_sessions_user_date', 'user_id', 'session_date'),
+    )
+
     # Relationships
     strength_logs = db.relationship('StrengthLog', backref='session', lazy='dynamic',
                                     cascade='all, delete-orphan')
@@ -72,19 +103,72 @@ class StrengthLog(db.Model):
     tempo = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Per-set detail (see pack_sets); NULL when every set is sets x reps @ weight.
+    # sets/reps/weight_kg/rpe then describe the number of sets and the top set.
+    set_data = db.Column(db.LargeBinary)
+
+    # Derived at save time (app/services/strength_sets.py), e1RM with the owner's formula
+    e1rm = db.Column(db.Numeric(7, 2))
+    volume_kg = db.Column(db.Numeric(9, 2))
+
+    # Columns the stored aggregates are derived from
+    AGGREGATE_INPUTS = ('sets', 'reps', 'weight_kg', 'rpe', 'set_data')
+    # Columns that change a log's contribution to weekly_muscle_sets
+    SET_COUNT_INPUTS = ('sets', 'rpe', 'set_data', 'exercise_id', 'session_id')
+
+    __table_args__ = (
+        db.Index('idx_strength_logs_exercise_session', 'exercise_id', 'session_id'),
+    )
+
     @property
     def volume(self):
-        """Calculate volume (sets × reps × weight)."""
-        return (self.sets or 0) * (self.reps or 0) * float(self.weight_kg or 0)
+        """Volume (reps × weight summed over the sets)."""
+        if self.volume_kg is not None:
+            return float(self.volume_kg)
+        return sum((reps or 0) * (weight or 0) for reps, weight, _ in self.set_list())
+
+    def set_list(self):
+        """[(reps, weight_kg, rpe)] for each set."""
+        if self.set_data is not None:
+            return unpack_sets(self.set_data)
+        weight = float(self.weight_kg) if self.weight_kg is not None else None
+        return [(self.reps, weight, self.rpe)] * (self.sets or 0)
+
+    def set_sets(self, sets):
+        """Record per-set detail; the summary columns take the heaviest set.
+
+        Raises ValueError unless there is at least one set and every set has
+        reps >= 1, a weight >= 0 (or none) and an RPE of 1-10 (or none).
+        """
+        sets = [(int(reps), float(weight) if weight else None, int(rpe) if rpe is not None else None)
+                for reps, weight, rpe in sets]
+        if not sets or any(reps < 1 or (weight or 0) < 0 or (rpe is not None and not 1 <= rpe <= 10)
+                           for reps, weight, rpe in sets):
+            raise ValueError('Each set needs at least 1 rep, a weight of 0 or more and an RPE of 1-10.')
+        top = max(sets, key=lambda s: (s[1] or 0, s[0]))
+        self.sets = len(sets)
+        self.reps, self.weight_kg, self.rpe = top
+        self.set_data = pack_sets(sets) if len(set(sets)) > 1 else None
+
+    @property
+    def set_summary(self):
+        """'3x10 @ 80kg' or '10x80, 8x70 @8, 6x60' with per-set detail."""
+        if self.set_data is None:
+            weight = f' @ {self.weight_kg}kg' if self.weight_kg else ''
+            return f'{self.sets}x{self.reps}{weight}'
+        parts = []
+        for reps, weight, rpe in self.set_list():
+            part = f'{reps}x{weight:g}' if weight else f'{reps}'
+            parts.append(f'{part} @{rpe}' if rpe else part)
+        return ', '.join(parts)
 
     @property
     def estimated_1rm(self):
-        """Calculate estimated 1RM using Epley formula."""
-        if not self.weight_kg or not self.reps:
-            return 0
-        if self.reps == 1:
-            return float(self.weight_kg)
-        return round(float(self.weight_kg) * (1 + self.reps / 30), 2)
+        """Estimated 1RM as stored at the last flush (default formula before that)."""
+        if self.e1rm is not None:
+            return float(self.e1rm)
+        from app.services.e1rm import estimate
+        return estimate(self.weight_kg, self.reps, self.rpe)
 
     @property
     def is_pr(self):
@@ -107,7 +191,41 @@ class StrengthLog(db.Model):
         return cls.query.join(WorkoutSession).filter(
             WorkoutSession.user_id == user_id,
             cls.exercise_id == exercise_id
-        ).order_by(WorkoutSession.session_date.desc()).first()
+        ).order_by(WorkoutSession.session_date.desc(), cls.log_id.desc()).first()
+
+    @classmethod
+    def get_last_performances(cls, user_id, exercise_ids):
+        """Get user's last performance for many exercises in one query.
+
+        Ranks each exercise's logs newest-first with ROW_NUMBER() (the
+        portable equivalent of DISTINCT ON) and keeps the top row, using the
+        (user_id, session_date) and (exercise_id, session_id) indexes.
+        Returns {exercise_id: row} with sets, reps, weight_kg, rpe and
+        session_date attributes.
+        """
+        exercise_ids = list(exercise_ids)
+        if not exercise_ids:
+            return {}
+
+        ranked = db.session.query(
+            cls.log_id,
+            cls.exercise_id,
+            cls.sets,
+            cls.reps,
+            cls.weight_kg,
+            cls.rpe,
+            WorkoutSession.session_date,
+            db.func.row_number().over(
+                partition_by=cls.exercise_id,
+                order_by=(WorkoutSession.session_date.desc(), cls.log_id.desc())
+            ).label('rank')
+        ).join(WorkoutSession).filter(
+            WorkoutSession.user_id == user_id,
+            cls.exercise_id.in_(exercise_ids)
+        ).subquery()
+
+        rows = db.session.query(ranked).filter(ranked.c.rank == 1).all()
+        return {row.exercise_id: row for row in rows}
 
     @classmethod
     def get_exercise_history(cls, user_id, exercise_id, limit=10):
@@ -120,15 +238,14 @@ class StrengthLog(db.Model):
     @classmethod
     def get_best_1rm(cls, user_id, exercise_id):
         """Get user's best estimated 1RM for an exercise."""
-        logs = cls.query.join(WorkoutSession).filter(
+        best = cls.query.join(WorkoutSession).filter(
             WorkoutSession.user_id == user_id,
             cls.exercise_id == exercise_id
-        ).all()
+        ).order_by(cls.e1rm.desc().nulls_last(), WorkoutSession.session_date, cls.log_id).first()
 
-        if not logs:
+        if best is None:
             return None
 
-        best = max(logs, key=lambda x: x.estimated_1rm)
         return {
             'weight': best.weight_kg,
             'reps': best.reps,
@@ -159,21 +276,22 @@ class RunningLog(db.Model):
     interval_details = db.Column(db.Text)  # Details for interval runs (e.g., "20min warm up + 5x30s at 4'30")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    @property
-    def trimp_score(self):
-        """Calculate TRIMP score."""
-        if not all([self.duration_minutes, self.avg_heart_rate, self.max_heart_rate]):
-            return None
+    # Seconds in each heart-rate zone (app/services/hr_zones.py), stored at save time
+    zone1_seconds = db.Column(db.Integer)
+    zone2_seconds = db.Column(db.Integer)
+    zone3_seconds = db.Column(db.Integer)
+    zone4_seconds = db.Column(db.Integer)
+    zone5_seconds = db.Column(db.Integer)
 
-        resting_hr = 60  # Default resting HR
-        if self.max_heart_rate <= resting_hr:
-            return 0
+    # Derived at save time from the owner's profile (app/services/run_metrics.py)
+    trimp_score = db.Column(db.Numeric(7, 2))
+    intensity_factor = db.Column(db.Numeric(4, 2))  # threshold pace / run pace
 
-        hr_ratio = (self.avg_heart_rate - resting_hr) / (self.max_heart_rate - resting_hr)
-        hr_ratio = max(0, min(1, hr_ratio))  # Clamp between 0 and 1
+    pace_per_km = db.synonym('avg_pace_per_km')
 
-        import math
-        return round(self.duration_minutes * hr_ratio * 0.64 * math.exp(1.92 * hr_ratio), 2)
+    # Recorded samples from an imported GPX/TCX/FIT file
+    samples = db.relationship('RunSamples', uselist=False, backref='running_log',
+                              cascade='all, delete-orphan')
 
     @classmethod
     def get_weekly_mileage(cls, user_id):
@@ -0,0 +1 @@
+"""Domain services that sit between the models and the blueprints."""
@@ -0,0 +1,227 @@
+"""Time-bucketed aggregation of any metric for charts.
+
+``aggregate`` takes metric names, a bucket size (day, week, month, quarter,
+year), a date range and an optional group-by and answers each metric with a
+single ``GROUP BY bucket[, group]`` query over the raw logs or the stored
+rollups (``weekly_muscle_sets``, ``training_load_days``, ``readiness_days``).
+Buckets are returned densely: every bucket of the range is present in
+order, with empty buckets filled with 0 (or None for averaged metrics), so
+charts no longer depend on which weeks happened to have data.
+
+Weeks start on Monday. Rollups stored per week (hard sets) can only be
+bucketed by week or coarser; a week counts towards the bucket containing
+its Monday.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+from app import db
+from app.models import (
+    WorkoutSession, StrengthLog, RunningLog, Exercise, ExerciseMuscleGroup,
+    WeeklyMuscleSets, TrainingLoadDay, ReadinessDay
+)
+
+BUCKETS = ('day', 'week', 'month', 'quarter', 'year')
+GROUPS = ('exercise', 'muscle_group', 'run_type')
+DEFAULT_BUCKET_COUNT = {'day': 30, 'week': 12, 'month': 12, 'quarter': 8, 'year': 5}
+MAX_BUCKETS = 1000
+MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+# source: function(group_by) -> (from clause, user column, date column, value, group column)
+Metric = namedtuple('Metric', 'label unit aggregate source groups fill min_bucket')
+
+
+def _strength(column):
+    def source(group_by):
+        joined = db.join(StrengthLog, WorkoutSession, WorkoutSession.session_id == StrengthLog.session_id)
+        value, group = column, None
+        if group_by == 'exercise':
+            joined = joined.join(Exercise, Exercise.exercise_id == StrengthLog.exercise_id)
+            group = Exercise.name
+        elif group_by == 'muscle_group':
+            joined = joined.outerjoin(ExerciseMuscleGroup,
+                                      ExerciseMuscleGroup.exercise_id == StrengthLog.exercise_id)
+            value = column * db.func.coalesce(ExerciseMuscleGroup.share, 1)
+            group = db.func.coalesce(ExerciseMuscleGroup.muscle_group, 'Other')
+        return joined, WorkoutSession.user_id, WorkoutSession.session_date, value, group
+    return source
+
+
+def _running(column):
+    def source(group_by):
+        joined = db.join(RunningLog, WorkoutSession, WorkoutSession.session_id == RunningLog.session_id)
+        group = db.func.coalesce(RunningLog.run_type, 'other') if group_by == 'run_type' else None
+        return joined, WorkoutSession.user_id, WorkoutSession.session_date, column, group
+    return source
+
+
+def _sessions(group_by):
+    return (WorkoutSession.__table__, WorkoutSession.user_id, WorkoutSession.session_date,
+            WorkoutSession.session_id, None)
+
+
+def _hard_sets(group_by):
+    group = WeeklyMuscleSets.muscle_group if group_by == 'muscle_group' else None
+    return (WeeklyMuscleSets.__table__, WeeklyMuscleSets.user_id, WeeklyMuscleSets.week_start,
+            WeeklyMuscleSets.hard_sets, group)
+
+
+def _training_load(group_by):
+    return (TrainingLoadDay.__table__, TrainingLoadDay.user_id, TrainingLoadDay.load_date,
+            TrainingLoadDay.load, None)
+
+
+def _readiness(group_by):
+    return ReadinessDay.__table__, ReadinessDay.user_id, ReadinessDay.day, ReadinessDay.readiness, None
+
+
+METRICS = {
+    'strength_volume': Metric('Strength volume', 'kg', 'sum', _strength(StrengthLog.volume_kg),
+                              ('exercise', 'muscle_group'), 0, 'day'),
+    'strength_sets': Metric('Strength sets', 'sets', 'sum', _strength(StrengthLog.sets),
+                            ('exercise', 'muscle_group'), 0, 'day'),
+    'hard_sets': Metric('Hard sets', 'sets', 'sum', _hard_sets, ('muscle_group',), 0, 'week'),
+    'sessions': Metric('Sessions', 'sessions', 'count_distinct', _sessions, (), 0, 'day'),
+    'running_distance': Metric('Running distance', 'km', 'sum', _running(RunningLog.distance_km),
+                               ('run_type',), 0, 'day'),
+    'running_duration': Metric('Running duration', 'min', 'sum', _running(RunningLog.duration_minutes),
+                               ('run_type',), 0, 'day'),
+    'training_load': Metric('Training load', 'TRIMP', 'sum', _training_load, (), 0, 'day'),
+    'readiness': Metric('Readiness', '/100', 'avg', _readiness, (), None, 'day'),
+}
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing ``day``."""
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    months = MONTHS[bucket]
+    return day.replace(month=(day.month - 1) // months * months + 1, day=1)
+
+
+def shift(start, bucket, count):
+    """The bucket start ``count`` buckets after (or before) ``start``."""
+    if bucket == 'day':
+        return start + timedelta(days=count)
+    if bucket == 'week':
+        return start + timedelta(weeks=count)
+    years, month = divmod(start.month - 1 + MONTHS[bucket] * count, 12)
+    return date(start.year + years, month + 1, 1)
+
+
+def bucket_count(start, end, bucket):
+    """Number of buckets from the one containing ``start`` up to ``end`` (0 if empty)."""
+    first = bucket_start(start, bucket)
+    if first > end:
+        return 0
+    if bucket in ('day', 'week'):
+        return (end - first).days // (1 if bucket == 'day' else 7) + 1
+    months = (end.year - first.year) * 12 + end.month - first.month
+    return months // MONTHS[bucket] + 1
+
+
+def bucket_starts(start, end, bucket):
+    """Every bucket start from the one containing ``start`` up to ``end``."""
+    first = bucket_start(start, bucket)
+    return [shift(first, bucket, i) for i in range(bucket_count(start, end, bucket))]
+
+
+def bucket_expression(column, bucket):
+    """SQL expression truncating a date column to its bucket start."""
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.func.date_trunc(bucket, column), db.Date)
+    if bucket == 'day':
+        return db.func.date(column)
+    if bucket == 'week':
+        return db.func.date(column, 'weekday 0', '-6 days')
+    if bucket == 'quarter':
+        month = db.cast(db.func.strftime('%m', column), db.Integer)
+        return db.func.date(column, 'start of month', db.func.printf('-%d months', (month - 1) % 3))
+    return db.func.date(column, f'start of {bucket}')
+
+
+def _aggregate_function(kind, value):
+    if kind == 'count_distinct':
+        return db.func.count(db.distinct(value))
+    return getattr(db.func, kind)(value)
+
+
+def _metric_series(user_id, name, bucket, start, end, group_by, keys):
+    """{group: [value per bucket]} for one metric, densely filled."""
+    metric = METRICS[name]
+    from_clause, user_column, date_column, value, group = metric.source(group_by)
+    bucket_column = bucket_expression(date_column, bucket)
+    columns = [bucket_column.label('bucket'), _aggregate_function(metric.aggregate, value).label('value')]
+    group_columns = [bucket_column]
+    if group is not None:
+        columns.append(group.label('grp'))
+        group_columns.append(group)
+
+    rows = db.session.execute(
+        db.select(*columns).select_from(from_clause).where(
+            user_column == user_id,
+            date_column.between(start, end)
+        ).group_by(*group_columns)
+    ).all()
+
+    values = {}
+    for row in rows:
+        if row.value is not None:
+            label = row.grp if group is not None else 'total'
+            values.setdefault(label, {})[str(row.bucket)] = round(float(row.value), 2)
+    if group is None and not values:
+        values['total'] = {}
+
+    series = {label: [by_bucket.get(key, metric.fill) for key in keys]
+              for label, by_bucket in values.items()}
+    # Largest groups first so stacked charts and legends read top-down
+    return dict(sorted(series.items(), key=lambda item: -sum(v or 0 for v in item[1])))
+
+
+def aggregate(user_id, metrics, bucket='week', start=None, end=None, group_by=None):
+    """Bucketed series of ``metrics`` over ``start``..``end``.
+
+    Without a range the last ``DEFAULT_BUCKET_COUNT`` buckets up to today
+    are used. Raises ValueError for unknown metrics, buckets or groupings
+    and for ranges longer than ``MAX_BUCKETS`` buckets (checked before any
+    bucket is built); OverflowError when a default start falls before year 1.
+    """
+    if not metrics:
+        raise ValueError('At least one metric is required')
+    unknown = [name for name in metrics if name not in METRICS]
+    if unknown:
+        raise ValueError(f'Unknown metric: {", ".join(unknown)}')
+    if bucket not in BUCKETS:
+        raise ValueError(f'Bucket must be one of: {", ".join(BUCKETS)}')
+    if group_by is not None and group_by not in GROUPS:
+        raise ValueError(f'Group by must be one of: {", ".join(GROUPS)}')
+    for name in metrics:
+        metric = METRICS[name]
+        if group_by is not None and group_by not in metric.groups:
+            raise ValueError(f'{name} cannot be grouped by {group_by}')
+        if BUCKETS.index(bucket) < BUCKETS.index(metric.min_bucket):
+            raise ValueError(f'{name} is stored per {metric.min_bucket}; use a longer bucket')
+
+    end = end or date.today()
+    start = bucket_start(start or shift(bucket_start(end, bucket), bucket, 1 - DEFAULT_BUCKET_COUNT[bucket]),
+                         bucket)
+    if start > end:
+        raise ValueError('Start must be on or before end')
+    if bucket_count(start, end, bucket) > MAX_BUCKETS:
+        raise ValueError(f'Range covers more than {MAX_BUCKETS} {bucket} buckets')
+    keys = [str(day) for day in bucket_starts(start, end, bucket)]
+
+    return {
+        'bucket': bucket,
+        'start': str(start),
+        'end': str(end),
+        'group_by': group_by,
+        'buckets': keys,
+        'metrics': {name: {
+            'label': METRICS[name].label,
+            'unit': METRICS[name].unit,
+            'series': _metric_series(user_id, name, bucket, start, end, group_by, keys)
+        } for name in metrics}
+    }
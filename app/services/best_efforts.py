@@ -0,0 +1,206 @@
+"""Best-effort segments and the running PR ledger.
+
+For every imported run the fastest 400m, 1K, 5K, 10K and half marathon
+inside the recording are found with a sliding window over the distance
+stream (two pointers, O(n) per distance) and stored as ``RunBestEffort``
+rows. Runs without samples only count when their total distance is within
+``SUMMARY_TOLERANCE`` of a standard distance.
+
+``RunningPR`` is updated incrementally: a new effort that beats the
+current record appends a ledger row. Backdated, re-imported or deleted
+runs rebuild the user's ledger from the stored efforts instead. Both are
+driven by the commit hook in app/models/events.py, so every write path
+(forms, API, imports, session deletes) keeps the ledger current.
+"""
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import WorkoutSession, RunningLog, RunBestEffort, RunningPR
+
+# key -> (label, metres)
+BEST_EFFORT_DISTANCES = {
+    '400m': ('400m', 400.0),
+    '1k': ('1K', 1000.0),
+    '5k': ('5K', 5000.0),
+    '10k': ('10K', 10000.0),
+    'half': ('Half Marathon', 21097.5),
+}
+SUMMARY_TOLERANCE = 0.02
+
+
+def fastest_segment(time, distance, target_m):
+    """Fastest stretch covering ``target_m`` metres.
+
+    Returns (elapsed seconds, start offset seconds) or None if the run is
+    shorter than the target. The start of the window is interpolated
+    between samples so the result does not depend on where samples fall.
+    """
+    n = len(distance)
+    if n < 2 or distance[-1] - distance[0] < target_m:
+        return None
+
+    best = None
+    i = 0
+    for j in range(1, n):
+        start_distance = distance[j] - target_m
+        if start_distance < distance[0]:
+            continue
+        # Advance the window start while the next sample still leaves a full target
+        while distance[i + 1] <= start_distance:
+            i += 1
+        span = distance[i + 1] - distance[i]
+        fraction = (start_distance - distance[i]) / span if span > 0 else 0.0
+        start_time = time[i] + fraction * (time[i + 1] - time[i])
+        elapsed = time[j] - start_time
+        if best is None or elapsed < best[0]:
+            best = (elapsed, start_time)
+    return best
+
+
+def find_best_efforts(time, distance):
+    """{distance_key: (elapsed seconds, start offset)} for every distance covered."""
+    efforts = {}
+    for key, (_label, metres) in BEST_EFFORT_DISTANCES.items():
+        segment = fastest_segment(time, distance, metres)
+        if segment is not None:
+            efforts[key] = segment
+    return efforts
+
+
+def summary_efforts(run_log):
+    """Efforts of a run without samples: the whole run if it is a standard distance."""
+    if not run_log.distance_km or not run_log.duration_minutes:
+        return {}
+    distance_m = float(run_log.distance_km) * 1000
+    efforts = {}
+    for key, (_label, metres) in BEST_EFFORT_DISTANCES.items():
+        if abs(distance_m - metres) <= metres * SUMMARY_TOLERANCE:
+            efforts[key] = (run_log.duration_minutes * 60.0, None)
+    return efforts
+
+
+def _effort_rows(run_log, user_id, session_date):
+    samples = run_log.samples
+    if samples is not None and samples.distance_data is not None:
+        efforts = find_best_efforts(samples.series('time'), samples.series('distance'))
+    else:
+        efforts = summary_efforts(run_log)
+    return [
+        RunBestEffort(
+            user_id=user_id,
+            distance_key=key,
+            elapsed_seconds=round(elapsed, 1),
+            start_offset_seconds=round(start, 1) if start is not None else None,
+            achieved_date=session_date
+        )
+        for key, (elapsed, start) in efforts.items()
+    ]
+
+
+def record_best_efforts(run_log, user_id, session_date):
+    """Store the run's best efforts and update the PR ledger.
+
+    Returns the ledger rows added for this run (new PRs). The caller
+    commits.
+    """
+    had_efforts = bool(run_log.best_efforts)
+    if had_efforts:
+        # Drop the old rows first: (log_id, distance_key) is unique
+        run_log.best_efforts = []
+        db.session.flush()
+    run_log.best_efforts = _effort_rows(run_log, user_id, session_date)
+    db.session.flush()
+
+    current = RunningPR.get_current(user_id)
+    backdated = any(pr.achieved_date > session_date for pr in current.values())
+    if had_efforts or backdated:
+        rebuild_ledger(user_id)
+        return RunningPR.query.filter_by(user_id=user_id, log_id=run_log.log_id).all()
+
+    new_prs = []
+    for effort in run_log.best_efforts:
+        pr = current.get(effort.distance_key)
+        if pr is None or effort.elapsed_seconds < pr.elapsed_seconds:
+            new_prs.append(RunningPR(
+                user_id=user_id,
+                distance_key=effort.distance_key,
+                elapsed_seconds=effort.elapsed_seconds,
+                previous_seconds=pr.elapsed_seconds if pr else None,
+                log_id=run_log.log_id,
+                achieved_date=session_date
+            ))
+    db.session.add_all(new_prs)
+    return new_prs
+
+
+def run_prs(run_log):
+    """PR ledger rows held by ``run_log`` (the PRs a just-saved run set)."""
+    return RunningPR.query.filter_by(log_id=run_log.log_id).all()
+
+
+def rebuild_ledger(user_id):
+    """Replay all stored efforts of a user in date order."""
+    RunningPR.query.filter_by(user_id=user_id).delete()
+    best = {}
+    efforts = RunBestEffort.query.filter_by(user_id=user_id).order_by(
+        RunBestEffort.achieved_date, RunBestEffort.log_id
+    ).all()
+    for effort in efforts:
+        previous = best.get(effort.distance_key)
+        if previous is None or effort.elapsed_seconds < previous:
+            db.session.add(RunningPR(
+                user_id=user_id,
+                distance_key=effort.distance_key,
+                elapsed_seconds=effort.elapsed_seconds,
+                previous_seconds=previous,
+                log_id=effort.log_id,
+                achieved_date=effort.achieved_date
+            ))
+            best[effort.distance_key] = effort.elapsed_seconds
+
+
+def backfill_user_efforts(user_id):
+    """Recompute the efforts of all of a user's runs, then the ledger."""
+    runs = RunningLog.query.options(
+        joinedload(RunningLog.samples), joinedload(RunningLog.session)
+    ).join(WorkoutSession).filter(WorkoutSession.user_id == user_id).all()
+    for run_log in runs:
+        run_log.best_efforts = []
+    db.session.flush()
+    for run_log in runs:
+        run_log.best_efforts = _effort_rows(run_log, user_id, run_log.session.session_date)
+    db.session.flush()
+    rebuild_ledger(user_id)
+    return len(runs)
+
+
+def format_seconds(seconds):
+    """1234.5 -> '20:34', 4000 -> '1:06:40'."""
+    seconds = int(round(float(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f'{hours}:{minutes:02d}:{secs:02d}'
+    return f'{minutes}:{secs:02d}'
+
+
+def current_prs(user_id):
+    """Current PR per standard distance, in distance order, for display/API."""
+    current = RunningPR.get_current(user_id)
+    result = []
+    for key, (label, metres) in BEST_EFFORT_DISTANCES.items():
+        pr = current.get(key)
+        if pr is None:
+            continue
+        seconds = float(pr.elapsed_seconds)
+        result.append({
+            'distance': key,
+            'label': label,
+            'seconds': seconds,
+            'time': format_seconds(seconds),
+            'pace_per_km': round(seconds / 60 / (metres / 1000), 2),
+            'achieved_date': str(pr.achieved_date),
+            'log_id': pr.log_id,
+            'previous_seconds': float(pr.previous_seconds) if pr.previous_seconds is not None else None
+        })
+    return result
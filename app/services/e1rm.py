@@ -0,0 +1,164 @@
+"""Estimated one-rep max (e1RM) formulas.
+
+Each formula is written once as an expression over weight, reps and RPE
+and an ``ops`` namespace for the few non-arithmetic operations. The same
+definition is evaluated on NumPy arrays (``estimate_array``; scalars go
+through the same path via ``estimate``) and on SQLAlchemy columns
+(``sql_expression``), which compiles to plain arithmetic and CASE so
+Postgres can inline it. ``sql_function`` renders the ``calculate_1rm``
+function in setup_database.sql from these definitions.
+
+The app stores each log's e1RM in ``strength_logs.e1rm`` using the
+owner's chosen formula (``users.e1rm_formula``), see
+app/services/strength_sets.py.
+"""
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import case, cast, func, literal_column, null, or_, Numeric
+
+DEFAULT_FORMULA = 'epley'
+
+# Brzycki's denominator reaches zero at 37 reps
+BRZYCKI_MAX_REPS = 36
+
+# Percentage of 1RM by reps to failure (reps + 10 - RPE), Tuchscherer's
+# RPE chart at RPE 10. Sets further from failure use the last entry.
+RPE_REPS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)
+RPE_PERCENT = (1.0, 0.955, 0.922, 0.892, 0.863, 0.837, 0.811, 0.786, 0.762, 0.739, 0.707, 0.68)
+
+Formula = namedtuple('Formula', 'key label expression single_rep_is_max')
+
+
+def _epley(weight, reps, rpe, ops):
+    return weight * (1 + reps / 30)
+
+
+def _brzycki(weight, reps, rpe, ops):
+    return weight * 36 / (37 - ops.minimum(reps, BRZYCKI_MAX_REPS))
+
+
+def _lombardi(weight, reps, rpe, ops):
+    return weight * ops.power(reps, 0.1)
+
+
+def _rpe_table(weight, reps, rpe, ops):
+    # Without an RPE the set is taken to be to failure
+    reps_to_failure = reps + 10 - ops.coalesce(rpe, 10)
+    return weight / ops.interp(reps_to_failure, RPE_REPS, RPE_PERCENT)
+
+
+FORMULAS = {
+    formula.key: formula for formula in (
+        Formula('epley', 'Epley', _epley, True),
+        Formula('brzycki', 'Brzycki', _brzycki, True),
+        Formula('lombardi', 'Lombardi', _lombardi, True),
+        Formula('rpe', 'RPE chart', _rpe_table, False),
+    )
+}
+
+
+class _NumpyOps:
+    power = staticmethod(np.power)
+    minimum = staticmethod(np.minimum)
+    interp = staticmethod(np.interp)
+
+    @staticmethod
+    def coalesce(value, default):
+        return np.where(np.isnan(value), default, value)
+
+
+class _SqlOps:
+    power = staticmethod(func.power)
+
+    @staticmethod
+    def minimum(value, limit):
+        return case((value > limit, limit), else_=value)
+
+    @staticmethod
+    def coalesce(value, default):
+        return func.coalesce(value, default)
+
+    @staticmethod
+    def interp(x, xs, ys):
+        """Piecewise-linear CASE with the same clamping as ``np.interp``."""
+        whens = [(x <= xs[0], ys[0])]
+        for x0, x1, y0, y1 in zip(xs, xs[1:], ys, ys[1:]):
+            whens.append((x <= x1, y0 + (x - x0) * round((y1 - y0) / (x1 - x0), 10)))
+        return case(*whens, else_=ys[-1])
+
+
+def get_formula(key):
+    """The registered formula for ``key``; unknown or empty keys get the default."""
+    return FORMULAS.get(key or DEFAULT_FORMULA, FORMULAS[DEFAULT_FORMULA])
+
+
+def formula_choices():
+    """[(key, label)] for forms."""
+    return [(formula.key, formula.label) for formula in FORMULAS.values()]
+
+
+def _as_array(values, size=None):
+    if values is None:
+        return np.full(size, np.nan)
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+def estimate_array(weights, reps, rpes=None, formula=DEFAULT_FORMULA):
+    """e1RM of many sets at once; missing or non-positive inputs give 0."""
+    w = _as_array(weights)
+    r = _as_array(reps)
+    rpe = _as_array(rpes, r.size)
+    spec = get_formula(formula)
+
+    valid = (w > 0) & (r > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        raw = spec.expression(w, np.where(valid, r, 1.0), rpe, _NumpyOps)
+    if spec.single_rep_is_max:
+        raw = np.where(r == 1, w, raw)
+    return np.where(valid, np.round(raw, 2), 0.0)
+
+
+def estimate(weight, reps, rpe=None, formula=DEFAULT_FORMULA):
+    """e1RM of one set, as a float."""
+    return float(estimate_array([weight], [reps], [rpe], formula)[0])
+
+
+def sql_expression(weight, reps, rpe=None, formula=DEFAULT_FORMULA):
+    """The formula as a SQL expression over the given columns."""
+    spec = get_formula(formula)
+    rpe = rpe if rpe is not None else null()
+    whens = [(or_(weight.is_(None), reps.is_(None), weight <= 0, reps <= 0), 0)]
+    if spec.single_rep_is_max:
+        whens.append((reps == 1, weight))
+    raw = spec.expression(weight, reps, rpe, _SqlOps)
+    return case(*whens, else_=func.round(cast(raw, Numeric), 2))
+
+
+def sql_function():
+    """``CREATE FUNCTION calculate_1rm`` covering every formula (Postgres).
+
+    A single-statement SQL function, so the planner inlines it into the
+    calling query instead of running it row by row.
+    """
+    from sqlalchemy.dialects import postgresql
+
+    weight, reps, rpe = (literal_column(name) for name in ('weight', 'reps', 'rpe'))
+
+    def render(key):
+        return str(sql_expression(weight, reps, rpe, key).compile(
+            dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}
+        ))
+
+    branches = [f"        WHEN '{key}' THEN {render(key)}"
+                for key in FORMULAS if key != DEFAULT_FORMULA]
+    return '\n'.join([
+        'CREATE OR REPLACE FUNCTION calculate_1rm(weight DECIMAL, reps INTEGER,',
+        f"    rpe INTEGER DEFAULT NULL, formula VARCHAR DEFAULT '{DEFAULT_FORMULA}')",
+        'RETURNS DECIMAL AS $$',
+        '    SELECT CASE formula',
+        *branches,
+        f'        ELSE {render(DEFAULT_FORMULA)}',
+        '    END',
+        '$$ LANGUAGE sql IMMUTABLE;'
+    ])
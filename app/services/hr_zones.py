@@ -0,0 +1,155 @@
+"""Heart-rate zones and per-run time in zone.
+
+Zones are fractions of heart-rate reserve (Karvonen) when the user has set
+a resting heart rate, otherwise fractions of max heart rate. Time in zone
+is computed once per run, from the recorded samples when the run was
+imported or from its average heart rate otherwise, and stored on
+``running_logs.zone1_seconds`` .. ``zone5_seconds`` so the zone chart only
+has to sum columns.
+"""
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app import db
+
+# (key, name, lower bound, upper bound, chart colour)
+ZONES = [
+    ('zone1', 'Recovery', 0.50, 0.60, '#94a3b8'),
+    ('zone2', 'Aerobic', 0.60, 0.70, '#22c55e'),
+    ('zone3', 'Tempo', 0.70, 0.80, '#eab308'),
+    ('zone4', 'Threshold', 0.80, 0.90, '#f97316'),
+    ('zone5', 'VO2 Max', 0.90, 1.00, '#ef4444'),
+]
+ZONE_COLUMNS = [f'{key}_seconds' for key, *_ in ZONES]
+
+DEFAULT_MAX_HR = 190  # only used until a max HR is set or recorded
+MAX_SAMPLE_GAP_S = 30  # longer gaps (auto-pause, lost signal) are not counted
+
+
+def zone_edges(max_hr, resting_hr=None):
+    """Lower bpm bound of each zone."""
+    floors = np.array([zone[2] for zone in ZONES])
+    if resting_hr:
+        return resting_hr + floors * (max_hr - resting_hr)
+    return floors * max_hr
+
+
+def zone_seconds(time, heart_rate, max_hr, resting_hr=None):
+    """Seconds spent in each zone from a sampled heart-rate stream.
+
+    Each interval between two samples is credited to the zone of its first
+    sample. Time below zone 1 is not counted; anything above max HR counts
+    as zone 5.
+    """
+    t = np.asarray(time, dtype=float)
+    hr = np.asarray(heart_rate, dtype=float)
+    if t.size < 2:
+        return [0] * len(ZONES)
+    dt = np.diff(t)
+    dt[(dt < 0) | (dt > MAX_SAMPLE_GAP_S)] = 0
+    bins = np.searchsorted(zone_edges(max_hr, resting_hr), hr[:-1], side='right')
+    totals = np.bincount(bins, weights=dt, minlength=len(ZONES) + 1)
+    return [int(round(seconds)) for seconds in totals[1:]]
+
+
+def zone_seconds_from_average(avg_hr, duration_minutes, max_hr, resting_hr=None):
+    """Fallback for runs without samples: whole duration in the average's zone."""
+    seconds = [0] * len(ZONES)
+    if avg_hr and duration_minutes:
+        zone = int(np.searchsorted(zone_edges(max_hr, resting_hr), avg_hr, side='right'))
+        if zone:
+            seconds[zone - 1] = int(duration_minutes) * 60
+    return seconds
+
+
+def heart_rate_limits(user_id):
+    """(max HR, resting HR, max HR was set explicitly) for a user.
+
+    Without a configured max HR the highest max HR recorded on any of the
+    user's runs is used, and None is returned if there is none yet.
+    """
+    from app.models import User, WorkoutSession, RunningLog
+
+    with db.session.no_autoflush:
+        user = db.session.get(User, user_id)
+        if user is not None and user.max_heart_rate:
+            return user.max_heart_rate, user.resting_heart_rate, True
+        recorded = db.session.query(func.max(RunningLog.max_heart_rate)).join(
+            WorkoutSession
+        ).filter(WorkoutSession.user_id == user_id).scalar()
+    resting_hr = user.resting_heart_rate if user is not None else None
+    return recorded, resting_hr, False
+
+
+def apply_zone_seconds(run_log, max_hr, resting_hr=None):
+    """Compute and store the zone vector of one run."""
+    samples = run_log.samples
+    if samples is not None and samples.heart_rate_data is not None:
+        seconds = zone_seconds(samples.series('time'), samples.series('heart_rate'),
+                               max_hr, resting_hr)
+    else:
+        seconds = zone_seconds_from_average(run_log.avg_heart_rate, run_log.duration_minutes,
+                                            max_hr, resting_hr)
+    for column, value in zip(ZONE_COLUMNS, seconds):
+        setattr(run_log, column, value)
+
+
+def update_run_zones(run_log, user_id):
+    """Refresh a new or edited run's zones.
+
+    If the user has no configured max HR and this run sets a new highest
+    recorded max, every zone boundary moved, so all runs are recomputed.
+    """
+    max_hr, resting_hr, explicit = heart_rate_limits(user_id)
+    if not explicit and run_log.max_heart_rate and run_log.max_heart_rate > (max_hr or 0):
+        max_hr = run_log.max_heart_rate
+        recompute_user_zones(user_id, max_hr=max_hr, resting_hr=resting_hr)
+    apply_zone_seconds(run_log, max_hr or DEFAULT_MAX_HR, resting_hr)
+
+
+def recompute_user_zones(user_id, max_hr=None, resting_hr=None):
+    """Recompute every run of a user (after a heart-rate settings change)."""
+    from app.models import WorkoutSession, RunningLog
+
+    if max_hr is None:
+        max_hr, resting_hr, _ = heart_rate_limits(user_id)
+        max_hr = max_hr or DEFAULT_MAX_HR
+    runs = RunningLog.query.options(joinedload(RunningLog.samples)).join(
+        WorkoutSession
+    ).filter(WorkoutSession.user_id == user_id).all()
+    for run_log in runs:
+        apply_zone_seconds(run_log, max_hr, resting_hr)
+    return len(runs)
+
+
+def zone_distribution(user_id):
+    """Summed time in zone over all of a user's runs."""
+    from app.models import WorkoutSession, RunningLog
+
+    totals = db.session.query(*[
+        func.coalesce(func.sum(getattr(RunningLog, column)), 0) for column in ZONE_COLUMNS
+    ]).join(WorkoutSession).filter(WorkoutSession.user_id == user_id).one()
+    max_hr, resting_hr, _ = heart_rate_limits(user_id)
+    max_hr = max_hr or DEFAULT_MAX_HR
+    edges = zone_edges(max_hr, resting_hr)
+    uppers = list(edges[1:]) + [max_hr]
+
+    total_minutes = sum(totals) / 60
+    zones = []
+    for (key, name, _low, _high, color), seconds, low, high in zip(ZONES, totals, edges, uppers):
+        minutes = round(seconds / 60, 1)
+        zones.append({
+            'zone': key,
+            'name': name,
+            'minutes': minutes,
+            'percentage': round(seconds / 60 / total_minutes * 100, 1) if total_minutes > 0 else 0,
+            'color': color,
+            'hr_range': f'{int(low)}-{int(high)} bpm'
+        })
+    return {
+        'zones': zones,
+        'total_minutes': round(total_minutes, 1),
+        'estimated_max_hr': max_hr,
+        'resting_hr': resting_hr
+    }
@@ -0,0 +1,260 @@
+"""Structured intervals parsed from ``RunningLog.interval_details``.
+
+The interval builder (and people typing by hand) write sessions like
+``10min warm up (easy) + 5x30s @ 4'30" / 1min jog + 10min cool down``.
+``parse_interval_details`` turns that into one segment per rep plus the
+warm-up/cool-down blocks; results are cached by text since the same
+prescriptions repeat across sessions. ``sync_run_intervals`` stores the
+segments as ``RunInterval`` rows, measuring each rep's actual pace from
+the run's samples when it has any, so rep paces can be compared across
+sessions with a single query (``rep_pace_trends``).
+"""
+import hashlib
+import re
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.cache import cache, user_tag
+from app.models import WorkoutSession, RunningLog, RunInterval
+
+PARSER_VERSION = 1  # bump to invalidate cached parses
+
+_SPLIT = re.compile(r'\s*(?:\+|;|,|\bthen\b)\s*(?![^(\[]*[)\]])')
+_REPS = re.compile(r'^(\d{1,2})\s*[x×]\s*')
+_PACE = re.compile(r"(\d{1,2})\s*[:'’]\s*(\d{2})\s*(?:\"|”|'')?")
+_TARGET = re.compile(r"(?:@|\bat\b)\s*" + _PACE.pattern)
+_AMOUNT = re.compile(
+    r'(\d+(?:[.,]\d+)?)\s*(km|min(?:ute)?s?|secs?|seconds?|k|m|s)(\d{2})?(?![a-z])'
+)
+_GROUP = re.compile(r'[(\[]([^)\]]*)[)\]]')
+_RECOVERY_TYPE = re.compile(r'\b(jog|walk|stand|standing|rest|float)\b')
+
+
+def _pace(match):
+    return round(int(match.group(1)) + int(match.group(2)) / 60, 2)
+
+
+def _amount(match):
+    """('distance_m' | 'duration_seconds', value) of an amount token."""
+    value = float(match.group(1).replace(',', '.'))
+    unit = match.group(2)
+    if unit in ('km', 'k'):
+        return 'distance_m', value * 1000
+    if unit == 'm':
+        return 'distance_m', value
+    if unit.startswith('min'):
+        return 'duration_seconds', int(value * 60 + int(match.group(3) or 0))
+    return 'duration_seconds', int(value)
+
+
+def _parse_part(part):
+    """Segments of one '+'-separated part, or [] if it has no size."""
+    text = part.lower().strip()
+    kind = 'warmup' if 'warm' in text else 'cooldown' if 'cool' in text else 'steady'
+
+    count = 1
+    reps = _REPS.match(text)
+    if reps:
+        kind = 'rep'
+        count = int(reps.group(1))
+        text = text[reps.end():]
+
+    # A bracketed list of paces is what was actually run, rep by rep
+    actuals = []
+    for group in _GROUP.finditer(text):
+        paces = list(_PACE.finditer(group.group(1)))
+        if paces and not re.search(r'[a-z]', _PACE.sub('', group.group(1))):
+            actuals = [_pace(p) for p in paces]
+            text = text.replace(group.group(0), ' ')
+            break
+
+    target = _TARGET.search(text) or _PACE.search(text)
+    target_pace = _pace(target) if target else None
+    if target:
+        text = text[:target.start()] + ' ' + text[target.end():]
+
+    amounts = list(_AMOUNT.finditer(text))
+    if not amounts:
+        return []
+    size_field, size = _amount(amounts[0])
+    recovery_seconds = None
+    if len(amounts) > 1:
+        field, value = _amount(amounts[1])
+        recovery_seconds = value if field == 'duration_seconds' else None
+    recovery_type = _RECOVERY_TYPE.search(text[amounts[0].end():])
+
+    segments = []
+    for rep in range(count):
+        segment = {
+            'kind': kind,
+            'rep': rep + 1 if kind == 'rep' else None,
+            'distance_m': None,
+            'duration_seconds': None,
+            'target_pace': target_pace,
+            'actual_pace': actuals[rep] if len(actuals) == count else None,
+            'recovery_seconds': None,
+            'recovery_type': None
+        }
+        segment[size_field] = size
+        if kind == 'rep' and rep < count - 1:
+            segment['recovery_seconds'] = recovery_seconds
+            segment['recovery_type'] = recovery_type.group(1) if recovery_type else None
+        segments.append(segment)
+    return segments
+
+
+def _parse(text):
+    segments = []
+    for block, part in enumerate(p for p in _SPLIT.split(text) if p.strip()):
+        for segment in _parse_part(part):
+            segment['block'] = block + 1
+            segments.append(segment)
+    return segments
+
+
+def parse_interval_details(text):
+    """List of segment dicts for a free-text interval description (cached)."""
+    if not text or not text.strip():
+        return []
+    digest = hashlib.sha1(text.strip().encode('utf-8')).hexdigest()
+    return cache.get_or_set(f'intervals:parse:{PARSER_VERSION}:{digest}',
+                            lambda: _parse(text.strip()))
+
+
+def measure_segments(segments, time, distance):
+    """Fill ``actual_pace`` of reps by walking the prescription over the samples.
+
+    Segments are laid end to end from the start of the recording (reps
+    separated by their recoveries). Measuring stops at the first segment
+    whose length is unknown or that runs past the end of the recording.
+    """
+    t = np.asarray(time, dtype=float)
+    d = np.asarray(distance, dtype=float)
+    if t.size < 2:
+        return segments
+    cursor = t[0]
+    for segment in segments:
+        start_distance = np.interp(cursor, t, d)
+        if segment['duration_seconds']:
+            end = cursor + segment['duration_seconds']
+        elif segment['distance_m']:
+            end = np.interp(start_distance + segment['distance_m'], d, t)
+        else:
+            break
+        if end > t[-1]:
+            break
+        covered = np.interp(end, t, d) - start_distance
+        if segment['kind'] == 'rep' and segment['actual_pace'] is None and covered > 0:
+            segment['actual_pace'] = round((end - cursor) / 60 / (covered / 1000), 2)
+        cursor = end
+        if segment['kind'] == 'rep' and segment['recovery_type'] and not segment['recovery_seconds']:
+            break  # recovery of unknown length
+        cursor += segment['recovery_seconds'] or 0
+    return segments
+
+
+def _segment_rows(run_log, user_id):
+    segments = [dict(s) for s in parse_interval_details(run_log.interval_details)]
+    samples = run_log.samples
+    if segments and samples is not None and samples.distance_data is not None:
+        measure_segments(segments, samples.series('time'), samples.series('distance'))
+    return [{
+        'user_id': user_id,
+        'position': position,
+        'kind': s['kind'],
+        'block': s['block'],
+        'rep': s['rep'],
+        'distance_m': s['distance_m'],
+        'duration_seconds': s['duration_seconds'],
+        'target_pace_per_km': s['target_pace'],
+        'actual_pace_per_km': s['actual_pace'],
+        'recovery_seconds': s['recovery_seconds'],
+        'recovery_type': s['recovery_type']
+    } for position, s in enumerate(segments)]
+
+
+def sync_run_intervals(run_log, user_id):
+    """Replace a run's interval rows with a fresh parse. The caller commits."""
+    run_log.intervals = [RunInterval(**row) for row in _segment_rows(run_log, user_id)]
+    return run_log.intervals
+
+
+def parse_all_intervals():
+    """Re-parse every run's interval text in bulk; returns the number of rows."""
+    runs = RunningLog.query.options(
+        joinedload(RunningLog.samples), joinedload(RunningLog.session)
+    ).filter(RunningLog.interval_details.isnot(None)).all()
+    rows = []
+    for run_log in runs:
+        for row in _segment_rows(run_log, run_log.session.user_id):
+            rows.append({'log_id': run_log.log_id, **row})
+    RunInterval.query.delete()
+    if rows:
+        db.session.execute(db.insert(RunInterval), rows)
+    return len(rows)
+
+
+def shape_label(distance_m, duration_seconds):
+    """'400m', '1km', '30s', '1min30' -- the prescribed size of a rep."""
+    if distance_m is not None:
+        metres = float(distance_m)
+        return f'{metres / 1000:g}km' if metres >= 1000 else f'{metres:g}m'
+    minutes, seconds = divmod(int(duration_seconds or 0), 60)
+    if not minutes:
+        return f'{seconds}s'
+    return f'{minutes}min{seconds:02d}' if seconds else f'{minutes}min'
+
+
+def rep_pace_trends(user_id, start_date=None):
+    """Rep paces per session grouped by rep shape, oldest session first.
+
+    {shape: [{date, log_id, reps, target_pace, actual_pace, best_pace}]}
+    from a single aggregate over run_intervals (user/kind index).
+    """
+    return cache.get_or_set(
+        f'intervals:trends:{user_id}:{start_date}',
+        lambda: _rep_pace_trends(user_id, start_date),
+        tags=[user_tag(user_id)]
+    )
+
+
+def _rep_pace_trends(user_id, start_date):
+    query = db.session.query(
+        RunInterval.distance_m,
+        RunInterval.duration_seconds,
+        RunInterval.log_id,
+        WorkoutSession.session_date,
+        func.count(RunInterval.interval_id).label('reps'),
+        func.avg(RunInterval.target_pace_per_km).label('target_pace'),
+        func.avg(RunInterval.actual_pace_per_km).label('actual_pace'),
+        func.min(RunInterval.actual_pace_per_km).label('best_pace')
+    ).join(RunningLog, RunningLog.log_id == RunInterval.log_id).join(
+        WorkoutSession, WorkoutSession.session_id == RunningLog.session_id
+    ).filter(
+        RunInterval.user_id == user_id,
+        RunInterval.kind == 'rep'
+    )
+    if start_date is not None:
+        query = query.filter(WorkoutSession.session_date >= start_date)
+    rows = query.group_by(
+        RunInterval.distance_m, RunInterval.duration_seconds,
+        RunInterval.log_id, WorkoutSession.session_date
+    ).order_by(WorkoutSession.session_date, RunInterval.log_id).all()
+
+    def rounded(value):
+        return round(float(value), 2) if value is not None else None
+
+    trends = {}
+    for row in rows:
+        trends.setdefault(shape_label(row.distance_m, row.duration_seconds), []).append({
+            'date': str(row.session_date),
+            'log_id': row.log_id,
+            'reps': row.reps,
+            'target_pace': rounded(row.target_pace),
+            'actual_pace': rounded(row.actual_pace),
+            'best_pace': rounded(row.best_pace)
+        })
+    return trends
@@ -0,0 +1,132 @@
+"""Weekly hard sets per muscle group.
+
+Volume (sets x reps x kg) reads zero for bodyweight work, so the weekly
+workload per muscle is also tracked as effective hard sets: sets at
+``HARD_SET_RPE`` or above, with sets logged without an RPE counted as
+working sets. A log's sets are split across its exercise's muscle groups
+by ``ExerciseMuscleGroup.share`` (exercises without a mapping count as
+'Other', like ``volume_by_muscle_group``).
+
+The counts live in ``weekly_muscle_sets``. The commit hook in
+app/models/events.py passes the (user, week) pairs a commit touched to
+``update_weeks``, which rewrites only those weeks; ``rebuild_user``
+rewrites a user's whole history (backfill, muscle mapping changes).
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import WorkoutSession, StrengthLog, ExerciseMuscleGroup, WeeklyMuscleSets
+from app.services.strength_sets import set_arrays
+
+HARD_SET_RPE = 7
+
+
+def week_start(day):
+    """Monday of the week containing ``day``."""
+    return day - timedelta(days=day.weekday())
+
+
+def hard_set_counts(logs):
+    """(sets, hard sets) arrays, one entry per log."""
+    counts, _, _, rpes = set_arrays(logs)
+    hard = np.array([rpe is None or rpe >= HARD_SET_RPE for rpe in rpes], dtype=int)
+    hard_counts = np.zeros(len(counts), dtype=int)
+    has_sets = counts > 0
+    if has_sets.any():
+        hard_counts[has_sets] = np.add.reduceat(hard, (np.cumsum(counts) - counts)[has_sets])
+    return counts, hard_counts
+
+
+def _muscle_shares(exercise_ids):
+    """{exercise_id: [(muscle_group, share)]} in one query."""
+    shares = defaultdict(list)
+    if exercise_ids:
+        rows = db.session.query(
+            ExerciseMuscleGroup.exercise_id, ExerciseMuscleGroup.muscle_group, ExerciseMuscleGroup.share
+        ).filter(ExerciseMuscleGroup.exercise_id.in_(exercise_ids)).all()
+        for row in rows:
+            shares[row.exercise_id].append((row.muscle_group, float(row.share)))
+    return shares
+
+
+def _week_rows(user_id, weeks):
+    """Rollup rows of the given weeks from the user's logs."""
+    logs = db.session.query(
+        WorkoutSession.session_date, StrengthLog.exercise_id, StrengthLog.sets, StrengthLog.reps,
+        StrengthLog.weight_kg, StrengthLog.rpe, StrengthLog.set_data
+    ).join(WorkoutSession, WorkoutSession.session_id == StrengthLog.session_id).filter(
+        WorkoutSession.user_id == user_id,
+        WorkoutSession.session_date >= min(weeks),
+        WorkoutSession.session_date < max(weeks) + timedelta(days=7)
+    ).all()
+    logs = [log for log in logs if week_start(log.session_date) in weeks]
+    if not logs:
+        return []
+
+    shares = _muscle_shares({log.exercise_id for log in logs})
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for log, count, hard in zip(logs, *hard_set_counts(logs)):
+        for muscle_group, share in shares.get(log.exercise_id) or [('Other', 1.0)]:
+            total = totals[(week_start(log.session_date), muscle_group)]
+            total[0] += hard * share
+            total[1] += count * share
+    return [{
+        'user_id': user_id,
+        'week_start': week,
+        'muscle_group': muscle_group,
+        'hard_sets': round(hard, 2),
+        'sets': round(count, 2)
+    } for (week, muscle_group), (hard, count) in totals.items() if count > 0]
+
+
+def update_weeks(user_id, weeks):
+    """Rewrite the user's rollup rows for ``weeks`` (Mondays).
+
+    Returns the number of rows written. The caller commits.
+    """
+    weeks = set(weeks)
+    if not weeks:
+        return 0
+    rows = _week_rows(user_id, weeks)
+    WeeklyMuscleSets.query.filter(
+        WeeklyMuscleSets.user_id == user_id,
+        WeeklyMuscleSets.week_start.in_(weeks)
+    ).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(WeeklyMuscleSets), rows)
+    return len(rows)
+
+
+def rebuild_user(user_id):
+    """Rewrite every week of the user's history; returns the number of rows."""
+    days = db.session.query(WorkoutSession.session_date).join(StrengthLog).filter(
+        WorkoutSession.user_id == user_id
+    ).distinct().all()
+    WeeklyMuscleSets.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    return update_weeks(user_id, {week_start(day) for (day,) in days})
+
+
+def weekly_hard_sets(user_id, weeks=12, end_date=None):
+    """{week_start: {muscle_group: hard sets}} for the ``weeks`` weeks up to ``end_date``."""
+    end_date = end_date or date.today()
+    rows = WeeklyMuscleSets.query.filter(
+        WeeklyMuscleSets.user_id == user_id,
+        WeeklyMuscleSets.week_start > week_start(end_date) - timedelta(weeks=weeks),
+        WeeklyMuscleSets.week_start <= end_date
+    ).order_by(WeeklyMuscleSets.week_start, WeeklyMuscleSets.muscle_group).all()
+
+    data = {}
+    for row in rows:
+        data.setdefault(str(row.week_start), {})[row.muscle_group] = float(row.hard_sets)
+    return data
+
+
+def hard_sets_for_week(user_id, week):
+    """{muscle_group: hard sets} of the week starting ``week``."""
+    rows = WeeklyMuscleSets.query.filter_by(user_id=user_id, week_start=week).order_by(
+        WeeklyMuscleSets.muscle_group
+    ).all()
+    return {row.muscle_group: float(row.hard_sets) for row in rows}
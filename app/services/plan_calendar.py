@@ -0,0 +1,144 @@
+"""Compact per-day data for the planning calendar.
+
+``month_calendar`` returns, for the six-week grid around a month, each
+day's plans (type, label, completion) and actual sessions grouped by type
+(count, how many are not linked to a plan, duration, distance). Sessions
+come from one grouped query; plans from the rule expansion in
+app/services/plan_rules.py with template names eager-loaded. The result is
+plain data cached per month under the user's tag, so the month view and
+the JSON endpoint used to prefetch neighbouring months share entries, and
+any write to the user's sessions or plans invalidates them.
+"""
+import calendar
+from datetime import MAXYEAR, MINYEAR, date, timedelta
+
+from app import db
+from app.cache import cache, user_tag, templates_tag
+from app.models import (
+    PlannedWorkout, WorkoutSession, RunningLog, WorkoutTemplate, TemplateExercise
+)
+from app.services.plan_rules import expand_plans
+
+# Years whose grid and neighbouring months are all valid dates
+YEARS = range(MINYEAR + 1, MAXYEAR)
+
+
+def grid_range(year, month):
+    """First and last day of the Monday-to-Sunday grid showing a month."""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    return first - timedelta(days=first.weekday()), last + timedelta(days=6 - last.weekday())
+
+
+def neighbour_months(year, month):
+    """((year, month) before, (year, month) after)."""
+    before = (year, month - 1) if month > 1 else (year - 1, 12)
+    after = (year, month + 1) if month < 12 else (year + 1, 1)
+    return before, after
+
+
+def _plan_label(plan):
+    if plan.template is not None:
+        return plan.template.name
+    return plan.description or plan.workout_type.replace('_', ' ').title()
+
+
+def _plan_days(user_id, start, end):
+    days = {}
+    for plan in expand_plans(user_id, start, end):
+        days.setdefault(plan.planned_date.isoformat(), []).append({
+            'plan_id': plan.plan_id,
+            'rule_id': plan.rule_id,
+            'occurrence_date': plan.occurrence_date.isoformat() if plan.occurrence_date else None,
+            'type': plan.workout_type,
+            'label': _plan_label(plan),
+            'template_id': plan.template_id,
+            'completed': bool(plan.completed)
+        })
+    return days
+
+
+def _session_days(user_id, start, end):
+    """Sessions per (day, type) in one grouped query."""
+    runs = db.select(
+        RunningLog.session_id,
+        db.func.sum(RunningLog.distance_km).label('distance'),
+        db.func.sum(RunningLog.duration_minutes).label('duration')
+    ).group_by(RunningLog.session_id).subquery()
+    linked = db.select(PlannedWorkout.completed_session_id.label('session_id')).where(
+        PlannedWorkout.user_id == user_id,
+        PlannedWorkout.completed_session_id.isnot(None)
+    ).distinct().subquery()
+
+    rows = db.session.execute(
+        db.select(
+            WorkoutSession.session_date,
+            WorkoutSession.session_type,
+            db.func.count().label('count'),
+            db.func.sum(db.case((linked.c.session_id.is_(None), 1), else_=0)).label('unplanned'),
+            db.func.sum(db.func.coalesce(WorkoutSession.duration_minutes, runs.c.duration)).label('duration'),
+            db.func.sum(runs.c.distance).label('distance')
+        ).outerjoin(runs, runs.c.session_id == WorkoutSession.session_id)
+        .outerjoin(linked, linked.c.session_id == WorkoutSession.session_id)
+        .where(
+            WorkoutSession.user_id == user_id,
+            WorkoutSession.session_date.between(start, end)
+        ).group_by(WorkoutSession.session_date, WorkoutSession.session_type)
+        .order_by(WorkoutSession.session_date, WorkoutSession.session_type)
+    ).all()
+
+    days = {}
+    for row in rows:
+        days.setdefault(row.session_date.isoformat(), []).append({
+            'type': row.session_type,
+            'count': row.count,
+            'unplanned': int(row.unplanned or 0),
+            'duration': int(row.duration or 0),
+            'distance': round(float(row.distance), 2) if row.distance is not None else None
+        })
+    return days
+
+
+def month_calendar(user_id, year, month):
+    """{'start', 'end', 'days': {iso date: {'plans': [...], 'actual': [...]}}} for a month's grid."""
+    return cache.get_or_set(
+        f'calendar:{user_id}:{year}-{month:02d}',
+        lambda: _month_calendar(user_id, year, month),
+        tags=[user_tag(user_id)]
+    )
+
+
+def _month_calendar(user_id, year, month):
+    start, end = grid_range(year, month)
+    plans, sessions = _plan_days(user_id, start, end), _session_days(user_id, start, end)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': {day: {'plans': plans.get(day, []), 'actual': sessions.get(day, [])}
+                 for day in sorted(plans.keys() | sessions.keys())}
+    }
+
+
+def completion_stats(user_id):
+    """``PlannedWorkout.get_completion_stats``, cached until the user's data changes."""
+    return cache.get_or_set(
+        f'plan-stats:{user_id}:{date.today().isoformat()}',
+        lambda: PlannedWorkout.get_completion_stats(user_id),
+        tags=[user_tag(user_id)]
+    )
+
+
+def template_choices(user_id):
+    """Active templates with their exercise counts, for the quick-add dropdown."""
+    def load():
+        rows = db.session.query(
+            WorkoutTemplate.template_id, WorkoutTemplate.name,
+            db.func.count(TemplateExercise.template_exercise_id).label('exercise_count')
+        ).outerjoin(TemplateExercise, TemplateExercise.template_id == WorkoutTemplate.template_id).filter(
+            WorkoutTemplate.user_id == user_id,
+            WorkoutTemplate.is_active.is_(True)
+        ).group_by(WorkoutTemplate.template_id, WorkoutTemplate.name).order_by(WorkoutTemplate.name).all()
+        return [{'template_id': row.template_id, 'name': row.name, 'exercise_count': row.exercise_count}
+                for row in rows]
+
+    return cache.get_or_set(f'templates:choices:{user_id}', load, tags=[templates_tag(user_id)])
@@ -0,0 +1,111 @@
+"""Link planned workouts to the sessions that fulfilled them.
+
+A plan is fulfilled by a session of the same type (``workout_type`` ==
+``session_type``) dated within ``MATCH_WINDOW`` days of it. Each session
+fulfils at most one plan; candidate pairs are taken nearest first, so a
+same-day session wins over one the day before or after. Rest days are
+never matched.
+
+Links are stored on the plan (``completed``, ``completed_session_id``)
+with ``match_source`` 'auto'. Plans the user completed by hand
+('manual', or completed with no ``match_source`` from before automatic
+matching existed) are left alone and keep their session. Occurrences of recurring
+rules are matched too; a matched occurrence is saved as an override row
+(app/services/plan_rules.py). The commit hook in
+app/models/events.py re-runs ``reconcile`` around every date a commit
+touched; ``reconcile_user`` is the backfill.
+"""
+from datetime import date, timedelta
+
+from app import db
+from app.models import PlannedWorkout, PlanRule, WorkoutSession
+from app.services.plan_rules import virtual_occurrences
+
+MATCH_WINDOW = 1  # days
+
+
+def match_pairs(plans, sessions, taken=()):
+    """{plan key: session_id} from (key, date, type) tuples, nearest pairs first.
+
+    Sessions in ``taken`` are already linked elsewhere and are skipped.
+    """
+    by_day = {}
+    for session_id, day, session_type in sessions:
+        if session_id not in taken:
+            by_day.setdefault((session_type, day), []).append(session_id)
+
+    candidates = []
+    for plan_id, day, workout_type in plans:
+        for offset in range(-MATCH_WINDOW, MATCH_WINDOW + 1):
+            for session_id in by_day.get((workout_type, day + timedelta(days=offset)), ()):
+                candidates.append((abs(offset), day, offset, plan_id, session_id))
+
+    matches, used = {}, set()
+    for _, _, _, plan_id, session_id in sorted(candidates):
+        if plan_id not in matches and session_id not in used:
+            matches[plan_id] = session_id
+            used.add(session_id)
+    return matches
+
+
+def reconcile(user_id, start, end):
+    """Re-match the user's automatic and open plans dated ``start``..``end``.
+
+    Returns the number of plans linked. The caller commits.
+    """
+    plans = PlannedWorkout.query.filter(
+        PlannedWorkout.user_id == user_id,
+        PlannedWorkout.planned_date.between(start, end),
+        PlannedWorkout.workout_type != 'rest',
+        db.or_(
+            PlannedWorkout.match_source == 'auto',
+            db.and_(PlannedWorkout.match_source.is_(None), PlannedWorkout.completed.isnot(True))
+        )
+    ).all()
+    stored_ids = [plan.plan_id for plan in plans]
+    plans += [plan for plan in virtual_occurrences(user_id, start, end) if plan.workout_type != 'rest']
+    if not plans:
+        return 0
+
+    window = timedelta(days=MATCH_WINDOW)
+    sessions = db.session.query(
+        WorkoutSession.session_id, WorkoutSession.session_date, WorkoutSession.session_type
+    ).filter(
+        WorkoutSession.user_id == user_id,
+        WorkoutSession.session_date.between(start - window, end + window)
+    ).all()
+    # Sessions held by manual plans or by auto plans outside the range
+    taken = set(db.session.scalars(
+        db.select(PlannedWorkout.completed_session_id).where(
+            PlannedWorkout.user_id == user_id,
+            PlannedWorkout.completed_session_id.in_([s.session_id for s in sessions]),
+            PlannedWorkout.plan_id.notin_(stored_ids)
+        )
+    ))
+
+    matches = match_pairs([(i, p.planned_date, p.workout_type) for i, p in enumerate(plans)], sessions, taken)
+    for i, plan in enumerate(plans):
+        session_id = matches.get(i)
+        if plan.completed_session_id != session_id or bool(plan.completed) != (session_id is not None):
+            plan.completed = session_id is not None
+            plan.completed_session_id = session_id
+            plan.match_source = 'auto' if session_id is not None else None
+            if plan.plan_id is None:
+                db.session.add(plan)  # a rule occurrence becomes an override
+    return len(matches)
+
+
+def reconcile_user(user_id):
+    """Re-match all of a user's plans and past rule occurrences (backfill)."""
+    first, last = db.session.query(
+        db.func.min(PlannedWorkout.planned_date), db.func.max(PlannedWorkout.planned_date)
+    ).filter(PlannedWorkout.user_id == user_id).one()
+    first_rule = db.session.query(db.func.min(PlanRule.start_date)).filter(
+        PlanRule.user_id == user_id
+    ).scalar()
+    if first_rule is not None:
+        first = min(first or first_rule, first_rule)
+        last = max(last or first_rule, date.today())
+    if first is None:
+        return 0
+    return reconcile(user_id, first, last)
@@ -0,0 +1,197 @@
+"""Recurring plans: weekly rules expanded lazily for the range being shown.
+
+A ``PlanRule`` stores a weekly pattern once. ``occurrences`` steps through
+the rule's active weeks in the requested range only, and the last
+occurrence of a ``count`` rule is computed arithmetically, so the cost of
+a calendar month does not depend on how long the block runs. What is stored per occurrence is sparse:
+
+* ``PlanRuleException`` rows for skipped dates;
+* ``PlannedWorkout`` rows with ``rule_id``/``occurrence_date`` for
+  occurrences that were edited, moved or completed (the reconciler in
+  app/services/plan_matching.py saves an occurrence when it links a session).
+
+``expand_plans`` merges stored plans and the remaining occurrences into the
+list of plans the calendar and the completion stats work from.
+"""
+from datetime import date, timedelta
+from itertools import groupby
+
+from app import db
+from app.models import PlannedWorkout, PlanRule, PlanRuleException
+
+MAX_WEEKS = 52
+
+
+def weekday_mask(weekdays):
+    """Bit mask (bit 0 = Monday) for an iterable of weekday numbers."""
+    mask = 0
+    for weekday in weekdays:
+        mask |= 1 << weekday
+    return mask
+
+
+def mask_weekdays(mask):
+    """Weekday numbers set in ``mask``, Monday first."""
+    return [weekday for weekday in range(7) if mask >> weekday & 1]
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def last_occurrence(rule):
+    """Date of the rule's last occurrence, or None if it never ends."""
+    ends = [rule.until] if rule.until else []
+    if rule.count:
+        weekdays = mask_weekdays(rule.weekdays)
+        anchor = _week_start(rule.start_date)
+        first_week = [d for d in weekdays if d >= rule.start_date.weekday()]
+        if rule.count <= len(first_week):
+            ends.append(anchor + timedelta(days=first_week[rule.count - 1]))
+        else:
+            weeks, index = divmod(rule.count - len(first_week) - 1, len(weekdays))
+            ends.append(anchor + timedelta(weeks=(weeks + 1) * (rule.interval_weeks or 1),
+                                           days=weekdays[index]))
+    return min(ends) if ends else None
+
+
+def occurrences(rule, start, end):
+    """Dates of the rule's occurrences within ``start``..``end`` (before exceptions)."""
+    last = last_occurrence(rule)
+    start = max(start, rule.start_date)
+    end = min(end, last) if last else end
+    if start > end:
+        return []
+    interval = rule.interval_weeks or 1
+    weekdays = mask_weekdays(rule.weekdays)
+    # First active week at or after the week of ``start``, in the rule's phase
+    weeks = (_week_start(start) - _week_start(rule.start_date)).days // 7
+    week = _week_start(start) + timedelta(weeks=-weeks % interval)
+    days = []
+    while week <= end:
+        days += [day for day in (week + timedelta(days=d) for d in weekdays) if start <= day <= end]
+        week += timedelta(weeks=interval)
+    return days
+
+
+def _rules_in_range(user_id, start, end):
+    return PlanRule.query.options(db.joinedload(PlanRule.template)).filter(
+        PlanRule.user_id == user_id,
+        PlanRule.start_date <= end,
+        db.or_(PlanRule.until.is_(None), PlanRule.until >= start)
+    ).all()
+
+
+def virtual_occurrences(user_id, start, end):
+    """Unsaved plans for the occurrences in range with no override or exception."""
+    rules = _rules_in_range(user_id, start, end)
+    if not rules:
+        return []
+
+    rule_ids = [rule.rule_id for rule in rules]
+    stored = db.union_all(
+        db.select(PlannedWorkout.rule_id, PlannedWorkout.occurrence_date).where(
+            PlannedWorkout.rule_id.in_(rule_ids),
+            PlannedWorkout.occurrence_date.between(start, end)
+        ),
+        db.select(PlanRuleException.rule_id, PlanRuleException.occurrence_date).where(
+            PlanRuleException.rule_id.in_(rule_ids),
+            PlanRuleException.occurrence_date.between(start, end)
+        )
+    )
+    handled = {tuple(row) for row in db.session.execute(stored)}
+
+    return [rule.occurrence(day) for rule in rules for day in occurrences(rule, start, end)
+            if (rule.rule_id, day) not in handled]
+
+
+def expand_plans(user_id, start, end):
+    """Stored plans and rule occurrences dated ``start``..``end``, by date."""
+    stored = PlannedWorkout.query.options(db.joinedload(PlannedWorkout.template)).filter(
+        PlannedWorkout.user_id == user_id,
+        PlannedWorkout.planned_date.between(start, end)
+    ).all()
+    plans = stored + virtual_occurrences(user_id, start, end)
+    return sorted(plans, key=lambda plan: plan.planned_date)
+
+
+def create_weekly_rules(user_id, items, start, weeks):
+    """One rule per (type, description) of ``items`` for ``weeks`` weeks from ``start``.
+
+    ``items`` are template entries: dicts with 'day' (0 = Monday), 'type'
+    and 'desc'. ``start`` must be a Monday.
+    """
+    until = start + timedelta(weeks=weeks, days=-1)
+    key = lambda item: (item['type'], item['desc'])  # noqa: E731
+    rules = []
+    for (workout_type, description), group in groupby(sorted(items, key=key), key=key):
+        rules.append(PlanRule(user_id=user_id, workout_type=workout_type, description=description,
+                              start_date=start, until=until,
+                              weekdays=weekday_mask(item['day'] for item in group)))
+    db.session.add_all(rules)
+    return rules
+
+
+def clear_range(user_id, start, end):
+    """Remove everything planned on ``start``..``end`` (whole weeks).
+
+    Rules overlapping the range keep their occurrences before and after it;
+    the part after becomes a rule of its own, taking its overrides and
+    exceptions along. The caller commits.
+    """
+    PlannedWorkout.query.filter(
+        PlannedWorkout.user_id == user_id,
+        PlannedWorkout.rule_id.is_(None),
+        PlannedWorkout.planned_date >= start,
+        PlannedWorkout.planned_date <= end
+    ).delete()
+
+    for rule in PlanRule.query.filter(PlanRule.user_id == user_id, PlanRule.start_date <= end).all():
+        last = last_occurrence(rule)
+        if last is not None and last < start:
+            continue
+        if last is None or last > end:
+            anchor = _week_start(rule.start_date)
+            weeks = -(-(end + timedelta(days=1) - anchor).days // 7)
+            weeks += -weeks % (rule.interval_weeks or 1)  # keep the rule's phase
+            tail = rule.copy(start_date=anchor + timedelta(weeks=weeks), count=None, until=last)
+            db.session.add(tail)
+            db.session.flush()
+            for model in (PlannedWorkout, PlanRuleException):
+                model.query.filter(
+                    model.rule_id == rule.rule_id, model.occurrence_date >= tail.start_date
+                ).update({'rule_id': tail.rule_id}, synchronize_session=False)
+        if rule.start_date < start:
+            end_rule(rule, start)
+        else:
+            db.session.delete(rule)
+
+
+def end_rule(rule, day):
+    """Stop ``rule`` before ``day``, dropping what was stored from ``day`` on."""
+    if day <= rule.start_date:
+        db.session.delete(rule)
+        return
+    rule.until = day - timedelta(days=1)
+    rule.count = None
+    for model in (PlannedWorkout, PlanRuleException):
+        for obj in model.query.filter(model.rule_id == rule.rule_id, model.occurrence_date >= day):
+            db.session.delete(obj)
+
+
+def skip_occurrence(rule, day):
+    """Skip the occurrence on ``day``, removing its override if there is one."""
+    for plan in PlannedWorkout.query.filter_by(rule_id=rule.rule_id, occurrence_date=day):
+        db.session.delete(plan)
+    if db.session.get(PlanRuleException, (rule.rule_id, day)) is None:
+        db.session.add(PlanRuleException(rule_id=rule.rule_id, occurrence_date=day))
+
+
+def occurrence_count(user_id, start, end):
+    """Number of unsaved non-rest rule occurrences in range (for completion stats)."""
+    return sum(1 for plan in virtual_occurrences(user_id, start, end) if plan.workout_type != 'rest')
+
+
+def parse_week_start(value):
+    """Monday of the ISO date ``value`` (today's week when empty)."""
+    return _week_start(date.fromisoformat(value) if value else date.today())
@@ -0,0 +1,206 @@
+"""Load and rep suggestions for the next session of each exercise.
+
+Double progression with RPE gating: work up through the rep range
+(``TemplateExercise.target_reps`` to ``target_reps_max``) at the same
+load, then add the smallest sensible increment and drop back to the
+bottom of the range. A set at RPE 10 repeats the load instead of adding
+reps, and two sessions in a row below the range trigger a 10% deload.
+Exercises outside any template keep their last rep count as the target.
+
+``suggest_next`` is pure, so ``compute_all_suggestions`` (the nightly
+``flask compute-progressions`` job) fans users out over a process pool
+after reading every input with two queries. The commit hook in
+app/models/events.py calls ``refresh_suggestions`` for the exercises a
+commit touched, and views read the stored ``ProgressionSuggestion`` rows.
+"""
+import math
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from app import db
+from app.models import (
+    User, WorkoutSession, StrengthLog, WorkoutTemplate, TemplateExercise, ProgressionSuggestion
+)
+
+HISTORY_LOGS = 3
+DELOAD_FACTOR = 0.9
+EASY_RPE = 6  # at or below this, skip straight to a heavier load
+MAX_RPE = 10
+
+REASONS = {
+    'increase_load': 'Top of the rep range reached: add weight',
+    'add_reps': 'Add a rep at the same weight',
+    'repeat': 'Repeat and own this weight',
+    'deload': 'Missed the rep range twice: deload',
+}
+
+
+def load_increment(weight):
+    """Smallest practical jump: 2.5 kg on bars and machines, 1 kg on light dumbbells."""
+    return 2.5 if weight >= 20 else 1.0
+
+
+def round_to(value, step):
+    return round(math.floor(value / step + 0.5) * step, 2)
+
+
+def suggest_next(history, rep_low=None, rep_high=None, target_sets=None):
+    """Next (sets, reps, weight_kg, reason) from recent top sets.
+
+    ``history`` holds (sets, reps, weight_kg, rpe) tuples, newest first.
+    Without a rep range the last rep count is both ends of it.
+    """
+    sets, reps, weight, rpe = history[0]
+    rep_low = rep_low or reps
+    rep_high = max(rep_high or rep_low, rep_low)
+    sets = target_sets or sets
+
+    if not weight:
+        # Bodyweight: progress reps only
+        if rpe is not None and rpe >= MAX_RPE:
+            return sets, reps, None, 'repeat'
+        return sets, reps + 1, None, 'add_reps'
+
+    step = load_increment(weight)
+    missed = [logged_reps < rep_low for _, logged_reps, _, _ in history[:2]]
+    if len(missed) == 2 and all(missed):
+        return sets, rep_low, round_to(weight * DELOAD_FACTOR, step), 'deload'
+    top_of_range = reps >= rep_high and (rpe is None or rpe < MAX_RPE)
+    easy = rpe is not None and rpe <= EASY_RPE and reps >= rep_low
+    if top_of_range or easy:
+        return sets, rep_low, round_to(weight + step, step), 'increase_load'
+    if reps < rep_low or (rpe is not None and rpe >= MAX_RPE):
+        return sets, max(reps, rep_low), weight, 'repeat'
+    return sets, min(reps + 1, rep_high), weight, 'add_reps'
+
+
+def _suggest_user(task):
+    """Suggestion rows for one user (runs in a worker process)."""
+    user_id, exercises = task
+    rows = []
+    for exercise_id, (history, log_id, target) in exercises.items():
+        rep_low, rep_high, target_sets = target
+        sets, reps, weight, reason = suggest_next(history, rep_low, rep_high, target_sets)
+        rep_low = rep_low or history[0][1]
+        rows.append({
+            'user_id': user_id,
+            'exercise_id': exercise_id,
+            'sets': sets,
+            'reps': reps,
+            'weight_kg': weight,
+            'reason': reason,
+            'rep_low': rep_low,
+            'rep_high': max(rep_high or rep_low, rep_low),
+            'based_on_log_id': log_id
+        })
+    return rows
+
+
+def _load_inputs(user_ids=None, exercise_ids=None):
+    """{user_id: {exercise_id: (history, newest log_id, rep target)}} in two queries."""
+    ranked = db.session.query(
+        WorkoutSession.user_id,
+        StrengthLog.exercise_id,
+        StrengthLog.log_id,
+        StrengthLog.sets,
+        StrengthLog.reps,
+        StrengthLog.weight_kg,
+        StrengthLog.rpe,
+        db.func.row_number().over(
+            partition_by=(WorkoutSession.user_id, StrengthLog.exercise_id),
+            order_by=(WorkoutSession.session_date.desc(), StrengthLog.log_id.desc())
+        ).label('rank')
+    ).join(WorkoutSession, WorkoutSession.session_id == StrengthLog.session_id)
+    targets = db.session.query(
+        WorkoutTemplate.user_id,
+        TemplateExercise.exercise_id,
+        TemplateExercise.target_reps,
+        TemplateExercise.target_reps_max,
+        TemplateExercise.target_sets
+    ).join(WorkoutTemplate, WorkoutTemplate.template_id == TemplateExercise.template_id).filter(
+        WorkoutTemplate.is_active.isnot(False)
+    )
+    if user_ids is not None:
+        ranked = ranked.filter(WorkoutSession.user_id.in_(user_ids))
+        targets = targets.filter(WorkoutTemplate.user_id.in_(user_ids))
+    if exercise_ids is not None:
+        ranked = ranked.filter(StrengthLog.exercise_id.in_(exercise_ids))
+        targets = targets.filter(TemplateExercise.exercise_id.in_(exercise_ids))
+    ranked = ranked.subquery()
+    logs = db.session.query(ranked).filter(ranked.c.rank <= HISTORY_LOGS).order_by(
+        ranked.c.user_id, ranked.c.exercise_id, ranked.c.rank
+    ).all()
+
+    # The most recently edited template wins when several include an exercise
+    rep_targets = {}
+    for row in targets.order_by(WorkoutTemplate.updated_at, TemplateExercise.template_exercise_id):
+        rep_targets[(row.user_id, row.exercise_id)] = (row.target_reps, row.target_reps_max,
+                                                      row.target_sets)
+
+    inputs = defaultdict(dict)
+    for row in logs:
+        entry = (row.sets, row.reps, float(row.weight_kg) if row.weight_kg else None, row.rpe)
+        if row.exercise_id not in inputs[row.user_id]:
+            target = rep_targets.get((row.user_id, row.exercise_id), (None, None, None))
+            inputs[row.user_id][row.exercise_id] = ([], row.log_id, target)
+        inputs[row.user_id][row.exercise_id][0].append(entry)
+    return inputs
+
+
+def _lock_user(user_id):
+    """Serialize writers of one user's suggestions (row lock on PostgreSQL)."""
+    db.session.execute(db.select(User.user_id).where(User.user_id == user_id).with_for_update())
+
+
+def compute_all_suggestions(workers=None):
+    """Rebuild every user's suggestions; returns the number of rows.
+
+    ``workers=1`` computes in-process (tests, small installs); otherwise
+    users are spread over a process pool. Suggestions are computed from a
+    snapshot of every user's inputs, then replaced one user at a time, each
+    in its own short transaction under the same per-user lock as
+    ``refresh_suggestions``. Under the lock the user's inputs are read
+    again; if a commit changed them since the snapshot, the rows are
+    recomputed from the current inputs instead of overwriting what the
+    commit hook stored.
+    """
+    tasks = list(_load_inputs().items())
+    if workers == 1 or len(tasks) < 2:
+        results = map(_suggest_user, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_suggest_user, tasks, chunksize=max(1, len(tasks) // 32)))
+
+    total = 0
+    for (user_id, inputs), rows in zip(tasks, results):
+        _lock_user(user_id)
+        current = _load_inputs([user_id]).get(user_id, {})
+        if current != inputs:
+            rows = _suggest_user((user_id, current))
+        ProgressionSuggestion.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(db.insert(ProgressionSuggestion), rows)
+        db.session.commit()
+        total += len(rows)
+    # Users with no strength logs left
+    logged = db.select(WorkoutSession.user_id).join(
+        StrengthLog, StrengthLog.session_id == WorkoutSession.session_id
+    )
+    ProgressionSuggestion.query.filter(
+        ProgressionSuggestion.user_id.notin_(logged)
+    ).delete(synchronize_session=False)
+    return total
+
+
+def refresh_suggestions(user_id, exercise_ids):
+    """Recompute one user's suggestions for the given exercises. The caller commits."""
+    exercise_ids = list(exercise_ids)
+    _lock_user(user_id)
+    rows = _suggest_user((user_id, _load_inputs([user_id], exercise_ids).get(user_id, {})))
+    ProgressionSuggestion.query.filter(
+        ProgressionSuggestion.user_id == user_id,
+        ProgressionSuggestion.exercise_id.in_(exercise_ids)
+    ).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(ProgressionSuggestion), rows)
+    return rows
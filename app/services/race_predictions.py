@@ -0,0 +1,145 @@
+"""Race time predictions and training paces from running PRs.
+
+VDOT follows Daniels & Gilbert: the oxygen cost of running at velocity v
+(m/min) divided by the fraction of VO2max that can be sustained for the
+race duration. The user's VDOT is the best over their current best-effort
+PRs (app/services/best_efforts.py); race times are predicted both by
+inverting VDOT and with Riegel's formula from the same effort.
+
+Results are cached under a fingerprint of the PR ledger, so they are only
+recomputed when a new best effort arrives (or the ledger is rebuilt).
+"""
+import math
+
+from sqlalchemy import func
+
+from app import db
+from app.cache import cache
+from app.models import RunningPR
+from app.services.best_efforts import BEST_EFFORT_DISTANCES, current_prs, format_seconds
+
+RIEGEL_EXPONENT = 1.06
+
+# key -> (label, metres)
+RACE_DISTANCES = {
+    '5k': ('5K', 5000.0),
+    '10k': ('10K', 10000.0),
+    'half': ('Half Marathon', 21097.5),
+    'marathon': ('Marathon', 42195.0),
+}
+
+# Training intensities as fractions of VO2max (Daniels)
+TRAINING_ZONES = [
+    ('easy', 'Easy', 0.59, 0.74),
+    ('threshold', 'Threshold', 0.83, 0.88),
+    ('interval', 'Interval', 0.95, 1.00),
+    ('repetition', 'Repetition', 1.05, 1.10),
+]
+
+# Efforts shorter than this say more about speed than aerobic fitness
+MIN_VDOT_DISTANCE_M = 1500
+
+
+def oxygen_cost(velocity):
+    """VO2 (ml/kg/min) of running at ``velocity`` m/min."""
+    return -4.60 + 0.182258 * velocity + 0.000104 * velocity ** 2
+
+
+def sustainable_fraction(minutes):
+    """Fraction of VO2max sustainable for a race of ``minutes``."""
+    return (0.8 + 0.1894393 * math.exp(-0.012778 * minutes)
+            + 0.2989558 * math.exp(-0.1932605 * minutes))
+
+
+def vdot(distance_m, seconds):
+    minutes = seconds / 60
+    return oxygen_cost(distance_m / minutes) / sustainable_fraction(minutes)
+
+
+def velocity_at(vo2):
+    """Velocity (m/min) whose oxygen cost is ``vo2``."""
+    a, b, c = 0.000104, 0.182258, -4.60 - vo2
+    return (-b + math.sqrt(b * b - 4 * a * c)) / (2 * a)
+
+
+def predict_seconds(vdot_value, distance_m):
+    """Race time for ``distance_m`` at a given VDOT (bisection on time)."""
+    low, high = 60.0, 60.0 * 60 * 10
+    for _ in range(60):
+        mid = (low + high) / 2
+        if vdot(distance_m, mid) > vdot_value:
+            low = mid  # too fast for this VDOT
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def riegel_seconds(seconds, distance_m, target_m, exponent=RIEGEL_EXPONENT):
+    return seconds * (target_m / distance_m) ** exponent
+
+
+def pace_per_km(velocity):
+    """min/km from m/min."""
+    return round(1000 / velocity, 2)
+
+
+def training_paces(vdot_value):
+    """Pace ranges (min/km, faster bound first) for the Daniels intensities."""
+    paces = []
+    for key, label, low, high in TRAINING_ZONES:
+        paces.append({
+            'zone': key,
+            'label': label,
+            'fast': pace_per_km(velocity_at(vdot_value * high)),
+            'slow': pace_per_km(velocity_at(vdot_value * low))
+        })
+    return paces
+
+
+def compute_predictions(prs):
+    """Predictions from a list of current PR dicts (see ``current_prs``)."""
+    candidates = [
+        (vdot(BEST_EFFORT_DISTANCES[pr['distance']][1], pr['seconds']), pr)
+        for pr in prs
+        if BEST_EFFORT_DISTANCES[pr['distance']][1] >= MIN_VDOT_DISTANCE_M
+    ]
+    if not candidates:
+        return None
+    best_vdot, source = max(candidates, key=lambda candidate: candidate[0])
+    source_m = BEST_EFFORT_DISTANCES[source['distance']][1]
+
+    races = []
+    for key, (label, metres) in RACE_DISTANCES.items():
+        seconds = predict_seconds(best_vdot, metres)
+        riegel = riegel_seconds(source['seconds'], source_m, metres)
+        races.append({
+            'distance': key,
+            'label': label,
+            'seconds': round(seconds),
+            'time': format_seconds(seconds),
+            'pace_per_km': round(seconds / 60 / (metres / 1000), 2),
+            'riegel_seconds': round(riegel),
+            'riegel_time': format_seconds(riegel)
+        })
+    return {
+        'vdot': round(best_vdot, 1),
+        'source': {
+            'distance': source['distance'],
+            'label': source['label'],
+            'time': source['time'],
+            'achieved_date': source['achieved_date']
+        },
+        'races': races,
+        'training_paces': training_paces(best_vdot)
+    }
+
+
+def race_predictions(user_id):
+    """Cached predictions for a user, or None without a usable PR."""
+    pr_count, last_pr = db.session.query(
+        func.count(RunningPR.pr_id), func.max(RunningPR.pr_id)
+    ).filter(RunningPR.user_id == user_id).one()
+    return cache.get_or_set(
+        f'predictions:{user_id}:{pr_count}:{last_pr}',
+        lambda: compute_predictions(current_prs(user_id))
+    )
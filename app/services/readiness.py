@@ -0,0 +1,194 @@
+"""Daily readiness from recovery logs, personal baselines and training load.
+
+Each day with a recovery log gets a 0-10 recovery score: the mean of the
+logged sleep, energy, motivation and inverted soreness, ignoring fields
+left blank. The score is compared with the user's own baseline (mean and
+SD of the scores of the previous ``BASELINE_DAYS`` days) and the day's
+acute:chronic workload ratio from the training-load series:
+
+    readiness = 10 * score + Z_POINTS * clip(z, -Z_CLIP, Z_CLIP)
+                - min(ACWR_POINTS * max(acwr - ACWR_HIGH, 0), MAX_LOAD_PENALTY)
+
+clipped to 0-100. Rows are stored in ``readiness_days``. A change on day
+D only affects the rows from D on (the baseline looks back, load moves
+forward), so the commit hook in app/models/events.py rewrites just those,
+after the training-load series has been brought up to date.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from app import db
+from app.models import RecoveryLog, ReadinessDay
+from app.services.training_load import load_series
+
+BASELINE_DAYS = 28
+MIN_BASELINE_LOGS = 4
+Z_POINTS = 5.0
+Z_CLIP = 2.0
+ACWR_HIGH = 1.3
+ACWR_POINTS = 50.0
+MAX_LOAD_PENALTY = 20.0
+
+# (minimum readiness, level), highest first
+THRESHOLDS = ((80, 'excellent'), (60, 'good'), (40, 'moderate'), (0, 'low'))
+LEVELS = {
+    'excellent': {'label': 'Ready to Push', 'color': 'success', 'advice': 'Great day for intense training!'},
+    'good': {'label': 'Good to Go', 'color': 'primary', 'advice': 'Normal training recommended.'},
+    'moderate': {'label': 'Take it Easy', 'color': 'warning', 'advice': 'Consider lighter intensity today.'},
+    'low': {'label': 'Rest Day', 'color': 'danger', 'advice': 'Recovery day recommended.'},
+}
+
+
+def level_for(readiness):
+    """Level key for a 0-100 readiness value."""
+    return next(level for minimum, level in THRESHOLDS if readiness >= minimum)
+
+
+def recovery_scores(sleep, energy, soreness, motivation):
+    """0-10 scores from per-day metric arrays (NaN = not logged); NaN if none logged."""
+    metrics = np.column_stack([
+        np.asarray(sleep, dtype=float),
+        np.asarray(energy, dtype=float),
+        10 - np.asarray(soreness, dtype=float),
+        np.asarray(motivation, dtype=float)
+    ])
+    logged = ~np.isnan(metrics)
+    counts = logged.sum(axis=1)
+    totals = np.where(logged, metrics, 0).sum(axis=1)
+    return np.divide(totals, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+
+
+def moment_stats(count, total, squares, min_count=1):
+    """Mean and sample SD arrays from windowed count/sum/sum of squares.
+
+    Entries with fewer than ``min_count`` values get NaN for both, and the
+    SD also needs at least two values.
+    """
+    count, total, squares = (np.asarray(a, dtype=float) for a in (count, total, squares))
+    enough = count >= max(min_count, 1)
+    safe = np.where(enough, count, 1)
+    mean = np.where(enough, total / safe, np.nan)
+    var = np.where(enough & (count > 1), (squares - total * total / safe) / np.maximum(safe - 1, 1), np.nan)
+    return mean, np.sqrt(np.maximum(var, 0))
+
+
+def rolling_baseline(scores, window=BASELINE_DAYS, min_count=MIN_BASELINE_LOGS):
+    """Mean and sample SD of the ``window`` days before each day.
+
+    ``scores`` is one value per calendar day with NaN on days without a
+    log. Days with fewer than ``min_count`` logged days in the window get NaN.
+    """
+    scores = np.asarray(scores, dtype=float)
+    logged = ~np.isnan(scores)
+    values = np.where(logged, scores, 0.0)
+
+    def trailing(x):
+        total = np.concatenate([[0.0], np.cumsum(x)])
+        end = np.arange(len(x))
+        return total[end] - total[np.maximum(end - window, 0)]
+
+    return moment_stats(trailing(logged), trailing(values), trailing(values ** 2), min_count)
+
+
+def blend(scores, z, acwr):
+    """0-100 readiness arrays from scores, baseline z-scores and ACWR (NaN = unknown)."""
+    readiness = 10 * np.asarray(scores, dtype=float)
+    readiness += Z_POINTS * np.clip(np.nan_to_num(z), -Z_CLIP, Z_CLIP)
+    overload = np.nan_to_num(np.asarray(acwr, dtype=float) - ACWR_HIGH).clip(min=0)
+    readiness -= np.minimum(ACWR_POINTS * overload, MAX_LOAD_PENALTY)
+    return readiness.clip(0, 100)
+
+
+def _daily_metrics(user_id, start_date):
+    """Per-day averages of the user's logged metrics from ``start_date`` on."""
+    return db.session.query(
+        RecoveryLog.log_date,
+        db.func.avg(RecoveryLog.sleep_quality).label('sleep'),
+        db.func.avg(RecoveryLog.energy_level).label('energy'),
+        db.func.avg(RecoveryLog.muscle_soreness).label('soreness'),
+        db.func.avg(RecoveryLog.motivation_score).label('motivation')
+    ).filter(
+        RecoveryLog.user_id == user_id,
+        RecoveryLog.log_date >= start_date
+    ).group_by(RecoveryLog.log_date).order_by(RecoveryLog.log_date).all()
+
+
+def update_readiness(user_id, from_date):
+    """Rewrite the user's readiness rows from ``from_date`` forward.
+
+    Returns the number of rows written. The caller commits.
+    """
+    ReadinessDay.query.filter(
+        ReadinessDay.user_id == user_id,
+        ReadinessDay.day >= from_date
+    ).delete(synchronize_session=False)
+
+    start = from_date - timedelta(days=BASELINE_DAYS)
+    rows = _daily_metrics(user_id, start)
+    if not rows or rows[-1].log_date < from_date:
+        return 0
+    end = rows[-1].log_date
+
+    # One slot per calendar day so the rolling window counts days, not logs
+    days = (end - start).days + 1
+    metrics = np.full((4, days), np.nan)
+    index = np.array([(row.log_date - start).days for row in rows])
+    for channel, name in enumerate(('sleep', 'energy', 'soreness', 'motivation')):
+        metrics[channel, index] = [np.nan if getattr(row, name) is None else float(getattr(row, name))
+                                   for row in rows]
+    scores = recovery_scores(*metrics)
+    mean, sd = rolling_baseline(scores)
+    z = np.divide(scores - mean, sd, out=np.full(days, np.nan), where=sd > 0)
+
+    first = (from_date - start).days
+    load = load_series(user_id, days - first, end)
+    acwr = np.full(days, np.nan)
+    tsb = np.full(days, np.nan)
+    for offset, values in enumerate(load, start=first):
+        acwr[offset] = np.nan if values['acwr'] is None else values['acwr']
+        tsb[offset] = values['tsb']
+    readiness = blend(scores, z, acwr)
+    # A near-constant baseline has a tiny SD; store z as blend() uses it so it
+    # always fits recovery_z NUMERIC(4,2)
+    stored_z = np.clip(z, -Z_CLIP, Z_CLIP)
+
+    def number(value, digits=2):
+        return None if np.isnan(value) else round(float(value), digits)
+
+    inserts = [{
+        'user_id': user_id,
+        'day': start + timedelta(days=int(i)),
+        'recovery_score': number(scores[i], 1),
+        'baseline_mean': number(mean[i]),
+        'baseline_sd': number(sd[i]),
+        'recovery_z': number(stored_z[i]),
+        'acwr': number(acwr[i]),
+        'tsb': number(tsb[i]),
+        'readiness': round(float(readiness[i]), 1),
+        'level': level_for(readiness[i])
+    } for i in range(first, days) if not np.isnan(scores[i])]
+    if inserts:
+        db.session.execute(db.insert(ReadinessDay), inserts)
+    return len(inserts)
+
+
+def rebuild_readiness(user_id):
+    """Recompute a user's whole series (backfill)."""
+    first = db.session.query(db.func.min(RecoveryLog.log_date)).filter(
+        RecoveryLog.user_id == user_id
+    ).scalar()
+    if first is None:
+        ReadinessDay.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        return 0
+    return update_readiness(user_id, first)
+
+
+def readiness_series(user_id, days=90, end_date=None):
+    """Stored readiness rows of the ``days`` days up to ``end_date``, oldest first."""
+    end_date = end_date or date.today()
+    rows = ReadinessDay.query.filter(
+        ReadinessDay.user_id == user_id,
+        ReadinessDay.day.between(end_date - timedelta(days=days - 1), end_date)
+    ).order_by(ReadinessDay.day).all()
+    return [row.to_dict() for row in rows]
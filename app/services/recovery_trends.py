@@ -0,0 +1,140 @@
+"""Rolling recovery baselines: 7- and 28-day means, SDs and z-scores.
+
+Logs are averaged per day, then for every logged day and metric the count,
+sum and sum of squares over the ``WINDOWS`` calendar days before it are
+taken with SQL window functions (``RANGE`` frames over a day number, so
+gaps in logging shorten the window instead of stretching it). The day
+itself is left out, as in the readiness baseline, so its z-score compares
+it with the days before. Means, sample SDs and z-scores are finished with
+``readiness.moment_stats``; SQLite has no STDDEV, and the moments give the
+same result on both databases.
+
+The whole series is computed once per user and cached under the user's
+tag; ``trends`` slices any date range out of it and, for long ranges,
+averages it into at most ``MAX_POINTS`` buckets of whole days.
+"""
+import math
+from datetime import date, timedelta
+
+import numpy as np
+
+from app import db
+from app.cache import cache, user_tag
+from app.models import RecoveryLog
+from app.services.readiness import moment_stats
+
+METRICS = {
+    'sleep': RecoveryLog.sleep_quality,
+    'energy': RecoveryLog.energy_level,
+    'soreness': RecoveryLog.muscle_soreness,
+    'motivation': RecoveryLog.motivation_score,
+}
+WINDOWS = (7, 28)
+DEFAULT_DAYS = 90
+MAX_POINTS = 365
+
+
+def _day_number(column):
+    """Integer-valued day ordinal usable as a RANGE frame key."""
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.extract('epoch', column) / 86400, db.Integer)
+    return db.func.julianday(column)
+
+
+def _user_series(user_id):
+    daily = db.select(
+        RecoveryLog.log_date.label('day'),
+        *(db.func.avg(column).label(name) for name, column in METRICS.items())
+    ).where(RecoveryLog.user_id == user_id).group_by(RecoveryLog.log_date).subquery()
+
+    key = _day_number(daily.c.day)
+    columns = [daily.c.day, *(daily.c[name] for name in METRICS)]
+    for window in WINDOWS:
+        frame = {'order_by': key, 'range_': (-window, -1)}  # the days before, not the day itself
+        for name in METRICS:
+            value = daily.c[name]
+            columns += [
+                db.func.count(value).over(**frame).label(f'{name}_n{window}'),
+                db.func.sum(value).over(**frame).label(f'{name}_s{window}'),
+                db.func.sum(value * value).over(**frame).label(f'{name}_q{window}'),
+            ]
+    rows = db.session.execute(db.select(*columns).order_by(daily.c.day)).all()
+
+    def column(label):
+        return np.array([np.nan if row._mapping[label] is None else float(row._mapping[label])
+                         for row in rows])
+
+    metrics = {}
+    for name in METRICS:
+        value = column(name)
+        metrics[name] = {'value': value.tolist()}
+        for window in WINDOWS:
+            mean, sd = moment_stats(*(column(f'{name}_{part}{window}') for part in 'nsq'))
+            z = np.divide(value - mean, sd, out=np.full(len(value), np.nan), where=sd > 0)
+            metrics[name].update({f'mean_{window}': mean.tolist(), f'sd_{window}': sd.tolist(),
+                                  f'z_{window}': z.tolist()})
+    return {'dates': [row.day.isoformat() for row in rows], 'metrics': metrics}
+
+
+def user_series(user_id):
+    """The user's full rolling series, cached until their recovery logs change."""
+    return cache.get_or_set(f'recovery-trends:{user_id}', lambda: _user_series(user_id),
+                            tags=[user_tag(user_id)])
+
+
+def downsample(offsets, values, bucket_days):
+    """Mean of ``values`` per ``bucket_days``-day bucket of ``offsets`` (days from the start).
+
+    Returns (bucket indexes, {name: means}); NaNs are ignored, all-NaN buckets give NaN.
+    """
+    buckets = np.asarray(offsets) // bucket_days
+    present, index = np.unique(buckets, return_inverse=True)
+    means = {}
+    for name, series in values.items():
+        series = np.asarray(series, dtype=float)
+        valid = ~np.isnan(series)
+        totals = np.bincount(index, weights=np.where(valid, series, 0), minlength=len(present))
+        counts = np.bincount(index, weights=valid, minlength=len(present))
+        means[name] = np.divide(totals, counts, out=np.full(len(present), np.nan), where=counts > 0)
+    return present, means
+
+
+def trends(user_id, start=None, end=None, max_points=MAX_POINTS):
+    """Rolling stats of ``start``..``end`` (default: the last ``DEFAULT_DAYS`` days).
+
+    Ranges longer than ``max_points`` days are averaged into buckets of
+    ``bucket_days`` days, dated by their first day.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=min(DEFAULT_DAYS, (end - date.min).days + 1) - 1)
+    if start > end:
+        raise ValueError('Start must be on or before end')
+
+    series = user_series(user_id)
+    days = np.array(series['dates'], dtype='datetime64[D]')
+    keep = (days >= np.datetime64(start)) & (days <= np.datetime64(end))
+    offsets = (days[keep] - np.datetime64(start)).astype(int)
+    bucket_days = max(1, math.ceil(((end - start).days + 1) / max_points))
+
+    stats = {f'{name}.{field}': np.asarray(values, dtype=float)[keep]
+             for name, fields in series['metrics'].items() for field, values in fields.items()}
+    if bucket_days > 1:
+        buckets, stats = downsample(offsets, stats, bucket_days)
+        dates = [(start + timedelta(days=int(b) * bucket_days)).isoformat() for b in buckets]
+    else:
+        dates = [str(day) for day in days[keep]]
+
+    def rounded(values):
+        return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+    metrics = {}
+    for label, values in stats.items():
+        name, field = label.split('.')
+        metrics.setdefault(name, {})[field] = rounded(values)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'bucket_days': bucket_days,
+        'dates': dates,
+        'metrics': metrics
+    }
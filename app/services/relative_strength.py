@@ -0,0 +1,99 @@
+"""Bodyweight-relative strength: e1RM per kg of bodyweight and DOTS.
+
+Every strength session is matched to the bodyweight in effect on its date,
+i.e. the most recent ``BodyMeasurement`` with a weight on or before it.
+Rather than a measurement lookup per log, the user's weigh-ins and logs
+are read with one query each and joined as-of with ``np.searchsorted``.
+Sessions before the first weigh-in have no bodyweight and are left out.
+
+DOTS uses the 2019 coefficients and needs ``User.sex``; without it only
+the per-kg ratio is reported.
+"""
+import numpy as np
+
+from app import db
+from app.cache import cache, user_tag
+from app.models import WorkoutSession, StrengthLog, BodyMeasurement
+
+# a..e of the DOTS denominator polynomial (bw^4 .. bw^0) and the bodyweight clamp
+DOTS_COEFFICIENTS = {
+    'M': ((-0.0000010930, 0.0007391293, -0.1918759221, 24.0900756, -307.75076), (40.0, 210.0)),
+    'F': ((-0.0000010706, 0.0005158568, -0.1126655495, 13.6175032, -57.96288), (40.0, 150.0)),
+}
+
+
+def dots(lifted, bodyweight, sex):
+    """DOTS points for ``lifted`` kg at ``bodyweight`` kg (arrays); NaN without a sex."""
+    lifted = np.asarray(lifted, dtype=float)
+    if sex not in DOTS_COEFFICIENTS:
+        return np.full(lifted.shape, np.nan)
+    coefficients, (low, high) = DOTS_COEFFICIENTS[sex]
+    bodyweight = np.clip(np.asarray(bodyweight, dtype=float), low, high)
+    return lifted * 500 / np.polyval(coefficients, bodyweight)
+
+
+def bodyweight_as_of(weigh_in_dates, weigh_in_weights, dates):
+    """Bodyweight in effect on each of ``dates`` (NaN before the first weigh-in).
+
+    ``weigh_in_dates`` must be sorted ascending; dates are anything numpy
+    can order (datetime64 or ordinals).
+    """
+    weights = np.asarray(weigh_in_weights, dtype=float)
+    if not len(weights):
+        return np.full(len(dates), np.nan)
+    index = np.searchsorted(np.asarray(weigh_in_dates), np.asarray(dates), side='right') - 1
+    return np.where(index >= 0, weights[np.maximum(index, 0)], np.nan)
+
+
+def _weigh_ins(user_id):
+    rows = db.session.query(BodyMeasurement.measurement_date, BodyMeasurement.weight_kg).filter(
+        BodyMeasurement.user_id == user_id,
+        BodyMeasurement.weight_kg.isnot(None)
+    ).order_by(BodyMeasurement.measurement_date, BodyMeasurement.measurement_id).all()
+    return ([np.datetime64(row.measurement_date) for row in rows],
+            [float(row.weight_kg) for row in rows])
+
+
+def relative_strength_history(user_id, exercise_id, sex=None):
+    """Per session date: best e1RM, bodyweight, e1RM per kg and DOTS, oldest first.
+
+    Cached until the user's logs or measurements change.
+    """
+    return cache.get_or_set(
+        f'relative-strength:{user_id}:{exercise_id}:{sex or "-"}',
+        lambda: _relative_strength_history(user_id, exercise_id, sex),
+        tags=[user_tag(user_id)]
+    )
+
+
+def _relative_strength_history(user_id, exercise_id, sex):
+    sessions = db.session.query(
+        WorkoutSession.session_date,
+        db.func.max(StrengthLog.e1rm).label('e1rm')
+    ).join(StrengthLog).filter(
+        WorkoutSession.user_id == user_id,
+        StrengthLog.exercise_id == exercise_id,
+        StrengthLog.e1rm > 0
+    ).group_by(WorkoutSession.session_date).order_by(WorkoutSession.session_date).all()
+    if not sessions:
+        return []
+
+    dates = np.array([np.datetime64(row.session_date) for row in sessions])
+    e1rm = np.array([float(row.e1rm) for row in sessions])
+    bodyweight = bodyweight_as_of(*_weigh_ins(user_id), dates)
+    ratio = e1rm / bodyweight
+    points = dots(e1rm, bodyweight, sex)
+
+    return [{
+        'date': str(row.session_date),
+        'estimated_1rm': round(float(e1rm[i]), 1),
+        'bodyweight': round(float(bodyweight[i]), 1),
+        'relative': round(float(ratio[i]), 2),
+        'dots': None if np.isnan(points[i]) else round(float(points[i]), 1)
+    } for i, row in enumerate(sessions) if not np.isnan(bodyweight[i])]
+
+
+def relative_pr(user_id, exercise_id, sex=None):
+    """Best e1RM per kg of bodyweight for an exercise (from the cached history), or None."""
+    history = relative_strength_history(user_id, exercise_id, sex)
+    return max(history, key=lambda row: row['relative']) if history else None
@@ -0,0 +1,231 @@
+"""Route matching for imported runs.
+
+Each GPS track is resampled to a compact polyline (evenly spaced along the
+course, at most ``MAX_POINTS`` points) and filed under the grid cell of
+its start point. A new track is compared only against the user's routes
+starting in the same or a neighbouring cell with a similar length, using
+the discrete Fréchet distance with early termination once it exceeds
+``MATCH_THRESHOLD_M``. The closest match (or a new route) is stored on the
+run's ``RunTrack`` row, so listing the efforts on a route never compares
+tracks.
+"""
+import math
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.cache import cache, user_tag
+from app.models import WorkoutSession, RunningLog, RunRoute, RunTrack
+
+GRID_DEG = 0.005  # ~550 m of latitude per cell
+MAX_POINTS = 100
+MIN_SPACING_M = 20.0
+MATCH_THRESHOLD_M = 75.0
+DISTANCE_TOLERANCE = 0.10
+
+METRES_PER_DEG = 111_320.0
+
+
+def grid_cell(lat, lon):
+    return f'{math.floor(lat / GRID_DEG)}:{math.floor(lon / GRID_DEG)}'
+
+
+def neighbour_cells(cell):
+    """The cell and its eight neighbours."""
+    row, col = (int(part) for part in cell.split(':'))
+    return [f'{row + dr}:{col + dc}' for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+
+def project(lats, lons, ref_lat):
+    """Equirectangular projection to metres, good enough at route scale."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    x = lons * METRES_PER_DEG * math.cos(math.radians(ref_lat))
+    y = lats * METRES_PER_DEG
+    return np.column_stack((x, y))
+
+
+def downsample(lats, lons):
+    """(lats, lons, length in metres) resampled evenly along the track.
+
+    Samples without a position are skipped. Returns None for tracks with
+    fewer than two positions.
+    """
+    points = [(lat, lon) for lat, lon in zip(lats, lons) if lat is not None and lon is not None]
+    if len(points) < 2:
+        return None
+    lat_arr = np.array([p[0] for p in points])
+    lon_arr = np.array([p[1] for p in points])
+    xy = project(lat_arr, lon_arr, lat_arr[0])
+    cumulative = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))))
+    length = float(cumulative[-1])
+    if length <= 0:
+        return None
+
+    count = int(min(MAX_POINTS, max(2, length // MIN_SPACING_M + 1)))
+    stations = np.linspace(0.0, length, count)
+    return (np.interp(stations, cumulative, lat_arr).round(5).tolist(),
+            np.interp(stations, cumulative, lon_arr).round(5).tolist(),
+            length)
+
+
+def frechet_distance(a, b, bound=None):
+    """Discrete Fréchet distance between two (n, 2) point arrays.
+
+    With ``bound``, returns None as soon as every coupling of some prefix
+    already exceeds it, which rejects most non-matching candidates after
+    a few rows.
+    """
+    dist = np.hypot(a[:, None, 0] - b[None, :, 0], a[:, None, 1] - b[None, :, 1])
+    n, m = dist.shape
+    previous = np.maximum.accumulate(dist[0])
+    if bound is not None and previous.min() > bound:
+        return None
+    for i in range(1, n):
+        row = np.empty(m)
+        row[0] = max(previous[0], dist[i, 0])
+        for j in range(1, m):
+            row[j] = max(min(previous[j], previous[j - 1], row[j - 1]), dist[i, j])
+        if bound is not None and row.min() > bound:
+            return None
+        previous = row
+    result = float(previous[-1])
+    return result if bound is None or result <= bound else None
+
+
+def _candidates(user_id, cell, length):
+    return RunRoute.query.filter(
+        RunRoute.user_id == user_id,
+        RunRoute.start_cell.in_(neighbour_cells(cell)),
+        RunRoute.distance_m.between(length * (1 - DISTANCE_TOLERANCE),
+                                    length * (1 + DISTANCE_TOLERANCE))
+    ).all()
+
+
+def match_run_route(run_log, user_id):
+    """Match a run's recorded track to one of the user's routes.
+
+    Creates a new route when nothing is close enough. Returns the route,
+    or None if the run has no GPS track. The caller commits.
+    """
+    samples = run_log.samples
+    if samples is None or samples.lat_data is None or samples.lon_data is None:
+        run_log.track = None
+        return None
+    resampled = downsample(samples.series('lat'), samples.series('lon'))
+    if resampled is None:
+        run_log.track = None
+        return None
+    lats, lons, length = resampled
+    cell = grid_cell(lats[0], lons[0])
+    track_xy = project(lats, lons, lats[0])
+
+    best, best_distance = None, None
+    for route in _candidates(user_id, cell, length):
+        route_lats, route_lons = route.points()
+        distance = frechet_distance(track_xy, project(route_lats, route_lons, lats[0]),
+                                    bound=MATCH_THRESHOLD_M)
+        if distance is not None and (best_distance is None or distance < best_distance):
+            best, best_distance = route, distance
+
+    if best is None:
+        best = RunRoute(user_id=user_id, start_cell=cell, distance_m=round(length, 1))
+        best.set_points(lats, lons)
+        db.session.add(best)
+        best_distance = 0.0
+
+    track = run_log.track or RunTrack(user_id=user_id)
+    track.start_cell = cell
+    track.distance_m = round(length, 1)
+    track.match_distance_m = round(best_distance, 1)
+    track.route = best
+    track.set_points(lats, lons)
+    run_log.track = track
+    return best
+
+
+def match_all_routes():
+    """Rebuild every route from scratch, matching runs in date order."""
+    RunTrack.query.delete()
+    RunRoute.query.delete()
+    runs = RunningLog.query.options(
+        joinedload(RunningLog.samples), joinedload(RunningLog.session)
+    ).join(WorkoutSession).filter(
+        RunningLog.samples.has()
+    ).order_by(WorkoutSession.session_date, RunningLog.log_id).all()
+    matched = 0
+    for run_log in runs:
+        if match_run_route(run_log, run_log.session.user_id) is not None:
+            matched += 1
+            db.session.flush()  # later runs must see the routes created so far
+    return matched
+
+
+def route_efforts(user_id, route_id):
+    """All efforts on a route, oldest first, with the fastest flagged."""
+    return cache.get_or_set(
+        f'routes:efforts:{user_id}:{route_id}',
+        lambda: _route_efforts(user_id, route_id),
+        tags=[user_tag(user_id)]
+    )
+
+
+def _route_efforts(user_id, route_id):
+    rows = db.session.query(
+        RunningLog.log_id,
+        RunningLog.session_id,
+        RunningLog.distance_km,
+        RunningLog.duration_minutes,
+        RunningLog.avg_pace_per_km,
+        RunningLog.avg_heart_rate,
+        WorkoutSession.session_date
+    ).join(RunTrack, RunTrack.log_id == RunningLog.log_id).join(
+        WorkoutSession, WorkoutSession.session_id == RunningLog.session_id
+    ).filter(
+        RunTrack.route_id == route_id,
+        RunTrack.user_id == user_id
+    ).order_by(WorkoutSession.session_date, RunningLog.log_id).all()
+
+    efforts = [{
+        'log_id': row.log_id,
+        'session_id': row.session_id,
+        'date': str(row.session_date),
+        'distance_km': float(row.distance_km) if row.distance_km else None,
+        'duration_minutes': row.duration_minutes,
+        'pace': float(row.avg_pace_per_km) if row.avg_pace_per_km else None,
+        'avg_hr': row.avg_heart_rate,
+        'is_best': False
+    } for row in rows]
+    paced = [effort for effort in efforts if effort['pace']]
+    if paced:
+        min(paced, key=lambda effort: effort['pace'])['is_best'] = True
+    return efforts
+
+
+def user_routes(user_id):
+    """The user's routes with effort counts and best pace, busiest first."""
+    rows = db.session.query(
+        RunRoute.route_id,
+        RunRoute.name,
+        RunRoute.distance_m,
+        func.count(RunTrack.log_id).label('efforts'),
+        func.min(RunningLog.avg_pace_per_km).label('best_pace'),
+        func.max(WorkoutSession.session_date).label('last_run')
+    ).join(RunTrack, RunTrack.route_id == RunRoute.route_id).join(
+        RunningLog, RunningLog.log_id == RunTrack.log_id
+    ).join(
+        WorkoutSession, WorkoutSession.session_id == RunningLog.session_id
+    ).filter(RunRoute.user_id == user_id).group_by(
+        RunRoute.route_id, RunRoute.name, RunRoute.distance_m
+    ).order_by(func.count(RunTrack.log_id).desc(), RunRoute.route_id).all()
+
+    return [{
+        'route_id': row.route_id,
+        'name': row.name or f'{float(row.distance_m) / 1000:.1f} km route',
+        'distance_km': round(float(row.distance_m) / 1000, 2),
+        'efforts': row.efforts,
+        'best_pace': float(row.best_pace) if row.best_pace else None,
+        'last_run': str(row.last_run)
+    } for row in rows]
@@ -0,0 +1,389 @@
+"""GPX, TCX and FIT import for running sessions.
+
+Files are read in a single streaming pass: XML formats go through
+``iterparse`` and every track point is dropped from the tree as soon as it
+has been read, FIT records are decoded straight from the byte stream. The
+result is a ``Track`` of parallel per-sample lists that ``import_track``
+stores as compressed ``RunSamples`` blobs and summarizes onto the
+``RunningLog``.
+"""
+import math
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+from xml.etree.ElementTree import iterparse, ParseError
+
+from app.models.run_samples import RunSamples, CHANNELS
+from app.services.hr_zones import update_run_zones
+from app.services.routes import match_run_route
+
+EARTH_RADIUS_M = 6371000.0
+ELEVATION_THRESHOLD_M = 2.0  # ignore GPS/baro noise below this when summing climb
+
+FIT_EPOCH = datetime(1989, 12, 31)
+SEMICIRCLE_DEG = 180.0 / 2 ** 31
+
+
+class TrackParseError(ValueError):
+    """The uploaded file is not a track this importer can read."""
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Track:
+    """Per-sample series of a recorded run.
+
+    Points are appended as they are parsed; ``finish`` turns timestamps into
+    seconds from the start, forward-fills gaps and derives distance from
+    the GPS positions when the file does not record it.
+    """
+
+    def __init__(self, source_format):
+        self.source_format = source_format
+        self.start_time = None
+        self._points = []
+
+    def add_point(self, timestamp, lat=None, lon=None, elevation=None,
+                  heart_rate=None, distance=None):
+        if timestamp is None:
+            return
+        self._points.append((timestamp, lat, lon, elevation, heart_rate, distance))
+
+    def finish(self):
+        points = sorted(self._points, key=lambda p: p[0])
+        self._points = []
+        if len(points) < 2:
+            raise TrackParseError('The file does not contain a recorded track.')
+
+        self.start_time = points[0][0]
+        columns = list(zip(*points))
+        self.time = [(t - self.start_time).total_seconds() for t in columns[0]]
+        self.lat = self._fill(columns[1])
+        self.lon = self._fill(columns[2])
+        self.elevation = self._fill(columns[3])
+        self.heart_rate = self._fill(columns[4])
+        self.distance = self._fill(columns[5])
+
+        if self.distance is None and self.lat is not None and self.lon is not None:
+            self.distance = [0.0]
+            for i in range(1, len(self.time)):
+                self.distance.append(self.distance[-1] + haversine_m(
+                    self.lat[i - 1], self.lon[i - 1], self.lat[i], self.lon[i]
+                ))
+        return self
+
+    @staticmethod
+    def _fill(values):
+        """Forward/back-fill missing samples; None if the channel is empty."""
+        first = next((v for v in values if v is not None), None)
+        if first is None:
+            return None
+        filled, last = [], first
+        for value in values:
+            if value is not None:
+                last = value
+            filled.append(last)
+        return filled
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def duration_seconds(self):
+        return self.time[-1] if self.time else 0
+
+    @property
+    def distance_m(self):
+        return self.distance[-1] if self.distance else None
+
+    def elevation_gain(self):
+        """Total climb, with a hysteresis threshold to suppress noise."""
+        if not self.elevation:
+            return None
+        gain, reference = 0.0, self.elevation[0]
+        for value in self.elevation[1:]:
+            if value > reference + ELEVATION_THRESHOLD_M:
+                gain += value - reference
+                reference = value
+            elif value < reference:
+                reference = value
+        return gain
+
+    def summary(self):
+        """Summary fields for RunningLog, only those the file supports."""
+        summary = {'duration_minutes': int(round(self.duration_seconds / 60))}
+        if self.distance_m:
+            distance_km = self.distance_m / 1000
+            summary['distance_km'] = round(distance_km, 2)
+            summary['avg_pace_per_km'] = round(self.duration_seconds / 60 / distance_km, 2)
+        gain = self.elevation_gain()
+        if gain is not None:
+            summary['elevation_gain_meters'] = int(round(gain))
+        if self.heart_rate:
+            summary['avg_heart_rate'] = self.time_weighted_mean(self.heart_rate)
+            summary['max_heart_rate'] = int(max(self.heart_rate))
+        return summary
+
+    def time_weighted_mean(self, values):
+        """Mean over elapsed time, so irregular sampling does not bias it."""
+        total = weighted = 0.0
+        for i in range(1, len(self.time)):
+            dt = self.time[i] - self.time[i - 1]
+            weighted += values[i] * dt
+            total += dt
+        return int(round(weighted / total)) if total else int(round(values[0]))
+
+    def series(self):
+        return {channel: getattr(self, channel) for channel in CHANNELS}
+
+
+# -- XML formats ----------------------------------------------------------------
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _iter_points(fileobj, point_tag):
+    """Yield (attributes, {leaf tag: text}) for each point element.
+
+    Each point is removed from its parent once read, so memory stays flat
+    no matter how long the recording is.
+    """
+    stack = []
+    try:
+        for event, elem in iterparse(fileobj, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                continue
+            stack.pop()
+            if _local(elem.tag) != point_tag:
+                continue
+            values = {}
+            for child in elem.iter():
+                if child is not elem and child.text and child.text.strip():
+                    values[_local(child.tag)] = child.text.strip()
+            yield elem.attrib, values
+            if stack:
+                stack[-1].remove(elem)
+            elem.clear()
+    except ParseError as exc:
+        raise TrackParseError(f'Invalid XML: {exc}') from exc
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _float(value):
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_gpx(fileobj):
+    """Parse a GPX 1.0/1.1 track (heart rate from Garmin TrackPointExtension)."""
+    track = Track('gpx')
+    for attrs, values in _iter_points(fileobj, 'trkpt'):
+        track.add_point(
+            _parse_time(values.get('time')),
+            lat=_float(attrs.get('lat')),
+            lon=_float(attrs.get('lon')),
+            elevation=_float(values.get('ele')),
+            heart_rate=_float(values.get('hr'))
+        )
+    return track.finish()
+
+
+def parse_tcx(fileobj):
+    """Parse a Garmin Training Center (TCX) activity."""
+    track = Track('tcx')
+    for _attrs, values in _iter_points(fileobj, 'Trackpoint'):
+        track.add_point(
+            _parse_time(values.get('Time')),
+            lat=_float(values.get('LatitudeDegrees')),
+            lon=_float(values.get('LongitudeDegrees')),
+            elevation=_float(values.get('AltitudeMeters')),
+            heart_rate=_float(values.get('Value')),  # HeartRateBpm/Value
+            distance=_float(values.get('DistanceMeters'))
+        )
+    return track.finish()
+
+
+# -- FIT ---------------------------------------------------------------------------
+
+FIT_RECORD_MESSAGE = 20
+
+# record message field number -> (name, decode)
+FIT_RECORD_FIELDS = {
+    253: ('timestamp', lambda v: FIT_EPOCH + timedelta(seconds=v)),
+    0: ('lat', lambda v: v * SEMICIRCLE_DEG),
+    1: ('lon', lambda v: v * SEMICIRCLE_DEG),
+    2: ('elevation', lambda v: v / 5 - 500),
+    3: ('heart_rate', float),
+    5: ('distance', lambda v: v / 100),
+    78: ('elevation', lambda v: v / 5 - 500),  # enhanced_altitude
+}
+
+# base type number -> (struct code, invalid value)
+FIT_BASE_TYPES = {
+    0x00: ('B', 0xFF), 0x01: ('b', 0x7F), 0x02: ('B', 0xFF),
+    0x83: ('h', 0x7FFF), 0x84: ('H', 0xFFFF),
+    0x85: ('i', 0x7FFFFFFF), 0x86: ('I', 0xFFFFFFFF),
+    0x0A: ('B', 0x00), 0x8B: ('H', 0x0000), 0x8C: ('I', 0x00000000),
+}
+
+
+def parse_fit(fileobj):
+    """Decode record messages from a FIT activity file.
+
+    Supports normal and compressed-timestamp headers and skips developer
+    fields; only the record fields in ``FIT_RECORD_FIELDS`` are decoded.
+    """
+    header = fileobj.read(12)
+    if len(header) < 12 or header[8:12] != b'.FIT':
+        raise TrackParseError('Not a FIT file.')
+    header_size = header[0]
+    data_size = struct.unpack('<I', header[4:8])[0]
+    if header_size > 12:
+        fileobj.read(header_size - 12)
+    data = fileobj.read(data_size)
+    if len(data) < data_size:
+        raise TrackParseError('Truncated FIT file.')
+
+    track = Track('fit')
+    definitions = {}
+    last_timestamp = None
+    pos = 0
+    try:
+        while pos < data_size:
+            record_header = data[pos]
+            pos += 1
+
+            if record_header & 0x80:
+                # Compressed timestamp header: 5-bit offset from last timestamp
+                local_type = (record_header >> 5) & 0x03
+                offset = record_header & 0x1F
+                timestamp = None
+                if last_timestamp is not None:
+                    timestamp = (last_timestamp & ~0x1F) + offset
+                    if offset < (last_timestamp & 0x1F):
+                        timestamp += 0x20
+                    last_timestamp = timestamp
+                definition = definitions[local_type]
+                values, pos = _read_fit_fields(data, pos, definition)
+                if timestamp is not None:
+                    values.setdefault(253, timestamp)
+            elif record_header & 0x40:
+                local_type = record_header & 0x0F
+                has_dev_fields = bool(record_header & 0x20)
+                endian = '>' if data[pos + 1] == 1 else '<'
+                global_num = struct.unpack(endian + 'H', data[pos + 2:pos + 4])[0]
+                num_fields = data[pos + 4]
+                pos += 5
+                fields = [tuple(data[pos + i * 3:pos + i * 3 + 3]) for i in range(num_fields)]
+                pos += num_fields * 3
+                dev_size = 0
+                if has_dev_fields:
+                    num_dev = data[pos]
+                    pos += 1
+                    dev_size = sum(data[pos + i * 3 + 1] for i in range(num_dev))
+                    pos += num_dev * 3
+                definitions[local_type] = (global_num, endian, fields, dev_size)
+                continue
+            else:
+                definition = definitions[record_header & 0x0F]
+                values, pos = _read_fit_fields(data, pos, definition)
+
+            if 253 in values:
+                last_timestamp = values[253]
+            if definition[0] != FIT_RECORD_MESSAGE:
+                continue
+            point = {}
+            for number, raw in values.items():
+                if number in FIT_RECORD_FIELDS:
+                    name, decode = FIT_RECORD_FIELDS[number]
+                    point[name] = decode(raw)
+            track.add_point(
+                point.pop('timestamp', None),
+                **point
+            )
+    except (KeyError, IndexError, struct.error) as exc:
+        raise TrackParseError('Corrupt FIT file.') from exc
+    return track.finish()
+
+
+def _read_fit_fields(data, pos, definition):
+    """Read one data message; returns ({field number: raw int}, new pos)."""
+    _global_num, endian, fields, dev_size = definition
+    values = {}
+    for number, size, base_type in fields:
+        fmt = FIT_BASE_TYPES.get(base_type)
+        if fmt is not None and struct.calcsize(fmt[0]) == size:
+            raw = struct.unpack_from(endian + fmt[0], data, pos)[0]
+            if raw != fmt[1]:
+                values[number] = raw
+        pos += size
+    return values, pos + dev_size
+
+
+# -- import pipeline ---------------------------------------------------------------
+
+PARSERS = {
+    'gpx': parse_gpx,
+    'tcx': parse_tcx,
+    'fit': parse_fit,
+}
+
+
+def parse_track(filename, fileobj):
+    """Parse an uploaded file, choosing the format from its extension."""
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    parser = PARSERS.get(extension)
+    if parser is None:
+        raise TrackParseError('Unsupported file type. Upload a .gpx, .tcx or .fit file.')
+    return parser(fileobj)
+
+
+def import_track(run_log, filename, fileobj):
+    """Parse a track file and attach it to ``run_log``.
+
+    Stores the samples, replaces the log's summary numbers with the
+    recorded ones and computes time in zone from the heart-rate stream.
+    Interval rows and best efforts are re-derived from the new samples by
+    the commit hook in app/models/events.py. Returns the parsed ``Track``;
+    the caller commits.
+    """
+    track = parse_track(filename, fileobj)
+
+    if run_log.samples is None:
+        run_log.samples = RunSamples.from_series(
+            track.series(), source_format=track.source_format, start_time=track.start_time
+        )
+    else:
+        run_log.samples.source_format = track.source_format
+        run_log.samples.start_time = track.start_time
+        run_log.samples.set_series(track.series())
+
+    for field, value in track.summary().items():
+        setattr(run_log, field, value)
+    if run_log.session is not None:
+        run_log.session.duration_minutes = run_log.duration_minutes
+        update_run_zones(run_log, run_log.session.user_id)
+        match_run_route(run_log, run_log.session.user_id)
+    return track
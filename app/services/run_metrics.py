@@ -0,0 +1,103 @@
+"""Per-run metrics stored at write time: pace, TRIMP and intensity factor.
+
+Metrics use the owner's physiology profile (``users.max_heart_rate``,
+``resting_heart_rate`` and ``threshold_pace_per_km``) and are written to
+``running_logs`` by the flush hook in app/models/events.py whenever a
+run's inputs change, so views and endpoints only read columns. When the
+profile changes, ``recompute_user_metrics`` reprocesses the user's history
+(metrics and heart-rate zones) in one pass.
+"""
+import math
+
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import User, WorkoutSession, RunningLog
+from app.services.hr_zones import heart_rate_limits, apply_zone_seconds, DEFAULT_MAX_HR
+
+DEFAULT_RESTING_HR = 60
+
+# Run columns the stored metrics are derived from
+METRIC_INPUTS = ('distance_km', 'duration_minutes', 'avg_heart_rate', 'max_heart_rate')
+
+
+def parse_pace(value):
+    """'4:30' or '4.5' (min/km) -> 4.5; None if empty or invalid."""
+    if value is None or str(value).strip() == '':
+        return None
+    value = str(value).strip().replace(',', '.')
+    try:
+        if ':' in value:
+            minutes, seconds = value.split(':')
+            if not 0 <= int(seconds) < 60:
+                return None
+            return round(int(minutes) + int(seconds) / 60, 2)
+        return round(float(value), 2)
+    except ValueError:
+        return None
+
+
+def calculate_pace(distance_km, duration_minutes):
+    """Average pace in min/km."""
+    if not distance_km or not duration_minutes or float(distance_km) <= 0:
+        return None
+    return round(duration_minutes / float(distance_km), 2)
+
+
+def calculate_trimp(duration_minutes, avg_hr, max_hr, resting_hr=None):
+    """Banister TRIMP: duration x HR reserve ratio x 0.64 e^(1.92 ratio)."""
+    if not all([duration_minutes, avg_hr, max_hr]):
+        return None
+    resting_hr = resting_hr or DEFAULT_RESTING_HR
+    if max_hr <= resting_hr:
+        return 0
+
+    hr_ratio = (avg_hr - resting_hr) / (max_hr - resting_hr)
+    hr_ratio = max(0, min(1, hr_ratio))  # Clamp between 0 and 1
+    return round(duration_minutes * hr_ratio * 0.64 * math.exp(1.92 * hr_ratio), 2)
+
+
+def calculate_intensity_factor(pace, threshold_pace):
+    """Threshold pace / run pace (1.0 = a run at threshold)."""
+    if not pace or not threshold_pace:
+        return None
+    return round(float(threshold_pace) / float(pace), 2)
+
+
+def apply_run_metrics(run_log, user, keep_pace=False):
+    """Compute and store one run's pace, TRIMP and intensity factor.
+
+    ``user`` supplies the profile (may be None). With ``keep_pace`` the
+    stored pace is left alone, e.g. when an import set it from the exact
+    recorded time.
+    """
+    pace = calculate_pace(run_log.distance_km, run_log.duration_minutes)
+    if pace is not None and not keep_pace:
+        run_log.avg_pace_per_km = pace
+
+    max_hr = (user.max_heart_rate if user is not None else None) or run_log.max_heart_rate
+    resting_hr = user.resting_heart_rate if user is not None else None
+    run_log.trimp_score = calculate_trimp(run_log.duration_minutes, run_log.avg_heart_rate,
+                                          max_hr, resting_hr)
+    run_log.intensity_factor = calculate_intensity_factor(
+        run_log.avg_pace_per_km, user.threshold_pace_per_km if user is not None else None
+    )
+
+
+def recompute_user_metrics(user_id):
+    """Reprocess every run of a user after a profile change.
+
+    One query loads the runs (with samples, for zones); the changed rows
+    are written in a single flush and the commit hook refreshes the
+    training-load series from the earliest run.
+    """
+    user = db.session.get(User, user_id)
+    max_hr, resting_hr, _ = heart_rate_limits(user_id)
+    runs = RunningLog.query.options(
+        joinedload(RunningLog.samples), joinedload(RunningLog.session)
+    ).join(WorkoutSession).filter(WorkoutSession.user_id == user_id).all()
+    for run_log in runs:
+        # Pace does not depend on the profile
+        apply_run_metrics(run_log, user, keep_pace=True)
+        apply_zone_seconds(run_log, max_hr or DEFAULT_MAX_HR, resting_hr)
+    return len(runs)
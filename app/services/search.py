@@ -0,0 +1,305 @@
+"""Exercise search and autocomplete.
+
+Two backends share one ranking:
+
+* ``postgres`` - trigram matching through ``pg_trgm`` (GIN indexes on
+  ``search_normalize(name)`` and ``search_normalize(muscle_group)``, see
+  setup_database.sql).
+* ``memory`` - a per-process prefix index over the cached exercise catalog,
+  used on SQLite or when the extension is unavailable. It is rebuilt only
+  when the ``exercises`` cache tag changes.
+
+Autocomplete always uses the memory index: the catalog is small, so a
+sorted token list answers prefix and typo-tolerant lookups in well under a
+millisecond without a database round trip.
+
+Scores are boosted by how often the current user has logged each exercise,
+so the lifts someone actually does float to the top.
+"""
+import logging
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import func, text
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.cache import cache, user_tag, EXERCISES_TAG
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Per-token match scores; muscle group matches count for less than name matches
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+MUSCLE_WEIGHT = 0.5
+LEADING_BONUS = 1.0  # query matches the start of the name
+
+UNDEFINED_FUNCTION = '42883'  # SQLSTATE raised when pg_trgm is missing
+USAGE_WEIGHT = 1.0  # multiplier on log1p(times logged)
+
+# SQL twin of normalize() for the trigram indexes and queries. Copied into
+# setup_database.sql; only accents that NFKD strips to a plain letter map.
+SQL_NORMALIZE_FUNCTION = '''CREATE OR REPLACE FUNCTION search_normalize(value TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(
+        translate(lower(value), 'àáâãäåāçèéêëēìíîïīñòóôõöōùúûüūýÿ',
+                                'aaaaaaaceeeeeiiiiinoooooouuuuuyy'),
+        '[^a-z0-9]+', ' ', 'g'))
+$$ LANGUAGE sql IMMUTABLE;'''
+
+
+def normalize(value):
+    """Lowercase and strip accents/punctuation ("Pull-Up" -> "pull up")."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(_TOKEN_RE.findall(value.lower()))
+
+
+def tokenize(value):
+    return normalize(value).split()
+
+
+def prefix_distance(query, token, max_distance):
+    """Edit distance between ``query`` and the closest prefix of ``token``.
+
+    Optimal string alignment (adjacent transpositions cost 1). Returns
+    ``max_distance + 1`` as soon as no prefix can be within the bound.
+    """
+    if len(query) - len(token) > max_distance:
+        return max_distance + 1
+    previous = None
+    row = list(range(len(token) + 1))
+    for i, qc in enumerate(query, 1):
+        current = [i] + [0] * len(token)
+        for j, tc in enumerate(token, 1):
+            cost = 0 if qc == tc else 1
+            current[j] = min(current[j - 1] + 1, row[j] + 1, row[j - 1] + cost)
+            if (previous is not None and i > 1 and j > 1
+                    and qc == token[j - 2] and query[i - 2] == tc):
+                current[j] = min(current[j], previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous, row = row, current
+    return min(row)
+
+
+def _max_typos(token):
+    if len(token) < 3:
+        return 0
+    return 1 if len(token) <= 5 else 2
+
+
+class ExerciseIndex:
+    """In-memory prefix index over the exercise catalog.
+
+    ``entries`` is a sorted list of ``(token, doc_position, field_weight)``
+    so every token starting with a prefix is one contiguous slice found
+    with ``bisect``.
+    """
+
+    def __init__(self, catalog):
+        self.docs = list(catalog)
+        self._names = [normalize(doc['name']) for doc in self.docs]
+        entries = set()
+        for position, doc in enumerate(self.docs):
+            for token in tokenize(doc['name']):
+                entries.add((token, position, 1.0))
+            for token in tokenize(doc.get('muscle_group')):
+                entries.add((token, position, MUSCLE_WEIGHT))
+        self.entries = sorted(entries)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _prefix_slice(self, prefix):
+        start = bisect_left(self.entries, (prefix,))
+        end = start
+        while end < len(self.entries) and self.entries[end][0].startswith(prefix):
+            end += 1
+        return self.entries[start:end]
+
+    def _token_scores(self, query_token, fuzzy):
+        """Best score per document for one query token."""
+        scores = {}
+        for token, position, weight in self._prefix_slice(query_token):
+            score = (EXACT_SCORE if token == query_token else PREFIX_SCORE) * weight
+            if score > scores.get(position, 0):
+                scores[position] = score
+
+        max_typos = _max_typos(query_token) if fuzzy else 0
+        if not scores and max_typos:
+            # Only misspelled tokens pay for the edit-distance scan, which is
+            # limited to tokens sharing the first letter
+            distances = {}
+            for token, position, weight in self._prefix_slice(query_token[0]):
+                if token not in distances:
+                    distances[token] = prefix_distance(query_token, token, max_typos)
+                if distances[token] > max_typos:
+                    continue
+                score = FUZZY_SCORE * weight
+                if score > scores.get(position, 0):
+                    scores[position] = score
+        return scores
+
+    def search(self, query, exercise_type=None, limit=20, boosts=None, fuzzy=True):
+        """Rank documents matching every query token.
+
+        Returns catalog dicts with an added ``score`` key, best first.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        totals = None
+        for query_token in query_tokens:
+            scores = self._token_scores(query_token, fuzzy)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {p: totals[p] + s for p, s in scores.items() if p in totals}
+            if not totals:
+                return []
+
+        normalized_query = ' '.join(query_tokens)
+        results = []
+        for position, score in totals.items():
+            doc = self.docs[position]
+            if exercise_type and doc.get('type') != exercise_type:
+                continue
+            if self._names[position].startswith(normalized_query):
+                score += LEADING_BONUS
+            if boosts:
+                score += USAGE_WEIGHT * math.log1p(boosts.get(doc['id'], 0))
+            results.append(dict(doc, score=round(score, 3)))
+
+        results.sort(key=lambda r: (-r['score'], r['name']))
+        return results[:limit] if limit else results
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+_postgres_unavailable = False
+
+
+def get_index():
+    """The process-wide index, rebuilt when the exercises tag moves."""
+    global _index, _index_version
+    from app.models import Exercise
+
+    version = cache.tag_version(EXERCISES_TAG)
+    with _index_lock:
+        if _index is None or version != _index_version:
+            _index = ExerciseIndex(Exercise.get_catalog())
+            _index_version = version
+        return _index
+
+
+def user_exercise_counts(user_id):
+    """How many times the user has logged each exercise ({exercise_id: n})."""
+    from app.models import StrengthLog, WorkoutSession
+
+    def load():
+        rows = db.session.query(
+            StrengthLog.exercise_id, func.count(StrengthLog.log_id)
+        ).join(WorkoutSession).filter(
+            WorkoutSession.user_id == user_id
+        ).group_by(StrengthLog.exercise_id).all()
+        return {exercise_id: count for exercise_id, count in rows}
+
+    if user_id is None:
+        return {}
+    return cache.get_or_set(f'search:usage:{user_id}', load, tags=[user_tag(user_id)])
+
+
+def _backend():
+    configured = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if configured == 'auto':
+        if _postgres_unavailable or db.engine.dialect.name != 'postgresql':
+            return 'memory'
+        return 'postgres'
+    return configured
+
+
+def _search_postgres(query, exercise_type, limit, boosts):
+    """Trigram search; candidates are re-ranked with the usage boost."""
+    normalized = normalize(query)
+    sql = text("""
+        SELECT exercise_id,
+               GREATEST(word_similarity(:q, search_normalize(name)),
+                        word_similarity(:q, search_normalize(muscle_group)) * :muscle_weight)
+               + CASE WHEN search_normalize(name) LIKE :prefix THEN :leading_bonus ELSE 0 END AS score
+        FROM exercises
+        WHERE (:q <% search_normalize(name) OR :q <% search_normalize(muscle_group)
+               OR search_normalize(name) LIKE :prefix)
+          AND (:exercise_type = '' OR exercise_type = :exercise_type)
+        ORDER BY score DESC
+        LIMIT :candidates
+    """)
+    # Predicates use the exact indexed expressions (NULL muscle groups simply
+    # do not match). Savepoint so a failure does not abort the request transaction
+    with db.session.begin_nested():
+        rows = db.session.execute(sql, {
+            'q': normalized,
+            'prefix': normalized.replace('%', '').replace('_', '') + '%',
+            'muscle_weight': MUSCLE_WEIGHT,
+            'leading_bonus': LEADING_BONUS / EXACT_SCORE,
+            'exercise_type': exercise_type or '',
+            'candidates': max(limit or 0, 50) * 2
+        }).all()
+
+    docs = {doc['id']: doc for doc in get_index().docs}
+    results = []
+    for row in rows:
+        doc = docs.get(row.exercise_id)
+        if doc is None:
+            continue
+        score = float(row.score) * EXACT_SCORE
+        if boosts:
+            score += USAGE_WEIGHT * math.log1p(boosts.get(doc['id'], 0))
+        results.append(dict(doc, score=round(score, 3)))
+    results.sort(key=lambda r: (-r['score'], r['name']))
+    return results[:limit] if limit else results
+
+
+def _missing_trgm(exc):
+    """True if ``exc`` says pg_trgm or ``search_normalize()`` is not installed."""
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, 'sqlstate', None) == UNDEFINED_FUNCTION
+
+
+def search_exercises(query, user_id=None, exercise_type=None, limit=20):
+    """Ranked exercise search using the configured backend.
+
+    A missing ``pg_trgm`` switches this process to the memory index for
+    good; any other database error only falls back for the current call.
+    """
+    global _postgres_unavailable
+
+    boosts = user_exercise_counts(user_id)
+    if _backend() == 'postgres':
+        try:
+            return _search_postgres(query, exercise_type, limit, boosts)
+        except Exception as exc:
+            if _missing_trgm(exc):
+                logger.warning('pg_trgm or search_normalize() is missing, using the in-memory index', exc_info=True)
+                _postgres_unavailable = True
+            else:
+                logger.warning('Trigram search failed, using in-memory index', exc_info=True)
+    return get_index().search(query, exercise_type=exercise_type, limit=limit, boosts=boosts)
+
+
+def autocomplete(prefix, user_id=None, exercise_type=None, limit=8):
+    """Typo-tolerant completions for a partially typed exercise name."""
+    return get_index().search(
+        prefix, exercise_type=exercise_type, limit=limit,
+        boosts=user_exercise_counts(user_id), fuzzy=True
+    )
@@ -0,0 +1,141 @@
+"""Per-set strength detail and the log-level aggregates stored with it.
+
+A strength log keeps its sets packed in ``strength_logs.set_data``
+(drop sets, back-off sets, per-set RPE) or, when every set is the same,
+just ``sets x reps @ weight``. Either way the log stores its volume and
+best e1RM (``volume_kg``, ``e1rm``) so analytics, exports and PR
+detection aggregate plain columns. The flush hook in
+app/models/events.py refreshes them through ``apply_strength_aggregates``;
+``recompute_user_strength`` rewrites a user's history in one vectorized
+pass (after a formula change, or to backfill), together with the 1RM
+personal records derived from it.
+"""
+import re
+
+import numpy as np
+
+from app import db
+from app.cache import user_tag
+from app.models import User, WorkoutSession, StrengthLog, PersonalRecord
+from app.services.e1rm import estimate_array
+
+MAX_SETS = 20
+
+_SET = re.compile(r'^(\d{1,3})(?:\s*[x×]\s*(\d+(?:\.\d+)?)\s*(?:kg)?)?\s*(?:@\s*(\d{1,2}))?$')
+
+
+def parse_set_detail(text):
+    """'10x80, 8x70 @8, 6x60' -> [(reps, weight_kg, rpe)]; [] if empty.
+
+    Raises ValueError naming the first part that is not 'reps[xweight][@rpe]'.
+    """
+    sets = []
+    for part in re.split(r'[,;]', text or ''):
+        part = part.strip().lower()
+        if not part:
+            continue
+        match = _SET.match(part)
+        if match is None:
+            raise ValueError(f'Could not read set "{part}".')
+        reps = int(match.group(1))
+        weight = float(match.group(2)) if match.group(2) else None
+        rpe = int(match.group(3)) if match.group(3) else None
+        if reps < 1 or (rpe is not None and not 1 <= rpe <= 10):
+            raise ValueError(f'Could not read set "{part}".')
+        sets.append((reps, weight, rpe))
+    if len(sets) > MAX_SETS:
+        raise ValueError(f'At most {MAX_SETS} sets per entry.')
+    return sets
+
+
+def set_detail(log):
+    """[{reps, weight_kg, rpe}] for each set of a log (API)."""
+    return [{'reps': reps, 'weight_kg': weight, 'rpe': rpe} for reps, weight, rpe in log.set_list()]
+
+
+def set_arrays(logs):
+    """Flatten logs into per-set arrays.
+
+    ``logs`` are StrengthLog instances or rows with sets, reps, weight_kg,
+    rpe and set_data. Returns (sets per log, reps, weights, rpes).
+    """
+    counts, sets = [], []
+    for log in logs:
+        log_sets = StrengthLog.set_list(log)
+        counts.append(len(log_sets))
+        sets.extend(log_sets)
+    reps, weights, rpes = zip(*sets) if sets else ((), (), ())
+    return np.array(counts, dtype=int), reps, weights, rpes
+
+
+def log_aggregates(logs, formula=None):
+    """(best e1RM, volume) arrays, one entry per log."""
+    counts, reps, weights, rpes = set_arrays(logs)
+    e1rm = np.zeros(len(counts))
+    volume = np.zeros(len(counts))
+    has_sets = counts > 0
+    if has_sets.any():
+        starts = (np.cumsum(counts) - counts)[has_sets]
+        set_e1rm = estimate_array(weights, reps, rpes, formula)
+        set_volume = np.nan_to_num(np.array(reps, dtype=float) * np.array(weights, dtype=float))
+        e1rm[has_sets] = np.maximum.reduceat(set_e1rm, starts)
+        volume[has_sets] = np.add.reduceat(set_volume, starts)
+    return e1rm.round(2), volume.round(2)
+
+
+def apply_strength_aggregates(log, user):
+    """Store one log's e1RM and volume; ``user`` supplies the formula (may be None)."""
+    e1rm, volume = log_aggregates([log], user.e1rm_formula if user is not None else None)
+    log.e1rm = float(e1rm[0])
+    log.volume_kg = float(volume[0])
+
+
+def one_rm_progression(rows, e1rm):
+    """PersonalRecord fields for each log that beat its exercise's best so far.
+
+    ``rows`` are in date order with exercise_id, session_date and weight_kg;
+    like the logging routes, only logs with a weight can set a 1RM record.
+    """
+    best, records = {}, []
+    for row, value in zip(rows, e1rm):
+        value = float(value)
+        if row.weight_kg and value > best.get(row.exercise_id, 0):
+            best[row.exercise_id] = value
+            records.append({'exercise_id': row.exercise_id, 'value': value,
+                            'date_achieved': row.session_date})
+    return records
+
+
+def recompute_user_strength(user_id):
+    """Rewrite the stored aggregates of all of a user's logs and their 1RM records.
+
+    One query loads the logs' set columns, every set is evaluated in a
+    single vectorized pass and the results are written back with one
+    executemany. The 1RM record history is rebuilt from the new estimates,
+    so later sets are compared against the same formula. The bulk writes
+    skip the flush hooks, so the user's cache tag is queued here. Returns
+    the number of logs.
+    """
+    user = db.session.get(User, user_id)
+    rows = db.session.query(
+        StrengthLog.log_id, StrengthLog.exercise_id, WorkoutSession.session_date,
+        StrengthLog.sets, StrengthLog.reps, StrengthLog.weight_kg, StrengthLog.rpe, StrengthLog.set_data
+    ).join(WorkoutSession).filter(
+        WorkoutSession.user_id == user_id
+    ).order_by(WorkoutSession.session_date, StrengthLog.log_id).all()
+    if not rows:
+        return 0
+    e1rm, volume = log_aggregates(rows, user.e1rm_formula if user else None)
+    db.session.execute(db.update(StrengthLog), [
+        {'log_id': row.log_id, 'e1rm': float(best), 'volume_kg': float(total)}
+        for row, best, total in zip(rows, e1rm, volume)
+    ])
+
+    PersonalRecord.query.filter_by(user_id=user_id, record_type='1RM').delete(synchronize_session=False)
+    db.session.add_all([
+        PersonalRecord(user_id=user_id, record_type='1RM', notes=f'Auto-detected PR: {record["value"]}',
+                       **record)
+        for record in one_rm_progression(rows, e1rm)
+    ])
+    db.session.info.setdefault('changed_cache_tags', set()).add(user_tag(user_id))
+    return len(rows)
@@ -0,0 +1,144 @@
+"""Fitness/fatigue training-load model (ATL, CTL, TSB, ACWR).
+
+Each day's load is the summed TRIMP of the user's runs. Acute (ATL) and
+chronic (CTL) load are exponentially weighted averages with 7 and 42 day
+time constants; TSB (balance, "form") is CTL - ATL and ACWR is ATL / CTL.
+
+The series is stored per day in ``training_load_days``. Every value
+depends only on the previous day's ATL/CTL and the day's load, so a
+change on date D only rewrites the rows from D forward, seeded from the
+row of D - 1 (see the commit hook in app/models/events.py). Rows stop at
+the last day with load; reads decay the last row forward to the requested
+end date without touching the database.
+"""
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+
+from app import db
+from app.models import WorkoutSession, RunningLog, TrainingLoadDay
+
+ATL_DAYS = 7
+CTL_DAYS = 42
+ATL_DECAY = 1 - math.exp(-1 / ATL_DAYS)
+CTL_DECAY = 1 - math.exp(-1 / CTL_DAYS)
+
+
+def step(atl, ctl, load):
+    """ATL and CTL at the end of a day with ``load``, from the previous day's."""
+    return atl + (load - atl) * ATL_DECAY, ctl + (load - ctl) * CTL_DECAY
+
+
+def _day_values(day, load, atl, ctl):
+    return {
+        'date': str(day),
+        'load': round(load, 2),
+        'atl': round(atl, 2),
+        'ctl': round(ctl, 2),
+        'tsb': round(ctl - atl, 2),
+        'acwr': round(atl / ctl, 2) if ctl > 0 else None
+    }
+
+
+def daily_loads(user_id, start_date):
+    """{date: summed TRIMP} of the user's runs from ``start_date`` on."""
+    runs = db.session.query(WorkoutSession.session_date, RunningLog).join(
+        RunningLog, RunningLog.session_id == WorkoutSession.session_id
+    ).filter(
+        WorkoutSession.user_id == user_id,
+        WorkoutSession.session_date >= start_date
+    ).all()
+    loads = defaultdict(float)
+    for session_date, run_log in runs:
+        loads[session_date] += float(run_log.trimp_score or 0)
+    return loads
+
+
+def update_training_load(user_id, from_date):
+    """Rewrite the stored series from ``from_date`` forward.
+
+    Returns the number of rows written. The caller commits.
+    """
+    seed = TrainingLoadDay.query.filter(
+        TrainingLoadDay.user_id == user_id,
+        TrainingLoadDay.load_date < from_date
+    ).order_by(TrainingLoadDay.load_date.desc()).first()
+    # Continue straight after the seed row so a gap after it is decayed too
+    start = seed.load_date + timedelta(days=1) if seed else from_date
+
+    loads = daily_loads(user_id, start)
+    TrainingLoadDay.query.filter(
+        TrainingLoadDay.user_id == user_id,
+        TrainingLoadDay.load_date >= start
+    ).delete(synchronize_session=False)
+    days_with_load = [day for day, load in loads.items() if load > 0]
+    if not days_with_load:
+        return 0
+    if seed is None:
+        start = min(days_with_load)
+
+    atl = float(seed.atl) if seed else 0.0
+    ctl = float(seed.ctl) if seed else 0.0
+    rows = []
+    day, end = start, max(days_with_load)
+    while day <= end:
+        load = loads.get(day, 0.0)
+        atl, ctl = step(atl, ctl, load)
+        values = _day_values(day, load, atl, ctl)
+        rows.append({
+            'user_id': user_id,
+            'load_date': day,
+            **{key: value for key, value in values.items() if key != 'date'}
+        })
+        day += timedelta(days=1)
+    db.session.execute(db.insert(TrainingLoadDay), rows)
+    return len(rows)
+
+
+def rebuild_training_load(user_id):
+    """Recompute a user's whole series (backfill)."""
+    first = db.session.query(db.func.min(WorkoutSession.session_date)).filter(
+        WorkoutSession.user_id == user_id
+    ).scalar()
+    return update_training_load(user_id, first or date.today())
+
+
+def load_series(user_id, days=90, end_date=None):
+    """Daily values for the ``days`` days up to ``end_date`` (default today).
+
+    Reads the stored rows in range plus the row before it; days before the
+    series starts are zero and days after its last row are decayed from it.
+    """
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    seed = TrainingLoadDay.query.filter(
+        TrainingLoadDay.user_id == user_id,
+        TrainingLoadDay.load_date < start_date
+    ).order_by(TrainingLoadDay.load_date.desc()).first()
+    stored = {
+        row.load_date: row for row in TrainingLoadDay.query.filter(
+            TrainingLoadDay.user_id == user_id,
+            TrainingLoadDay.load_date.between(start_date, end_date)
+        )
+    }
+
+    if seed is not None:
+        # Decay across any gap between the seed row and the window
+        gap = (start_date - seed.load_date).days - 1
+        atl = float(seed.atl) * (1 - ATL_DECAY) ** gap
+        ctl = float(seed.ctl) * (1 - CTL_DECAY) ** gap
+    else:
+        atl = ctl = 0.0
+
+    series = []
+    day = start_date
+    while day <= end_date:
+        row = stored.get(day)
+        if row is not None:
+            atl, ctl = float(row.atl), float(row.ctl)
+            series.append(row.to_dict())
+        else:
+            atl, ctl = step(atl, ctl, 0.0)
+            series.append(_day_values(day, 0.0, atl, ctl))
+        day += timedelta(days=1)
+    return series
@@ -354,12 +354,6 @@ function formatPace(pacePerKm) {
     return `${minutes}:${seconds.toString().padStart(2, '0')}/km`;
 }
 
-function calculate1RM(weight, reps) {
-    if (reps === 1) return weight;
-    if (reps <= 0 || weight <= 0) return 0;
-    return Math.round(weight * (1 + reps / 30) * 100) / 100;
-}
-
 // Service Worker Registration (for PWA)
 if ('serviceWorker' in navigator) {
     window.addEventListener('load', () => {
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 """Run the Flask application."""
 import os
+import click
 from datetime import datetime
 from app import create_app, db
 
@@ -21,6 +22,163 @@ def init_db():
     print('Database tables created.')
 
 
+@app.cli.command('cache-stats')
+def cache_stats():
+    """Show the cache backend and the hit/miss counters shared by all workers."""
+    from app.cache import cache
+
+    for key, value in cache.stats().items():
+        print(f'{key}: {value}')
+
+
+@app.cli.command('cache-clear')
+def cache_clear():
+    """Drop every entry from the configured cache backend."""
+    from app.cache import cache
+
+    cache.clear()
+    print('Cache cleared.')
+
+
+@app.cli.command('backfill-muscle-groups')
+def backfill_muscle_groups():
+    """Rebuild the exercise to muscle group mapping from exercises.muscle_group."""
+    from app.models import ExerciseMuscleGroup
+
+    count = ExerciseMuscleGroup.backfill()
+    print(f'Muscle group mapping rebuilt for {count} exercises.')
+
+
+@app.cli.command('recompute-run-metrics')
+def recompute_run_metrics():
+    """Recompute stored TRIMP, intensity and zone times for every user's runs."""
+    from app.models import User
+    from app.services.run_metrics import recompute_user_metrics
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += recompute_user_metrics(user_id)
+        db.session.commit()
+    print(f'Run metrics recomputed for {total} runs.')
+
+
+@app.cli.command('recompute-strength')
+def recompute_strength():
+    """Recompute stored e1RM and volume of every strength log."""
+    from app.models import User
+    from app.services.strength_sets import recompute_user_strength
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += recompute_user_strength(user_id)
+    db.session.commit()
+    print(f'Strength aggregates recomputed for {total} logs.')
+
+
+@app.cli.command('rebuild-readiness')
+def rebuild_readiness_series():
+    """Recompute the stored daily readiness series for every user."""
+    from app.models import User
+    from app.services.readiness import rebuild_readiness
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += rebuild_readiness(user_id)
+    db.session.commit()
+    print(f'Readiness recomputed for {total} days.')
+
+
+@app.cli.command('rebuild-muscle-sets')
+def rebuild_muscle_sets():
+    """Rebuild the weekly hard-sets-per-muscle rollup for every user."""
+    from app.models import User
+    from app.services.muscle_sets import rebuild_user
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += rebuild_user(user_id)
+    db.session.commit()
+    print(f'Weekly muscle sets rebuilt: {total} rows.')
+
+
+@app.cli.command('compute-progressions')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: one per CPU).')
+def compute_progressions(workers):
+    """Rebuild next-session load suggestions for every user (run nightly)."""
+    from app.services.progression import compute_all_suggestions
+
+    total = compute_all_suggestions(workers=workers)
+    db.session.commit()
+    print(f'Progression suggestions computed for {total} exercises.')
+
+
+@app.cli.command('reconcile-plans')
+def reconcile_plans():
+    """Link every user's planned workouts to the sessions that fulfilled them."""
+    from app.models import User
+    from app.services.plan_matching import reconcile_user
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += reconcile_user(user_id)
+    db.session.commit()
+    print(f'Plans linked to sessions: {total}.')
+
+
+@app.cli.command('e1rm-sql')
+def e1rm_sql():
+    """Print the calculate_1rm SQL function generated from the formula registry."""
+    from app.services.e1rm import sql_function
+
+    print(sql_function())
+
+
+@app.cli.command('backfill-best-efforts')
+def backfill_best_efforts():
+    """Recompute running best efforts and the PR ledger for every user."""
+    from app.models import User
+    from app.services.best_efforts import backfill_user_efforts
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += backfill_user_efforts(user_id)
+    db.session.commit()
+    print(f'Best efforts recomputed for {total} runs.')
+
+
+@app.cli.command('rebuild-training-load')
+def rebuild_training_load():
+    """Recompute the stored ATL/CTL/TSB series for every user."""
+    from app.models import User
+    from app.services.training_load import rebuild_training_load as rebuild
+
+    total = 0
+    for (user_id,) in db.session.query(User.user_id).all():
+        total += rebuild(user_id)
+    db.session.commit()
+    print(f'Training load rebuilt ({total} days).')
+
+
+@app.cli.command('parse-intervals')
+def parse_intervals():
+    """Re-parse interval_details of every run into run_intervals rows."""
+    from app.services.intervals import parse_all_intervals
+
+    count = parse_all_intervals()
+    db.session.commit()
+    print(f'{count} interval segments stored.')
+
+
+@app.cli.command('match-routes')
+def match_routes():
+    """Rebuild route clusters from every imported GPS track."""
+    from app.services.routes import match_all_routes
+
+    count = match_all_routes()
+    db.session.commit()
+    print(f'{count} tracks matched to routes.')
+
+
 @app.cli.command('create-user')
 def create_user():
     """Create a test user."""
@@ -17,19 +17,50 @@ DROP FUNCTION IF EXISTS calculate_1rm CASCADE;
 DROP FUNCTION IF EXISTS calculate_trimp CASCADE;
 DROP FUNCTION IF EXISTS get_exercise_substitutes CASCADE;
 DROP FUNCTION IF EXISTS add_substitution CASCADE;
+DROP FUNCTION IF EXISTS search_normalize CASCADE;
+DROP TABLE IF EXISTS readiness_days CASCADE;
+DROP TABLE IF EXISTS weekly_muscle_sets CASCADE;
+DROP TABLE IF EXISTS progression_suggestions CASCADE;
 DROP TABLE IF EXISTS body_measurements CASCADE;
 DROP TABLE IF EXISTS planned_workouts CASCADE;
+DROP TABLE IF EXISTS plan_rule_exceptions CASCADE;
+DROP TABLE IF EXISTS plan_rules CASCADE;
 DROP TABLE IF EXISTS template_exercises CASCADE;
 DROP TABLE IF EXISTS workout_templates CASCADE;
 DROP TABLE IF EXISTS exercise_substitutions CASCADE;
+DROP TABLE IF EXISTS exercise_muscle_groups CASCADE;
 DROP TABLE IF EXISTS recovery_logs CASCADE;
 DROP TABLE IF EXISTS personal_records CASCADE;
+DROP TABLE IF EXISTS training_load_days CASCADE;
+DROP TABLE IF EXISTS running_pr_ledger CASCADE;
+DROP TABLE IF EXISTS run_best_efforts CASCADE;
+DROP TABLE IF EXISTS run_tracks CASCADE;
+DROP TABLE IF EXISTS run_routes CASCADE;
+DROP TABLE IF EXISTS run_intervals CASCADE;
+DROP TABLE IF EXISTS run_samples CASCADE;
 DROP TABLE IF EXISTS running_logs CASCADE;
 DROP TABLE IF EXISTS strength_logs CASCADE;
 DROP TABLE IF EXISTS workout_sessions CASCADE;
 DROP TABLE IF EXISTS exercises CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 
+-- =============================================================================
+-- EXTENSIONS
+-- =============================================================================
+
+-- Trigram matching for exercise search (app/services/search.py)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Search form of a name, the same as normalize() in app/services/search.py
+-- ("Pull-Up" -> "pull up"). The trigram indexes below are built on it.
+CREATE OR REPLACE FUNCTION search_normalize(value TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(
+        translate(lower(value), 'àáâãäåāçèéêëēìíîïīñòóôõöōùúûüūýÿ',
+                                'aaaaaaaceeeeeiiiiinoooooouuuuuyy'),
+        '[^a-z0-9]+', ' ', 'g'))
+$$ LANGUAGE sql IMMUTABLE;
+
 -- =============================================================================
 -- TABLES
 -- =============================================================================
@@ -42,7 +73,12 @@ CREATE TABLE users (
     password_hash VARCHAR(255) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_login TIMESTAMP,
-    is_active BOOLEAN DEFAULT TRUE
+    is_active BOOLEAN DEFAULT TRUE,
+    max_heart_rate SMALLINT,
+    resting_heart_rate SMALLINT,
+    threshold_pace_per_km DECIMAL(5,2),
+    e1rm_formula VARCHAR(20) DEFAULT 'epley',
+    sex CHAR(1) CHECK (sex IN ('M', 'F'))   -- DOTS coefficients
 );
 
 -- Exercise library
@@ -50,7 +86,7 @@ CREATE TABLE exercises (
     exercise_id SERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
     description TEXT,
-    muscle_group VARCHAR(50),
+    muscle_group VARCHAR(200),  -- comma-separated, primary first
     exercise_type VARCHAR(20) CHECK (exercise_type IN ('strength', 'cardio')),
     video_reference_url VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -78,7 +114,13 @@ CREATE TABLE strength_logs (
     rpe INTEGER CHECK (rpe BETWEEN 1 AND 10),
     rest_seconds INTEGER,
     tempo VARCHAR(20),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Per-set reps/weight/RPE packed by the app; NULL when all sets are equal,
+    -- in which case sets/reps/weight_kg/rpe describe them (else the top set)
+    set_data BYTEA,
+    -- Stored by the app: best estimated 1RM (user's formula) and total volume
+    e1rm DECIMAL(7,2),
+    volume_kg DECIMAL(9,2)
 );
 
 -- Running logs
@@ -96,9 +138,120 @@ CREATE TABLE running_logs (
     weather_conditions VARCHAR(50),
     route_notes TEXT,
     interval_details TEXT,
+    -- Seconds per heart-rate zone, computed by the app when the run is saved
+    zone1_seconds INTEGER,
+    zone2_seconds INTEGER,
+    zone3_seconds INTEGER,
+    zone4_seconds INTEGER,
+    zone5_seconds INTEGER,
+    -- Derived from the owner's profile when the run is saved (app/services/run_metrics.py)
+    trimp_score DECIMAL(7,2),
+    intensity_factor DECIMAL(4,2),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Recorded samples of imported runs (GPX/TCX/FIT), one row per run. Each
+-- channel is a zlib-compressed, delta-encoded varint array written by
+-- app/models/run_samples.py; NULL when the file did not record it.
+CREATE TABLE run_samples (
+    log_id INTEGER PRIMARY KEY REFERENCES running_logs(log_id) ON DELETE CASCADE,
+    source_format VARCHAR(10),
+    start_time TIMESTAMP,
+    sample_count INTEGER NOT NULL,
+    encoding SMALLINT NOT NULL DEFAULT 1,
+    time_data BYTEA NOT NULL,
+    distance_data BYTEA,
+    heart_rate_data BYTEA,
+    elevation_data BYTEA,
+    lat_data BYTEA,
+    lon_data BYTEA,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Route clusters of GPS tracks (app/services/routes.py). Polylines are
+-- downsampled tracks stored like run_samples channels (1e-5 degree steps).
+CREATE TABLE run_routes (
+    route_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    name VARCHAR(100),
+    start_cell VARCHAR(24) NOT NULL,
+    distance_m DECIMAL(8,1) NOT NULL,
+    lat_data BYTEA NOT NULL,
+    lon_data BYTEA NOT NULL,
+    point_count SMALLINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Downsampled track of each imported run and the route it matched
+CREATE TABLE run_tracks (
+    log_id INTEGER PRIMARY KEY REFERENCES running_logs(log_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    route_id INTEGER REFERENCES run_routes(route_id) ON DELETE SET NULL,
+    start_cell VARCHAR(24) NOT NULL,
+    distance_m DECIMAL(8,1) NOT NULL,
+    match_distance_m DECIMAL(7,1),
+    lat_data BYTEA NOT NULL,
+    lon_data BYTEA NOT NULL,
+    point_count SMALLINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Interval segments parsed from running_logs.interval_details (app/services/intervals.py)
+CREATE TABLE run_intervals (
+    interval_id SERIAL PRIMARY KEY,
+    log_id INTEGER NOT NULL REFERENCES running_logs(log_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    position SMALLINT NOT NULL,
+    kind VARCHAR(10) NOT NULL CHECK (kind IN ('warmup', 'rep', 'steady', 'cooldown')),
+    block SMALLINT NOT NULL,
+    rep SMALLINT,
+    distance_m DECIMAL(7,1),
+    duration_seconds INTEGER,
+    target_pace_per_km DECIMAL(5,2),
+    actual_pace_per_km DECIMAL(5,2),
+    recovery_seconds INTEGER,
+    recovery_type VARCHAR(10),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Fastest standard-distance segment inside each run (app/services/best_efforts.py)
+CREATE TABLE run_best_efforts (
+    effort_id SERIAL PRIMARY KEY,
+    log_id INTEGER NOT NULL REFERENCES running_logs(log_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    distance_key VARCHAR(10) NOT NULL CHECK (distance_key IN ('400m', '1k', '5k', '10k', 'half')),
+    elapsed_seconds DECIMAL(8,1) NOT NULL,
+    start_offset_seconds DECIMAL(8,1),
+    achieved_date DATE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(log_id, distance_key)
+);
+
+-- Running PR progressions, one row per improvement
+CREATE TABLE running_pr_ledger (
+    pr_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    distance_key VARCHAR(10) NOT NULL,
+    elapsed_seconds DECIMAL(8,1) NOT NULL,
+    previous_seconds DECIMAL(8,1),
+    log_id INTEGER REFERENCES running_logs(log_id) ON DELETE CASCADE,
+    achieved_date DATE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Daily training-load series (app/services/training_load.py), kept up to
+-- date from the earliest changed date on every commit touching a run
+CREATE TABLE training_load_days (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    load_date DATE NOT NULL,
+    load DECIMAL(7,2) NOT NULL DEFAULT 0,
+    atl DECIMAL(7,2) NOT NULL,
+    ctl DECIMAL(7,2) NOT NULL,
+    tsb DECIMAL(7,2) NOT NULL,
+    acwr DECIMAL(5,2),
+    PRIMARY KEY (user_id, load_date)
+);
+
 -- Personal records
 CREATE TABLE personal_records (
     record_id SERIAL PRIMARY KEY,
@@ -134,6 +287,42 @@ CREATE TABLE exercise_substitutions (
     CHECK (exercise_id <> substitute_id)
 );
 
+-- Normalized exercise to muscle group mapping (maintained by the app from
+-- exercises.muscle_group). Shares of one exercise sum to 1: the primary
+-- group weighs 1.0 and each secondary group 0.5 before normalizing.
+CREATE TABLE exercise_muscle_groups (
+    exercise_id INTEGER NOT NULL REFERENCES exercises(exercise_id) ON DELETE CASCADE,
+    muscle_group VARCHAR(50) NOT NULL,
+    share DECIMAL(5,4) NOT NULL,
+    position SMALLINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (exercise_id, muscle_group)
+);
+
+-- Daily readiness (recovery score vs 28-day baseline, blended with ACWR)
+CREATE TABLE readiness_days (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    recovery_score DECIMAL(3,1) NOT NULL,   -- 0-10
+    baseline_mean DECIMAL(4,2),             -- previous 28 days; NULL until 4 logs
+    baseline_sd DECIMAL(4,2),
+    recovery_z DECIMAL(4,2),
+    acwr DECIMAL(5,2),
+    tsb DECIMAL(7,2),
+    readiness DECIMAL(4,1) NOT NULL,        -- 0-100
+    level VARCHAR(10) NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+
+-- Weekly sets per muscle group (rewritten per touched week on commit)
+CREATE TABLE weekly_muscle_sets (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    week_start DATE NOT NULL,               -- Monday
+    muscle_group VARCHAR(50) NOT NULL,
+    hard_sets DECIMAL(6,2) NOT NULL DEFAULT 0,  -- sets at RPE >= 7 (or unrated), split by share
+    sets DECIMAL(6,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, week_start, muscle_group)
+);
+
 -- Workout templates
 CREATE TABLE workout_templates (
     template_id SERIAL PRIMARY KEY,
@@ -154,10 +343,50 @@ CREATE TABLE template_exercises (
     order_index INTEGER DEFAULT 0,
     target_sets INTEGER DEFAULT 3,
     target_reps INTEGER DEFAULT 10,
+    target_reps_max INTEGER,                -- top of a rep range; NULL = fixed target
     notes VARCHAR(200)
 );
 
--- Planned workouts (weekly planning)
+-- Next-session load suggestions (flask compute-progressions, refreshed on commit)
+CREATE TABLE progression_suggestions (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    exercise_id INTEGER NOT NULL REFERENCES exercises(exercise_id) ON DELETE CASCADE,
+    sets SMALLINT NOT NULL,
+    reps SMALLINT NOT NULL,
+    weight_kg DECIMAL(6,2),
+    reason VARCHAR(20) NOT NULL,
+    rep_low SMALLINT NOT NULL,
+    rep_high SMALLINT NOT NULL,
+    based_on_log_id INTEGER REFERENCES strength_logs(log_id) ON DELETE SET NULL,
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, exercise_id)
+);
+
+-- Recurring plans: weekly pattern stored once, expanded when shown
+CREATE TABLE plan_rules (
+    rule_id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    workout_type VARCHAR(20) NOT NULL,
+    description VARCHAR(255),
+    target_duration INTEGER,
+    target_distance DECIMAL(6,2),
+    template_id INTEGER REFERENCES workout_templates(template_id),
+    start_date DATE NOT NULL,
+    weekdays SMALLINT NOT NULL CHECK (weekdays BETWEEN 1 AND 127),  -- bit 0 = Monday
+    interval_weeks SMALLINT NOT NULL DEFAULT 1 CHECK (interval_weeks >= 1),
+    count INTEGER CHECK (count >= 1),
+    until DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Skipped occurrences of recurring plans
+CREATE TABLE plan_rule_exceptions (
+    rule_id INTEGER NOT NULL REFERENCES plan_rules(rule_id) ON DELETE CASCADE,
+    occurrence_date DATE NOT NULL,
+    PRIMARY KEY (rule_id, occurrence_date)
+);
+
+-- Planned workouts (weekly planning); rows with rule_id override one occurrence
 CREATE TABLE planned_workouts (
     plan_id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
@@ -168,7 +397,10 @@ CREATE TABLE planned_workouts (
     target_distance DECIMAL(6,2),
     template_id INTEGER REFERENCES workout_templates(template_id),
     completed BOOLEAN DEFAULT FALSE,
-    completed_session_id INTEGER REFERENCES workout_sessions(session_id),
+    completed_session_id INTEGER REFERENCES workout_sessions(session_id) ON DELETE SET NULL,
+    match_source VARCHAR(10) CHECK (match_source IN ('manual', 'auto')),
+    rule_id INTEGER REFERENCES plan_rules(rule_id) ON DELETE CASCADE,
+    occurrence_date DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -201,60 +433,73 @@ CREATE TABLE body_measurements (
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_workout_sessions_date ON workout_sessions(session_date);
 CREATE INDEX idx_workout_sessions_user ON workout_sessions(user_id);
+CREATE INDEX idx_workout_sessions_user_date ON workout_sessions(user_id, session_date);
 CREATE INDEX idx_strength_logs_session ON strength_logs(session_id);
+CREATE INDEX idx_strength_logs_exercise_session ON strength_logs(exercise_id, session_id);
 CREATE INDEX idx_running_logs_session ON running_logs(session_id);
 CREATE INDEX idx_exercises_type ON exercises(exercise_type);
+CREATE INDEX idx_exercises_name_trgm ON exercises USING gin (search_normalize(name) gin_trgm_ops);
+CREATE INDEX idx_exercises_muscle_trgm ON exercises USING gin (search_normalize(muscle_group) gin_trgm_ops);
+CREATE INDEX idx_run_routes_user_cell ON run_routes(user_id, start_cell);
+CREATE INDEX idx_run_tracks_route ON run_tracks(route_id);
+CREATE INDEX idx_run_intervals_log ON run_intervals(log_id);
+CREATE INDEX idx_run_intervals_user_kind ON run_intervals(user_id, kind, distance_m, duration_seconds);
+CREATE INDEX idx_run_best_efforts_user_distance ON run_best_efforts(user_id, distance_key, elapsed_seconds);
+CREATE INDEX idx_running_pr_ledger_user_distance ON running_pr_ledger(user_id, distance_key, elapsed_seconds);
 CREATE INDEX idx_recovery_logs_date ON recovery_logs(log_date);
 CREATE INDEX idx_recovery_logs_user ON recovery_logs(user_id);
 CREATE INDEX idx_personal_records_user ON personal_records(user_id);
+CREATE INDEX idx_exercise_muscle_groups_muscle ON exercise_muscle_groups(muscle_group, exercise_id);
 CREATE INDEX idx_substitutions_exercise ON exercise_substitutions(exercise_id);
 CREATE INDEX idx_substitutions_substitute ON exercise_substitutions(substitute_id);
 CREATE INDEX idx_templates_user ON workout_templates(user_id);
 CREATE INDEX idx_template_exercises_template ON template_exercises(template_id);
 CREATE INDEX idx_planned_workouts_user ON planned_workouts(user_id);
 CREATE INDEX idx_planned_workouts_date ON planned_workouts(planned_date);
+CREATE INDEX idx_planned_workouts_user_date ON planned_workouts(user_id, planned_date);
+CREATE INDEX idx_planned_workouts_session ON planned_workouts(completed_session_id);
+CREATE INDEX idx_planned_workouts_rule ON planned_workouts(rule_id, occurrence_date);
+CREATE INDEX idx_plan_rules_user_start ON plan_rules(user_id, start_date);
 CREATE INDEX idx_body_measurements_user ON body_measurements(user_id);
 CREATE INDEX idx_body_measurements_date ON body_measurements(measurement_date);
+CREATE INDEX idx_body_measurements_user_date ON body_measurements(user_id, measurement_date);
 
 -- =============================================================================
 -- FUNCTIONS
 -- =============================================================================
 
--- 1RM Estimation using Epley Formula: weight × (1 + reps/30)
-CREATE OR REPLACE FUNCTION calculate_1rm(weight DECIMAL, reps INTEGER)
+-- 1RM Estimation (Epley, Brzycki, Lombardi or RPE chart). The app stores the
+-- estimate in strength_logs.e1rm with each user's formula; this is for ad-hoc
+-- queries. Generated from app/services/e1rm.py (flask e1rm-sql) - do not edit.
+CREATE OR REPLACE FUNCTION calculate_1rm(weight DECIMAL, reps INTEGER,
+    rpe INTEGER DEFAULT NULL, formula VARCHAR DEFAULT 'epley')
 RETURNS DECIMAL AS $$
-BEGIN
-    IF reps = 1 THEN
-        RETURN weight;
-    ELSIF reps <= 0 OR weight <= 0 THEN
-        RETURN 0;
-    ELSE
-        RETURN ROUND(weight * (1 + reps::DECIMAL / 30), 2);
-    END IF;
-END;
-$$ LANGUAGE plpgsql IMMUTABLE;
+    SELECT CASE formula
+        WHEN 'brzycki' THEN CASE WHEN (weight IS NULL OR reps IS NULL OR weight <= 0 OR reps <= 0) THEN 0 WHEN (reps = 1) THEN weight ELSE round(CAST((weight * 36) / CAST((37 - CASE WHEN (reps > 36) THEN 36 ELSE reps END) AS NUMERIC) AS NUMERIC), 2) END
+        WHEN 'lombardi' THEN CASE WHEN (weight IS NULL OR reps IS NULL OR weight <= 0 OR reps <= 0) THEN 0 WHEN (reps = 1) THEN weight ELSE round(CAST(weight * power(reps, 0.1) AS NUMERIC), 2) END
+        WHEN 'rpe' THEN CASE WHEN (weight IS NULL OR reps IS NULL OR weight <= 0 OR reps <= 0) THEN 0 ELSE round(CAST(weight / CAST(CASE WHEN ((reps + 10) - coalesce(rpe, 10) <= 1) THEN 1.0 WHEN ((reps + 10) - coalesce(rpe, 10) <= 2) THEN 1.0 + (((reps + 10) - coalesce(rpe, 10)) - 1) * -0.045 WHEN ((reps + 10) - coalesce(rpe, 10) <= 3) THEN 0.955 + (((reps + 10) - coalesce(rpe, 10)) - 2) * -0.033 WHEN ((reps + 10) - coalesce(rpe, 10) <= 4) THEN 0.922 + (((reps + 10) - coalesce(rpe, 10)) - 3) * -0.03 WHEN ((reps + 10) - coalesce(rpe, 10) <= 5) THEN 0.892 + (((reps + 10) - coalesce(rpe, 10)) - 4) * -0.029 WHEN ((reps + 10) - coalesce(rpe, 10) <= 6) THEN 0.863 + (((reps + 10) - coalesce(rpe, 10)) - 5) * -0.026 WHEN ((reps + 10) - coalesce(rpe, 10) <= 7) THEN 0.837 + (((reps + 10) - coalesce(rpe, 10)) - 6) * -0.026 WHEN ((reps + 10) - coalesce(rpe, 10) <= 8) THEN 0.811 + (((reps + 10) - coalesce(rpe, 10)) - 7) * -0.025 WHEN ((reps + 10) - coalesce(rpe, 10) <= 9) THEN 0.786 + (((reps + 10) - coalesce(rpe, 10)) - 8) * -0.024 WHEN ((reps + 10) - coalesce(rpe, 10) <= 10) THEN 0.762 + (((reps + 10) - coalesce(rpe, 10)) - 9) * -0.023 WHEN ((reps + 10) - coalesce(rpe, 10) <= 11) THEN 0.739 + (((reps + 10) - coalesce(rpe, 10)) - 10) * -0.032 WHEN ((reps + 10) - coalesce(rpe, 10) <= 12) THEN 0.707 + (((reps + 10) - coalesce(rpe, 10)) - 11) * -0.027 ELSE 0.68 END AS DOUBLE PRECISION) AS NUMERIC), 2) END
+        ELSE CASE WHEN (weight IS NULL OR reps IS NULL OR weight <= 0 OR reps <= 0) THEN 0 WHEN (reps = 1) THEN weight ELSE round(CAST(weight * (1 + reps / CAST(30 AS NUMERIC)) AS NUMERIC), 2) END
+    END
+$$ LANGUAGE sql IMMUTABLE;
 
 -- Get best estimated 1RM for an exercise
 CREATE OR REPLACE FUNCTION get_best_1rm(p_exercise_id INTEGER, p_user_id INTEGER DEFAULT NULL)
 RETURNS TABLE(exercise_name VARCHAR, best_1rm DECIMAL, achieved_date DATE) AS $$
-BEGIN
-    RETURN QUERY
     SELECT
         e.name,
-        MAX(calculate_1rm(sl.weight_kg, sl.reps)),
+        sl.e1rm,
         ws.session_date
     FROM strength_logs sl
     JOIN workout_sessions ws ON sl.session_id = ws.session_id
     JOIN exercises e ON sl.exercise_id = e.exercise_id
     WHERE sl.exercise_id = p_exercise_id
       AND (p_user_id IS NULL OR ws.user_id = p_user_id)
-    GROUP BY e.name, ws.session_date
-    ORDER BY MAX(calculate_1rm(sl.weight_kg, sl.reps)) DESC
+    ORDER BY sl.e1rm DESC NULLS LAST
     LIMIT 1;
-END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE sql STABLE;
 
--- TRIMP (Training Impulse) Score Calculation
+-- TRIMP (Training Impulse) Score Calculation. The app stores the score in
+-- running_logs.trimp_score using the user's profile; this is for ad-hoc queries.
 -- Formula: Duration (min) × HR_ratio × 0.64 × e^(1.92 × HR_ratio)
 CREATE OR REPLACE FUNCTION calculate_trimp(
     duration_min INTEGER,
@@ -291,7 +536,8 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql IMMUTABLE;
 
--- Volume calculation for strength training
+-- Volume of uniform sets. The app stores each log's volume (including
+-- per-set detail) in strength_logs.volume_kg; this is for ad-hoc queries.
 CREATE OR REPLACE FUNCTION calculate_volume(sets INTEGER, reps INTEGER, weight DECIMAL)
 RETURNS DECIMAL AS $$
 BEGIN
@@ -356,16 +602,17 @@ BEGIN
     WITH weekly_data AS (
         SELECT
             DATE_TRUNC('week', ws.session_date)::DATE AS week_start,
-            e.muscle_group AS mg,
-            SUM(calculate_volume(sl.sets, sl.reps, sl.weight_kg)) AS total_volume,
-            LAG(SUM(calculate_volume(sl.sets, sl.reps, sl.weight_kg))) OVER (
-                PARTITION BY e.muscle_group ORDER BY DATE_TRUNC('week', ws.session_date)
+            COALESCE(emg.muscle_group, 'Other')::VARCHAR AS mg,
+            SUM(sl.volume_kg * COALESCE(emg.share, 1)) AS total_volume,
+            LAG(SUM(sl.volume_kg * COALESCE(emg.share, 1))) OVER (
+                PARTITION BY COALESCE(emg.muscle_group, 'Other')
+                ORDER BY DATE_TRUNC('week', ws.session_date)
             ) AS prev_volume
         FROM strength_logs sl
         JOIN workout_sessions ws ON sl.session_id = ws.session_id
-        JOIN exercises e ON sl.exercise_id = e.exercise_id
+        LEFT JOIN exercise_muscle_groups emg ON emg.exercise_id = sl.exercise_id
         WHERE ws.user_id = p_user_id OR p_user_id IS NULL
-        GROUP BY DATE_TRUNC('week', ws.session_date), e.muscle_group
+        GROUP BY DATE_TRUNC('week', ws.session_date), COALESCE(emg.muscle_group, 'Other')
     )
     SELECT
         wd.week_start,
@@ -427,7 +674,9 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Get substitutes with last performance
+-- Get substitutes with the user's own last performance. The lateral subquery
+-- only touches this user's sessions (idx_workout_sessions_user_date) and
+-- this exercise's logs (idx_strength_logs_exercise_session).
 CREATE OR REPLACE FUNCTION get_exercise_substitutes(p_exercise_id INTEGER, p_user_id INTEGER)
 RETURNS TABLE(
     substitute_exercise_id INTEGER,
@@ -438,24 +687,28 @@ RETURNS TABLE(
     last_weight_kg DECIMAL,
     last_performed DATE
 ) AS $$
-BEGIN
-    RETURN QUERY
-    SELECT DISTINCT ON (e.exercise_id)
+    SELECT
         e.exercise_id,
         e.name,
         e.muscle_group,
-        sl.sets,
-        sl.reps,
-        sl.weight_kg,
-        ws.session_date
+        last.sets,
+        last.reps,
+        last.weight_kg,
+        last.session_date
     FROM exercise_substitutions es
     JOIN exercises e ON e.exercise_id = es.substitute_id
-    LEFT JOIN strength_logs sl ON sl.exercise_id = e.exercise_id
-    LEFT JOIN workout_sessions ws ON ws.session_id = sl.session_id AND ws.user_id = p_user_id
+    LEFT JOIN LATERAL (
+        SELECT sl.sets, sl.reps, sl.weight_kg, ws.session_date
+        FROM strength_logs sl
+        JOIN workout_sessions ws ON ws.session_id = sl.session_id
+        WHERE sl.exercise_id = e.exercise_id
+          AND ws.user_id = p_user_id
+        ORDER BY ws.session_date DESC, sl.log_id DESC
+        LIMIT 1
+    ) last ON TRUE
     WHERE es.exercise_id = p_exercise_id
-    ORDER BY e.exercise_id, ws.session_date DESC NULLS LAST;
-END;
-$$ LANGUAGE plpgsql;
+    ORDER BY e.exercise_id;
+$$ LANGUAGE sql STABLE;
 
 -- Helper to add bidirectional substitution
 CREATE OR REPLACE FUNCTION add_substitution(ex1 INTEGER, ex2 INTEGER)
@@ -482,7 +735,7 @@ SELECT
     sl.reps,
     sl.weight_kg,
     sl.rpe,
-    calculate_1rm(sl.weight_kg, sl.reps) AS estimated_1rm,
+    sl.e1rm AS estimated_1rm,
     sl.created_at
 FROM strength_logs sl
 JOIN exercises e ON sl.exercise_id = e.exercise_id;
@@ -498,7 +751,8 @@ SELECT
     rl.avg_pace_per_km,
     rl.avg_heart_rate,
     rl.max_heart_rate,
-    calculate_trimp(rl.duration_minutes, rl.avg_heart_rate, rl.max_heart_rate) AS trimp_score,
+    rl.trimp_score,
+    rl.intensity_factor,
     rl.perceived_effort,
     rl.created_at
 FROM running_logs rl;
@@ -511,7 +765,7 @@ SELECT
     SUM(rl.distance_km) AS total_distance_km,
     COUNT(rl.log_id) AS run_count,
     SUM(rl.duration_minutes) AS total_duration_min,
-    AVG(calculate_trimp(rl.duration_minutes, rl.avg_heart_rate, rl.max_heart_rate)) AS avg_trimp
+    AVG(rl.trimp_score) AS avg_trimp
 FROM running_logs rl
 JOIN workout_sessions ws ON rl.session_id = ws.session_id
 GROUP BY ws.user_id, DATE_TRUNC('week', ws.session_date);
@@ -521,13 +775,13 @@ CREATE OR REPLACE VIEW weekly_strength_volume AS
 SELECT
     ws.user_id,
     DATE_TRUNC('week', ws.session_date)::DATE AS week_start,
-    e.muscle_group,
-    SUM(calculate_volume(sl.sets, sl.reps, sl.weight_kg)) AS total_volume,
+    COALESCE(emg.muscle_group, 'Other') AS muscle_group,
+    SUM(sl.volume_kg * COALESCE(emg.share, 1)) AS total_volume,
     COUNT(DISTINCT ws.session_id) AS session_count
 FROM strength_logs sl
 JOIN workout_sessions ws ON sl.session_id = ws.session_id
-JOIN exercises e ON sl.exercise_id = e.exercise_id
-GROUP BY ws.user_id, DATE_TRUNC('week', ws.session_date), e.muscle_group;
+LEFT JOIN exercise_muscle_groups emg ON emg.exercise_id = sl.exercise_id
+GROUP BY ws.user_id, DATE_TRUNC('week', ws.session_date), COALESCE(emg.muscle_group, 'Other');
 
 -- User dashboard summary
 CREATE OR REPLACE VIEW user_dashboard_summary AS
@@ -544,7 +798,7 @@ SELECT
      FROM running_logs rl
      JOIN workout_sessions ws ON rl.session_id = ws.session_id
      WHERE ws.user_id = u.user_id) AS total_distance_km,
-    (SELECT COALESCE(SUM(calculate_volume(sl.sets, sl.reps, sl.weight_kg)), 0)
+    (SELECT COALESCE(SUM(sl.volume_kg), 0)
      FROM strength_logs sl
      JOIN workout_sessions ws ON sl.session_id = ws.session_id
      WHERE ws.user_id = u.user_id) AS total_volume_lifted
@@ -557,54 +811,58 @@ SELECT DISTINCT ON (ws.user_id, sl.exercise_id)
     e.name AS exercise_name,
     sl.weight_kg AS best_weight,
     sl.reps AS reps_at_best,
-    calculate_1rm(sl.weight_kg, sl.reps) AS estimated_1rm,
+    sl.e1rm AS estimated_1rm,
     ws.session_date AS achieved_date
 FROM strength_logs sl
 JOIN workout_sessions ws ON sl.session_id = ws.session_id
 JOIN exercises e ON sl.exercise_id = e.exercise_id
 WHERE e.exercise_type = 'strength'
-ORDER BY ws.user_id, sl.exercise_id, calculate_1rm(sl.weight_kg, sl.reps) DESC;
+ORDER BY ws.user_id, sl.exercise_id, sl.e1rm DESC NULLS LAST;
 
--- Running PRs
+-- Running PRs: best efforts from the app-maintained ledger (fastest segment
+-- inside any run, reported in minutes like the view always has; the ledger
+-- stores seconds) plus longest run (km) and best average pace (min/km), each
+-- with the date the record was actually set.
 CREATE OR REPLACE VIEW running_prs AS
-SELECT
-    ws.user_id,
-    'Fastest 5K' AS record_type,
-    MIN(rl.duration_minutes) AS value,
-    MIN(ws.session_date) AS achieved_date
-FROM running_logs rl
-JOIN workout_sessions ws ON rl.session_id = ws.session_id
-WHERE rl.distance_km BETWEEN 4.9 AND 5.1
-GROUP BY ws.user_id
-UNION ALL
-SELECT
-    ws.user_id,
-    'Fastest 10K' AS record_type,
-    MIN(rl.duration_minutes) AS value,
-    MIN(ws.session_date) AS achieved_date
-FROM running_logs rl
-JOIN workout_sessions ws ON rl.session_id = ws.session_id
-WHERE rl.distance_km BETWEEN 9.9 AND 10.1
-GROUP BY ws.user_id
+SELECT * FROM (
+    SELECT DISTINCT ON (l.user_id, l.distance_key)
+        l.user_id,
+        'Fastest ' || CASE l.distance_key
+            WHEN '400m' THEN '400m'
+            WHEN '1k' THEN '1K'
+            WHEN '5k' THEN '5K'
+            WHEN '10k' THEN '10K'
+            WHEN 'half' THEN 'Half Marathon'
+        END AS record_type,
+        ROUND(l.elapsed_seconds / 60.0, 2) AS value,
+        l.achieved_date
+    FROM running_pr_ledger l
+    ORDER BY l.user_id, l.distance_key, l.elapsed_seconds, l.achieved_date
+) efforts
 UNION ALL
-SELECT
-    ws.user_id,
-    'Longest Run' AS record_type,
-    MAX(rl.distance_km) AS value,
-    MAX(ws.session_date) AS achieved_date
-FROM running_logs rl
-JOIN workout_sessions ws ON rl.session_id = ws.session_id
-GROUP BY ws.user_id
+SELECT * FROM (
+    SELECT DISTINCT ON (ws.user_id)
+        ws.user_id,
+        'Longest Run' AS record_type,
+        rl.distance_km AS value,
+        ws.session_date AS achieved_date
+    FROM running_logs rl
+    JOIN workout_sessions ws ON rl.session_id = ws.session_id
+    WHERE rl.distance_km IS NOT NULL
+    ORDER BY ws.user_id, rl.distance_km DESC, ws.session_date
+) longest
 UNION ALL
-SELECT
-    ws.user_id,
-    'Best Pace' AS record_type,
-    MIN(rl.avg_pace_per_km) AS value,
-    MIN(ws.session_date) AS achieved_date
-FROM running_logs rl
-JOIN workout_sessions ws ON rl.session_id = ws.session_id
-WHERE rl.avg_pace_per_km > 0
-GROUP BY ws.user_id;
+SELECT * FROM (
+    SELECT DISTINCT ON (ws.user_id)
+        ws.user_id,
+        'Best Pace' AS record_type,
+        rl.avg_pace_per_km AS value,
+        ws.session_date AS achieved_date
+    FROM running_logs rl
+    JOIN workout_sessions ws ON rl.session_id = ws.session_id
+    WHERE rl.avg_pace_per_km > 0
+    ORDER BY ws.user_id, rl.avg_pace_per_km, ws.session_date
+) pace;
 
 -- Recovery trends
 CREATE OR REPLACE VIEW recovery_trends AS
@@ -644,3 +902,15 @@ INSERT INTO exercises (name, description, muscle_group, exercise_type) VALUES
 ('Tempo Run', 'Sustained harder effort', 'Cardio', 'cardio'),
 ('Interval Run', 'High intensity intervals', 'Cardio', 'cardio'),
 ('Long Run', 'Endurance building run', 'Cardio', 'cardio');
+
+-- Muscle group mapping for the sample exercises (same shares as the app)
+INSERT INTO exercise_muscle_groups (exercise_id, muscle_group, share, position)
+SELECT
+    e.exercise_id,
+    TRIM(g.name),
+    CASE WHEN g.ord = 1 THEN 1.0 ELSE 0.5 END / (1 + 0.5 * (c.cnt - 1)),
+    g.ord - 1
+FROM exercises e
+CROSS JOIN LATERAL unnest(string_to_array(e.muscle_group, ',')) WITH ORDINALITY AS g(name, ord)
+CROSS JOIN LATERAL (SELECT cardinality(string_to_array(e.muscle_group, ',')) AS cnt) c
+WHERE TRIM(g.name) <> '';
@@ -144,3 +144,39 @@ def sample_recovery(app, sample_user):
         db.session.commit()
 
         return recovery
+
+
+@pytest.fixture
+def add_strength_log(app, sample_user, sample_exercises):
+    """Factory: log one exercise in a new strength session and commit.
+
+    ``day`` defaults to ``days_ago`` days before today; ``detail`` is a
+    list of (reps, weight_kg, rpe) sets. Other keywords go to StrengthLog.
+    """
+    def add(exercise='Bench Press', day=None, days_ago=0, detail=None, sets=3, user_id=None, **fields):
+        session = WorkoutSession(user_id=user_id or sample_user.user_id, session_type='upper_body',
+                                 session_date=day or date.today() - timedelta(days=days_ago))
+        exercise_id = Exercise.query.filter_by(name=exercise).first().exercise_id
+        log = StrengthLog(session=session, exercise_id=exercise_id, sets=sets, **fields)
+        if detail:
+            log.set_sets(detail)
+        db.session.add_all([session, log])
+        db.session.commit()
+        return log
+
+    return add
+
+
+@pytest.fixture
+def add_recovery_log(app, sample_user):
+    """Factory: commit a recovery log dated ``day`` (or ``days_ago`` days ago)."""
+    def add(day=None, days_ago=0, sleep=7, energy=7, soreness=3, motivation=7, user_id=None):
+        log = RecoveryLog(user_id=user_id or sample_user.user_id,
+                          log_date=day or date.today() - timedelta(days=days_ago),
+                          sleep_quality=sleep, energy_level=energy, muscle_soreness=soreness,
+                          motivation_score=motivation)
+        db.session.add(log)
+        db.session.commit()
+        return log
+
+    return add
@@ -0,0 +1,124 @@
+"""Tests for the generic time-bucketed aggregation."""
+from datetime import date
+
+import pytest
+from app import db
+from app.models import Exercise, ExerciseMuscleGroup, WorkoutSession, RunningLog
+from app.services.aggregation import aggregate, bucket_start, bucket_starts, bucket_count, shift
+
+
+def add_run(user_id, day, distance, run_type='easy'):
+    session = WorkoutSession(user_id=user_id, session_type='running', session_date=day)
+    db.session.add_all([session, RunningLog(session=session, run_type=run_type, distance_km=distance,
+                                            duration_minutes=int(distance * 6))])
+    db.session.commit()
+
+
+class TestBuckets:
+    """Tests for bucket arithmetic."""
+
+    def test_bucket_start(self):
+        day = date(2024, 8, 15)  # a Thursday
+        assert [bucket_start(day, b) for b in ('day', 'week', 'month', 'quarter', 'year')] == [
+            day, date(2024, 8, 12), date(2024, 8, 1), date(2024, 7, 1), date(2024, 1, 1)
+        ]
+
+    def test_shift_and_dense_starts(self):
+        assert shift(date(2024, 11, 1), 'quarter', 1) == date(2025, 2, 1)
+        assert shift(date(2024, 1, 1), 'month', -1) == date(2023, 12, 1)
+        assert bucket_starts(date(2024, 1, 20), date(2024, 4, 2), 'month') == [
+            date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1)
+        ]
+        assert bucket_count(date(2024, 1, 3), date(2024, 1, 15), 'week') == 3
+        assert bucket_count(date(1, 1, 1), date(9999, 12, 31), 'day') == 3652059
+        assert bucket_starts(date(9999, 12, 1), date(9999, 12, 31), 'week')[-1] == date(9999, 12, 27)
+
+
+class TestAggregate:
+    """Tests for the GROUP BY queries and zero-filling."""
+
+    def test_weekly_volume_by_muscle_group_is_dense(self, app, sample_user, add_strength_log):
+        with app.app_context():
+            bench = Exercise.query.filter_by(name='Bench Press').first()
+            ExerciseMuscleGroup.query.filter_by(exercise_id=bench.exercise_id).delete()
+            db.session.add_all([
+                ExerciseMuscleGroup(exercise_id=bench.exercise_id, muscle_group='Chest', share=0.75),
+                ExerciseMuscleGroup(exercise_id=bench.exercise_id, muscle_group='Triceps', share=0.25, position=1)
+            ])
+            db.session.commit()
+            add_strength_log('Bench Press', date(2024, 3, 4), reps=10, weight_kg=50)  # 1500 kg
+            add_strength_log('Bench Press', date(2024, 3, 10), reps=10, weight_kg=50)  # same week (Sunday)
+            add_strength_log('Squat', date(2024, 3, 20), reps=10, weight_kg=100)
+
+            result = aggregate(sample_user.user_id, ['strength_volume'], 'week',
+                               date(2024, 3, 4), date(2024, 3, 24), 'muscle_group')
+            assert result['buckets'] == ['2024-03-04', '2024-03-11', '2024-03-18']
+            series = result['metrics']['strength_volume']['series']
+            assert series['Legs'] == [0, 0, 3000.0]
+            assert series['Chest'] == [2250.0, 0, 0]
+            assert series['Triceps'] == [750.0, 0, 0]
+            assert list(series)[0] == 'Legs'  # largest first
+
+    def test_monthly_quarterly_and_ungrouped(self, app, sample_user, add_strength_log):
+        with app.app_context():
+            add_strength_log('Squat', date(2024, 1, 31), reps=10, weight_kg=50)
+            add_strength_log('Squat', date(2024, 3, 1), reps=10, weight_kg=50)
+            add_run(sample_user.user_id, date(2024, 2, 10), 10, 'long')
+            add_run(sample_user.user_id, date(2024, 4, 5), 5)
+
+            result = aggregate(sample_user.user_id, ['sessions', 'running_distance'], 'month',
+                               date(2024, 1, 1), date(2024, 4, 30))
+            assert result['metrics']['sessions']['series'] == {'total': [1, 1, 1, 1]}
+            assert result['metrics']['running_distance']['series'] == {'total': [0, 10.0, 0, 5.0]}
+
+            quarters = aggregate(sample_user.user_id, ['running_distance'], 'quarter',
+                                 date(2024, 1, 1), date(2024, 6, 30), 'run_type')
+            assert quarters['buckets'] == ['2024-01-01', '2024-04-01']
+            assert quarters['metrics']['running_distance']['series'] == {'long': [10.0, 0], 'easy': [0, 5.0]}
+
+    def test_empty_averages_are_not_zero_filled(self, app, sample_user):
+        with app.app_context():
+            result = aggregate(sample_user.user_id, ['readiness'], 'day', date(2024, 1, 1), date(2024, 1, 3))
+            assert result['metrics']['readiness']['series'] == {'total': [None, None, None]}
+
+    @pytest.mark.parametrize('kwargs', [
+        {'metrics': []},
+        {'metrics': ['nope']},
+        {'metrics': ['sessions'], 'bucket': 'fortnight'},
+        {'metrics': ['sessions'], 'group_by': 'run_type'},
+        {'metrics': ['hard_sets'], 'bucket': 'day'},
+        {'metrics': ['sessions'], 'bucket': 'day', 'start': date(2000, 1, 1)},
+    ])
+    def test_invalid_requests(self, app, sample_user, kwargs):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                aggregate(sample_user.user_id, **kwargs)
+
+
+class TestAggregateEndpoint:
+    """Tests for /analytics/api/aggregate and the volume chart endpoint."""
+
+    def test_endpoint(self, authenticated_client, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            add_strength_log('Squat', reps=10, weight_kg=50)
+
+        data = authenticated_client.get(
+            '/analytics/api/aggregate?metric=strength_volume,strength_sets&bucket=year&group_by=exercise'
+        ).get_json()
+        assert len(data['buckets']) == 5
+        assert data['metrics']['strength_sets']['series'] == {'Squat': [0, 0, 0, 0, 3.0]}
+
+        response = authenticated_client.get('/analytics/api/aggregate?metric=strength_volume&start=bad')
+        assert response.status_code == 400
+        for query in ('start=0001-01-01&end=9999-12-31&bucket=day', 'end=0001-01-02&bucket=month'):
+            response = authenticated_client.get(f'/analytics/api/aggregate?metric=sessions&{query}')
+            assert response.status_code == 400
+
+    def test_strength_volume_is_not_truncated(self, authenticated_client, app, sample_user, sample_exercises,
+                                              add_strength_log):
+        with app.app_context():
+            add_strength_log('Squat', reps=10, weight_kg=50)
+
+        data = authenticated_client.get('/analytics/api/strength-volume?weeks=8').get_json()
+        assert len(data) == 8
+        assert data[max(data)] == {'Legs': 1500.0}
@@ -0,0 +1,123 @@
+"""Tests for best-effort detection and the running PR ledger."""
+import io
+from datetime import date, timedelta
+
+import pytest
+from app import db
+from app.models import WorkoutSession, RunningLog, RunBestEffort, RunningPR
+from app.services.best_efforts import (
+    fastest_segment, find_best_efforts, backfill_user_efforts, current_prs, format_seconds, run_prs
+)
+from app.services.run_import import import_track
+from tests.test_run_import import make_fit
+
+
+class TestSlidingWindow:
+    """Tests for the O(n) fastest-segment search."""
+
+    def test_finds_fast_middle_section(self):
+        # 1 s samples: 3 m/s, then 300 s at 5 m/s, then 3 m/s again
+        time, distance, d = [], [], 0.0
+        for t in range(1000):
+            time.append(t)
+            distance.append(d)
+            d += 5.0 if 300 <= t < 600 else 3.0
+        elapsed, start = fastest_segment(time, distance, 1000)
+        assert elapsed == pytest.approx(200)
+        assert 300 <= start <= 400
+
+    def test_interpolates_between_sparse_samples(self):
+        time = [0, 100, 200]
+        distance = [0, 500, 1000]
+        # First full window ends at 500 m, so it starts 100 m (20 s) in
+        assert fastest_segment(time, distance, 400) == pytest.approx((80, 20))
+
+    def test_too_short(self):
+        assert fastest_segment([0, 60], [0, 300], 400) is None
+        assert set(find_best_efforts([0, 300, 600], [0, 1000, 2000])) == {'400m', '1k'}
+
+    def test_format_seconds(self):
+        assert format_seconds(1234.5) == '20:34'
+        assert format_seconds(4000) == '1:06:40'
+
+
+class TestLedger:
+    """Tests for persisted efforts and incremental PR updates."""
+
+    def _run(self, user_id, days_ago, distance_km, minutes):
+        session = WorkoutSession(user_id=user_id, session_type='running',
+                                 session_date=date.today() - timedelta(days=days_ago))
+        run = RunningLog(session=session, run_type='easy', distance_km=distance_km,
+                         duration_minutes=minutes)
+        db.session.add_all([session, run])
+        db.session.commit()  # the commit hook stores the efforts and updates the ledger
+        return run, run_prs(run)
+
+    def test_summary_runs_and_incremental_ledger(self, app, sample_user):
+        with app.app_context():
+            _, prs = self._run(sample_user.user_id, 10, 5.0, 25)
+            assert [pr.distance_key for pr in prs] == ['5k']
+            _, prs = self._run(sample_user.user_id, 5, 5.02, 27)
+            assert prs == []
+            run, prs = self._run(sample_user.user_id, 1, 4.98, 23)
+            assert [(pr.distance_key, float(pr.previous_seconds)) for pr in prs] == [('5k', 1500.0)]
+            assert RunningPR.query.count() == 2
+
+            data = current_prs(sample_user.user_id)
+            assert data[0]['time'] == '23:00'
+            assert data[0]['achieved_date'] == str(date.today() - timedelta(days=1))
+
+    def test_backdated_run_rebuilds_ledger(self, app, sample_user):
+        with app.app_context():
+            self._run(sample_user.user_id, 1, 5.0, 25)
+            self._run(sample_user.user_id, 20, 5.0, 22)
+            # The older, faster run is the record and the newer one is not a PR
+            prs = RunningPR.query.order_by(RunningPR.achieved_date).all()
+            assert [float(pr.elapsed_seconds) for pr in prs] == [1320.0]
+
+    def test_import_finds_efforts_inside_run(self, app, sample_user):
+        with app.app_context():
+            session = WorkoutSession(user_id=sample_user.user_id, session_date=date.today(),
+                                     session_type='running')
+            run = RunningLog(session=session, run_type='easy')
+            db.session.add_all([session, run])
+            db.session.flush()
+            # 600 s at 3.5 m/s -> 2.1 km, no standard distance matches the total
+            samples = [(150, i * 3.5, 10) for i in range(601)]
+            import_track(run, 'run.fit', io.BytesIO(make_fit(samples)))
+            db.session.commit()
+            new_prs = run_prs(run)
+
+            efforts = {e.distance_key: float(e.elapsed_seconds) for e in run.best_efforts}
+            assert efforts == {'400m': pytest.approx(114.3), '1k': pytest.approx(285.7)}
+            assert sorted(pr.distance_key for pr in new_prs) == ['1k', '400m']
+
+    def test_deleting_run_drops_its_pr(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            self._run(sample_user.user_id, 10, 5.0, 25)
+            fast, _ = self._run(sample_user.user_id, 1, 5.0, 20)
+            authenticated_client.post(f'/running/session/{fast.session_id}/delete')
+
+            assert RunBestEffort.query.count() == 1
+            assert [float(pr.elapsed_seconds) for pr in RunningPR.query.all()] == [1500.0]
+            response = authenticated_client.get('/running/api/prs')
+            assert response.get_json()[0]['time'] == '25:00'
+
+    def test_workout_delete_replays_ledger(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            self._run(sample_user.user_id, 10, 5.0, 25)
+            fast, prs = self._run(sample_user.user_id, 1, 5.0, 21)
+            assert [float(pr.elapsed_seconds) for pr in prs] == [1260.0]
+            authenticated_client.post(f'/workouts/session/{fast.session_id}/delete')
+
+            assert [float(pr.elapsed_seconds) for pr in RunningPR.query.all()] == [1500.0]
+
+    def test_backfill(self, app, sample_user):
+        with app.app_context():
+            self._run(sample_user.user_id, 3, 10.0, 50)
+            RunBestEffort.query.delete()
+            RunningPR.query.delete()
+            db.session.commit()
+            assert backfill_user_efforts(sample_user.user_id) == 1
+            db.session.commit()
+            assert [p['distance'] for p in current_prs(sample_user.user_id)] == ['10k']
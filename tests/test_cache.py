@@ -0,0 +1,240 @@
+"""Tests for the cache layer and its backends."""
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.cache import Cache, MemoryBackend, FileSystemBackend, RedisBackend, TTLCache
+from app.models import Exercise
+
+
+class StandInRedisHandler(socketserver.StreamRequestHandler):
+    """Tiny RESP2 server implementing the commands the backend uses."""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def write_bulk(self, value):
+        if value is None:
+            self.wfile.write(b'$-1\r\n')
+        else:
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            cmd = args[0].upper()
+            if cmd == b'GET':
+                self.write_bulk(store.get(args[1]))
+            elif cmd == b'MGET':
+                self.wfile.write(b'*%d\r\n' % (len(args) - 1))
+                for key in args[1:]:
+                    self.write_bulk(store.get(key))
+            elif cmd == b'SET':
+                store[args[1]] = args[2]
+                self.wfile.write(b'+OK\r\n')
+            elif cmd == b'DEL':
+                removed = sum(1 for key in args[1:] if store.pop(key, None) is not None)
+                self.wfile.write(b':%d\r\n' % removed)
+            elif cmd == b'INCRBY':
+                store[args[1]] = b'%d' % (int(store.get(args[1], 0)) + int(args[2]))
+                self.wfile.write(b':%s\r\n' % store[args[1]])
+            elif cmd == b'SCAN':
+                prefix = args[3].rstrip(b'*')
+                keys = [k for k in store if k.startswith(prefix)]
+                self.wfile.write(b'*2\r\n$1\r\n0\r\n*%d\r\n' % len(keys))
+                for key in keys:
+                    self.write_bulk(key)
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+
+
+@pytest.fixture
+def redis_server():
+    """Run a stand-in Redis-protocol server on a free local port."""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StandInRedisHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_cache(backend):
+    cache = Cache()
+    cache.backend = backend
+    return cache
+
+
+class TestCacheFacade:
+    """Tests for get/set/delete, tags and stats."""
+
+    def test_get_set_delete(self):
+        cache = make_cache(MemoryBackend())
+        assert cache.get('missing') is None
+        cache.set('key', {'value': [1, 2, 3]})
+        assert cache.get('key') == {'value': [1, 2, 3]}
+        cache.delete('key')
+        assert cache.get('key', 'default') == 'default'
+
+    def test_tag_invalidation(self):
+        cache = make_cache(MemoryBackend())
+        cache.set('a', 1, tags=['user:1'])
+        cache.set('b', 2, tags=['user:2'])
+        cache.invalidate_tags('user:1')
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        cache.set('a', 3, tags=['user:1'])
+        assert cache.get('a') == 3
+
+    def test_get_or_set_and_stats(self):
+        cache = make_cache(MemoryBackend())
+        calls = []
+        for _ in range(3):
+            cache.get_or_set('computed', lambda: calls.append(1) or 42)
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['backend'] == 'memory'
+
+
+    def test_invalidation_during_compute_is_a_miss(self):
+        cache = make_cache(MemoryBackend())
+
+        def producer():
+            cache.invalidate_tags('user:1')  # a commit lands while the value is computed
+            return 'stale'
+
+        assert cache.get_or_set('view', producer, tags=['user:1']) == 'stale'
+        assert cache.get_or_set('view', lambda: 'fresh', tags=['user:1']) == 'fresh'
+        assert cache.get('view') == 'fresh'
+
+
+class TestBackends:
+    """Tests for the individual storage drivers."""
+
+    def test_memory_byte_budget_evicts_lru(self):
+        backend = MemoryBackend(max_bytes=10)
+        backend.set('a', b'12345')
+        backend.set('b', b'12345')
+        backend.get('a')
+        backend.set('c', b'12345')
+        assert backend.get('b') is None
+        assert backend.get('a') == b'12345'
+        assert backend.info()['bytes'] <= 10
+
+    def test_memory_expiry(self):
+        backend = MemoryBackend()
+        backend.set('a', b'x', timeout=0.01)
+        time.sleep(0.02)
+        assert backend.get('a') is None
+
+    def test_filesystem_shared_between_instances(self, tmp_path):
+        writer = make_cache(FileSystemBackend(str(tmp_path)))
+        reader = make_cache(FileSystemBackend(str(tmp_path)))
+        writer.set('shared', {'n': 1}, tags=['exercises'])
+        assert reader.get('shared') == {'n': 1}
+        reader.invalidate_tags('exercises')
+        assert writer.get('shared') is None
+
+    def test_redis_protocol_backend(self, redis_server):
+        port = redis_server.server_address[1]
+        cache = make_cache(RedisBackend(url=f'redis://127.0.0.1:{port}/0', key_prefix='wt:'))
+        cache.key_prefix = 'wt:'
+        cache.set('k', [1, 2], tags=['t'])
+        assert cache.get('k') == [1, 2]
+        cache.invalidate_tags('t')
+        assert cache.get('k') is None
+        cache.set('k2', 'v')
+        cache.clear()
+        assert redis_server.store == {}
+
+    def test_redis_unavailable_is_a_miss(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        cache = make_cache(RedisBackend(url=f'redis://127.0.0.1:{port}/0'))
+        cache.set('k', 1)
+        assert cache.get('k') is None
+
+    def test_stats_shared_between_processes(self, tmp_path, redis_server):
+        port = redis_server.server_address[1]
+        for backend in (lambda: FileSystemBackend(str(tmp_path)),
+                        lambda: RedisBackend(url=f'redis://127.0.0.1:{port}/0')):
+            worker, cli = make_cache(backend()), make_cache(backend())
+            worker.get_or_set('k', lambda: 1)
+            worker.get('k')
+            worker._flush_stats()  # a worker's counts reach the backend every few seconds
+            assert (cli.stats()['hits'], cli.stats()['misses']) == (1, 1)
+            cli.reset_stats()
+            assert worker.stats()['hits'] == 0
+
+    def test_filesystem_culls_oldest_entries(self, tmp_path):
+        backend = FileSystemBackend(str(tmp_path), max_entries=3)
+        for i in range(4):
+            backend.set(f'k{i}', b'x')
+            os.utime(backend._path(f'k{i}'), (i, i))
+        assert backend.get('k0') is None
+        assert backend.get('k3') == b'x'
+        assert backend.info()['items'] == 3
+        assert backend.incr('hits', 2) == 2 and backend.get_counters(['hits']) == [2]
+
+    def test_memory_refused_with_several_workers(self):
+        with pytest.raises(ValueError):
+            Cache()._create_backend({'CACHE_TYPE': 'memory', 'WEB_CONCURRENCY': 2})
+        assert Cache()._create_backend({'CACHE_TYPE': 'memory', 'WEB_CONCURRENCY': 1}).name == 'memory'
+
+    def test_ttl_cache(self):
+        ttl_cache = TTLCache(ttl=60, max_entries=2)
+        ttl_cache.set(1, 'a')
+        ttl_cache.set(2, 'b')
+        ttl_cache.set(3, 'c')
+        assert ttl_cache.get(1) is None
+        assert ttl_cache.get(3) == 'c'
+
+
+class TestCacheInvalidationHooks:
+    """Tests that model writes invalidate cached data."""
+
+    def test_catalog_refreshes_after_new_exercise(self, app, sample_exercises):
+        with app.app_context():
+            names = [e['name'] for e in Exercise.get_catalog()]
+            assert 'Overhead Press' not in names
+
+            db.session.add(Exercise(name='Overhead Press', muscle_group='Shoulders',
+                                    exercise_type='strength'))
+            db.session.commit()
+
+            names = [e['name'] for e in Exercise.get_catalog()]
+            assert 'Overhead Press' in names
+
+    def test_tags_expire_on_commit_only(self, app, sample_exercises):
+        with app.app_context():
+            Exercise.get_catalog()
+            db.session.add(Exercise(name='Dip', muscle_group='Chest', exercise_type='strength'))
+            db.session.flush()
+            assert 'Dip' not in [e['name'] for e in Exercise.get_catalog()]  # not committed yet
+
+            db.session.rollback()
+            db.session.add(Exercise(name='Curl', muscle_group='Arms', exercise_type='strength'))
+            db.session.commit()
+            names = [e['name'] for e in Exercise.get_catalog()]
+            assert 'Curl' in names and 'Dip' not in names
@@ -0,0 +1,123 @@
+"""Tests for the e1RM formula registry and stored estimates."""
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import column, select, Integer, Numeric
+
+from app import db
+from app.cache import cache, user_tag
+from app.models import User, StrengthLog, PersonalRecord
+from app.services.e1rm import FORMULAS, estimate, estimate_array, sql_expression, sql_function
+from app.services.strength_sets import recompute_user_strength
+
+SETS = [(100, 5, None), (100, 5, 8), (80, 1, None), (60, 12, 7), (0, 5, None), (100, None, None)]
+
+
+class TestFormulas:
+    """Tests for the registry evaluators."""
+
+    def test_known_values(self):
+        assert estimate(100, 5) == pytest.approx(116.67)
+        assert estimate(100, 5, formula='brzycki') == pytest.approx(112.5)
+        assert estimate(100, 5, formula='lombardi') == pytest.approx(117.46)
+        # 5 reps at RPE 8 is 7 reps to failure: 81.1% of 1RM
+        assert estimate(100, 5, 8, formula='rpe') == pytest.approx(123.3)
+
+    def test_edge_cases(self):
+        for key in FORMULAS:
+            assert estimate(0, 5, formula=key) == 0
+            assert estimate(None, 5, formula=key) == 0
+            assert estimate(100, None, formula=key) == 0
+        assert estimate(80, 1, formula='brzycki') == 80
+        assert estimate(80, 1, 10, formula='rpe') == 80
+        assert estimate(80, 1, 8, formula='rpe') > 80
+
+    def test_unknown_formula_falls_back_to_default(self):
+        assert estimate(100, 5, formula='nope') == estimate(100, 5)
+        assert estimate(100, 5, formula=None) == estimate(100, 5)
+
+    def test_array_matches_scalar(self):
+        weights, reps, rpes = zip(*SETS)
+        for key in FORMULAS:
+            values = estimate_array(weights, reps, rpes, key)
+            assert values.tolist() == [estimate(*row, formula=key) for row in SETS]
+
+    @pytest.mark.parametrize('key', ['epley', 'brzycki', 'rpe'])
+    def test_sql_matches_numpy(self, app, key):
+        weight, reps, rpe = column('weight', Numeric), column('reps', Integer), column('rpe', Integer)
+        with app.app_context():
+            for row in SETS:
+                query = select(sql_expression(weight, reps, rpe, key)).select_from(
+                    select(*(
+                        db.literal(value, type_).label(name)
+                        for name, value, type_ in zip(('weight', 'reps', 'rpe'), row,
+                                                      (Numeric, Integer, Integer))
+                    )).subquery()
+                )
+                value = db.session.execute(query).scalar()
+                assert float(value) == pytest.approx(estimate(*row, formula=key), abs=0.01)
+
+    def test_setup_sql_is_generated(self):
+        setup_sql = Path(__file__).resolve().parent.parent / 'setup_database.sql'
+        assert sql_function() in setup_sql.read_text()
+
+
+class TestStoredE1rm:
+    """Tests for the flush hook and formula changes."""
+
+    def test_stored_on_insert_and_edit(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(reps=5, weight_kg=100)
+            assert float(log.e1rm) == pytest.approx(116.67)
+
+            log.reps = 3
+            db.session.commit()
+            assert log.estimated_1rm == pytest.approx(estimate(100, 3))
+
+    def test_uses_owner_formula(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            user = db.session.get(User, sample_user.user_id)
+            user.e1rm_formula = 'rpe'
+            db.session.commit()
+            log = add_strength_log(reps=5, weight_kg=100, rpe=8)
+            assert log.estimated_1rm == pytest.approx(123.3)
+
+    def test_recompute_after_formula_change(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            logs = [add_strength_log(reps=r, weight_kg=w, rpe=rpe)
+                    for w, r, rpe in SETS[:4]]
+            user = db.session.get(User, sample_user.user_id)
+            user.e1rm_formula = 'brzycki'
+            assert recompute_user_strength(user.user_id) == 4
+            db.session.commit()
+
+            stored = [db.session.get(StrengthLog, log.log_id).estimated_1rm for log in logs]
+            expected = estimate_array(*zip(*SETS[:4]), formula='brzycki')
+            assert np.allclose(stored, expected)
+
+    def test_recompute_rebuilds_prs_and_expires_cache(self, app, sample_user, sample_exercises,
+                                                      add_strength_log):
+        with app.app_context():
+            log = add_strength_log(reps=10, weight_kg=80)
+            PersonalRecord.check_and_update_pr(sample_user.user_id, log.exercise_id, '1RM',
+                                               log.estimated_1rm, date.today())
+            version = cache.tag_version(user_tag(sample_user.user_id))
+
+            user = db.session.get(User, sample_user.user_id)
+            user.e1rm_formula = 'brzycki'
+            recompute_user_strength(user.user_id)
+            db.session.commit()
+
+            assert cache.tag_version(user_tag(sample_user.user_id)) != version
+            record = PersonalRecord.query.filter_by(user_id=sample_user.user_id, record_type='1RM').one()
+            assert float(record.value) == pytest.approx(estimate(80, 10, formula='brzycki'))
+
+    def test_best_1rm_reads_stored_column(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            add_strength_log(reps=10, weight_kg=80)
+            best = add_strength_log(reps=3, weight_kg=100)
+            result = StrengthLog.get_best_1rm(sample_user.user_id, best.exercise_id)
+            assert result['estimated_1rm'] == pytest.approx(110.0)
+            assert result['reps'] == 3
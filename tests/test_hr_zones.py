@@ -0,0 +1,99 @@
+"""Tests for heart-rate zone analytics."""
+import io
+from datetime import date
+
+import pytest
+from app import db
+from app.models import User, WorkoutSession, RunningLog
+from app.services.hr_zones import (
+    zone_edges, zone_seconds, zone_seconds_from_average, update_run_zones, zone_distribution
+)
+from app.services.run_import import import_track
+from tests.test_run_import import make_fit
+
+
+class TestZoneMath:
+    """Tests for zone binning."""
+
+    def test_edges_use_heart_rate_reserve_when_resting_known(self):
+        assert list(zone_edges(200)) == [100, 120, 140, 160, 180]
+        assert list(zone_edges(200, 50)) == [125, 140, 155, 170, 185]
+
+    def test_zone_seconds_from_samples(self):
+        time = [0, 10, 20, 30, 40, 100, 110]
+        hr = [110, 130, 150, 170, 190, 190, 210]
+        # 110-120 -> zone1, the 60 s gap after t=40 is not counted
+        assert zone_seconds(time, hr, 200) == [10, 10, 10, 10, 10]
+
+    def test_below_zone1_not_counted(self):
+        assert zone_seconds([0, 60], [80, 80], 200) == [0, 0, 0, 0, 0]
+
+    def test_average_fallback(self):
+        assert zone_seconds_from_average(150, 30, 200) == [0, 0, 1800, 0, 0]
+        assert zone_seconds_from_average(None, 30, 200) == [0] * 5
+
+
+class TestStoredZones:
+    """Tests for per-run stored zone vectors."""
+
+    def _add_run(self, user_id, avg_hr, max_hr, minutes=30):
+        session = WorkoutSession(user_id=user_id, session_date=date.today(), session_type='running')
+        db.session.add(session)
+        db.session.flush()
+        run = RunningLog(session_id=session.session_id, run_type='easy', duration_minutes=minutes,
+                         avg_heart_rate=avg_hr, max_heart_rate=max_hr)
+        db.session.add(run)
+        update_run_zones(run, user_id)
+        db.session.commit()
+        return run
+
+    def test_distribution_sums_stored_vectors(self, app, sample_user):
+        with app.app_context():
+            user = db.session.get(User, sample_user.user_id)
+            user.max_heart_rate = 200
+            db.session.commit()
+            self._add_run(user.user_id, 130, 160)
+            self._add_run(user.user_id, 175, 195, minutes=20)
+
+            data = zone_distribution(user.user_id)
+            assert [z['minutes'] for z in data['zones']] == [0, 30, 0, 20, 0]
+            assert data['total_minutes'] == 50
+            assert data['estimated_max_hr'] == 200
+
+    def test_new_recorded_max_recomputes_other_runs(self, app, sample_user):
+        with app.app_context():
+            first = self._add_run(sample_user.user_id, 150, 160)
+            # Max HR 160: 150 bpm is 94% -> zone 5
+            assert first.zone5_seconds == 1800
+            self._add_run(sample_user.user_id, 120, 200)
+            # Max HR now 200: 150 bpm is 75% -> zone 3
+            first = db.session.get(RunningLog, first.log_id)
+            assert first.zone3_seconds == 1800 and first.zone5_seconds == 0
+
+    def test_import_uses_heart_rate_stream(self, app, sample_user):
+        with app.app_context():
+            user = db.session.get(User, sample_user.user_id)
+            user.max_heart_rate = 200
+            session = WorkoutSession(user_id=user.user_id, session_date=date.today(),
+                                     session_type='running')
+            run = RunningLog(session=session, run_type='easy')
+            db.session.add_all([session, run])
+            db.session.flush()
+            samples = [(130 if i < 20 else 185, i * 3.0, 10) for i in range(40)]
+            import_track(run, 'run.fit', io.BytesIO(make_fit(samples)))
+            db.session.commit()
+            assert [run.zone1_seconds, run.zone2_seconds, run.zone5_seconds] == [0, 20, 19]
+
+    def test_profile_change_recomputes(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            run = self._add_run(sample_user.user_id, 150, 160)
+            response = authenticated_client.post('/profile', data={
+                'action': 'update_heart_rate', 'max_heart_rate': '200', 'resting_heart_rate': ''
+            })
+            assert response.status_code == 302
+            run = db.session.get(RunningLog, run.log_id)
+            db.session.refresh(run)
+            assert run.zone3_seconds == 1800
+
+            response = authenticated_client.get('/analytics/api/running-zones')
+            assert response.get_json()['estimated_max_hr'] == 200
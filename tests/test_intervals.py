@@ -0,0 +1,115 @@
+"""Tests for structured intervals parsed from interval_details."""
+from datetime import date, timedelta
+
+import pytest
+from app import db
+from app.models import WorkoutSession, RunningLog, RunInterval
+from app.services import intervals
+from app.services.intervals import (
+    parse_interval_details, measure_segments, parse_all_intervals, shape_label
+)
+
+
+class TestParser:
+    """Tests for the free-text parser."""
+
+    def test_builder_format(self):
+        segments = parse_interval_details(
+            "10min warm up (easy) + 5x1min30 @ 4'30\" / 1min jog + 10min cool down (easy)"
+        )
+        assert [s['kind'] for s in segments] == ['warmup'] + ['rep'] * 5 + ['cooldown']
+        rep = segments[1]
+        assert rep['duration_seconds'] == 90 and rep['target_pace'] == 4.5
+        assert rep['recovery_seconds'] == 60 and rep['recovery_type'] == 'jog'
+        assert segments[5]['recovery_seconds'] is None  # no recovery after the last rep
+
+    def test_distance_reps_with_actual_paces(self):
+        segments = parse_interval_details("3x1.5km at 4:00 w/ 2min rest (3'58, 4'02, 3'55)")
+        assert [s['distance_m'] for s in segments] == [1500, 1500, 1500]
+        assert [s['actual_pace'] for s in segments] == [3.97, 4.03, 3.92]
+        assert segments[0]['recovery_type'] == 'rest'
+
+    def test_unparseable(self):
+        assert parse_interval_details('felt good') == []
+        assert parse_interval_details(None) == []
+
+    def test_results_are_cached(self, app, monkeypatch):
+        with app.app_context():
+            calls = []
+            real_parse = intervals._parse
+            monkeypatch.setattr(intervals, '_parse', lambda text: calls.append(text) or real_parse(text))
+            parse_interval_details('6x400m @ 3:30')
+            parse_interval_details('6x400m @ 3:30')
+            assert len(calls) == 1
+
+    def test_shape_label(self):
+        assert shape_label(400, None) == '400m'
+        assert shape_label(1500, None) == '1.5km'
+        assert shape_label(None, 90) == '1min30'
+        assert shape_label(None, 30) == '30s'
+
+
+class TestMeasurement:
+    """Tests for actual rep paces from samples."""
+
+    def test_measure_time_reps(self):
+        # 60 s warm-up at 3 m/s, then 30 s reps at 5 m/s with 30 s walks at 1 m/s
+        time, distance, d = [], [], 0.0
+        for t in range(241):
+            time.append(t)
+            distance.append(d)
+            phase = (t - 60) % 60 if t >= 60 else None
+            d += 3.0 if phase is None else 5.0 if phase < 30 else 1.0
+        segments = [dict(s) for s in parse_interval_details('1min warm up + 3x30s / 30s walk')]
+        measure_segments(segments, time, distance)
+        assert [s['actual_pace'] for s in segments[1:]] == [3.33, 3.33, 3.33]
+
+
+class TestStorage:
+    """Tests for stored rows, the bulk parse and the trend query."""
+
+    def _run(self, user_id, days_ago, details):
+        session = WorkoutSession(user_id=user_id, session_type='running',
+                                 session_date=date.today() - timedelta(days=days_ago))
+        run = RunningLog(session=session, run_type='interval', interval_details=details)
+        db.session.add_all([session, run])
+        db.session.commit()
+        return run
+
+    def test_new_run_route_stores_reps(self, authenticated_client, app):
+        authenticated_client.post('/running/new', data={
+            'session_date': str(date.today()), 'run_type': 'interval', 'distance_km': '8',
+            'duration_minutes': '45', 'has_intervals': 'on',
+            'interval_details': "15min warm up (easy) + 6x800m @ 3'45 / 90s jog"
+        })
+        with app.app_context():
+            rows = RunInterval.query.order_by(RunInterval.position).all()
+            assert len(rows) == 7
+            assert rows[1].kind == 'rep' and float(rows[1].distance_m) == 800
+
+    def test_bulk_parse_and_trends(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            self._run(sample_user.user_id, 14, "6x800m @ 3:50 (3'52, 3'50, 3'49, 3'51, 3'48, 3'46)")
+            self._run(sample_user.user_id, 7, "6x800m @ 3:45 (3'44, 3'46, 3'45, 3'43, 3'44, 3'40)")
+            self._run(sample_user.user_id, 3, "8x30s @ 3:15")
+            assert RunInterval.query.count() == 20  # stored by the commit hook
+            RunInterval.query.delete()
+
+            assert parse_all_intervals() == 20
+            db.session.commit()
+
+        response = authenticated_client.get('/analytics/api/interval-trends')
+        trends = response.get_json()
+        assert set(trends) == {'800m', '30s'}
+        first, second = trends['800m']
+        assert first['reps'] == 6 and first['target_pace'] == pytest.approx(3.83, abs=0.01)
+        assert second['actual_pace'] < first['actual_pace']
+        assert second['best_pace'] == pytest.approx(3.67, abs=0.01)
+        assert trends['30s'][0]['actual_pace'] is None
+
+    def test_edit_replaces_rows(self, app, sample_user):
+        with app.app_context():
+            run = self._run(sample_user.user_id, 1, '4x1km @ 4:00')
+            run.interval_details = '5x1km @ 4:00'
+            db.session.commit()
+            assert RunInterval.query.count() == 5
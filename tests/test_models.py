@@ -4,8 +4,8 @@ from datetime import date, timedelta
 from decimal import Decimal
 from app import db
 from app.models import (
-    User, Exercise, WorkoutSession, StrengthLog, RunningLog,
-    RecoveryLog, PersonalRecord, BodyMeasurement
+    User, Exercise, ExerciseMuscleGroup, WorkoutSession, StrengthLog, RunningLog,
+    RecoveryLog, PersonalRecord, BodyMeasurement, WorkoutTemplate, TemplateExercise
 )
 
 
@@ -44,6 +44,44 @@ class TestUserModel:
             with pytest.raises(Exception):
                 db.session.commit()
 
+    def test_get_cached_user(self, app, sample_user):
+        """Test cached user lookup only queries on a miss."""
+        from app.models.user import user_cache
+        with app.app_context():
+            record = User.get_cached(sample_user.user_id)
+            assert record.username == 'testuser'
+            assert record.get_id() == str(sample_user.user_id)
+            assert user_cache.get(sample_user.user_id) is record
+            assert User.get_cached(str(sample_user.user_id)) is record
+
+    def test_cached_user_invalidated_on_update(self, app, sample_user):
+        """Test profile changes and deactivation invalidate the cache."""
+        with app.app_context():
+            assert User.get_cached(sample_user.user_id).email == 'test@example.com'
+
+            user = User.query.get(sample_user.user_id)
+            user.email = 'changed@example.com'
+            db.session.commit()
+            assert User.get_cached(sample_user.user_id).email == 'changed@example.com'
+
+            user.is_active = False
+            db.session.commit()
+            assert User.get_cached(sample_user.user_id) is None
+
+    def test_cached_user_kept_until_commit(self, app, sample_user):
+        """Test a flushed but uncommitted change leaves the cached record alone."""
+        from app.models.user import user_cache
+        with app.app_context():
+            record = User.get_cached(sample_user.user_id)
+            user = User.query.get(sample_user.user_id)
+            user.email = 'pending@example.com'
+            db.session.flush()
+            assert user_cache.get(sample_user.user_id) is record
+
+            db.session.rollback()
+            assert user_cache.get(sample_user.user_id) is record
+            assert User.get_cached(sample_user.user_id).total_workouts == 0
+
 
 class TestExerciseModel:
     """Tests for Exercise model."""
@@ -69,6 +107,67 @@ class TestExerciseModel:
             assert len(chest_exercises) >= 1
             assert all(ex.muscle_group == 'Chest' for ex in chest_exercises)
 
+    def test_muscle_group_mapping(self, app):
+        """Test the normalized muscle group rows follow the string column."""
+        with app.app_context():
+            exercise = Exercise(name='Close-Grip Bench', muscle_group='Chest, Triceps',
+                                exercise_type='strength')
+            db.session.add(exercise)
+            db.session.commit()
+
+            shares = {l.muscle_group: float(l.share) for l in exercise.muscle_links}
+            assert shares == {'Chest': pytest.approx(0.6667), 'Triceps': pytest.approx(0.3333)}
+            assert [e.name for e in Exercise.get_by_muscle_group('Triceps')] == ['Close-Grip Bench']
+
+            exercise.muscle_groups_list = ['Triceps']
+            db.session.commit()
+            assert [(l.muscle_group, float(l.share)) for l in exercise.muscle_links] == [('Triceps', 1.0)]
+            assert Exercise.get_by_muscle_group('Chest') == []
+            assert ExerciseMuscleGroup.query.count() == 1
+
+    def test_volume_split_across_muscle_groups(self, app, sample_user):
+        """Test compound exercise volume is split by share, not its own bucket."""
+        with app.app_context():
+            exercise = Exercise(name='Dip', muscle_group='Chest, Triceps, Shoulders',
+                                exercise_type='strength')
+            session = WorkoutSession(user_id=sample_user.user_id, session_date=date.today(),
+                                     session_type='upper_body')
+            db.session.add_all([exercise, session])
+            db.session.flush()
+            db.session.add(StrengthLog(session_id=session.session_id, exercise_id=exercise.exercise_id,
+                                       sets=2, reps=10, weight_kg=50))
+            db.session.commit()
+
+            volume = ExerciseMuscleGroup.volume_by_muscle_group(sample_user.user_id)
+            assert volume == {'Chest': 500.0, 'Shoulders': 250.0, 'Triceps': 250.0}
+
+    def test_substitutes_scoped_to_user(self, app, sample_user, sample_exercises):
+        """Test substitute last performance only uses the requesting user's logs."""
+        from app.models import ExerciseSubstitution
+        with app.app_context():
+            bench = Exercise.query.filter_by(name='Bench Press').first()
+            squat = Exercise.query.filter_by(name='Squat').first()
+            ExerciseSubstitution.add_substitution(bench.exercise_id, squat.exercise_id)
+
+            other = User(username='other', email='other@example.com')
+            other.set_password('password123')
+            db.session.add(other)
+            db.session.flush()
+            other_session = WorkoutSession(user_id=other.user_id, session_date=date.today(),
+                                           session_type='upper_body')
+            db.session.add(other_session)
+            db.session.flush()
+            db.session.add(StrengthLog(session_id=other_session.session_id,
+                                       exercise_id=squat.exercise_id, sets=5, reps=5, weight_kg=200))
+            db.session.commit()
+
+            subs = bench.get_substitutes_with_history(sample_user.user_id)
+            assert [s['exercise_name'] for s in subs] == ['Squat']
+            assert subs[0]['last_weight_kg'] is None
+
+            subs = bench.get_substitutes_with_history(other.user_id)
+            assert subs[0]['last_weight_kg'] == 200.0
+
 
 class TestStrengthLogModel:
     """Tests for StrengthLog model."""
@@ -93,6 +192,58 @@ class TestStrengthLogModel:
             assert log.volume == expected_volume
 
 
+    def test_get_last_performances(self, app, sample_user, sample_strength_session):
+        """Test batched last-performance lookup picks the newest log per exercise."""
+        with app.app_context():
+            bench = Exercise.query.filter_by(name='Bench Press').first()
+            squat = Exercise.query.filter_by(name='Squat').first()
+            older = WorkoutSession(user_id=sample_user.user_id, session_type='upper_body',
+                                   session_date=date.today() - timedelta(days=7))
+            db.session.add(older)
+            db.session.flush()
+            db.session.add_all([
+                StrengthLog(session_id=older.session_id, exercise_id=bench.exercise_id,
+                            sets=5, reps=5, weight_kg=90),
+                StrengthLog(session_id=older.session_id, exercise_id=squat.exercise_id,
+                            sets=3, reps=5, weight_kg=120),
+            ])
+            db.session.commit()
+
+            last = StrengthLog.get_last_performances(
+                sample_user.user_id, [bench.exercise_id, squat.exercise_id]
+            )
+            assert float(last[bench.exercise_id].weight_kg) == 80
+            assert last[bench.exercise_id].session_date == date.today()
+            assert float(last[squat.exercise_id].weight_kg) == 120
+
+    def test_template_last_performance_query_count(self, app, sample_user, sample_strength_session):
+        """Test template pre-fill does not issue a query per exercise."""
+        from sqlalchemy import event
+        with app.app_context():
+            template = WorkoutTemplate(user_id=sample_user.user_id, name='Push')
+            db.session.add(template)
+            db.session.flush()
+            for idx, ex in enumerate(Exercise.query.all()):
+                db.session.add(TemplateExercise(template_id=template.template_id,
+                                                exercise_id=ex.exercise_id, order_index=idx))
+            db.session.commit()
+
+            statements = []
+            engine = db.engine
+            listener = lambda *args: statements.append(args[2])
+            event.listen(engine, 'before_cursor_execute', listener)
+            try:
+                exercises = template.get_exercises_with_last_performance(sample_user.user_id)
+            finally:
+                event.remove(engine, 'before_cursor_execute', listener)
+
+            assert len(exercises) == 4
+            assert len(statements) <= 3
+            bench = next(e for e in exercises if e['exercise_name'] == 'Bench Press')
+            assert bench['has_history'] and bench['last_weight'] == 80.0
+            assert bench['last_date'] == str(date.today())
+
+
 class TestRunningLogModel:
     """Tests for RunningLog model."""
 
@@ -0,0 +1,94 @@
+"""Tests for the weekly hard-sets-per-muscle rollup."""
+from datetime import date, timedelta
+
+from app import db
+from app.models import Exercise, StrengthLog, WeeklyMuscleSets
+from app.services.muscle_sets import week_start, hard_set_counts, rebuild_user, weekly_hard_sets
+
+MONDAY = week_start(date.today())
+
+
+def stored(user_id, week=MONDAY):
+    rows = WeeklyMuscleSets.query.filter_by(user_id=user_id, week_start=week).all()
+    return {row.muscle_group: (float(row.hard_sets), float(row.sets)) for row in rows}
+
+
+class TestHardSetCounts:
+    """Tests for counting hard sets per log."""
+
+    def test_counts(self):
+        logs = [
+            StrengthLog(sets=3, reps=10, rpe=6),
+            StrengthLog(sets=4, reps=12),  # unrated sets count as working sets
+            StrengthLog(sets=0, reps=5, rpe=9)
+        ]
+        detailed = StrengthLog()
+        detailed.set_sets([(5, 100, 8), (5, 90, 6), (8, 80, None)])
+        counts, hard = hard_set_counts(logs + [detailed])
+        assert counts.tolist() == [3, 4, 0, 3]
+        assert hard.tolist() == [0, 4, 0, 2]
+
+
+class TestWeeklyRollup:
+    """Tests for the commit hook and reads."""
+
+    def test_bodyweight_sets_split_across_muscles(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            dips = Exercise(name='Dips', muscle_group='Chest, Triceps', exercise_type='strength')
+            db.session.add(dips)
+            db.session.commit()
+
+            add_strength_log('Dips', day=MONDAY, sets=3, reps=12, rpe=8)
+            assert stored(sample_user.user_id) == {'Chest': (2.0, 2.0), 'Triceps': (1.0, 1.0)}
+
+    def test_edit_and_delete(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(day=MONDAY, sets=3, reps=10, weight_kg=80, rpe=8)
+            add_strength_log(day=MONDAY, sets=2, reps=10, weight_kg=60, rpe=5)
+            assert stored(sample_user.user_id) == {'Chest': (3.0, 5.0)}
+
+            log.rpe = 6
+            db.session.commit()
+            assert stored(sample_user.user_id) == {'Chest': (0.0, 5.0)}
+
+            db.session.delete(log)
+            db.session.commit()
+            assert stored(sample_user.user_id) == {'Chest': (0.0, 2.0)}
+
+    def test_moving_session_moves_week(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(day=MONDAY, sets=3, reps=5, weight_kg=100)
+            log.session.session_date = MONDAY - timedelta(days=3)
+            db.session.commit()
+
+            assert stored(sample_user.user_id) == {}
+            assert stored(sample_user.user_id, MONDAY - timedelta(weeks=1)) == {'Chest': (3.0, 3.0)}
+
+    def test_remapping_exercise_rewrites_weeks(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(day=MONDAY, sets=4, reps=8, weight_kg=60)
+            log.exercise.muscle_group = 'Chest, Shoulders'
+            db.session.commit()
+            assert stored(sample_user.user_id) == {'Chest': (2.67, 2.67), 'Shoulders': (1.33, 1.33)}
+
+    def test_rebuild_and_read(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            add_strength_log(day=MONDAY, sets=3, reps=5, weight_kg=100)
+            add_strength_log('Squat', day=MONDAY - timedelta(weeks=2), sets=5, reps=5)
+            WeeklyMuscleSets.query.delete()
+            assert rebuild_user(sample_user.user_id) == 2
+            db.session.commit()
+
+            assert weekly_hard_sets(sample_user.user_id, weeks=4) == {
+                str(MONDAY - timedelta(weeks=2)): {'Legs': 5.0},
+                str(MONDAY): {'Chest': 3.0}
+            }
+            assert weekly_hard_sets(sample_user.user_id, weeks=1) == {str(MONDAY): {'Chest': 3.0}}
+
+    def test_week_comparison_reads_rollup(self, authenticated_client, app, sample_user,
+                                          sample_exercises, add_strength_log):
+        with app.app_context():
+            add_strength_log(sets=3, reps=12, rpe=9)
+
+        response = authenticated_client.get('/analytics/api/week-comparison')
+        assert response.get_json()['this_week']['stats']['muscle_sets'] == {'Chest': 3.0}
@@ -0,0 +1,106 @@
+"""Tests for the planning calendar data service."""
+from datetime import date
+
+from sqlalchemy import event
+from app import db
+from app.models import (
+    Exercise, PlannedWorkout, PlanRule, WorkoutSession, RunningLog, WorkoutTemplate, TemplateExercise
+)
+from app.services.plan_calendar import month_calendar, grid_range, neighbour_months, template_choices
+from app.services.plan_rules import skip_occurrence
+
+
+def add_run(user_id, day, distance, duration):
+    session = WorkoutSession(user_id=user_id, session_type='running', session_date=day)
+    db.session.add_all([session, RunningLog(session=session, run_type='easy', distance_km=distance,
+                                            duration_minutes=duration)])
+    db.session.commit()
+    return session
+
+
+class TestMonthCalendar:
+    """Tests for the per-day summaries and their cache."""
+
+    def test_grid_and_neighbours(self):
+        assert grid_range(2024, 3) == (date(2024, 2, 26), date(2024, 3, 31))
+        assert neighbour_months(2024, 1) == ((2023, 12), (2024, 2))
+
+    def test_day_summaries(self, app, sample_user):
+        with app.app_context():
+            template = WorkoutTemplate(user_id=sample_user.user_id, name='Push Day')
+            db.session.add_all([template, PlannedWorkout(user_id=sample_user.user_id, workout_type='running',
+                                                         planned_date=date(2024, 3, 5))])
+            db.session.flush()
+            db.session.add(PlannedWorkout(user_id=sample_user.user_id, workout_type='upper_body',
+                                          planned_date=date(2024, 3, 6), template_id=template.template_id))
+            db.session.commit()
+            add_run(sample_user.user_id, date(2024, 3, 5), 8, 45)   # fulfils the plan
+            add_run(sample_user.user_id, date(2024, 3, 20), 5, 30)  # unplanned
+            add_run(sample_user.user_id, date(2024, 3, 20), 3, 20)
+
+            days = month_calendar(sample_user.user_id, 2024, 3)['days']
+            assert days['2024-03-05']['plans'][0]['completed'] is True
+            assert days['2024-03-05']['actual'] == [
+                {'type': 'running', 'count': 1, 'unplanned': 0, 'duration': 45, 'distance': 8.0}
+            ]
+            assert days['2024-03-06']['plans'][0]['label'] == 'Push Day'
+            assert days['2024-03-20']['actual'] == [
+                {'type': 'running', 'count': 2, 'unplanned': 2, 'duration': 50, 'distance': 8.0}
+            ]
+
+    def test_cached_until_plans_change(self, app, sample_user):
+        with app.app_context():
+            rule = PlanRule(user_id=sample_user.user_id, workout_type='running', start_date=date(2024, 3, 4),
+                            weekdays=1, count=4)
+            db.session.add(rule)
+            db.session.commit()
+            assert len(month_calendar(sample_user.user_id, 2024, 3)['days']) == 4
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])  # noqa: E731
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                month_calendar(sample_user.user_id, 2024, 3)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert statements == []
+
+            skip_occurrence(rule, date(2024, 3, 11))
+            db.session.commit()
+            assert '2024-03-11' not in month_calendar(sample_user.user_id, 2024, 3)['days']
+
+    def test_template_choices_count_exercises(self, app, sample_user, sample_exercises):
+        with app.app_context():
+            push = WorkoutTemplate(user_id=sample_user.user_id, name='Push')
+            db.session.add_all([push, WorkoutTemplate(user_id=sample_user.user_id, name='Empty')])
+            db.session.flush()
+            for exercise in Exercise.query.limit(2):
+                db.session.add(TemplateExercise(template_id=push.template_id, exercise_id=exercise.exercise_id))
+            db.session.commit()
+
+            assert [(c['name'], c['exercise_count']) for c in template_choices(sample_user.user_id)] == [
+                ('Empty', 0), ('Push', 2)
+            ]
+
+    def test_month_endpoint(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            add_run(sample_user.user_id, date(2024, 2, 29), 10, 60)
+
+        data = authenticated_client.get('/planning/api/month?year=2024&month=3').get_json()
+        assert data['start'] == '2024-02-26'
+        assert data['days']['2024-02-29']['actual'][0]['unplanned'] == 1
+        assert authenticated_client.get('/planning/api/month?month=13').status_code == 400
+        for year in (0, 10000):
+            assert authenticated_client.get(f'/planning/api/month?year={year}&month=1').status_code == 400
+        assert authenticated_client.get('/planning/?year=10000&month=12').status_code == 200
+        assert authenticated_client.get('/planning/?year=2024&month=3').status_code == 200
+
+    def test_page_shows_own_writes(self, authenticated_client, app, sample_user):
+        authenticated_client.get('/planning/api/month?year=2024&month=3')  # prefetched before the write
+
+        response = authenticated_client.post('/planning/add', data={
+            'planned_date': '2024-03-12', 'workout_type': 'running', 'description': 'Hill repeats'
+        }, follow_redirects=True)
+        assert 'Hill repeats' in response.get_data(as_text=True)
+        data = authenticated_client.get('/planning/api/month?year=2024&month=3').get_json()
+        assert data['days']['2024-03-12']['plans'][0]['label'] == 'Hill repeats'
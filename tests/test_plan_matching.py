@@ -0,0 +1,111 @@
+"""Tests for plan-to-session reconciliation."""
+from datetime import date, timedelta
+
+from app import db
+from app.models import PlannedWorkout, WorkoutSession
+from app.services.plan_matching import match_pairs, reconcile_user
+
+TODAY = date.today()
+
+
+def add_plan(user_id, days_ago, workout_type='running'):
+    plan = PlannedWorkout(user_id=user_id, planned_date=TODAY - timedelta(days=days_ago),
+                          workout_type=workout_type)
+    db.session.add(plan)
+    db.session.commit()
+    return plan
+
+
+def add_session(user_id, days_ago, session_type='running'):
+    session = WorkoutSession(user_id=user_id, session_type=session_type,
+                             session_date=TODAY - timedelta(days=days_ago))
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+class TestMatchPairs:
+    """Tests for the nearest-first assignment."""
+
+    def test_nearest_and_type(self):
+        d = date(2024, 5, 6)
+        plans = [(1, d, 'running'), (2, d + timedelta(days=1), 'running'), (3, d, 'upper_body')]
+        sessions = [(10, d + timedelta(days=1), 'running'), (11, d, 'running'),
+                    (12, d + timedelta(days=2), 'upper_body')]
+        assert match_pairs(plans, sessions) == {1: 11, 2: 10}
+
+    def test_taken_sessions_are_skipped(self):
+        d = date(2024, 5, 6)
+        assert match_pairs([(1, d, 'running')], [(10, d, 'running')], taken={10}) == {}
+
+
+class TestReconcile:
+    """Tests for the commit hook, manual completions and the stats."""
+
+    def test_session_saved_near_plan_completes_it(self, app, sample_user):
+        with app.app_context():
+            plan = add_plan(sample_user.user_id, 3)
+            session = add_session(sample_user.user_id, 2)  # a day late
+            db.session.expire_all()
+            assert (plan.completed, plan.completed_session_id, plan.match_source) == (
+                True, session.session_id, 'auto'
+            )
+
+            # Moving the session out of the window unlinks it again
+            session.session_date = TODAY
+            db.session.commit()
+            db.session.expire_all()
+            assert (plan.completed, plan.completed_session_id, plan.match_source) == (False, None, None)
+
+    def test_manual_links_are_kept(self, app, sample_user):
+        with app.app_context():
+            plan = add_plan(sample_user.user_id, 1)
+            session = add_session(sample_user.user_id, 5)
+            PlannedWorkout.mark_completed(plan.plan_id, session.session_id)
+            other = add_plan(sample_user.user_id, 5)
+            add_session(sample_user.user_id, 1)
+            db.session.expire_all()
+
+            assert (plan.completed_session_id, plan.match_source) == (session.session_id, 'manual')
+            assert not other.completed  # its session is held by the manual plan
+
+    def test_legacy_completed_plans_are_kept(self, app, sample_user):
+        with app.app_context():
+            plan = add_plan(sample_user.user_id, 10)
+            # Completed by hand before automatic matching: no session, no source
+            PlannedWorkout.query.update({'completed': True, 'match_source': None})
+            db.session.commit()
+
+            reconcile_user(sample_user.user_id)
+            add_session(sample_user.user_id, 9, 'upper_body')  # a commit touching a nearby date
+            db.session.expire_all()
+            assert (plan.completed, plan.match_source) == (True, None)
+
+    def test_backfill_and_stats(self, app, sample_user):
+        with app.app_context():
+            run = add_session(sample_user.user_id, 8)
+            lift = add_session(sample_user.user_id, 6, 'upper_body')
+            plans = [add_plan(sample_user.user_id, 7), add_plan(sample_user.user_id, 6, 'upper_body'),
+                     add_plan(sample_user.user_id, 2), add_plan(sample_user.user_id, 4, 'rest')]
+            # Simulate links lost before the reconciler existed
+            PlannedWorkout.query.update({'completed': False, 'completed_session_id': None,
+                                         'match_source': None})
+            db.session.commit()
+            assert PlannedWorkout.get_completion_stats(sample_user.user_id)['completed'] == 0
+
+            assert reconcile_user(sample_user.user_id) == 2
+            db.session.commit()
+            db.session.expire_all()
+            assert [p.completed_session_id for p in plans] == [run.session_id, lift.session_id, None, None]
+            assert PlannedWorkout.get_completion_stats(sample_user.user_id) == {
+                'total': 3, 'completed': 2, 'rate': 67
+            }
+
+    def test_calendar_hides_linked_sessions(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            add_plan(sample_user.user_id, 0)
+            add_session(sample_user.user_id, 0)
+
+        html = authenticated_client.get('/planning/').get_data(as_text=True)
+        assert 'event planned running completed' in html
+        assert 'event actual' not in html
@@ -0,0 +1,130 @@
+"""Tests for recurring plan rules."""
+from datetime import date, timedelta
+
+from app import db
+from app.models import PlannedWorkout, PlanRule, PlanRuleException, WorkoutSession
+from app.services.plan_rules import (
+    weekday_mask, last_occurrence, occurrences, expand_plans, clear_range, skip_occurrence
+)
+
+MONDAY = date(2024, 1, 1)
+
+
+def rule(**fields):
+    defaults = dict(workout_type='running', start_date=MONDAY, weekdays=weekday_mask([0, 3]))
+    return PlanRule(**{**defaults, **fields})
+
+
+class TestExpansion:
+    """Tests for occurrence arithmetic."""
+
+    def test_weekly_pattern_with_interval(self):
+        r = rule(interval_weeks=2, until=date(2024, 1, 31))
+        assert occurrences(r, MONDAY, date(2024, 2, 29)) == [
+            date(2024, 1, 1), date(2024, 1, 4), date(2024, 1, 15), date(2024, 1, 18),
+            date(2024, 1, 29)
+        ]
+
+    def test_count_gives_last_occurrence(self):
+        assert last_occurrence(rule(count=2)) == date(2024, 1, 4)
+        assert last_occurrence(rule(count=5)) == date(2024, 1, 15)
+        assert last_occurrence(rule(start_date=date(2024, 1, 3), count=3)) == date(2024, 1, 11)
+        assert last_occurrence(rule(count=3, interval_weeks=4)) == date(2024, 1, 29)
+        assert occurrences(rule(interval_weeks=3), date(2024, 1, 17), date(2024, 2, 8)) == [
+            date(2024, 1, 22), date(2024, 1, 25)
+        ]
+        r = rule(count=32)  # a 16-week block
+        assert len(occurrences(r, MONDAY, date(2025, 1, 1))) == 32
+        assert last_occurrence(rule()) is None
+
+
+class TestStoredRules:
+    """Tests for expansion with overrides, exceptions and the routes."""
+
+    def test_expand_merges_overrides_and_skips(self, app, sample_user):
+        with app.app_context():
+            r = rule(user_id=sample_user.user_id, count=32)
+            db.session.add(r)
+            db.session.commit()
+            moved = r.occurrence(date(2024, 1, 4))
+            moved.planned_date = date(2024, 1, 5)
+            moved.description = 'Moved'
+            db.session.add(moved)
+            skip_occurrence(r, date(2024, 1, 8))
+            db.session.commit()
+
+            plans = expand_plans(sample_user.user_id, MONDAY, date(2024, 1, 14))
+            assert [(p.planned_date, p.description, p.plan_id is None) for p in plans] == [
+                (date(2024, 1, 1), None, True), (date(2024, 1, 5), 'Moved', False),
+                (date(2024, 1, 11), None, True)
+            ]
+            assert PlannedWorkout.query.count() == 1  # storage stays sparse
+
+    def test_matched_occurrence_is_saved_as_override(self, app, sample_user):
+        with app.app_context():
+            today = date.today()
+            db.session.add(rule(user_id=sample_user.user_id, start_date=today - timedelta(days=14),
+                                weekdays=127, count=20))
+            db.session.commit()
+            session = WorkoutSession(user_id=sample_user.user_id, session_type='running',
+                                     session_date=today - timedelta(days=2))
+            db.session.add(session)
+            db.session.commit()
+
+            override = PlannedWorkout.query.one()
+            assert (override.occurrence_date, override.completed_session_id, override.match_source) == (
+                today - timedelta(days=2), session.session_id, 'auto'
+            )
+            stats = PlannedWorkout.get_completion_stats(sample_user.user_id)
+            assert (stats['total'], stats['completed']) == (15, 1)
+
+    def test_clear_range_splits_rules(self, app, sample_user):
+        with app.app_context():
+            r = rule(user_id=sample_user.user_id, count=8)  # four weeks
+            db.session.add(r)
+            db.session.commit()
+            skip_occurrence(r, date(2024, 1, 25))
+            db.session.commit()
+
+            clear_range(sample_user.user_id, date(2024, 1, 8), date(2024, 1, 14))
+            db.session.commit()
+            rules = PlanRule.query.order_by(PlanRule.start_date).all()
+            assert [(x.start_date, last_occurrence(x)) for x in rules] == [
+                (MONDAY, date(2024, 1, 7)), (date(2024, 1, 15), date(2024, 1, 25))
+            ]
+            assert PlanRuleException.query.one().rule_id == rules[1].rule_id
+            assert len(expand_plans(sample_user.user_id, MONDAY, date(2024, 2, 29))) == 5
+
+    def test_template_block_and_end_series(self, authenticated_client, app, sample_user):
+        response = authenticated_client.get('/planning/template/balanced?weeks=16&start=2030-01-07')
+        assert response.status_code == 302
+        with app.app_context():
+            assert PlanRule.query.count() == 6  # one per (type, description), not 112 rows
+            assert PlannedWorkout.query.count() == 0
+            assert len(expand_plans(sample_user.user_id, date(2030, 1, 7), date(2030, 4, 28))) == 112
+            rule_id = PlanRule.query.filter_by(description='Long Run').one().rule_id
+
+        authenticated_client.post(f'/planning/rules/{rule_id}/end', data={'date': '2030-02-01'})
+        html = authenticated_client.get('/planning/?year=2030&month=1').get_data(as_text=True)
+        assert html.count('Long Run') == 3  # Jan 12, 19, 26; Feb 2 (still on the grid) is gone
+
+    def test_malformed_dates_are_rejected(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            r = rule(user_id=sample_user.user_id)
+            db.session.add(r)
+            db.session.commit()
+            rule_id = r.rule_id
+
+        for url, data in ((f'/planning/rules/{rule_id}/skip', {'date': 'nope'}),
+                          (f'/planning/rules/{rule_id}/end', {}),
+                          ('/planning/add', {'planned_date': '2024-13-01', 'workout_type': 'running'})):
+            response = authenticated_client.post(url, data=data, follow_redirects=True)
+            assert response.status_code == 200
+            assert 'Invalid date.' in response.get_data(as_text=True)
+        for start in ('2024-02-30', '9999-06-01'):
+            response = authenticated_client.get(f'/planning/template/balanced?start={start}',
+                                                follow_redirects=True)
+            assert 'Invalid start date.' in response.get_data(as_text=True)
+        with app.app_context():
+            assert PlanRule.query.count() == 1
+            assert PlanRuleException.query.count() == 0
@@ -0,0 +1,143 @@
+"""Tests for progression suggestions."""
+from app import db
+from app.models import User, Exercise, WorkoutTemplate, TemplateExercise, ProgressionSuggestion
+from app.services import progression
+from app.services.progression import suggest_next, compute_all_suggestions
+
+
+def suggestion_for(log):
+    return db.session.get(ProgressionSuggestion, (log.session.user_id, log.exercise_id))
+
+
+class TestSuggestNext:
+    """Tests for the double-progression rule."""
+
+    def test_adds_reps_inside_range(self):
+        assert suggest_next([(3, 9, 80.0, 8)], 8, 12) == (3, 10, 80.0, 'add_reps')
+
+    def test_adds_load_at_top_of_range(self):
+        assert suggest_next([(3, 12, 80.0, 9)], 8, 12) == (3, 8, 82.5, 'increase_load')
+        assert suggest_next([(3, 12, 12.0, None)], 8, 12) == (3, 8, 13.0, 'increase_load')
+
+    def test_easy_set_adds_load_early(self):
+        assert suggest_next([(3, 9, 80.0, 6)], 8, 12) == (3, 8, 82.5, 'increase_load')
+
+    def test_max_effort_repeats(self):
+        assert suggest_next([(3, 12, 80.0, 10)], 8, 12) == (3, 12, 80.0, 'repeat')
+        assert suggest_next([(3, 7, 80.0, 9)], 8, 12) == (3, 8, 80.0, 'repeat')
+
+    def test_deload_after_two_misses(self):
+        history = [(3, 6, 100.0, 10), (3, 7, 100.0, 9)]
+        assert suggest_next(history, 8, 12) == (3, 8, 90.0, 'deload')
+
+    def test_fixed_target_and_bodyweight(self):
+        assert suggest_next([(5, 5, 100.0, 8)]) == (5, 5, 102.5, 'increase_load')
+        assert suggest_next([(3, 12, None, None)], 8, 12, 4) == (4, 13, None, 'add_reps')
+
+
+class TestStoredSuggestions:
+    """Tests for the commit hook and the batch job."""
+
+    def test_refreshed_on_commit(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(sets=3, reps=10, weight_kg=80, rpe=8)
+            suggestion = suggestion_for(log)
+            assert (suggestion.reps, float(suggestion.weight_kg)) == (10, 82.5)
+            assert suggestion.based_on_log_id == log.log_id
+
+            log.rpe = 10
+            db.session.commit()
+            db.session.expire_all()
+            assert suggestion_for(log).reason == 'repeat'
+
+    def test_template_rep_range(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(sets=3, reps=10, weight_kg=80, rpe=8)
+            template = WorkoutTemplate(user_id=sample_user.user_id, name='Push')
+            db.session.add(template)
+            db.session.flush()
+            db.session.add(TemplateExercise(template_id=template.template_id, exercise_id=log.exercise_id,
+                                            target_sets=4, target_reps=8, target_reps_max=12))
+            db.session.commit()
+
+            suggestion = suggestion_for(log)
+            assert (suggestion.sets, suggestion.reps, suggestion.reason) == (4, 11, 'add_reps')
+            exercises = template.get_exercises_with_last_performance(sample_user.user_id)
+            assert exercises[0]['rep_range'] == '8-12'
+            assert (exercises[0]['suggested_reps'], exercises[0]['suggested_weight']) == (11, 80.0)
+
+    def test_deleting_latest_log_falls_back(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            older = add_strength_log(days_ago=7, sets=3, reps=5, weight_kg=100)
+            newer = add_strength_log(sets=3, reps=5, weight_kg=110)
+            db.session.delete(newer.session)
+            db.session.commit()
+            db.session.expire_all()
+            assert suggestion_for(older).based_on_log_id == older.log_id
+
+    def test_compute_all(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(sets=3, reps=5, weight_kg=100)
+            ProgressionSuggestion.query.delete()
+            db.session.commit()
+
+            assert compute_all_suggestions(workers=1) == 1
+            db.session.commit()
+            assert float(suggestion_for(log).weight_kg) == 102.5
+
+    def test_compute_all_replaces_per_user(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(sets=3, reps=5, weight_kg=100)
+            former = User(username='former', email='former@example.com', password_hash='x')
+            db.session.add(former)
+            db.session.flush()
+            db.session.add(ProgressionSuggestion(user_id=former.user_id, exercise_id=log.exercise_id,
+                                                 sets=3, reps=5, weight_kg=50, reason='repeat',
+                                                 rep_low=5, rep_high=5))
+            db.session.commit()
+
+            assert compute_all_suggestions(workers=1) == 1
+            db.session.commit()
+            assert [s.user_id for s in ProgressionSuggestion.query] == [sample_user.user_id]
+
+    def test_compute_all_keeps_rows_of_commits_made_meanwhile(self, app, sample_user, sample_exercises,
+                                                              add_strength_log, monkeypatch):
+        load_inputs = progression._load_inputs
+        stored = []
+
+        def snapshot_then_log(*args, **kwargs):
+            inputs = load_inputs(*args, **kwargs)
+            if not args and not kwargs:
+                # A set is committed after the job's snapshot; the hook stores fresh rows
+                add_strength_log(sets=3, reps=5, weight_kg=110)
+                stored.extend(s.weight_kg for s in ProgressionSuggestion.query)
+            return inputs
+
+        with app.app_context():
+            add_strength_log(sets=3, reps=5, weight_kg=100, days_ago=3)
+            monkeypatch.setattr(progression, '_load_inputs', snapshot_then_log)
+            compute_all_suggestions(workers=1)
+            db.session.commit()
+            assert [s.weight_kg for s in ProgressionSuggestion.query] == stored
+
+    def test_template_rejects_inverted_rep_range(self, authenticated_client, app, sample_user,
+                                                 sample_exercises):
+        with app.app_context():
+            template = WorkoutTemplate(user_id=sample_user.user_id, name='Push')
+            db.session.add(template)
+            db.session.commit()
+            template_id = template.template_id
+            exercise_id = Exercise.query.filter_by(name='Bench Press').first().exercise_id
+
+        response = authenticated_client.post(f'/templates/{template_id}/add-exercise', data={
+            'exercise_id': exercise_id, 'target_reps': 10, 'target_reps_max': 8
+        }, follow_redirects=True)
+        assert b'rep range cannot be below' in response.data
+        with app.app_context():
+            assert TemplateExercise.query.count() == 0
+
+        authenticated_client.post(f'/templates/{template_id}/add-exercise', data={
+            'exercise_id': exercise_id, 'target_reps': 5, 'target_reps_max': 5
+        })
+        with app.app_context():
+            assert TemplateExercise.query.one().target_reps_max == 5  # a fixed 5-5 target
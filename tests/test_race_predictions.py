@@ -0,0 +1,89 @@
+"""Tests for VDOT race predictions and the running stats page."""
+from datetime import date, timedelta
+
+import pytest
+from app import db
+from app.models import WorkoutSession, RunningLog
+from app.services import race_predictions as predictions_service
+from app.services.race_predictions import (
+    vdot, predict_seconds, riegel_seconds, training_paces, race_predictions
+)
+
+
+def add_run(user_id, days_ago, distance_km, minutes):
+    session = WorkoutSession(user_id=user_id, session_type='running',
+                             session_date=date.today() - timedelta(days=days_ago))
+    run = RunningLog(session=session, run_type='easy', distance_km=distance_km,
+                     duration_minutes=minutes)
+    db.session.add_all([session, run])
+    db.session.commit()
+    return run
+
+
+class TestModel:
+    """Tests for the VDOT and Riegel formulas."""
+
+    def test_vdot_matches_daniels_tables(self):
+        assert vdot(5000, 20 * 60) == pytest.approx(49.8, abs=0.2)
+        assert vdot(10000, 50 * 60) == pytest.approx(39.9, abs=0.3)
+
+    def test_prediction_inverts_vdot(self):
+        seconds = predict_seconds(50.0, 42195)
+        assert vdot(42195, seconds) == pytest.approx(50.0, abs=0.01)
+        assert 3 * 3600 < seconds < 3.3 * 3600
+
+    def test_riegel(self):
+        assert riegel_seconds(1200, 5000, 10000) == pytest.approx(1200 * 2 ** 1.06)
+
+    def test_training_paces_ordered(self):
+        paces = training_paces(50)
+        assert [p['zone'] for p in paces] == ['easy', 'threshold', 'interval', 'repetition']
+        assert all(p['fast'] < p['slow'] for p in paces)
+        assert paces[0]['fast'] > paces[-1]['slow']
+
+
+class TestCachedPredictions:
+    """Tests for caching keyed on the PR ledger."""
+
+    def test_recomputed_only_on_new_pr(self, app, sample_user, monkeypatch):
+        with app.app_context():
+            assert race_predictions(sample_user.user_id) is None
+            add_run(sample_user.user_id, 10, 5.0, 25)
+
+            calls = []
+            real = predictions_service.compute_predictions
+            monkeypatch.setattr(predictions_service, 'compute_predictions',
+                                lambda prs: calls.append(1) or real(prs))
+            first = race_predictions(sample_user.user_id)
+            add_run(sample_user.user_id, 5, 7.3, 40)  # not a standard distance
+            assert race_predictions(sample_user.user_id) == first
+            assert len(calls) == 1
+
+            add_run(sample_user.user_id, 1, 5.0, 22)
+            faster = race_predictions(sample_user.user_id)
+            assert len(calls) == 2
+            assert faster['vdot'] > first['vdot']
+            assert faster['source']['time'] == '22:00'
+
+
+class TestStatsPage:
+    """Tests for /running/stats."""
+
+    def test_all_time_bests_beyond_recent_runs(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            add_run(sample_user.user_id, 400, 30.0, 170)  # old long run
+            for days_ago in range(60):
+                add_run(sample_user.user_id, days_ago, 5.0, 30)
+            add_run(sample_user.user_id, 200, 5.0, 21)
+
+        response = authenticated_client.get('/running/stats')
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert '30.00 km' in html
+        assert '4.2 min/km' in html
+        assert '<span class="stat-value">62</span>' in html
+        assert 'Race Predictions' in html
+
+        data = authenticated_client.get('/running/api/predictions').get_json()
+        assert data['source']['time'] == '21:00'
+        assert [race['distance'] for race in data['races']] == ['5k', '10k', 'half', 'marathon']
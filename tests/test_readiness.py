@@ -0,0 +1,121 @@
+"""Tests for the stored daily readiness series."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from app import db
+from app.models import RecoveryLog, ReadinessDay, WorkoutSession, RunningLog
+from app.services.readiness import (
+    recovery_scores, moment_stats, rolling_baseline, blend, rebuild_readiness, readiness_series
+)
+
+TODAY = date.today()
+
+
+def stored(user_id, days_ago=0):
+    return ReadinessDay.for_day(user_id, TODAY - timedelta(days=days_ago))
+
+
+class TestReadinessMath:
+    """Tests for the vectorized building blocks."""
+
+    def test_scores_ignore_blank_metrics(self):
+        scores = recovery_scores([8, np.nan, np.nan], [6, 4, np.nan], [np.nan, 2, np.nan],
+                                 [7, np.nan, np.nan])
+        assert scores[:2].tolist() == [7.0, 6.0]
+        assert np.isnan(scores[2])
+
+    def test_moment_stats(self):
+        mean, sd = moment_stats([1, 2, 3], [6, 14, 21], [36, 100, 149])
+        assert np.isnan(sd[0])
+        assert mean.tolist() == [6, 7, 7]
+        assert sd[1] == pytest.approx(np.std([6, 8], ddof=1))
+        assert sd[2] == pytest.approx(np.std([6, 8, 7], ddof=1))
+        assert np.isnan(moment_stats([2], [14], [100], min_count=3)[0]).all()
+
+    def test_rolling_baseline_looks_back_only(self):
+        scores = [6, np.nan, 8, 6, 8, 1]
+        mean, sd = rolling_baseline(scores, window=5, min_count=3)
+        assert np.isnan(mean[:4]).all()
+        assert mean[4] == pytest.approx(20 / 3)
+        assert mean[5] == pytest.approx(7.0)  # today's 1 is not part of its own baseline
+        assert sd[5] == pytest.approx(np.std([6, 8, 6, 8], ddof=1))
+
+    def test_blend(self):
+        readiness = blend([7, 7, 7, 10], [np.nan, -3, 1, 2], [np.nan, 1.0, 1.5, 3.0])
+        assert readiness.tolist() == [70, 60, 65, 90]
+
+
+class TestStoredReadiness:
+    """Tests for the commit hook and reads."""
+
+    def test_written_on_log_and_edit(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            log = add_recovery_log(soreness=None)
+            row = stored(sample_user.user_id)
+            assert float(row.recovery_score) == 7.0
+            assert row.baseline_mean is None
+            assert (float(row.readiness), row.level) == (70.0, 'good')
+
+            log.sleep_quality = 10
+            db.session.commit()
+            db.session.expire_all()
+            assert float(stored(sample_user.user_id).recovery_score) == 8.0
+
+    def test_baseline_and_backdated_log(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            for days_ago in (5, 4, 3, 2):
+                add_recovery_log(days_ago=days_ago, sleep=6 + days_ago % 2)
+            add_recovery_log(sleep=9, energy=9, soreness=1, motivation=9)
+            row = stored(sample_user.user_id)
+            assert float(row.baseline_mean) == pytest.approx(6.88, abs=0.01)
+            assert float(row.recovery_z) == 2.0  # stored clipped, as blended
+            assert float(row.readiness) == 100.0
+
+            # A backdated bad day inside the window moves today's baseline
+            add_recovery_log(days_ago=1, sleep=2, energy=2, soreness=9, motivation=2)
+            db.session.expire_all()
+            assert float(stored(sample_user.user_id).baseline_mean) == pytest.approx(5.85, abs=0.01)
+
+    def test_near_constant_baseline_keeps_z_in_range(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            for days_ago in range(28, 0, -1):
+                db.session.add(RecoveryLog(user_id=sample_user.user_id,
+                                           log_date=TODAY - timedelta(days=days_ago),
+                                           sleep_quality=8 if days_ago == 5 else 7, energy_level=7,
+                                           muscle_soreness=3, motivation_score=7))
+            db.session.commit()
+            add_recovery_log(sleep=1, energy=1, soreness=10, motivation=1)
+            assert float(stored(sample_user.user_id).recovery_z) == -2.0
+
+    def test_training_load_change_refreshes(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            add_recovery_log()
+            assert stored(sample_user.user_id).acwr is None
+
+            session = WorkoutSession(user_id=sample_user.user_id, session_type='running',
+                                     session_date=TODAY - timedelta(days=1))
+            db.session.add_all([session, RunningLog(session=session, run_type='easy', distance_km=10,
+                                                    duration_minutes=60, avg_heart_rate=150,
+                                                    max_heart_rate=180)])
+            db.session.commit()
+            db.session.expire_all()
+            row = stored(sample_user.user_id)
+            assert float(row.acwr) > 1.3
+            assert float(row.readiness) == 70.0 - 20.0  # capped load penalty
+
+    def test_rebuild_and_weekly_average(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            add_recovery_log(days_ago=1, soreness=None)
+            add_recovery_log(soreness=4)
+            ReadinessDay.query.delete()
+            assert rebuild_readiness(sample_user.user_id) == 2
+            db.session.commit()
+
+            assert [row['date'] for row in readiness_series(sample_user.user_id, 7)] == [
+                str(TODAY - timedelta(days=1)), str(TODAY)
+            ]
+            average = RecoveryLog.get_weekly_average(sample_user.user_id)
+            assert average['avg_soreness'] == 4.0  # the blank entry is not averaged in as 0
+            assert average['avg_readiness'] is not None
+            assert average['logs_count'] == 2
@@ -0,0 +1,67 @@
+"""Tests for rolling recovery trend statistics."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from app.services.recovery_trends import downsample, trends
+
+TODAY = date.today()
+
+
+class TestRollingMath:
+    """Tests for the numpy finishing steps."""
+
+    def test_downsample_ignores_nan(self):
+        buckets, means = downsample([0, 1, 5, 9], {'x': [1, np.nan, 3, 5]}, 3)
+        assert buckets.tolist() == [0, 1, 3]
+        assert means['x'].tolist() == [1, 3, 5]
+
+
+class TestTrends:
+    """Tests for the windowed query, the cache and the endpoint."""
+
+    def test_windows_count_calendar_days(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            start = TODAY - timedelta(days=29)
+            for offset, sleep in ((0, 4), (10, 6), (25, 8), (29, 9)):
+                add_recovery_log(start + timedelta(days=offset), sleep=sleep)
+
+            result = trends(sample_user.user_id, start, TODAY)
+            sleep = result['metrics']['sleep']
+            assert result['dates'][-1] == TODAY.isoformat()
+            assert sleep['value'] == [4, 6, 8, 9]
+            assert sleep['mean_7'] == [None, None, None, 8]  # day 25 is inside day 29's week
+            assert sleep['mean_28'][-1] == 7                    # day 0 fell out, day 29 is not in it
+            assert sleep['sd_7'] == [None, None, None, None]
+            assert sleep['z_28'][-1] == pytest.approx((9 - 7) / np.std([6, 8], ddof=1), abs=0.01)
+
+    def test_cached_and_refreshed_on_new_log(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            add_recovery_log(TODAY - timedelta(days=1), energy=5)
+            assert trends(sample_user.user_id)['metrics']['energy']['value'] == [5]
+            add_recovery_log(TODAY, energy=9)
+            assert trends(sample_user.user_id)['metrics']['energy']['mean_7'] == [None, 5]
+
+    def test_multi_year_range_is_downsampled(self, app, sample_user, add_recovery_log):
+        with app.app_context():
+            start = TODAY - timedelta(days=3 * 365)
+            for offset in range(0, 3 * 365, 3):
+                add_recovery_log(start + timedelta(days=offset), sleep=offset % 10)
+
+            result = trends(sample_user.user_id, start, TODAY, max_points=100)
+            assert result['bucket_days'] == 11
+            assert len(result['dates']) <= 100
+            assert result['dates'][0] == start.isoformat()
+
+    def test_endpoint(self, authenticated_client, app, sample_user, add_recovery_log):
+        with app.app_context():
+            add_recovery_log(TODAY)
+
+        data = authenticated_client.get('/recovery/api/trends?days=7').get_json()
+        assert data['start'] == (TODAY - timedelta(days=6)).isoformat()
+        assert data['metrics']['soreness']['value'] == [3]
+        assert authenticated_client.get('/recovery/api/trends?start=nope').status_code == 400
+        data = authenticated_client.get(f'/recovery/api/trends?days={10 ** 9}').get_json()
+        assert data['start'] == date.min.isoformat()
+        data = authenticated_client.get('/recovery/api/trends?end=0001-01-05').get_json()
+        assert data['start'] == date.min.isoformat()
@@ -0,0 +1,70 @@
+"""Tests for bodyweight-relative strength."""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from app import db
+from app.models import BodyMeasurement
+from app.services.relative_strength import (
+    dots, bodyweight_as_of, relative_strength_history, relative_pr
+)
+
+TODAY = date.today()
+
+
+def weigh_in(user_id, days_ago, weight):
+    db.session.add(BodyMeasurement(user_id=user_id, weight_kg=weight,
+                                   measurement_date=TODAY - timedelta(days=days_ago)))
+    db.session.commit()
+
+
+class TestAsOfJoin:
+    """Tests for the vectorized as-of lookup and DOTS."""
+
+    def test_most_recent_weigh_in(self):
+        weights = bodyweight_as_of([10, 20, 30], [80.0, 82.0, 81.0], [5, 10, 15, 30, 99])
+        assert np.isnan(weights[0])
+        assert weights[1:].tolist() == [80.0, 80.0, 81.0, 81.0]
+        assert np.isnan(bodyweight_as_of([], [], [1, 2])).all()
+
+    def test_dots(self):
+        assert dots([500], [100], 'M')[0] == pytest.approx(307.75, abs=0.05)
+        assert dots([300], [60], 'F')[0] > dots([300], [60], 'M')[0]
+        assert np.isnan(dots([500], [100], None)[0])
+
+
+class TestRelativeStrength:
+    """Tests for the history and the cached PR."""
+
+    def test_history_uses_bodyweight_on_the_day(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            weigh_in(sample_user.user_id, 30, 80)
+            weigh_in(sample_user.user_id, 10, 90)
+            add_strength_log(days_ago=40, reps=1, weight_kg=70)  # before the first weigh-in
+            add_strength_log(days_ago=20, reps=1, weight_kg=100)
+            log = add_strength_log(days_ago=5, reps=1, weight_kg=108)
+
+            history = relative_strength_history(sample_user.user_id, log.exercise_id, 'M')
+            assert [(row['bodyweight'], row['relative']) for row in history] == [(80.0, 1.25), (90.0, 1.2)]
+            assert history[0]['dots'] == pytest.approx(float(dots([100], [80], 'M')[0]), abs=0.1)
+
+    def test_relative_pr_is_cached_until_data_changes(self, app, sample_user, sample_exercises,
+                                                      add_strength_log):
+        with app.app_context():
+            weigh_in(sample_user.user_id, 30, 80)
+            log = add_strength_log(days_ago=20, reps=1, weight_kg=100)
+            assert relative_pr(sample_user.user_id, log.exercise_id)['relative'] == 1.25
+
+            weigh_in(sample_user.user_id, 25, 100)
+            pr = relative_pr(sample_user.user_id, log.exercise_id)
+            assert (pr['relative'], pr['dots']) == (1.0, None)
+
+    def test_endpoint(self, authenticated_client, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            weigh_in(sample_user.user_id, 3, 80)
+            log = add_strength_log(days_ago=1, reps=5, weight_kg=100)
+            exercise_id = log.exercise_id
+
+        data = authenticated_client.get(f'/analytics/api/relative-strength/{exercise_id}').get_json()
+        assert len(data['history']) == 1
+        assert data['pr']['relative'] == round(116.67 / 80, 2)
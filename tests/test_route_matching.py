@@ -0,0 +1,103 @@
+"""Tests for GPS route matching."""
+import math
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from app import db
+from app.models import WorkoutSession, RunningLog, RunSamples, RunRoute, RunTrack
+from app.services.routes import (
+    downsample, frechet_distance, grid_cell, neighbour_cells, match_run_route, match_all_routes,
+    MAX_POINTS
+)
+
+
+def loop_track(lat0=50.85, lon0=4.35, radius_deg=0.01, points=600, noise_deg=0.0, seed=0,
+               reverse=False):
+    """A circular ~7 km course starting at its eastern point."""
+    rng = random.Random(seed)
+    angles = [2 * math.pi * i / (points - 1) for i in range(points)]
+    if reverse:
+        angles = [-a for a in angles]
+    lats = [lat0 + radius_deg * math.sin(a) + rng.uniform(-noise_deg, noise_deg) for a in angles]
+    lons = [lon0 + radius_deg * math.cos(a) / math.cos(math.radians(lat0))
+            + rng.uniform(-noise_deg, noise_deg) for a in angles]
+    return lats, lons
+
+
+def add_run(user_id, lats, lons, days_ago=0, pace=5.0):
+    session = WorkoutSession(user_id=user_id, session_type='running',
+                             session_date=date.today() - timedelta(days=days_ago))
+    run = RunningLog(session=session, run_type='easy', distance_km=7, duration_minutes=35,
+                     avg_pace_per_km=pace)
+    run.samples = RunSamples.from_series({
+        'time': list(range(len(lats))), 'lat': lats, 'lon': lons
+    }, source_format='gpx')
+    db.session.add_all([session, run])
+    db.session.flush()
+    route = match_run_route(run, user_id)
+    db.session.commit()
+    return run, route
+
+
+class TestGeometry:
+    """Tests for downsampling and the Fréchet distance."""
+
+    def test_downsample(self):
+        lats, lons = loop_track()
+        small_lats, small_lons, length = downsample(lats + [None], lons + [None])
+        assert len(small_lats) == MAX_POINTS
+        assert length == pytest.approx(2 * math.pi * 0.01 * 111_320, rel=0.01)
+        assert downsample([50.0], [4.0]) is None
+
+    def test_frechet(self):
+        a = np.array([[0, 0], [10, 0], [20, 0]], dtype=float)
+        b = np.array([[0, 3], [10, 4], [20, 3]], dtype=float)
+        assert frechet_distance(a, b) == pytest.approx(4)
+        assert frechet_distance(a, b[::-1]) == pytest.approx(math.hypot(20, 3))
+        assert frechet_distance(a, b + 100, bound=50) is None
+
+    def test_grid(self):
+        cell = grid_cell(50.851, 4.349)
+        assert cell == '10170:869'
+        assert len(set(neighbour_cells(cell))) == 9
+
+
+class TestMatching:
+    """Tests for clustering runs into routes."""
+
+    def test_same_course_matches(self, app, sample_user):
+        with app.app_context():
+            _, first = add_run(sample_user.user_id, *loop_track(noise_deg=0.0001, seed=1))
+            run, second = add_run(sample_user.user_id, *loop_track(noise_deg=0.0001, seed=2))
+            assert second.route_id == first.route_id
+            assert 0 < float(run.track.match_distance_m) < 75
+
+    def test_other_courses_get_new_routes(self, app, sample_user):
+        with app.app_context():
+            _, base = add_run(sample_user.user_id, *loop_track())
+            _, reverse = add_run(sample_user.user_id, *loop_track(reverse=True))
+            _, elsewhere = add_run(sample_user.user_id, *loop_track(lat0=50.9))
+            _, bigger = add_run(sample_user.user_id, *loop_track(radius_deg=0.015))
+            assert len({base.route_id, reverse.route_id, elsewhere.route_id, bigger.route_id}) == 4
+
+    def test_efforts_endpoint_and_rebuild(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            add_run(sample_user.user_id, *loop_track(seed=1, noise_deg=0.0001), days_ago=10, pace=5.2)
+            run, route = add_run(sample_user.user_id, *loop_track(seed=2, noise_deg=0.0001),
+                                 days_ago=3, pace=4.9)
+            add_run(sample_user.user_id, *loop_track(lat0=51.2))
+            route_id = route.route_id
+
+        efforts = authenticated_client.get(f'/running/api/routes/{route_id}/efforts').get_json()
+        assert [e['pace'] for e in efforts] == [5.2, 4.9]
+        assert efforts[1]['is_best']
+        routes = authenticated_client.get('/running/api/routes').get_json()
+        assert [r['efforts'] for r in routes] == [2, 1]
+
+        with app.app_context():
+            assert match_all_routes() == 3
+            db.session.commit()
+            assert RunRoute.query.count() == 2
+            assert RunTrack.query.filter(RunTrack.route_id.isnot(None)).count() == 3
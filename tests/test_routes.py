@@ -165,6 +165,21 @@ class TestExerciseRoutes:
             response = authenticated_client.get('/exercises/')
             assert response.status_code == 200
 
+    def test_exercise_search_page(self, authenticated_client, app, sample_exercises):
+        """Test exercise library search uses the ranked search."""
+        with app.app_context():
+            response = authenticated_client.get('/exercises/?search=dead')
+            assert response.status_code == 200
+            assert b'Deadlift' in response.data
+            assert b'Bench Press' not in response.data
+
+    def test_autocomplete_api(self, authenticated_client, app, sample_exercises):
+        """Test autocomplete tolerates typos."""
+        with app.app_context():
+            response = authenticated_client.get('/exercises/api/autocomplete?q=sqaut')
+            assert response.status_code == 200
+            assert [e['name'] for e in response.get_json()] == ['Squat']
+
 
 class TestPlanningRoutes:
     """Tests for planning routes."""
@@ -0,0 +1,171 @@
+"""Tests for GPX/TCX/FIT import and sample storage."""
+import io
+import math
+import struct
+from datetime import date, datetime, timedelta
+
+import pytest
+from app import db
+from app.models import WorkoutSession, RunningLog, RunSamples
+from app.models.run_samples import encode_series, decode_series
+from app.services.run_import import (
+    parse_gpx, parse_tcx, parse_fit, parse_track, import_track, TrackParseError, FIT_EPOCH
+)
+
+START = datetime(2024, 5, 1, 7, 0, 0)
+
+
+def make_gpx(points=4):
+    trkpts = []
+    for i in range(points):
+        t = (START + timedelta(seconds=i * 10)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        trkpts.append(
+            f'<trkpt lat="{50 + i * 0.0003:.6f}" lon="4.000000"><ele>{100 + i * 3}</ele>'
+            f'<time>{t}</time><extensions><gpxtpx:TrackPointExtension>'
+            f'<gpxtpx:hr>{140 + i}</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions></trkpt>'
+        )
+    return (
+        '<?xml version="1.0"?><gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1" '
+        'xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">'
+        f'<trk><trkseg>{"".join(trkpts)}</trkseg></trk></gpx>'
+    ).encode()
+
+
+def make_tcx():
+    points = []
+    for i in range(3):
+        t = (START + timedelta(seconds=i * 60)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        points.append(
+            f'<Trackpoint><Time>{t}</Time><DistanceMeters>{i * 250}</DistanceMeters>'
+            f'<HeartRateBpm><Value>{150 + i * 5}</Value></HeartRateBpm></Trackpoint>'
+        )
+    return (
+        '<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">'
+        f'<Activities><Activity><Lap><Track>{"".join(points)}</Track></Lap></Activity></Activities>'
+        '</TrainingCenterDatabase>'
+    ).encode()
+
+
+def make_fit(samples):
+    """Minimal FIT file: one record definition, normal and compressed headers."""
+    records = bytearray()
+    # Definition for local type 0, global message 20 (record), little endian
+    fields = [(253, 4, 0x86), (3, 1, 0x02), (5, 4, 0x86), (2, 2, 0x84)]
+    records += bytes([0x40, 0, 0]) + struct.pack('<H', 20) + bytes([len(fields)])
+    for field in fields:
+        records += bytes(field)
+    base = int((START - FIT_EPOCH).total_seconds())
+    for i, (hr, distance_m, altitude) in enumerate(samples):
+        values = struct.pack('<IBIH', base + i, hr, int(distance_m * 100), int((altitude + 500) * 5))
+        if i % 2:
+            # Compressed timestamp header carries the low 5 bits of the time
+            records += bytes([0x80 | ((base + i) & 0x1F)]) + values
+        else:
+            records += bytes([0x00]) + values
+    header = struct.pack('<BBHI4s', 12, 0x10, 2100, len(records), b'.FIT')
+    return header + bytes(records) + b'\x00\x00'
+
+
+class TestSampleCodec:
+    """Tests for the compressed sample arrays."""
+
+    @pytest.mark.parametrize('scale,order', [(1, 1), (10, 2), (1_000_000, 2)])
+    def test_roundtrip(self, scale, order):
+        values = [0, 1.5, -3.25, 7, 7, 1e-6 * 123456, 180.0, -179.999999]
+        decoded = decode_series(encode_series(values, scale, order), scale, order)
+        assert decoded == pytest.approx([round(v * scale) / scale for v in values])
+
+    def test_three_hour_run_is_compact(self):
+        n = 3 * 3600
+        series = {
+            'time': list(range(n)),
+            'distance': [i * 3.1 for i in range(n)],
+            'heart_rate': [150 + int(10 * math.sin(i / 300)) for i in range(n)],
+            'elevation': [100 + 20 * math.sin(i / 900) for i in range(n)],
+            'lat': [50 + 0.01 * math.sin(i / 1800) for i in range(n)],
+            'lon': [4 + 0.01 * math.cos(i / 1800) for i in range(n)],
+        }
+        samples = RunSamples.from_series(series, source_format='gpx')
+        assert samples.sample_count == n
+        assert samples.stored_bytes < 16 * 1024
+        assert samples.series('heart_rate') == series['heart_rate']
+        assert samples.series('lat') == pytest.approx(series['lat'], abs=1e-6)
+
+
+class TestParsers:
+    """Tests for the streaming file parsers."""
+
+    def test_parse_gpx(self):
+        track = parse_gpx(io.BytesIO(make_gpx()))
+        assert len(track) == 4
+        assert track.start_time == START
+        assert track.time == [0, 10, 20, 30]
+        assert track.heart_rate == [140, 141, 142, 143]
+        # Distance derived from positions: 3 x 0.0003 deg latitude ~ 100 m
+        assert track.distance_m == pytest.approx(100, rel=0.01)
+        assert track.elevation_gain() == 9
+
+    def test_parse_tcx(self):
+        track = parse_tcx(io.BytesIO(make_tcx()))
+        assert track.distance == [0, 250, 500]
+        assert track.lat is None
+        summary = track.summary()
+        assert summary['distance_km'] == 0.5
+        assert summary['duration_minutes'] == 2
+        assert summary['avg_heart_rate'] == 158
+        assert summary['max_heart_rate'] == 160
+
+    def test_parse_fit(self):
+        samples = [(140 + i, i * 3.0, 10 + i * 0.2) for i in range(40)]
+        track = parse_fit(io.BytesIO(make_fit(samples)))
+        assert len(track) == 40
+        assert track.start_time == START
+        assert track.time == list(range(40))
+        assert track.heart_rate == [s[0] for s in samples]
+        assert track.distance[-1] == pytest.approx(117.0)
+        assert track.elevation[1] == pytest.approx(10.2)
+
+    def test_rejects_unknown_and_invalid_files(self):
+        with pytest.raises(TrackParseError):
+            parse_track('run.csv', io.BytesIO(b''))
+        with pytest.raises(TrackParseError):
+            parse_track('run.gpx', io.BytesIO(b'<gpx><trk>'))
+        with pytest.raises(TrackParseError):
+            parse_track('run.fit', io.BytesIO(b'not a fit file'))
+
+
+class TestImportRoutes:
+    """Tests for attaching a recording to a run."""
+
+    def test_import_gpx_updates_run(self, authenticated_client, app, sample_running_session):
+        with app.app_context():
+            session_id = WorkoutSession.query.filter_by(session_type='running').first().session_id
+            response = authenticated_client.post(
+                f'/running/session/{session_id}/import',
+                data={'track_file': (io.BytesIO(make_gpx(points=7)), 'morning.gpx')},
+                content_type='multipart/form-data',
+                follow_redirects=True
+            )
+            assert response.status_code == 200
+            assert b'Imported 7 samples' in response.data
+
+            run_log = RunningLog.query.filter_by(session_id=session_id).first()
+            assert run_log.samples.sample_count == 7
+            assert run_log.duration_minutes == 1
+            assert run_log.max_heart_rate == 146
+
+            response = authenticated_client.get(f'/running/session/{session_id}/samples?step=2')
+            data = response.get_json()
+            assert data['source_format'] == 'gpx'
+            assert data['heart_rate'] == [140, 142, 144, 146]
+
+    def test_samples_deleted_with_session(self, app, sample_running_session):
+        with app.app_context():
+            session = WorkoutSession.query.filter_by(session_type='running').first()
+            import_track(session.running_logs.first(), 'run.tcx', io.BytesIO(make_tcx()))
+            db.session.commit()
+            assert RunSamples.query.count() == 1
+
+            db.session.delete(session)
+            db.session.commit()
+            assert RunSamples.query.count() == 0
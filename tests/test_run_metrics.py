@@ -0,0 +1,88 @@
+"""Tests for run metrics stored at write time."""
+from datetime import date
+
+import pytest
+from app import db
+from app.models import User, WorkoutSession, RunningLog, TrainingLoadDay
+from app.services.run_metrics import (
+    parse_pace, calculate_trimp, calculate_intensity_factor, recompute_user_metrics
+)
+
+
+def add_run(user_id, **fields):
+    session = WorkoutSession(user_id=user_id, session_type='running', session_date=date.today())
+    run = RunningLog(session=session, run_type='easy', **fields)
+    db.session.add_all([session, run])
+    db.session.commit()
+    return run
+
+
+class TestCalculations:
+    """Tests for the metric formulas."""
+
+    def test_parse_pace(self):
+        assert parse_pace('4:30') == 4.5
+        assert parse_pace('5,25') == 5.25
+        assert parse_pace('4:75') is None
+        assert parse_pace('') is None
+
+    def test_trimp_uses_resting_hr(self):
+        assert calculate_trimp(60, 150, 180) == pytest.approx(121.56, abs=0.01)
+        assert calculate_trimp(60, 150, 180, resting_hr=45) > calculate_trimp(60, 150, 180)
+        assert calculate_trimp(60, None, 180) is None
+
+    def test_intensity_factor(self):
+        assert calculate_intensity_factor(5.0, 4.5) == 0.9
+        assert calculate_intensity_factor(5.0, None) is None
+
+
+class TestStoredMetrics:
+    """Tests for the flush hook and the profile backfill."""
+
+    def test_metrics_stored_on_insert_and_edit(self, app, sample_user):
+        with app.app_context():
+            run = add_run(sample_user.user_id, distance_km=10, duration_minutes=50,
+                          avg_heart_rate=150, max_heart_rate=180)
+            assert float(run.avg_pace_per_km) == 5.0
+            assert float(run.trimp_score) == pytest.approx(calculate_trimp(50, 150, 180))
+
+            run.duration_minutes = 45
+            db.session.commit()
+            assert float(run.pace_per_km) == 4.5
+            assert float(run.trimp_score) == pytest.approx(calculate_trimp(45, 150, 180))
+
+    def test_explicit_pace_is_kept(self, app, sample_user):
+        with app.app_context():
+            run = add_run(sample_user.user_id, distance_km=10, duration_minutes=50,
+                          avg_pace_per_km=4.97)
+            assert float(run.avg_pace_per_km) == 4.97
+
+    def test_profile_backfill(self, app, sample_user):
+        with app.app_context():
+            run = add_run(sample_user.user_id, distance_km=10, duration_minutes=50,
+                          avg_heart_rate=150, max_heart_rate=180)
+            before = float(run.trimp_score)
+
+            user = db.session.get(User, sample_user.user_id)
+            user.max_heart_rate, user.resting_heart_rate = 195, 50
+            user.threshold_pace_per_km = 4.5
+            assert recompute_user_metrics(user.user_id) == 1
+            db.session.commit()
+
+            assert float(run.trimp_score) == pytest.approx(calculate_trimp(50, 150, 195, 50))
+            assert float(run.trimp_score) != before
+            assert float(run.intensity_factor) == 0.9
+            day = TrainingLoadDay.query.filter_by(user_id=user.user_id).one()
+            assert float(day.load) == pytest.approx(float(run.trimp_score))
+
+    def test_profile_form(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            run = add_run(sample_user.user_id, distance_km=10, duration_minutes=50)
+            response = authenticated_client.post('/profile', data={
+                'action': 'update_heart_rate', 'max_heart_rate': '', 'resting_heart_rate': '',
+                'threshold_pace': '4:10'
+            })
+            assert response.status_code == 302
+            db.session.refresh(run)
+            assert float(run.intensity_factor) == pytest.approx(4.17 / 5, abs=0.01)
+            assert float(db.session.get(User, sample_user.user_id).threshold_pace_per_km) == 4.17
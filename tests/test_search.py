@@ -0,0 +1,110 @@
+"""Tests for exercise search and autocomplete."""
+from pathlib import Path
+
+import pytest
+from app import db
+from app.models import Exercise
+from app.services.search import (
+    ExerciseIndex, normalize, prefix_distance, search_exercises, autocomplete, get_index,
+    SQL_NORMALIZE_FUNCTION
+)
+
+
+CATALOG = [
+    {'id': 1, 'name': 'Bench Press', 'muscle_group': 'Chest, Triceps', 'type': 'strength'},
+    {'id': 2, 'name': 'Incline Bench Press', 'muscle_group': 'Chest', 'type': 'strength'},
+    {'id': 3, 'name': 'Pull-Up', 'muscle_group': 'Back, Biceps', 'type': 'strength'},
+    {'id': 4, 'name': 'Easy Run', 'muscle_group': 'Cardio', 'type': 'cardio'},
+]
+
+
+class TestExerciseIndex:
+    """Tests for the in-memory prefix index."""
+
+    def test_normalize(self):
+        assert normalize('Pull-Up') == 'pull up'
+        assert normalize('  Café  Curl ') == 'cafe curl'
+
+    def test_setup_sql_normalizes_like_the_index(self):
+        setup_sql = Path(__file__).resolve().parent.parent / 'setup_database.sql'
+        text = setup_sql.read_text()
+        assert SQL_NORMALIZE_FUNCTION in text
+        assert 'gin (search_normalize(name) gin_trgm_ops)' in text
+
+    def test_prefix_distance(self):
+        assert prefix_distance('bench', 'bench', 1) == 0
+        assert prefix_distance('ben', 'bench', 1) == 0
+        assert prefix_distance('bnech', 'bench', 1) == 1  # transposition
+        assert prefix_distance('xyz', 'bench', 1) == 2
+
+    def test_prefix_match_ranks_leading_name_first(self):
+        index = ExerciseIndex(CATALOG)
+        results = index.search('bench')
+        assert [r['id'] for r in results] == [1, 2]
+
+    def test_all_tokens_must_match(self):
+        index = ExerciseIndex(CATALOG)
+        assert [r['id'] for r in index.search('incl ben')] == [2]
+        assert index.search('bench run') == []
+
+    def test_muscle_group_matches(self):
+        index = ExerciseIndex(CATALOG)
+        assert [r['id'] for r in index.search('bicep')] == [3]
+
+    def test_typo_tolerance(self):
+        index = ExerciseIndex(CATALOG)
+        assert index.search('bnech', fuzzy=False) == []
+        assert [r['id'] for r in index.search('bnech')][:1] == [1]
+
+    def test_usage_boost(self):
+        index = ExerciseIndex(CATALOG)
+        results = index.search('bench', boosts={2: 20})
+        assert results[0]['id'] == 2
+
+    def test_type_filter_and_limit(self):
+        index = ExerciseIndex(CATALOG)
+        assert index.search('run', exercise_type='strength') == []
+        assert len(index.search('press', limit=1)) == 1
+
+
+class TestSearchService:
+    """Tests for search against the database-backed catalog."""
+
+    def test_search_boosts_logged_exercises(self, app, sample_user, sample_strength_session):
+        with app.app_context():
+            db.session.add(Exercise(name='Bench Dip', muscle_group='Triceps',
+                                    exercise_type='strength'))
+            db.session.commit()
+            results = search_exercises('bench', user_id=sample_user.user_id)
+            assert results[0]['name'] == 'Bench Press'
+
+    def test_index_rebuilt_when_exercises_change(self, app, sample_exercises):
+        with app.app_context():
+            assert autocomplete('goblet') == []
+            first = get_index()
+            db.session.add(Exercise(name='Goblet Squat', muscle_group='Quadriceps',
+                                    exercise_type='strength'))
+            db.session.commit()
+            assert get_index() is not first
+            assert [r['name'] for r in autocomplete('gobl')] == ['Goblet Squat']
+
+    def test_only_missing_trgm_disables_postgres(self, app, sample_exercises, monkeypatch):
+        from sqlalchemy.exc import DBAPIError
+        from app.services import search
+
+        class MissingFunction(Exception):
+            sqlstate = search.UNDEFINED_FUNCTION
+
+        errors = [DBAPIError('SELECT', {}, Exception('timeout')), DBAPIError('SELECT', {}, MissingFunction())]
+
+        def failing(*args):
+            raise errors.pop(0)
+
+        monkeypatch.setattr(search, '_postgres_unavailable', False)
+        monkeypatch.setattr(search, '_search_postgres', failing)
+        monkeypatch.setitem(app.config, 'SEARCH_BACKEND', 'postgres')
+        with app.app_context():
+            assert search_exercises('bench')[0]['name'] == 'Bench Press'
+            assert search._postgres_unavailable is False  # transient: retried next call
+            assert search_exercises('bench')[0]['name'] == 'Bench Press'
+            assert search._postgres_unavailable is True
@@ -0,0 +1,98 @@
+"""Tests for per-set strength detail and stored log aggregates."""
+import pytest
+from app import db
+from app.models import Exercise, WorkoutSession, StrengthLog
+from app.models.workout import pack_sets, unpack_sets
+from app.services.e1rm import estimate
+from app.services.strength_sets import parse_set_detail, log_aggregates, recompute_user_strength
+
+DROP_SETS = [(5, 100.0, 8), (5, 90.0, None), (8, 80.0, 9)]
+
+
+class TestSetDetail:
+    """Tests for packing and parsing."""
+
+    def test_pack_round_trip(self):
+        sets = [(5, 102.5, 8), (5, 92.25, None), (12, None, 10)]
+        assert unpack_sets(pack_sets(sets)) == sets
+
+    def test_parse(self):
+        assert parse_set_detail('5x100 @8, 5x90; 8 x 80.5kg@9') == [
+            (5, 100.0, 8), (5, 90.0, None), (8, 80.5, 9)
+        ]
+        assert parse_set_detail('12, 10') == [(12, None, None), (10, None, None)]
+        assert parse_set_detail('  ') == []
+        with pytest.raises(ValueError):
+            parse_set_detail('5x100 @11')
+        with pytest.raises(ValueError):
+            parse_set_detail('heavy')
+
+    def test_set_sets_rejects_out_of_range_values(self):
+        for sets in ([(0, 100, None)], [(5, -20, None)], [(5, 100, 11)], [(5, 100, 0)], []):
+            with pytest.raises(ValueError):
+                StrengthLog().set_sets(sets)
+        log = StrengthLog()
+        log.set_sets([(5, 100, 10), (8, None, 1)])
+        assert (log.sets, log.reps, float(log.weight_kg), log.rpe) == (2, 5, 100.0, 10)
+
+    def test_aggregates_match_uniform_formula(self):
+        uniform = StrengthLog(sets=3, reps=10, weight_kg=80)
+        e1rm, volume = log_aggregates([uniform, StrengthLog(sets=0, reps=5, weight_kg=50)])
+        assert e1rm.tolist() == [estimate(80, 10), 0]
+        assert volume.tolist() == [2400, 0]
+
+
+class TestStoredAggregates:
+    """Tests for the summary columns kept with the sets."""
+
+    def test_drop_sets(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(detail=DROP_SETS)
+            assert (log.sets, log.reps, float(log.weight_kg), log.rpe) == (3, 5, 100, 8)
+            assert log.volume == 500 + 450 + 640
+            assert log.estimated_1rm == pytest.approx(estimate(100, 5))
+            assert log.set_list() == DROP_SETS
+            assert log.set_summary == '5x100 @8, 5x90, 8x80 @9'
+
+    def test_uniform_sets_are_not_packed(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(detail=[(5, 100, None)] * 3)
+            assert log.set_data is None
+            assert log.set_summary == '3x5 @ 100.00kg'
+            assert log.volume == 1500
+
+    def test_summary_edit_drops_detail(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            log = add_strength_log(detail=DROP_SETS)
+            log.weight_kg = 60
+            db.session.commit()
+            assert log.set_data is None
+            assert log.volume == 3 * 5 * 60
+
+    def test_recompute(self, app, sample_user, sample_exercises, add_strength_log):
+        with app.app_context():
+            detailed = add_strength_log(detail=DROP_SETS)
+            uniform = add_strength_log(sets=3, reps=10, weight_kg=80)
+            StrengthLog.query.update({'e1rm': None, 'volume_kg': None})
+            assert recompute_user_strength(sample_user.user_id) == 2
+            db.session.commit()
+
+            assert float(db.session.get(StrengthLog, detailed.log_id).volume_kg) == 1590
+            assert float(db.session.get(StrengthLog, uniform.log_id).e1rm) == estimate(80, 10)
+
+    def test_log_form_accepts_set_detail(self, authenticated_client, app, sample_user,
+                                         sample_exercises):
+        with app.app_context():
+            session = WorkoutSession(user_id=sample_user.user_id, session_type='upper_body')
+            db.session.add(session)
+            db.session.commit()
+            bench = Exercise.query.filter_by(name='Bench Press').first()
+
+            response = authenticated_client.post(f'/workouts/session/{session.session_id}/log', data={
+                'exercise_id': bench.exercise_id,
+                'set_detail': '5x100 @8, 5x90, 8x80 @9'
+            })
+            assert response.status_code == 200
+            assert b'5x100 @8, 5x90, 8x80 @9' in response.data
+            log = StrengthLog.query.filter_by(session_id=session.session_id).one()
+            assert log.set_list() == DROP_SETS
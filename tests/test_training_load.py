@@ -0,0 +1,120 @@
+"""Tests for the stored ATL/CTL/TSB training-load series."""
+from datetime import date, timedelta
+
+import pytest
+from app import db
+from app.models import WorkoutSession, RunningLog, TrainingLoadDay
+from app.services.training_load import (
+    step, update_training_load, rebuild_training_load, load_series, ATL_DECAY, CTL_DECAY
+)
+
+
+def add_run(user_id, days_ago, minutes=60, avg_hr=150, max_hr=180):
+    session = WorkoutSession(user_id=user_id, session_type='running',
+                             session_date=date.today() - timedelta(days=days_ago))
+    run = RunningLog(session=session, run_type='easy', distance_km=10, duration_minutes=minutes,
+                     avg_heart_rate=avg_hr, max_heart_rate=max_hr)
+    db.session.add_all([session, run])
+    db.session.commit()
+    return run
+
+
+def assert_same_series(a, b):
+    # Incremental updates seed from stored (rounded) values, so allow rounding drift
+    assert [row['date'] for row in a] == [row['date'] for row in b]
+    for row_a, row_b in zip(a, b):
+        assert row_a['load'] == row_b['load']
+        for key in ('atl', 'ctl', 'tsb'):
+            assert row_a[key] == pytest.approx(row_b[key], abs=0.02)
+
+
+def stored(user_id):
+    return [row.to_dict() for row in TrainingLoadDay.query.filter_by(user_id=user_id)
+            .order_by(TrainingLoadDay.load_date)]
+
+
+class TestModel:
+    """Tests for the exponentially weighted update."""
+
+    def test_step(self):
+        atl, ctl = step(0, 0, 100)
+        assert atl == pytest.approx(100 * ATL_DECAY)
+        assert ctl == pytest.approx(100 * CTL_DECAY)
+        # A steady load converges to itself
+        for _ in range(400):
+            atl, ctl = step(atl, ctl, 50)
+        assert atl == pytest.approx(50, abs=0.01) and ctl == pytest.approx(50, abs=0.01)
+
+
+class TestIncrementalSeries:
+    """Tests for the commit hook keeping the stored series current."""
+
+    def test_run_creates_rows_through_last_run(self, app, sample_user):
+        with app.app_context():
+            run = add_run(sample_user.user_id, 10)
+            add_run(sample_user.user_id, 3)
+            rows = stored(sample_user.user_id)
+            assert len(rows) == 8
+            assert rows[0]['load'] == pytest.approx(float(run.trimp_score), abs=0.01)
+            assert rows[1]['load'] == 0
+            assert rows[1]['atl'] < rows[0]['atl']
+            assert rows[-1]['tsb'] == pytest.approx(rows[-1]['ctl'] - rows[-1]['atl'], abs=0.01)
+
+    def test_backdated_edit_and_delete_match_rebuild(self, app, sample_user, authenticated_client):
+        with app.app_context():
+            user_id = sample_user.user_id
+            add_run(user_id, 20)
+            middle = add_run(user_id, 12, minutes=90)
+            add_run(user_id, 2)
+            add_run(user_id, 30, minutes=45)  # backdated before the series start
+
+            middle.session.session_date = date.today() - timedelta(days=15)
+            middle.avg_heart_rate = 165
+            db.session.commit()
+            incremental = stored(user_id)
+            assert incremental[0]['date'] == str(date.today() - timedelta(days=30))
+
+            rebuild_training_load(user_id)
+            db.session.commit()
+            assert_same_series(stored(user_id), incremental)
+
+            authenticated_client.post(f'/running/session/{middle.session_id}/delete')
+            incremental = stored(user_id)
+            rebuild_training_load(user_id)
+            db.session.commit()
+            assert_same_series(stored(user_id), incremental)
+            assert all(row['date'] != str(date.today() - timedelta(days=15)) or row['load'] == 0
+                       for row in incremental)
+
+    def test_update_only_rewrites_from_changed_date(self, app, sample_user):
+        with app.app_context():
+            add_run(sample_user.user_id, 40)
+            add_run(sample_user.user_id, 5)
+            assert update_training_load(sample_user.user_id, date.today() - timedelta(days=5)) == 1
+            db.session.commit()
+            assert len(stored(sample_user.user_id)) == 36
+
+
+class TestReads:
+    """Tests for reading the series without recomputation."""
+
+    def test_series_decays_after_last_run(self, app, sample_user):
+        with app.app_context():
+            add_run(sample_user.user_id, 50)
+            add_run(sample_user.user_id, 40)
+            series = load_series(sample_user.user_id, days=30)
+            assert len(series) == 30
+            assert series[-1]['date'] == str(date.today())
+            assert all(day['load'] == 0 for day in series)
+            last = stored(sample_user.user_id)[-1]
+            assert series[-1]['atl'] == pytest.approx(last['atl'] * (1 - ATL_DECAY) ** 40, abs=0.01)
+            assert series[-1]['acwr'] < 0.5
+
+    def test_chart_endpoint(self, authenticated_client, app, sample_user):
+        with app.app_context():
+            add_run(sample_user.user_id, 1)
+        response = authenticated_client.get('/analytics/api/training-load?days=14')
+        data = response.get_json()
+        assert len(data) == 14
+        assert data[-2]['load'] > 0
+        assert data[0]['ctl'] == 0